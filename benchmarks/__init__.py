@@ -0,0 +1,10 @@
+"""
+Performance benchmarks for PyCDS database objects.
+
+Benchmarks run against a local PostgreSQL database migrated to the head revision,
+into which a synthetic CRMP dataset of configurable scale is generated (see
+`benchmarks.synthetic`). Results are written as JSON, so that runs at different
+revisions can be compared (see `benchmarks.compare`).
+
+See README.md in this directory for usage.
+"""
@@ -0,0 +1,205 @@
+"""
+Utilities shared by benchmarks: timing, query plans, result files, and command
+line arguments.
+"""
+
+import datetime
+import json
+import logging
+import statistics
+import subprocess
+import time
+from argparse import ArgumentParser
+from importlib.metadata import PackageNotFoundError, version
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from pycds.context import get_schema_name
+
+from benchmarks import synthetic
+
+logger = logging.getLogger(__name__)
+
+
+def compile_sql(statement):
+    """Return the SQL text of a SQLAlchemy statement or DDL element, with literal
+    values inlined. Strings are returned unchanged."""
+    if isinstance(statement, str):
+        return statement
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def time_statement(conn, statement, repeat=1, setup=None):
+    """Execute a statement `repeat` times and return the elapsed times.
+
+    Each execution takes place in a savepoint that is rolled back afterwards, so
+    that each repetition starts from the same state, and the statement has no
+    lasting effect.
+
+    :param conn: (sqlalchemy.engine.Connection) connection in a transaction
+    :param statement: SQLAlchemy statement, DDL element, or SQL string
+    :param repeat: (int) number of executions
+    :param setup: optional statement executed, untimed, before each execution
+    :return: (dict) `seconds` (list of elapsed times), `min`, `median`
+    """
+    sql = compile_sql(statement)
+    seconds = []
+    for _ in range(repeat):
+        savepoint = conn.begin_nested()
+        try:
+            if setup is not None:
+                conn.execute(text(compile_sql(setup)))
+            start = time.perf_counter()
+            conn.execute(text(sql))
+            seconds.append(time.perf_counter() - start)
+        finally:
+            savepoint.rollback()
+    return {
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+    }
+
+
+def explain_analyze(conn, statement):
+    """Execute a query under `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` and return the
+    plan. The query is executed in a savepoint that is rolled back afterwards.
+
+    :param conn: (sqlalchemy.engine.Connection) connection in a transaction
+    :param statement: SQLAlchemy statement or SQL string
+    :return: (dict) the plan, as returned by PostgreSQL
+    """
+    savepoint = conn.begin_nested()
+    try:
+        result = conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compile_sql(statement)}")
+        ).scalar()
+    finally:
+        savepoint.rollback()
+    # psycopg2 parses json results; be robust to drivers that do not.
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def plan_nodes(plan):
+    """Yield the nodes of a plan (as returned by `explain_analyze`), depth first."""
+    stack = [plan["Plan"] if "Plan" in plan else plan]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.get("Plans", [])))
+
+
+def plan_summary(plan):
+    """Summarize the parallelism of a plan (as returned by `explain_analyze`).
+
+    :param plan: (dict) the plan
+    :return: (dict) `parallel` (whether any node is parallel aware), and the total
+        numbers of `workers_planned` and `workers_launched` by Gather nodes
+    """
+    nodes = list(plan_nodes(plan))
+    return {
+        "parallel": any(node.get("Parallel Aware", False) for node in nodes),
+        "workers_planned": sum(node.get("Workers Planned", 0) for node in nodes),
+        "workers_launched": sum(node.get("Workers Launched", 0) for node in nodes),
+    }
+
+
+def git_revision():
+    """Return the git commit of the working tree, or None if unavailable."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(conn, schema_name=get_schema_name()):
+    """Return a description of the environment of a benchmark run: package,
+    source, schema, and server versions."""
+    try:
+        pycds_version = version("pycds")
+    except PackageNotFoundError:
+        pycds_version = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "pycds_version": pycds_version,
+        "git_revision": git_revision(),
+        "schema_name": schema_name,
+        "alembic_version": conn.execute(
+            text(f"SELECT version_num FROM {schema_name}.alembic_version")
+        ).scalar(),
+        "server_version": conn.execute(text("SHOW server_version")).scalar(),
+    }
+
+
+def write_results(results, path):
+    """Write benchmark results to a JSON file, or to standard output if `path` is
+    "-"."""
+    content = json.dumps(results, indent=2, default=str)
+    if path == "-":
+        print(content)
+        return
+    with open(path, "w") as f:
+        f.write(content)
+    logger.info(f"Results written to {path}")
+
+
+def read_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def benchmark_parser(description):
+    """Return a command line parser with the arguments common to benchmarks:
+    database DSN, results file, synthetic dataset scale, and logging level.
+    Benchmarks add their own arguments to it."""
+    defaults = synthetic.Scale()
+    p = ArgumentParser(description=description)
+    p.add_argument("-d", "--dsn", required=True, help="Database DSN")
+    p.add_argument(
+        "-o", "--out", default="-", help="Results file (JSON); '-' for stdout"
+    )
+    p.add_argument(
+        "--no-generate",
+        action="store_true",
+        help="Do not generate a synthetic dataset; use the existing database "
+        "content",
+    )
+    for field in synthetic.Scale._fields:
+        default = getattr(defaults, field)
+        p.add_argument(
+            f"--{field.replace('_', '-')}",
+            type=type(default),
+            default=default,
+            help=f"Synthetic dataset: {field.replace('_', ' ')} "
+            f"(default {default})",
+        )
+    p.add_argument(
+        "-L",
+        "--loglevel",
+        default="INFO",
+        choices="DEBUG INFO WARNING ERROR CRITICAL".split(),
+        help="Logging level",
+    )
+    return p
+
+
+def scale_from_args(args):
+    """Return the synthetic dataset scale given by arguments parsed by a
+    `benchmark_parser`, or None if no dataset is to be generated."""
+    if args.no_generate:
+        return None
+    return synthetic.Scale(
+        **{field: getattr(args, field) for field in synthetic.Scale._fields}
+    )
@@ -0,0 +1,108 @@
+"""
+Comparison of two benchmark result files.
+
+For each matview present in both files, prints the median create and refresh times
+of each run and their ratio (new / base), and flags ratios outside a tolerance.
+Exits with status 1 if any ratio exceeds `1 + tolerance`, so that the comparison can
+be used to catch regressions.
+
+Usage:
+
+    python -m benchmarks.compare base.json new.json [--tolerance 0.2]
+"""
+
+import sys
+from argparse import ArgumentParser
+
+from benchmarks.common import read_results
+
+timed_operations = ("create", "refresh")
+
+
+def compare(base, new, tolerance=0.2):
+    """Compare two benchmark results.
+
+    :param base: (dict) baseline results
+    :param new: (dict) new results
+    :param tolerance: (float) relative change in median time regarded as
+        significant
+    :return: (list) of dicts, one per matview and operation, with keys `matview`,
+        `operation`, `base`, `new`, `ratio`, and `status` (one of "slower",
+        "faster", "same")
+    """
+    comparisons = []
+    base_matviews = base["matviews"]
+    new_matviews = new["matviews"]
+    for name in sorted(base_matviews.keys() & new_matviews.keys()):
+        for operation in timed_operations:
+            base_time = base_matviews[name][operation]["median"]
+            new_time = new_matviews[name][operation]["median"]
+            ratio = new_time / base_time if base_time else float("inf")
+            if ratio > 1 + tolerance:
+                status = "slower"
+            elif ratio < 1 - tolerance:
+                status = "faster"
+            else:
+                status = "same"
+            comparisons.append(
+                {
+                    "matview": name,
+                    "operation": operation,
+                    "base": base_time,
+                    "new": new_time,
+                    "ratio": ratio,
+                    "status": status,
+                }
+            )
+    return comparisons
+
+
+def format_comparisons(base, new, comparisons):
+    def describe(results):
+        env = results["environment"]
+        return f"{env['alembic_version']} ({env['git_revision'] or 'unknown'})"
+
+    lines = [
+        f"base: {describe(base)}",
+        f"new:  {describe(new)}",
+        f"{'matview':<40} {'operation':<10} {'base (s)':>10} {'new (s)':>10} "
+        f"{'ratio':>7}",
+    ]
+    for c in comparisons:
+        lines.append(
+            f"{c['matview']:<40} {c['operation']:<10} {c['base']:>10.3f} "
+            f"{c['new']:>10.3f} {c['ratio']:>7.2f}"
+            f"{'' if c['status'] == 'same' else '  ' + c['status']}"
+        )
+    for name in sorted(base["matviews"].keys() ^ new["matviews"].keys()):
+        where = "base" if name in base["matviews"] else "new"
+        lines.append(f"{name:<40} only in {where}")
+    return "\n".join(lines)
+
+
+def main(args):
+    base = read_results(args.base)
+    new = read_results(args.new)
+    if base.get("scale") != new.get("scale"):
+        print("Warning: results are for datasets of different scales")
+    comparisons = compare(base, new, tolerance=args.tolerance)
+    print(format_comparisons(base, new, comparisons))
+    return int(any(c["status"] == "slower" for c in comparisons))
+
+
+def parser():
+    p = ArgumentParser(description="Compare two matview benchmark result files.")
+    p.add_argument("base", help="Baseline results file")
+    p.add_argument("new", help="New results file")
+    p.add_argument(
+        "-t",
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative change in median time regarded as significant",
+    )
+    return p
+
+
+if __name__ == "__main__":
+    sys.exit(main(parser().parse_args(sys.argv[1:])))
@@ -0,0 +1,208 @@
+"""
+Benchmark of queries that call the helper SQL functions.
+
+The helper functions `daysinmonth`, `lastdateofmonth`, `season`, and
+`variable_tags` are called per row by queries over large tables, including the
+defining queries of native matviews `collapsed_vars_mv` and `climo_obs_count_mv`.
+Whether such a query can use a parallel plan, and whether the planner can inline
+the function call, depends on how each function is declared (see
+`pycds.orm.functions.version_b2273a086ddb`).
+
+For each case (a query calling one of the functions), this benchmark measures
+
+- `time`: the time to execute the query;
+- `plan`: its plan, with actual times and buffer usage
+  (`EXPLAIN (ANALYZE, BUFFERS)`), and `plan_summary`, whether it is parallel and
+  with how many workers;
+- `inlined`: whether the function call was inlined, i.e., the function does not
+  appear in the verbose plan (`EXPLAIN VERBOSE`).
+
+Run it against databases at revisions before and after b2273a086ddb to compare.
+On small datasets the planner does not choose parallel plans; option
+`--force-parallel` makes parallelism free in the planner's cost model, so that the
+plans show whether parallelism is possible at all.
+
+Every operation is rolled back, so the database is left as it was.
+
+Usage:
+
+    python -m benchmarks.functions --dsn postgresql://... --out results.json
+"""
+
+import logging
+import sys
+
+from sqlalchemy import create_engine, text
+
+from pycds.context import get_schema_name
+from pycds.orm.native_matviews import CollapsedVariables
+from pycds.orm.native_matviews.version_96729d6db8b3 import ClimoObsCount
+
+from benchmarks import synthetic
+from benchmarks.common import (
+    benchmark_parser,
+    compile_sql,
+    environment,
+    explain_analyze,
+    plan_summary,
+    scale_from_args,
+    time_statement,
+    write_results,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Planner settings that make parallel plans as cheap as serial ones.
+force_parallel_settings = {
+    "parallel_setup_cost": 0,
+    "parallel_tuple_cost": 0,
+    "min_parallel_table_scan_size": 0,
+    "min_parallel_index_scan_size": 0,
+}
+
+
+def cases(schema_name=get_schema_name()):
+    """Return the benchmark cases: a dict of case name to (function name, query)."""
+    return {
+        "daysinmonth": (
+            "daysinmonth",
+            f"SELECT sum(datum / {schema_name}.daysinmonth(obs_time)) "
+            f"FROM {schema_name}.obs_raw",
+        ),
+        "lastdateofmonth": (
+            "lastdateofmonth",
+            f"SELECT {schema_name}.lastdateofmonth(CAST(obs_time AS date)), count(*) "
+            f"FROM {schema_name}.obs_raw GROUP BY 1",
+        ),
+        "season": (
+            "season",
+            f"SELECT {schema_name}.season(obs_time), count(*) "
+            f"FROM {schema_name}.obs_raw GROUP BY 1",
+        ),
+        "variable_tags": (
+            "variable_tags",
+            f"SELECT count(*) FROM {schema_name}.obs_raw "
+            f"JOIN {schema_name}.meta_vars USING (vars_id) "
+            f"WHERE {schema_name}.variable_tags(meta_vars) @> ARRAY['observation']",
+        ),
+        CollapsedVariables.base_name(): (
+            "variable_tags",
+            compile_sql(CollapsedVariables.__selectable__),
+        ),
+        ClimoObsCount.base_name(): (
+            "variable_tags",
+            compile_sql(ClimoObsCount.__selectable__),
+        ),
+    }
+
+
+def is_inlined(conn, function_name, query):
+    """Return whether a function called by a query is inlined in its plan."""
+    plan = "\n".join(row[0] for row in conn.execute(text(f"EXPLAIN (VERBOSE) {query}")))
+    return f"{function_name}(" not in plan
+
+
+def benchmark_case(conn, name, function_name, query, repeat=1):
+    """Benchmark a single case.
+
+    :param conn: (sqlalchemy.engine.Connection) connection in a transaction
+    :param name: (str) name of the case
+    :param function_name: (str) name of the function called
+    :param query: (str) the query
+    :param repeat: (int) number of times to repeat the timed query
+    :return: (dict) timing, query plan, and whether the function was inlined
+    """
+    logger.info(f"Benchmarking {name}")
+    result = {
+        "function": function_name,
+        "time": time_statement(conn, query, repeat=repeat),
+        "plan": explain_analyze(conn, query),
+        "inlined": is_inlined(conn, function_name, query),
+    }
+    result["plan_summary"] = plan_summary(result["plan"])
+    logger.info(
+        f"{name}: {result['time']['median']:.3f} s, "
+        f"{result['plan_summary']['workers_launched']} parallel workers, "
+        f"{function_name} {'' if result['inlined'] else 'not '}inlined"
+    )
+    return result
+
+
+def run(engine, scale=None, repeat=1, case_names=None, force_parallel=False):
+    """Run the benchmark.
+
+    :param engine: (sqlalchemy.engine.Engine) engine for a migrated database
+    :param scale: (synthetic.Scale) if not None, generate a synthetic dataset of
+        this size first, and commit it
+    :param repeat: (int) number of times to repeat each timed query
+    :param case_names: (list) names of the cases to run; default all
+    :param force_parallel: (bool) make parallel plans as cheap as serial ones
+    :return: (dict) results
+    """
+    schema_name = get_schema_name()
+    if scale is not None:
+        with engine.begin() as conn:
+            synthetic.generate(conn, scale, schema_name=schema_name)
+
+    with engine.connect() as conn:
+        if force_parallel:
+            for setting, value in force_parallel_settings.items():
+                conn.execute(text(f"SET LOCAL {setting} = {value}"))
+        results = {
+            "environment": environment(conn, schema_name),
+            "scale": scale and scale._asdict(),
+            "row_counts": synthetic.row_counts(conn, schema_name),
+            "force_parallel": force_parallel,
+            "cases": {
+                name: benchmark_case(conn, name, function_name, query, repeat=repeat)
+                for name, (function_name, query) in cases(schema_name).items()
+                if case_names is None or name in case_names
+            },
+        }
+        conn.rollback()
+    return results
+
+
+def main(args):
+    logging.basicConfig(level=getattr(logging, args.loglevel))
+    engine = create_engine(args.dsn)
+    results = run(
+        engine,
+        scale=scale_from_args(args),
+        repeat=args.repeat,
+        case_names=args.cases,
+        force_parallel=args.force_parallel,
+    )
+    write_results(results, args.out)
+
+
+def parser():
+    p = benchmark_parser(
+        "Benchmark queries calling the helper SQL functions against a synthetic "
+        "dataset. The schema is given by environment variable PYCDS_SCHEMA_NAME."
+    )
+    p.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times to repeat each timed query",
+    )
+    p.add_argument(
+        "-c",
+        "--cases",
+        nargs="+",
+        help="Names of cases to run (default all)",
+    )
+    p.add_argument(
+        "--force-parallel",
+        action="store_true",
+        help="Make parallel plans as cheap as serial ones in the planner's cost "
+        "model",
+    )
+    return p
+
+
+if __name__ == "__main__":
+    main(parser().parse_args(sys.argv[1:]))
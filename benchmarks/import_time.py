@@ -0,0 +1,193 @@
+"""
+Benchmark of the time to import PyCDS, and guard of its lazy loading.
+
+Each case is an import statement, executed in a new Python interpreter with
+`-X importtime`. This benchmark measures
+
+- `microseconds`: the total import time of the statement, the sum of the
+  cumulative times of the modules it imports directly;
+- `modules`: the modules of interest (PyCDS and its heavy dependencies) loaded by
+  the statement.
+
+Names exported by `pycds`, `pycds.orm.views`, and `pycds.orm.native_matviews` are
+loaded on first use (see `pycds.lazy`). Each case lists modules that its statement
+must not load; a case that loads any of them is reported as a violation. With
+`--check`, the benchmark exits with status 1 if there are any violations.
+
+Usage:
+
+    python -m benchmarks.import_time --out results.json [--check]
+"""
+
+import datetime
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+from benchmarks.common import git_revision, write_results
+
+logger = logging.getLogger(__name__)
+
+
+# Modules reported by the benchmark, and their submodules.
+reported_modules = ("pycds", "sqlalchemy", "geoalchemy2", "alembic")
+
+# Import statements, and the modules (with their submodules) each must not load.
+cases = (
+    ("import pycds", ("sqlalchemy", "geoalchemy2", "alembic", "pycds.orm")),
+    (
+        "from pycds import Obs, History",
+        (
+            "pycds.orm.views",
+            "pycds.orm.native_matviews",
+            "pycds.orm.manual_matviews",
+        ),
+    ),
+    ("from pycds import CrmpNetworkGeoserver", ("pycds.orm.manual_matviews",)),
+    ("from pycds import *", ()),
+)
+
+# Line of `-X importtime` output: self time, cumulative time, indented module name.
+importtime_line = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def is_within(module, packages):
+    """Return whether `module` is one of `packages` or a submodule of one."""
+    return any(module == p or module.startswith(f"{p}.") for p in packages)
+
+
+def measure(statement):
+    """Execute an import statement in a new interpreter.
+
+    :param statement: (str) Python import statement
+    :return: (tuple) total import time (µs), list of reported modules loaded
+    """
+    code = f"{statement}\nimport sys\nprint('\\n'.join(sys.modules))\n"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    microseconds = 0
+    for line in completed.stderr.splitlines():
+        match = importtime_line.match(line)
+        # Only top-level imports: their cumulative times include their imports.
+        if match and match.group(3) == "":
+            microseconds += int(match.group(2))
+    modules = sorted(
+        module
+        for module in completed.stdout.splitlines()
+        if is_within(module, reported_modules)
+    )
+    return microseconds, modules
+
+
+def benchmark_case(statement, forbidden, repeat=1):
+    """Benchmark an import statement.
+
+    :param statement: (str) Python import statement
+    :param forbidden: (tuple) modules the statement must not load
+    :param repeat: (int) number of times to measure
+    :return: (dict) timings, modules loaded, and violations
+    """
+    microseconds = []
+    for _ in range(repeat):
+        us, modules = measure(statement)
+        microseconds.append(us)
+    violations = [module for module in modules if is_within(module, forbidden)]
+    result = {
+        "microseconds": microseconds,
+        "min": min(microseconds),
+        "median": statistics.median(microseconds),
+        "modules": modules,
+        "forbidden": list(forbidden),
+        "violations": violations,
+    }
+    logger.info(
+        f"{statement}: {result['median'] / 1000:.1f} ms, {len(modules)} modules"
+        f"{', violations: ' + ', '.join(violations) if violations else ''}"
+    )
+    return result
+
+
+def run(repeat=1, selected_cases=cases):
+    """Run the benchmark.
+
+    :param repeat: (int) number of times to measure each case
+    :param selected_cases: (tuple) of `(statement, forbidden)` cases
+    :return: (dict) results
+    """
+    return {
+        "environment": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python_version": platform.python_version(),
+        },
+        "imports": {
+            statement: benchmark_case(statement, forbidden, repeat=repeat)
+            for statement, forbidden in selected_cases
+        },
+    }
+
+
+def violations(results):
+    """Return the violations in benchmark results, as `(statement, module)`
+    pairs."""
+    return [
+        (statement, module)
+        for statement, result in results["imports"].items()
+        for module in result["violations"]
+    ]
+
+
+def main(args):
+    logging.basicConfig(level=getattr(logging, args.loglevel))
+    results = run(repeat=args.repeat)
+    write_results(results, args.out)
+    if args.check:
+        for statement, module in violations(results):
+            print(f"'{statement}' loads {module}", file=sys.stderr)
+        return int(bool(violations(results)))
+    return 0
+
+
+def parser():
+    p = ArgumentParser(
+        description="Benchmark the import time of PyCDS, and check that names are "
+        "loaded lazily."
+    )
+    p.add_argument(
+        "-o", "--out", default="-", help="Results file (JSON); '-' for stdout"
+    )
+    p.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of times to measure each import statement",
+    )
+    p.add_argument(
+        "-c",
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if any import statement loads a module it must " "not",
+    )
+    p.add_argument(
+        "-L",
+        "--loglevel",
+        default="INFO",
+        choices="DEBUG INFO WARNING ERROR CRITICAL".split(),
+        help="Logging level",
+    )
+    return p
+
+
+if __name__ == "__main__":
+    sys.exit(main(parser().parse_args(sys.argv[1:])))
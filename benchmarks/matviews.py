@@ -0,0 +1,175 @@
+"""
+Benchmark of building and refreshing the native materialized views.
+
+For each native matview at the head revision (those exported by
+`pycds.orm.native_matviews`), this benchmark measures
+
+- `create`: the time to build a new copy of the matview from its definition
+  (`CREATE MATERIALIZED VIEW ... AS ...`);
+- `refresh`: the time to refresh the matview (`REFRESH MATERIALIZED VIEW ...`);
+- `plan`: the plan of the matview's defining query, with actual times and buffer
+  usage (`EXPLAIN (ANALYZE, BUFFERS)`), and `plan_summary`, whether it is
+  parallel and with how many workers.
+
+Every operation is rolled back, so the database is left as it was.
+
+Usage:
+
+    python -m benchmarks.matviews --dsn postgresql://... --out results.json
+
+Run with `--help` for the options, which include the scale of the synthetic
+dataset (see `benchmarks.synthetic`).
+"""
+
+import inspect
+import logging
+import sys
+
+from sqlalchemy import create_engine, text
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableNativeMatview
+from pycds.context import get_schema_name
+from pycds.sqlalchemy.ddl_extensions import CreateMaterializedView
+import pycds.orm.native_matviews
+
+from benchmarks import synthetic
+from benchmarks.common import (
+    benchmark_parser,
+    environment,
+    explain_analyze,
+    plan_summary,
+    scale_from_args,
+    time_statement,
+    write_results,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def native_matviews():
+    """Return the native matviews at the head revision, ordered by name."""
+    return sorted(
+        (
+            obj
+            for _, obj in inspect.getmembers(pycds.orm.native_matviews, inspect.isclass)
+            if issubclass(obj, ReplaceableNativeMatview)
+        ),
+        key=lambda matview: matview.base_name(),
+    )
+
+
+def benchmark_matview(conn, matview, repeat=1, schema_name=get_schema_name()):
+    """Benchmark a single native matview.
+
+    :param conn: (sqlalchemy.engine.Connection) connection in a transaction
+    :param matview: (ReplaceableNativeMatview subclass) the matview
+    :param repeat: (int) number of times to repeat each timed operation
+    :param schema_name: (str) schema name
+    :return: (dict) timings, row count, and query plan
+    """
+    name = matview.base_name()
+    logger.info(f"Benchmarking {name}")
+    result = {
+        "create": time_statement(
+            conn,
+            CreateMaterializedView(
+                f"{schema_name}.{name}_bench", matview.__selectable__
+            ),
+            repeat=repeat,
+        ),
+        "refresh": time_statement(conn, matview.refresh(log=False), repeat=repeat),
+        "plan": explain_analyze(conn, matview.__selectable__),
+    }
+    result["plan_summary"] = plan_summary(result["plan"])
+    # Count rows after a refresh, since the matview may not have been refreshed
+    # since the dataset was generated.
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(matview.refresh(log=False))
+        result["rows"] = conn.execute(
+            text(f"SELECT count(*) FROM {schema_name}.{name}")
+        ).scalar()
+    finally:
+        savepoint.rollback()
+    logger.info(
+        f"{name}: create {result['create']['median']:.3f} s, "
+        f"refresh {result['refresh']['median']:.3f} s, {result['rows']} rows, "
+        f"{result['plan_summary']['workers_launched']} parallel workers"
+    )
+    return result
+
+
+def run(engine, scale=None, repeat=1, matview_names=None):
+    """Run the benchmark.
+
+    :param engine: (sqlalchemy.engine.Engine) engine for a database migrated to the
+        head revision
+    :param scale: (synthetic.Scale) if not None, generate a synthetic dataset of
+        this size first, and commit it
+    :param repeat: (int) number of times to repeat each timed operation
+    :param matview_names: (list) base names of the matviews to benchmark; default
+        all
+    :return: (dict) results
+    """
+    schema_name = get_schema_name()
+    if scale is not None:
+        with engine.begin() as conn:
+            synthetic.generate(conn, scale, schema_name=schema_name)
+
+    matviews = [
+        matview
+        for matview in native_matviews()
+        if matview_names is None or matview.base_name() in matview_names
+    ]
+    with engine.connect() as conn:
+        results = {
+            "environment": environment(conn, schema_name),
+            "scale": scale and scale._asdict(),
+            "row_counts": synthetic.row_counts(conn, schema_name),
+            "matviews": {
+                matview.base_name(): benchmark_matview(
+                    conn, matview, repeat=repeat, schema_name=schema_name
+                )
+                for matview in matviews
+            },
+        }
+        conn.rollback()
+    return results
+
+
+def main(args):
+    logging.basicConfig(level=getattr(logging, args.loglevel))
+    engine = create_engine(args.dsn)
+    results = run(
+        engine,
+        scale=scale_from_args(args),
+        repeat=args.repeat,
+        matview_names=args.matviews,
+    )
+    write_results(results, args.out)
+
+
+def parser():
+    p = benchmark_parser(
+        "Benchmark building and refreshing native materialized views against a "
+        "synthetic dataset. The database must be migrated to the head revision. The "
+        "schema is given by environment variable PYCDS_SCHEMA_NAME."
+    )
+    p.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times to repeat each timed operation",
+    )
+    p.add_argument(
+        "-m",
+        "--matviews",
+        nargs="+",
+        help="Names of matviews to benchmark (default all)",
+    )
+    return p
+
+
+if __name__ == "__main__":
+    main(parser().parse_args(sys.argv[1:]))
@@ -0,0 +1,471 @@
+"""
+Query plan regression check for views, matviews, and client queries.
+
+Indexes are added to the database by hand-written migrations (e.g.,
+0d99ba90c229, bdc28573df56), and nothing checks that the queries they are meant
+for actually use them. This benchmark records the plan of each of the following
+queries against a synthetic dataset (see `benchmarks.synthetic`):
+
+- the defining query (`__selectable__`) of each view exported by
+  `pycds.orm.views` and each native matview exported by
+  `pycds.orm.native_matviews`;
+- the canonical client queries in `client_queries`, which select by the columns
+  that the indexes on the main tables and matviews are for.
+
+For each query the results contain its `plan` (`EXPLAIN (ANALYZE, BUFFERS)`) and a
+`summary` of it (see `summarize`): its shape, estimated total cost, the relations
+it scans sequentially and by index, and the number of sorts that spilled to disk.
+ANALYZE is needed to tell whether a sort spilled; the estimated costs are those of
+plain `EXPLAIN`.
+
+Given a baseline results file, the summaries are compared with it (see `compare`).
+A query regresses if it scans sequentially a relation that it scanned by index in
+the baseline, or if it has a sort that spills to disk and the baseline did not.
+Changes of shape, and of estimated cost beyond a tolerance, are reported too, and
+are regressions only if a cost tolerance is given. The exit status is 1 if any
+query regresses, so the check can fail a build.
+
+Plans depend on the server version, its settings, and the size and distribution
+of the data, so a baseline is only comparable with results from the same
+environment and dataset scale. Record the baseline at the base revision, migrate,
+and compare at the new revision, against the same data.
+
+Queries that cannot be run at the revision of the database (e.g., of views or
+matviews added by later migrations) are omitted from the results, so that runs at
+different revisions can be compared on the queries they have in common.
+
+Every query is rolled back, so the database is left as it was.
+
+Usage:
+
+    python -m benchmarks.plans --dsn postgresql://... --out base.json
+    alembic ... upgrade head
+    python -m benchmarks.plans --dsn postgresql://... --no-generate \\
+        --baseline base.json --out new.json
+"""
+
+import inspect
+import logging
+import sys
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
+
+from pycds.alembic.extensions.replaceable_objects import (
+    ReplaceableView,
+    ReplaceableNativeMatview,
+)
+from pycds.context import get_schema_name
+import pycds.orm.views
+import pycds.orm.native_matviews
+
+from benchmarks import synthetic
+from benchmarks.common import (
+    benchmark_parser,
+    compile_sql,
+    environment,
+    explain_analyze,
+    plan_nodes,
+    read_results,
+    scale_from_args,
+    write_results,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Node types that scan a relation by index. (A bitmap heap scan takes the rows
+# found by the bitmap index scans below it.)
+index_scan_types = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+
+def replaceable_objects(module, base_class):
+    """Return the classes exported by `module` that are subclasses of
+    `base_class`, ordered by name."""
+    return sorted(
+        (
+            obj
+            for _, obj in inspect.getmembers(module, inspect.isclass)
+            if issubclass(obj, base_class)
+        ),
+        key=lambda obj: obj.base_name(),
+    )
+
+
+def sample_values(conn, schema_name=get_schema_name()):
+    """Return values used in the client queries, taken from the dataset: a history
+    and its station, network and first observation, a variable observed in it, a
+    flagged observation, and the latest observation modification time. Values are
+    None if the dataset is empty."""
+    row = conn.execute(
+        text(
+            f"""
+            SELECT
+                hx.history_id, hx.station_id, stn.network_id,
+                (SELECT min(vars_id) FROM {schema_name}.obs_raw
+                 WHERE history_id = hx.history_id) AS vars_id,
+                (SELECT min(obs_time) FROM {schema_name}.obs_raw
+                 WHERE history_id = hx.history_id) AS obs_time
+            FROM {schema_name}.meta_history hx
+            JOIN {schema_name}.meta_station stn USING (station_id)
+            ORDER BY hx.history_id
+            LIMIT 1
+            """
+        )
+    ).first()
+    values = (
+        dict(row._mapping)
+        if row is not None
+        else dict.fromkeys(
+            ("history_id", "station_id", "network_id", "vars_id", "obs_time")
+        )
+    )
+    values["flagged_obs_raw_id"] = conn.execute(
+        text(f"SELECT min(obs_raw_id) FROM {schema_name}.obs_raw_native_flags")
+    ).scalar()
+    values["mod_time"] = conn.execute(
+        text(f"SELECT max(mod_time) FROM {schema_name}.obs_raw")
+    ).scalar()
+    return values
+
+
+def literal(value):
+    """Return an SQL literal for a sample value."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return f"'{value}'"
+
+
+def client_queries(values, schema_name=get_schema_name()):
+    """Return the canonical client queries: a dict of query name to SQL.
+
+    :param values: (dict) sample values, as returned by `sample_values`
+    :param schema_name: (str) schema name
+    """
+    v = {name: literal(value) for name, value in values.items()}
+    s = schema_name
+    return {
+        # obs_raw_history_id_idx
+        "obs_of_history": (
+            f"SELECT obs_time, vars_id, datum FROM {s}.obs_raw "
+            f"WHERE history_id = {v['history_id']} ORDER BY obs_time"
+        ),
+        # obs_raw_comp_idx
+        "obs_in_time_range": (
+            f"SELECT history_id, vars_id, datum FROM {s}.obs_raw "
+            f"WHERE obs_time >= {v['obs_time']} "
+            f"AND obs_time < CAST({v['obs_time']} AS timestamp) + interval '1 day'"
+        ),
+        "obs_of_variable_in_time_range": (
+            f"SELECT history_id, datum FROM {s}.obs_raw "
+            f"WHERE obs_time >= {v['obs_time']} "
+            f"AND obs_time < CAST({v['obs_time']} AS timestamp) + interval '1 day' "
+            f"AND vars_id = {v['vars_id']}"
+        ),
+        # mod_time_idx
+        "obs_recently_modified": (
+            f"SELECT obs_raw_id FROM {s}.obs_raw "
+            f"WHERE mod_time >= CAST({v['mod_time']} AS timestamp) - interval '1 hour'"
+        ),
+        # flag_index
+        "native_flags_of_obs": (
+            f"SELECT native_flag_id FROM {s}.obs_raw_native_flags "
+            f"WHERE obs_raw_id = {v['flagged_obs_raw_id']}"
+        ),
+        # fki_meta_history_station_id_fk
+        "histories_of_station": (
+            f"SELECT * FROM {s}.meta_history WHERE station_id = {v['station_id']}"
+        ),
+        # fki_meta_station_network_id_fkey
+        "stations_of_network": (
+            f"SELECT * FROM {s}.meta_station WHERE network_id = {v['network_id']}"
+        ),
+        # fki_meta_vars_network_id_fkey
+        "variables_of_network": (
+            f"SELECT * FROM {s}.meta_vars WHERE network_id = {v['network_id']}"
+        ),
+        # crmp_network_geoserver_the_geom_idx
+        "stations_in_bbox": (
+            f"SELECT history_id, the_geom FROM {s}.crmp_network_geoserver "
+            f"WHERE the_geom && ST_MakeEnvelope(-125, 48, -123, 50, 4326)"
+        ),
+        # obs_count_per_month_mv_pkey
+        "obs_counts_of_history": (
+            f"SELECT vars_id, obs_month, count FROM {s}.obs_count_per_month_mv "
+            f"WHERE history_id = {v['history_id']}"
+        ),
+        # obs_count_per_day_history_idx
+        "daily_obs_counts_of_history": (
+            f"SELECT date_trunc, count FROM {s}.obs_count_per_day_history_v "
+            f"WHERE history_id = {v['history_id']}"
+        ),
+    }
+
+
+def cases(conn, schema_name=get_schema_name()):
+    """Return the queries whose plans are checked: a dict of query name to
+    (kind, SQL), where kind is one of "view", "matview", "client"."""
+    result = {
+        view.base_name(): ("view", compile_sql(view.__selectable__))
+        for view in replaceable_objects(pycds.orm.views, ReplaceableView)
+    }
+    result.update(
+        {
+            matview.base_name(): ("matview", compile_sql(matview.__selectable__))
+            for matview in replaceable_objects(
+                pycds.orm.native_matviews, ReplaceableNativeMatview
+            )
+        }
+    )
+    result.update(
+        {
+            name: ("client", query)
+            for name, query in client_queries(
+                sample_values(conn, schema_name), schema_name
+            ).items()
+        }
+    )
+    return result
+
+
+def describe_node(node):
+    """Return a one-line description of a plan node: its type, and the relation
+    and index it scans, if any."""
+    description = node["Node Type"]
+    if "Relation Name" in node:
+        description += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        description += f" using {node['Index Name']}"
+    return description
+
+
+def is_sort_spill(node):
+    """Return whether a plan node is a sort that spilled to disk."""
+    return node["Node Type"] in ("Sort", "Incremental Sort") and (
+        node.get("Sort Space Type") == "Disk"
+        or node.get("Sort Method", "").startswith("external")
+    )
+
+
+def summarize(plan):
+    """Summarize a plan (as returned by `explain_analyze`).
+
+    :param plan: (dict) the plan
+    :return: (dict) `shape` (list of node descriptions, depth first, indented by
+        depth), `cost` (estimated total cost), `seq_scans` and `index_scans`
+        (sorted names of the relations scanned so), and `sort_spills` (number of
+        sorts that spilled to disk)
+    """
+
+    def shape(node, depth=0):
+        yield "  " * depth + describe_node(node)
+        for child in node.get("Plans", []):
+            yield from shape(child, depth + 1)
+
+    nodes = list(plan_nodes(plan))
+    return {
+        "shape": list(shape(plan["Plan"])),
+        "cost": plan["Plan"]["Total Cost"],
+        "seq_scans": sorted(
+            {n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}
+        ),
+        "index_scans": sorted(
+            {n["Relation Name"] for n in nodes if n["Node Type"] in index_scan_types}
+        ),
+        "sort_spills": sum(is_sort_spill(n) for n in nodes),
+    }
+
+
+def check_case(conn, name, kind, query):
+    """Record the plan of a single query.
+
+    :param conn: (sqlalchemy.engine.Connection) connection in a transaction
+    :param name: (str) name of the query
+    :param kind: (str) kind of the query
+    :param query: (str) the query
+    :return: (dict) kind, query, plan, and plan summary
+    """
+    logger.info(f"Explaining {name}")
+    plan = explain_analyze(conn, query)
+    result = {"kind": kind, "query": query, "plan": plan, "summary": summarize(plan)}
+    logger.info(
+        f"{name}: cost {result['summary']['cost']:.1f}, "
+        f"seq scans {result['summary']['seq_scans']}, "
+        f"index scans {result['summary']['index_scans']}"
+    )
+    return result
+
+
+def run(engine, scale=None, case_names=None, settings=None):
+    """Run the check, recording plans.
+
+    :param engine: (sqlalchemy.engine.Engine) engine for a migrated database
+    :param scale: (synthetic.Scale) if not None, generate a synthetic dataset of
+        this size first, and commit it
+    :param case_names: (list) names of the queries to explain; default all
+    :param settings: (dict) planner settings (e.g. `{"enable_seqscan": "off"}`) to
+        apply to the queries
+    :return: (dict) results
+    """
+    schema_name = get_schema_name()
+    settings = settings or {}
+    if scale is not None:
+        with engine.begin() as conn:
+            synthetic.generate(conn, scale, schema_name=schema_name)
+
+    with engine.connect() as conn:
+        for setting, value in settings.items():
+            conn.execute(text(f"SET LOCAL {setting} = {value}"))
+        results = {
+            "environment": environment(conn, schema_name),
+            "scale": scale and scale._asdict(),
+            "row_counts": synthetic.row_counts(conn, schema_name),
+            "settings": settings,
+            "cases": {},
+        }
+        for name, (kind, query) in cases(conn, schema_name).items():
+            if case_names is not None and name not in case_names:
+                continue
+            try:
+                results["cases"][name] = check_case(conn, name, kind, query)
+            except ProgrammingError as e:
+                logger.warning(f"{name}: omitted: {e.orig}")
+        conn.rollback()
+    return results
+
+
+def compare(base, new, cost_tolerance=None):
+    """Compare the plans of two runs.
+
+    :param base: (dict) baseline results
+    :param new: (dict) new results
+    :param cost_tolerance: (float) relative increase in estimated cost regarded as
+        a regression; None if cost increases are not regressions
+    :return: (list) of dicts, one per query present in both runs, with keys `case`,
+        `base_cost`, `new_cost`, `ratio`, `shape_changed`, `seq_scans` (relations
+        scanned sequentially that the baseline scanned by index), `sort_spills`
+        (whether a sort spills that did not in the baseline), `costlier` (whether
+        the cost increased beyond the tolerance), and `regressed`
+    """
+    comparisons = []
+    for name in sorted(base["cases"].keys() & new["cases"].keys()):
+        b = base["cases"][name]["summary"]
+        n = new["cases"][name]["summary"]
+        ratio = n["cost"] / b["cost"] if b["cost"] else float("inf")
+        seq_scans = sorted(
+            (set(n["seq_scans"]) - set(b["seq_scans"])) & set(b["index_scans"])
+        )
+        sort_spills = n["sort_spills"] > 0 and b["sort_spills"] == 0
+        costlier = cost_tolerance is not None and ratio > 1 + cost_tolerance
+        comparisons.append(
+            {
+                "case": name,
+                "base_cost": b["cost"],
+                "new_cost": n["cost"],
+                "ratio": ratio,
+                "shape_changed": n["shape"] != b["shape"],
+                "seq_scans": seq_scans,
+                "sort_spills": sort_spills,
+                "costlier": costlier,
+                "regressed": bool(seq_scans) or sort_spills or costlier,
+            }
+        )
+    return comparisons
+
+
+def format_comparisons(base, new, comparisons):
+    def describe(results):
+        env = results["environment"]
+        return f"{env['alembic_version']} ({env['git_revision'] or 'unknown'})"
+
+    lines = [
+        f"base: {describe(base)}",
+        f"new:  {describe(new)}",
+        f"{'query':<40} {'base cost':>12} {'new cost':>12} {'ratio':>7}",
+    ]
+    for c in comparisons:
+        notes = []
+        if c["shape_changed"]:
+            notes.append("shape changed")
+        if c["seq_scans"]:
+            notes.append(f"seq scan of {', '.join(c['seq_scans'])}")
+        if c["sort_spills"]:
+            notes.append("sort spills")
+        if c["costlier"]:
+            notes.append("costlier")
+        if c["regressed"]:
+            notes.append("REGRESSED")
+        lines.append(
+            f"{c['case']:<40} {c['base_cost']:>12.1f} {c['new_cost']:>12.1f} "
+            f"{c['ratio']:>7.2f}"
+            f"{'  ' + '; '.join(notes) if notes else ''}"
+        )
+    for name in sorted(base["cases"].keys() ^ new["cases"].keys()):
+        where = "base" if name in base["cases"] else "new"
+        lines.append(f"{name:<40} only in {where}")
+    return "\n".join(lines)
+
+
+def parse_settings(settings):
+    """Parse planner settings given as `name=value` strings into a dict."""
+    return dict(setting.split("=", 1) for setting in settings or ())
+
+
+def main(args):
+    logging.basicConfig(level=getattr(logging, args.loglevel))
+    engine = create_engine(args.dsn)
+    results = run(
+        engine,
+        scale=scale_from_args(args),
+        case_names=args.cases,
+        settings=parse_settings(args.set),
+    )
+    write_results(results, args.out)
+    if args.baseline is None:
+        return 0
+    base = read_results(args.baseline)
+    if base.get("scale") != results.get("scale"):
+        print("Warning: results are for datasets of different scales")
+    comparisons = compare(base, results, cost_tolerance=args.cost_tolerance)
+    print(format_comparisons(base, results, comparisons))
+    return int(any(c["regressed"] for c in comparisons))
+
+
+def parser():
+    p = benchmark_parser(
+        "Record the query plans of views, native matviews, and client queries "
+        "against a synthetic dataset, and optionally compare them with a baseline. "
+        "The schema is given by environment variable PYCDS_SCHEMA_NAME."
+    )
+    p.add_argument(
+        "-b",
+        "--baseline",
+        help="Baseline results file to compare with; exit with status 1 if any "
+        "query plan regresses",
+    )
+    p.add_argument(
+        "-t",
+        "--cost-tolerance",
+        type=float,
+        help="Relative increase in estimated cost regarded as a regression "
+        "(default: cost increases are reported but are not regressions)",
+    )
+    p.add_argument(
+        "-c",
+        "--cases",
+        nargs="+",
+        help="Names of queries to explain (default all)",
+    )
+    p.add_argument(
+        "--set",
+        nargs="+",
+        metavar="NAME=VALUE",
+        help="Planner settings to apply, e.g. enable_seqscan=off",
+    )
+    return p
+
+
+if __name__ == "__main__":
+    sys.exit(main(parser().parse_args(sys.argv[1:])))
@@ -0,0 +1,335 @@
+"""
+Generation of a synthetic CRMP dataset for benchmarking.
+
+The dataset is generated entirely in the database, with set-based `INSERT ... SELECT`
+statements over `generate_series`, so that large datasets can be generated quickly.
+Its size is specified by a `Scale`:
+
+- `networks` networks, each with `variables_per_network` variables (a mix of
+  observation and climatology variables of the kinds found in CRMP) and
+  `stations_per_network` stations;
+- `histories_per_station` consecutive histories per station;
+- about `obs_per_history` hourly observations per history, spread evenly over the
+  network's variables;
+- native and PCIC flags for each network (one of each discarding), and a fraction
+  `flag_density` of observations flagged with each kind of flag.
+
+All generated networks, stations, variables and flags are named with the prefix
+`bench_`, so the dataset can coexist with (though it is normally generated into an
+otherwise empty) database. Random values are drawn after seeding the server's
+generator with `seed`, so a dataset of a given scale is reproducible.
+
+The partitions of `obs_raw` and `obs_raw_hx` covering the generated observations
+are created before they are inserted (see `pycds.partitioning`).
+"""
+
+import datetime
+import logging
+import math
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from pycds.context import get_schema_name
+from pycds.partitioning import create_partitions
+
+logger = logging.getLogger(__name__)
+
+
+Scale = namedtuple(
+    "Scale",
+    "networks stations_per_network histories_per_station variables_per_network "
+    "obs_per_history flag_density seed",
+    defaults=(4, 50, 2, 8, 2000, 0.02, 0),
+)
+
+prefix = "bench_"
+start_time = datetime.datetime(2000, 1, 1)
+obs_interval = datetime.timedelta(hours=1)
+flags_per_network = 3
+
+# Variables are generated by cycling through these templates:
+# (net_var_name stem, standard_name, cell_method, unit)
+variable_templates = [
+    ("Tx", "air_temperature", "time: maximum", "celsius"),
+    ("Tn", "air_temperature", "time: minimum", "celsius"),
+    ("T", "air_temperature", "time: point", "celsius"),
+    ("P", "lwe_thickness_of_precipitation_amount", "time: sum", "mm"),
+    ("RH", "relative_humidity", "time: point", "%"),
+    (
+        "Tx_Climatology",
+        "air_temperature",
+        "t: maximum within days t: mean within months t: mean over years",
+        "celsius",
+    ),
+    (
+        "Tn_Climatology",
+        "air_temperature",
+        "t: minimum within days t: mean within months t: mean over years",
+        "celsius",
+    ),
+    (
+        "P_Climatology",
+        "lwe_thickness_of_precipitation_amount",
+        "t: sum within months t: mean over years",
+        "mm",
+    ),
+]
+
+
+def variable_rows(scale):
+    """Return the columns (net_var_name, standard_name, cell_method, unit) of the
+    variables generated for each network, as a tuple of lists."""
+    rows = []
+    for i in range(scale.variables_per_network):
+        stem, *rest = variable_templates[i % len(variable_templates)]
+        rows.append((f"{stem}_{i}", *rest))
+    return tuple(list(column) for column in zip(*rows))
+
+
+def obs_steps(scale):
+    """Return the number of observation times in each history."""
+    return math.ceil(scale.obs_per_history / scale.variables_per_network)
+
+
+def history_period(scale):
+    """Return the length of the period covered by each history."""
+    return obs_steps(scale) * obs_interval
+
+
+def time_range(scale):
+    """Return the range of observation times in the dataset."""
+    return (
+        start_time,
+        start_time + scale.histories_per_station * history_period(scale),
+    )
+
+
+def generate(conn, scale=Scale(), schema_name=get_schema_name()):
+    """Generate a synthetic dataset.
+
+    :param conn: (sqlalchemy.engine.Connection) connection, in a transaction, to a
+        database migrated to the head revision. The caller is responsible for
+        committing.
+    :param scale: (Scale) size of the dataset
+    :param schema_name: (str) schema name
+    """
+    s = schema_name
+
+    def execute(description, sql, **params):
+        logger.info(f"Generating {description}")
+        result = conn.execute(text(sql), params)
+        logger.info(f"Generated {result.rowcount} {description}")
+
+    conn.execute(text(f"SET search_path TO {s}, public"))
+    # setseed takes a value in [-1, 1].
+    conn.execute(text("SELECT setseed(:seed)"), {"seed": (scale.seed % 1000) / 1000})
+
+    execute(
+        "networks",
+        f"""
+        INSERT INTO {s}.meta_network
+            (network_name, description, publish, network_display_name)
+        SELECT :prefix || n, 'Synthetic benchmark network ' || n, true, 'Bench ' || n
+        FROM generate_series(1, :networks) AS n
+        """,
+        prefix=prefix,
+        networks=scale.networks,
+    )
+
+    net_var_names, standard_names, cell_methods, units = variable_rows(scale)
+    execute(
+        "variables",
+        f"""
+        INSERT INTO {s}.meta_vars
+            (net_var_name, standard_name, cell_method, unit, display_name,
+            short_name, network_id)
+        SELECT
+            v.net_var_name, v.standard_name, v.cell_method, v.unit, v.net_var_name,
+            v.standard_name || ' ' || v.cell_method, n.network_id
+        FROM {s}.meta_network AS n
+        CROSS JOIN unnest(
+            CAST(:net_var_names AS text[]),
+            CAST(:standard_names AS text[]),
+            CAST(:cell_methods AS text[]),
+            CAST(:units AS text[])
+        ) AS v(net_var_name, standard_name, cell_method, unit)
+        WHERE n.network_name LIKE :pattern
+        """,
+        net_var_names=net_var_names,
+        standard_names=standard_names,
+        cell_methods=cell_methods,
+        units=units,
+        pattern=f"{prefix}%",
+    )
+
+    execute(
+        "stations",
+        f"""
+        INSERT INTO {s}.meta_station (network_id, native_id, publish)
+        SELECT n.network_id, n.network_name || '_' || k, true
+        FROM {s}.meta_network AS n
+        CROSS JOIN generate_series(1, :stations) AS k
+        WHERE n.network_name LIKE :pattern
+        """,
+        stations=scale.stations_per_network,
+        pattern=f"{prefix}%",
+    )
+
+    # Volatile expressions in a subquery's select list prevent it from being
+    # flattened, so each history's location is drawn once.
+    execute(
+        "histories",
+        f"""
+        INSERT INTO {s}.meta_history
+            (station_id, station_name, lon, lat, elev, sdate, edate, province,
+            country, freq, the_geom)
+        SELECT
+            station_id, station_name, lon, lat, elev, sdate, edate, 'BC', 'Canada',
+            '1-hourly', ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+        FROM (
+            SELECT
+                st.station_id,
+                'Station ' || st.native_id || ' ' || j AS station_name,
+                round((-139 + random() * 25)::numeric, 4) AS lon,
+                round((48.3 + random() * 11.7)::numeric, 4) AS lat,
+                round((random() * 2000)::numeric, 1) AS elev,
+                CAST(:start + (j - 1) * CAST(:period AS interval) AS date) AS sdate,
+                CAST(:start + j * CAST(:period AS interval) AS date) AS edate
+            FROM {s}.meta_station AS st
+            CROSS JOIN generate_series(1, :histories) AS j
+            WHERE st.native_id LIKE :pattern
+        ) AS h
+        """,
+        start=start_time,
+        period=history_period(scale),
+        histories=scale.histories_per_station,
+        pattern=f"{prefix}%",
+    )
+
+    start, end = time_range(scale)
+    now = datetime.datetime.now()
+    create_partitions(conn, "obs_raw", start, end, schema_name=s)
+    create_partitions(conn, "obs_raw_hx", now, now, schema_name=s)
+
+    # Observations are inserted one network at a time to bound the size of each
+    # statement (and of the transition tables of its statement-level triggers).
+    network_ids = (
+        conn.execute(
+            text(
+                f"SELECT network_id FROM {s}.meta_network "
+                f"WHERE network_name LIKE :pattern ORDER BY network_id"
+            ),
+            {"pattern": f"{prefix}%"},
+        )
+        .scalars()
+        .all()
+    )
+    for network_id in network_ids:
+        execute(
+            f"observations for network {network_id}",
+            f"""
+            INSERT INTO {s}.obs_raw (obs_time, datum, vars_id, history_id)
+            SELECT
+                h.sdate + k * CAST(:interval AS interval),
+                round((random() * 40 - 10)::numeric, 1),
+                v.vars_id,
+                h.history_id
+            FROM {s}.meta_history AS h
+            JOIN {s}.meta_station AS st ON st.station_id = h.station_id
+            JOIN {s}.meta_vars AS v ON v.network_id = st.network_id
+            CROSS JOIN generate_series(0, :steps - 1) AS k
+            WHERE st.network_id = :network_id
+            ORDER BY h.history_id, k, v.vars_id
+            """,
+            interval=obs_interval,
+            steps=obs_steps(scale),
+            network_id=network_id,
+        )
+
+    execute(
+        "native flags",
+        f"""
+        INSERT INTO {s}.meta_native_flag
+            (flag_name, description, network_id, value, discard)
+        SELECT
+            :prefix || k, 'Synthetic benchmark flag ' || k, n.network_id, NULL, k = 1
+        FROM {s}.meta_network AS n
+        CROSS JOIN generate_series(1, :flags) AS k
+        WHERE n.network_name LIKE :pattern
+        """,
+        prefix=f"{prefix}flag_",
+        flags=flags_per_network,
+        pattern=f"{prefix}%",
+    )
+    execute(
+        "PCIC flags",
+        f"""
+        INSERT INTO {s}.meta_pcic_flag (flag_name, description, discard)
+        SELECT :prefix || k, 'Synthetic benchmark flag ' || k, k = 1
+        FROM generate_series(1, :flags) AS k
+        """,
+        prefix=f"{prefix}flag_",
+        flags=flags_per_network,
+    )
+
+    # Each flagged observation gets one flag, chosen by its id.
+    execute(
+        "native flag associations",
+        f"""
+        INSERT INTO {s}.obs_raw_native_flags (obs_raw_id, native_flag_id)
+        SELECT o.obs_raw_id, f.native_flag_id
+        FROM {s}.obs_raw AS o
+        JOIN {s}.meta_history AS h ON h.history_id = o.history_id
+        JOIN {s}.meta_station AS st ON st.station_id = h.station_id
+        JOIN {s}.meta_native_flag AS f
+            ON f.network_id = st.network_id
+            AND f.flag_name = :prefix || (o.obs_raw_id % :flags + 1)
+        WHERE st.native_id LIKE :pattern AND random() < :density
+        """,
+        prefix=f"{prefix}flag_",
+        flags=flags_per_network,
+        pattern=f"{prefix}%",
+        density=scale.flag_density,
+    )
+    execute(
+        "PCIC flag associations",
+        f"""
+        INSERT INTO {s}.obs_raw_pcic_flags (obs_raw_id, pcic_flag_id)
+        SELECT o.obs_raw_id, f.pcic_flag_id
+        FROM {s}.obs_raw AS o
+        JOIN {s}.meta_history AS h ON h.history_id = o.history_id
+        JOIN {s}.meta_station AS st ON st.station_id = h.station_id
+        JOIN {s}.meta_pcic_flag AS f
+            ON f.flag_name = :prefix || (o.obs_raw_id % :flags + 1)
+        WHERE st.native_id LIKE :pattern AND random() < :density
+        """,
+        prefix=f"{prefix}flag_",
+        flags=flags_per_network,
+        pattern=f"{prefix}%",
+        density=scale.flag_density,
+    )
+
+    logger.info("Analyzing")
+    conn.execute(text("ANALYZE"))
+
+
+counted_tables = (
+    "meta_network",
+    "meta_vars",
+    "meta_station",
+    "meta_history",
+    "obs_raw",
+    "obs_raw_native_flags",
+    "obs_raw_pcic_flags",
+)
+
+
+def row_counts(conn, schema_name=get_schema_name()):
+    """Return the number of rows in each of the main tables of the dataset."""
+    return {
+        table: conn.execute(
+            text(f"SELECT count(*) FROM {schema_name}.{table}")
+        ).scalar()
+        for table in counted_tables
+    }
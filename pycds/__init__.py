@@ -23,6 +23,12 @@ tables, views, materialized views).
 Clients of this package must take care to specify `PYCDS_SCHEMA_NAME` correctly
 when performing any database operations with it. Otherwise the operations will
 fail with errors of the form "could not find object X in schema Y".
+
+**Note: Lazy loading:**
+
+The names exported by this package are loaded on first use (see `pycds.lazy`).
+For example, `from pycds import Obs` imports the table definitions, but not the
+views or matviews, whose definitions are comparatively expensive to construct.
 """
 
 __all__ = [
@@ -51,70 +57,82 @@ __all__ = [
     "ObsRawPCICFlags",
     "PCICFlag",
     "DerivedValue",
+    "MatviewRefreshLog",
+    "NetworkHistoryLatest",
+    "StationHistoryLatest",
+    "HistoryHistoryLatest",
+    "VariableHistoryLatest",
     "CollapsedVariables",
     # Alembic-managed native matviews
     "VarsPerHistory",
-    "ClimoObsCount",
     "StationObservationStats",
-    "ObsCountPerMonthHistory",
     "CollapsedVariables",
-    "MonthlyTotalPrecipitation",
+    "CrmpNetworkGeoserver",
     # Alembic-managed manual matviews
+    "MonthlyTotalPrecipitation",
     "DailyMaxTemperature",
     "DailyMinTemperature",
     "MonthlyAverageOfDailyMaxTemperature",
     "MonthlyAverageOfDailyMinTemperature",
+    "ObsCountPerMonth",
+    "ObsCountPerDayHistory",
     # Alembic-managed views
-    "CrmpNetworkGeoserver",
     "HistoryStationNetwork",
-    "ObsCountPerDayHistory",
     "ObsWithFlags",
+    "ObsCountPerMonthHistory",
+    "ClimoObsCount",
 ]
 
 from pycds.context import get_schema_name, get_su_role_name
-from pycds.util import schema_func, variable_tags
-
-# Import database module to make it accessible as pycds.database for mocking in tests
-from pycds import database as database
-
-from .orm.tables import (
-    Base,
-    Network,
-    NetworkHistory,
-    Contact,
-    Station,
-    StationHistory,
-    History,
-    HistoryHistory,
-    ObsRawNativeFlags,
-    ObsRawPCICFlags,
-    MetaSensor,
-    Obs,
-    ObsHistory,
-    TimeBound,
-    Variable,
-    VariableHistory,
-    NativeFlag,
-    PCICFlag,
-    DerivedValue,
-)
-
-from .orm.views import (
-    CrmpNetworkGeoserver,
-    HistoryStationNetwork,
-    ObsCountPerDayHistory,
-    ObsWithFlags,
-)
+from pycds.lazy import lazy_attributes
 
-from .orm.native_matviews import (
-    VarsPerHistory,
-    ClimoObsCount,
-    StationObservationStats,
-    CollapsedVariables,
-    ObsCountPerMonthHistory,
-    MonthlyTotalPrecipitation,
-    DailyMaxTemperature,
-    DailyMinTemperature,
-    MonthlyAverageOfDailyMaxTemperature,
-    MonthlyAverageOfDailyMinTemperature,
+# All other exported names are loaded lazily, on first use, so that importing
+# pycds (or a name from it) does not import the ORM layers that are not needed.
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        # Submodule, accessible as pycds.database (e.g., for mocking in tests)
+        "database": None,
+        "schema_func": ".util",
+        "variable_tags": ".util",
+        "Base": ".orm.tables",
+        "Network": ".orm.tables",
+        "NetworkHistory": ".orm.tables",
+        "Contact": ".orm.tables",
+        "Station": ".orm.tables",
+        "StationHistory": ".orm.tables",
+        "History": ".orm.tables",
+        "HistoryHistory": ".orm.tables",
+        "ObsRawNativeFlags": ".orm.tables",
+        "ObsRawPCICFlags": ".orm.tables",
+        "MetaSensor": ".orm.tables",
+        "Obs": ".orm.tables",
+        "ObsHistory": ".orm.tables",
+        "TimeBound": ".orm.tables",
+        "Variable": ".orm.tables",
+        "VariableHistory": ".orm.tables",
+        "NativeFlag": ".orm.tables",
+        "PCICFlag": ".orm.tables",
+        "DerivedValue": ".orm.tables",
+        "MatviewRefreshLog": ".orm.tables",
+        "NetworkHistoryLatest": ".orm.tables",
+        "StationHistoryLatest": ".orm.tables",
+        "HistoryHistoryLatest": ".orm.tables",
+        "VariableHistoryLatest": ".orm.tables",
+        "HistoryStationNetwork": ".orm.views",
+        "ObsWithFlags": ".orm.views",
+        "ObsCountPerMonthHistory": ".orm.views",
+        "ClimoObsCount": ".orm.views",
+        "VarsPerHistory": ".orm.native_matviews",
+        "StationObservationStats": ".orm.native_matviews",
+        "CollapsedVariables": ".orm.native_matviews",
+        "CrmpNetworkGeoserver": ".orm.native_matviews",
+        "MonthlyTotalPrecipitation": ".orm.manual_matviews",
+        "DailyMaxTemperature": ".orm.manual_matviews",
+        "DailyMinTemperature": ".orm.manual_matviews",
+        "MonthlyAverageOfDailyMaxTemperature": ".orm.manual_matviews",
+        "MonthlyAverageOfDailyMinTemperature": ".orm.manual_matviews",
+        "ObsCountPerMonth": ".orm.manual_matviews",
+        "ObsCountPerDayHistory": ".orm.manual_matviews",
+    },
 )
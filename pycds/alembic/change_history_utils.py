@@ -5,12 +5,20 @@ migration. Naming functions do correspond to equivalent database functions used
 the change history functionality.
 """
 
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from typing import Iterable, Any
 
-from alembic import op
+import sqlalchemy as sa
+from alembic import context, op
+from sqlalchemy import text
 
 from pycds import get_schema_name
 
+logger = logging.getLogger("alembic")
+
 
 schema_name = get_schema_name()
 
@@ -32,6 +40,10 @@ def hx_id_name(collection_name: str, **kwargs):
     return f"{collection_name}_hx_id"
 
 
+def hx_latest_table_name(collection_name: str, **kwargs) -> str:
+    return f"{hx_table_name(collection_name, **kwargs)}_latest"
+
+
 def hx_id_seq_name(collection_name: str, **kwargs):
     """Return the name of the sequence that generates the primary id of the history table.
     This name is the default name generated by Postgres."""
@@ -125,6 +137,8 @@ def populate_history_table(
     pri_id_name: str,
     foreign_tables: list[tuple[str, str]],
     limit: int = None,
+    chunk_size: int = None,
+    workers: int = 1,
 ):
     """
     Populate the history table with data from the main table, in order of item id (main
@@ -133,7 +147,23 @@ def populate_history_table(
     same order, which is required for it to be a valid history table.
     We include the history FKs in the initial population, because to do it any other
     way proves infeasible for large tables (obs_raw) in memory and/or time usage.
+
+    By default the history table is populated in a single statement, within the
+    migration transaction. If `chunk_size` is specified, it is instead populated in
+    chunks, each committed separately, by `populate_history_table_in_chunks`. This
+    commits the migration transaction first.
     """
+    if chunk_size is not None:
+        with op.get_context().autocommit_block():
+            populate_history_table_in_chunks(
+                op.get_bind().engine,
+                collection_name,
+                pri_id_name,
+                foreign_tables,
+                chunk_size,
+                workers=workers,
+            )
+        return
 
     # Foreign tables are used in common table expressions (CTEs) that provide the latest
     # foreign table history id's. A series of related objects are generated from the
@@ -188,7 +218,462 @@ def populate_history_table(
     op.execute(stmt)
 
 
-def create_primary_table_triggers(collection_name: str, prefix: str = "t100_"):
+# Control table recording the progress of chunked history table population. It is
+# created on demand, and holds one row per history table populated in chunks.
+population_progress_table_name = "hx_population_progress"
+
+
+def history_population_options() -> dict:
+    """
+    Return the options for populating large history tables specified on the Alembic
+    command line, as keyword arguments for `populate_history_table`. For example,
+
+        alembic -x db=... -x hx_chunk_size=1000000 -x hx_workers=4 upgrade ...
+
+    If no chunk size is specified, the result is empty, and history tables are
+    populated in a single statement.
+    """
+    x_args = context.get_x_argument(as_dictionary=True)
+    if "hx_chunk_size" not in x_args:
+        return {}
+    return {
+        "chunk_size": int(x_args["hx_chunk_size"]),
+        "workers": int(x_args.get("hx_workers", 1)),
+    }
+
+
+def create_population_progress_table(conn, schema=schema_name):
+    conn.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS
+                {qualified_name(population_progress_table_name, schema=schema)} (
+                collection_name text PRIMARY KEY,
+                next_id bigint NOT NULL,
+                end_id bigint NOT NULL,
+                rows_inserted bigint NOT NULL DEFAULT 0,
+                last_hx_id bigint,
+                started timestamp NOT NULL DEFAULT now(),
+                updated timestamp NOT NULL DEFAULT now(),
+                completed timestamp
+            )
+            """
+        )
+    )
+
+
+def get_population_progress(conn, collection_name: str, schema=schema_name):
+    """
+    Return the progress of the chunked population of the history table for
+    `collection_name`, or None if none has been started. Progress is a row with
+    columns `next_id` (lowest main table primary key not yet copied), `end_id`
+    (exclusive upper bound of the primary keys to copy), `rows_inserted`,
+    `last_hx_id` (greatest history id after the last chunk inserted), `started`,
+    `updated`, and `completed` (null until population is complete).
+    """
+    table_name = qualified_name(population_progress_table_name, schema=schema)
+    if conn.execute(text(f"SELECT to_regclass('{table_name}')")).scalar() is None:
+        return None
+    return conn.execute(
+        text(f"SELECT * FROM {table_name} WHERE collection_name = :collection_name"),
+        {"collection_name": collection_name},
+    ).first()
+
+
+def clear_population_progress(conn, collection_name: str, schema=schema_name):
+    """Remove any record of the chunked population of a history table."""
+    if get_population_progress(conn, collection_name, schema=schema) is not None:
+        conn.execute(
+            text(
+                f"DELETE FROM "
+                f"{qualified_name(population_progress_table_name, schema=schema)} "
+                f"WHERE collection_name = :collection_name"
+            ),
+            {"collection_name": collection_name},
+        )
+
+
+def latest_history_id(conn, collection_name: str, schema=schema_name):
+    """Return the greatest history id in the history table, or None if it is
+    empty."""
+    return conn.execute(
+        text(
+            f"SELECT max({hx_id_name(collection_name)}) "
+            f"FROM {hx_table_name(collection_name, schema=schema)}"
+        )
+    ).scalar()
+
+
+def history_column_names(conn, collection_name: str, schema=schema_name):
+    """Return the names of the columns of the history table, excluding its primary
+    key, in table order."""
+    return [
+        row.attname
+        for row in conn.execute(
+            text(
+                f"SELECT attname FROM pg_attribute "
+                f"WHERE attrelid = '{hx_table_name(collection_name, schema=schema)}'"
+                f"  ::regclass "
+                f"  AND attnum > 0 AND NOT attisdropped "
+                f"  AND attname <> '{hx_id_name(collection_name)}' "
+                f"ORDER BY attnum"
+            )
+        )
+    ]
+
+
+def history_rows_query(
+    collection_name: str,
+    pri_id_name: str,
+    foreign_tables: list[tuple[str, str]],
+    schema=schema_name,
+    latest: bool = False,
+) -> str:
+    """
+    Return a query for the history records, excluding history ids, of the main table
+    rows with primary keys in the range given by parameters `lo` (inclusive) and `hi`
+    (exclusive). Its columns are those listed by `history_column_names`. The latest
+    foreign history ids are looked up per row, using the indexes on the foreign
+    history tables, rather than aggregated over the whole of each foreign history
+    table.
+
+    If `latest`, the latest foreign history ids are instead taken from the latest
+    history id tables of the foreign tables (see `create_hx_latest_table`), by a
+    plain join.
+    """
+    if latest:
+        ft_hx_ids = "".join(
+            f", ft{i}.{hx_id_name(ft_table_name)}"
+            for i, (ft_table_name, _) in enumerate(foreign_tables or tuple())
+        )
+        ft_joins = "".join(
+            f"""
+            LEFT JOIN {hx_latest_table_name(ft_table_name, schema=schema)} ft{i}
+                ON ft{i}.{ft_pk_name} = main.{ft_pk_name}
+            """
+            for i, (ft_table_name, ft_pk_name) in enumerate(foreign_tables or tuple())
+        )
+        return f"""
+            SELECT main.*, false AS deleted {ft_hx_ids}
+            FROM {main_table_name(collection_name, schema=schema)} main {ft_joins}
+            WHERE main.{pri_id_name} >= :lo AND main.{pri_id_name} < :hi
+        """
+
+    ft_hx_ids = "".join(
+        f"""
+        , (
+            SELECT max({hx_id_name(ft_table_name)})
+            FROM {hx_table_name(ft_table_name, schema=schema)} ft
+            WHERE ft.{ft_pk_name} = main.{ft_pk_name}
+        ) AS {hx_id_name(ft_table_name)}
+        """
+        for ft_table_name, ft_pk_name in (foreign_tables or tuple())
+    )
+    return f"""
+        SELECT main.*, false AS deleted {ft_hx_ids}
+        FROM {main_table_name(collection_name, schema=schema)} main
+        WHERE main.{pri_id_name} >= :lo AND main.{pri_id_name} < :hi
+    """
+
+
+def create_hx_latest_table(collection_name: str, pri_id_name: str):
+    """
+    Create and populate the latest history id table of a collection, which maps each
+    primary id to its latest (greatest) history id. It is maintained by the
+    statement-level history tracking trigger function from version cc28bde2be1a on,
+    and replaces the aggregation of the history table when resolving history foreign
+    keys that refer to the collection.
+    """
+    op.create_table(
+        hx_latest_table_name(collection_name, schema=None),
+        sa.Column(pri_id_name, sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column(hx_id_name(collection_name), sa.Integer, nullable=False),
+        schema=schema_name,
+    )
+    op.execute(
+        f"INSERT INTO {hx_latest_table_name(collection_name)} "
+        f"SELECT {pri_id_name}, max({hx_id_name(collection_name)}) "
+        f"FROM {hx_table_name(collection_name)} "
+        f"GROUP BY {pri_id_name}"
+    )
+
+
+def drop_hx_latest_table(collection_name: str):
+    op.drop_table(
+        hx_latest_table_name(collection_name, schema=None), schema=schema_name
+    )
+
+
+def chunk_table_name(collection_name: str, lo: int, schema=schema_name) -> str:
+    return qualified_name(f"{collection_name}_hx_chunk_{lo}", schema=schema)
+
+
+def drop_chunk_tables(conn, collection_name: str, schema=schema_name):
+    """Drop any tables of prepared chunks of the history table for
+    `collection_name`."""
+    for row in conn.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace "
+            "WHERE nspname = :schema AND relkind = 'r' AND relname ~ :pattern"
+        ),
+        {"schema": schema, "pattern": f"^{collection_name}_hx_chunk_[0-9]+$"},
+    ).all():
+        conn.execute(text(f"DROP TABLE {qualified_name(row.relname, schema=schema)}"))
+
+
+def populate_history_table_in_chunks(
+    engine,
+    collection_name: str,
+    pri_id_name: str,
+    foreign_tables: list[tuple[str, str]],
+    chunk_size: int,
+    workers: int = 1,
+    schema=schema_name,
+):
+    """
+    Populate the history table with data from the main table in chunks, each
+    covering a range of `chunk_size` primary key values, and each inserted and
+    committed in its own transaction. Chunks are inserted in order of primary key,
+    which preserves the ordering of history ids.
+
+    Progress is recorded in the control table `hx_population_progress`, in the same
+    transaction as each chunk. If population fails or is interrupted, calling this
+    function again continues from the first chunk not committed. Population
+    covers the primary keys present when it started; it does nothing once complete.
+
+    If `workers` is greater than 1, chunks are prepared ahead, in that number of
+    separate connections, into unlogged tables, from which they are inserted in
+    order. This moves the work of reading the main table and looking up foreign
+    history ids out of the sequential insertion of chunks.
+
+    The main table must not be written while it is populated: a row inserted,
+    updated or deleted after it was copied would be missing from, or out of order
+    in, the history table. The main table should therefore be quiesced for the whole
+    of population, including between a failed run and its resumption. Each run holds
+    a SHARE lock on the main table, which blocks writes until it finishes. Writes
+    outside a run cannot be blocked, but are detected, provided the primary table
+    history tracking triggers are in place (they append a history record for every
+    write): population raises `RuntimeError` if the history table is not empty when
+    population starts, or has records other than those it inserted when it resumes.
+
+    :param engine: (sqlalchemy.engine.Engine) database engine
+    :param collection_name: (str) name of main table
+    :param pri_id_name: (str) name of main table primary key
+    :param foreign_tables: list of (foreign table name, foreign key name) tuples
+    :param chunk_size: (int) number of primary key values in each chunk
+    :param workers: (int) number of connections preparing chunks
+    :param schema: (str) schema name
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk size: {chunk_size}")
+
+    main_table = main_table_name(collection_name, schema=schema)
+
+    # Block writes to the main table for the whole run. The lock is held by a
+    # connection of its own, since chunks are committed separately. It does not
+    # conflict with the reads of the main table by the chunk transactions.
+    with engine.connect() as lock_conn, lock_conn.begin():
+        lock_conn.execute(text(f"LOCK TABLE {main_table} IN SHARE MODE"))
+        populate_locked_history_table_in_chunks(
+            engine,
+            collection_name,
+            pri_id_name,
+            foreign_tables,
+            chunk_size,
+            workers=workers,
+            schema=schema,
+        )
+
+
+def populate_locked_history_table_in_chunks(
+    engine,
+    collection_name: str,
+    pri_id_name: str,
+    foreign_tables: list[tuple[str, str]],
+    chunk_size: int,
+    workers: int = 1,
+    schema=schema_name,
+):
+    """Populate the history table in chunks, as `populate_history_table_in_chunks`,
+    once the caller has locked the main table against writes."""
+    main_table = main_table_name(collection_name, schema=schema)
+    progress_table = qualified_name(population_progress_table_name, schema=schema)
+
+    with engine.begin() as conn:
+        create_population_progress_table(conn, schema=schema)
+        progress = get_population_progress(conn, collection_name, schema=schema)
+        last_hx_id = latest_history_id(conn, collection_name, schema=schema)
+        if progress is None:
+            if last_hx_id is not None:
+                raise RuntimeError(
+                    f"History table for {collection_name} is not empty; "
+                    f"{collection_name} was written before population started"
+                )
+            lo, hi = conn.execute(
+                text(f"SELECT min({pri_id_name}), max({pri_id_name}) FROM {main_table}")
+            ).first()
+            progress = conn.execute(
+                text(
+                    f"INSERT INTO {progress_table} (collection_name, next_id, end_id) "
+                    f"VALUES (:collection_name, :next_id, :end_id) "
+                    f"RETURNING *"
+                ),
+                {
+                    "collection_name": collection_name,
+                    "next_id": lo or 0,
+                    "end_id": hi + 1 if hi is not None else 0,
+                },
+            ).first()
+        elif progress.completed is None and last_hx_id != progress.last_hx_id:
+            raise RuntimeError(
+                f"History table for {collection_name} has records not inserted by "
+                f"population; {collection_name} was written since population "
+                f"stopped. Downgrade, and populate again with {collection_name} "
+                f"quiesced"
+            )
+        columns = ", ".join(history_column_names(conn, collection_name, schema=schema))
+
+    if progress.completed is not None:
+        logger.info(f"History table for {collection_name} already populated")
+        return
+
+    chunks = [
+        (lo, min(lo + chunk_size, progress.end_id))
+        for lo in range(progress.next_id, progress.end_id, chunk_size)
+    ]
+    logger.info(
+        f"Populating history table for {collection_name}: {len(chunks)} chunks "
+        f"from {pri_id_name} {progress.next_id} "
+        f"({progress.rows_inserted} rows already inserted)"
+    )
+
+    rows_query = history_rows_query(
+        collection_name, pri_id_name, foreign_tables, schema=schema
+    )
+
+    def prepare_chunk(lo, hi):
+        chunk_table = chunk_table_name(collection_name, lo, schema=schema)
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {chunk_table}"))
+            conn.execute(
+                text(f"CREATE UNLOGGED TABLE {chunk_table} AS {rows_query}"),
+                {"lo": lo, "hi": hi},
+            )
+        return chunk_table
+
+    def prepared_chunks():
+        """Yield the name of the prepared table for each chunk, in order, or None if
+        chunks are not prepared ahead."""
+        if workers <= 1:
+            yield from (None for _ in chunks)
+            return
+        # Keep up to twice as many chunks in preparation as there are workers, so
+        # that a prepared chunk is usually waiting when the previous one is inserted,
+        # without preparing (and storing) the whole table ahead.
+        remaining = iter(chunks)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque(
+                pool.submit(prepare_chunk, lo, hi)
+                for lo, hi in islice(remaining, 2 * workers)
+            )
+            try:
+                while pending:
+                    chunk_table = pending.popleft().result()
+                    for lo, hi in islice(remaining, 1):
+                        pending.append(pool.submit(prepare_chunk, lo, hi))
+                    yield chunk_table
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def insert_chunk(conn, lo, hi, chunk_table):
+        if chunk_table is None:
+            source, params = rows_query, {"lo": lo, "hi": hi}
+        else:
+            source, params = f"SELECT * FROM {chunk_table}", {}
+        # History ids are assigned by the identity column default, as rows are
+        # inserted, in primary key order.
+        rows_inserted = conn.execute(
+            text(
+                f"INSERT INTO {hx_table_name(collection_name, schema=schema)} "
+                f"({columns}) "
+                f"SELECT * FROM ({source}) chunk ORDER BY {pri_id_name}"
+            ),
+            params,
+        ).rowcount
+        if chunk_table is not None:
+            conn.execute(text(f"DROP TABLE {chunk_table}"))
+        conn.execute(
+            text(
+                f"UPDATE {progress_table} "
+                f"SET next_id = :hi, rows_inserted = rows_inserted + :rows_inserted, "
+                f"  last_hx_id = :last_hx_id, updated = now(), "
+                f"  completed = CASE WHEN :hi >= end_id THEN now() END "
+                f"WHERE collection_name = :collection_name"
+            ),
+            {
+                "hi": hi,
+                "rows_inserted": rows_inserted,
+                "last_hx_id": latest_history_id(conn, collection_name, schema=schema),
+                "collection_name": collection_name,
+            },
+        )
+        return rows_inserted
+
+    chunk_tables = prepared_chunks()
+    try:
+        for i, ((lo, hi), chunk_table) in enumerate(zip(chunks, chunk_tables)):
+            with engine.begin() as conn:
+                rows_inserted = insert_chunk(conn, lo, hi, chunk_table)
+            logger.debug(
+                f"Inserted {rows_inserted} history records for {pri_id_name} "
+                f"{lo} to {hi - 1} ({i + 1}/{len(chunks)})"
+            )
+    finally:
+        # Stop preparing chunks, and wait for workers, if insertion fails.
+        chunk_tables.close()
+
+    with engine.begin() as conn:
+        # Remove chunks prepared by an earlier, interrupted run with another chunk
+        # size. (Chunks prepared by this run have all been inserted and dropped.)
+        drop_chunk_tables(conn, collection_name, schema=schema)
+        if not chunks:
+            # Nothing to copy: the main table was empty when population started.
+            conn.execute(
+                text(
+                    f"UPDATE {progress_table} SET completed = now(), updated = now() "
+                    f"WHERE collection_name = :collection_name"
+                ),
+                {"collection_name": collection_name},
+            )
+    logger.info(f"History table for {collection_name} populated")
+
+
+# Events handled by statement-level primary table triggers, with the transition table
+# each one declares.
+statement_trigger_events = (
+    ("INSERT", "NEW TABLE AS new_rows"),
+    ("UPDATE", "NEW TABLE AS new_rows"),
+    ("DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def create_primary_table_triggers(
+    collection_name: str,
+    prefix: str = "t100_",
+    statement_level: bool = False,
+    foreign_tables: list = None,
+):
+    """
+    Create the history tracking triggers on the primary table.
+
+    If `statement_level`, history records are appended by statement-level triggers
+    (see `pycds.orm.trigger_functions.version_d7ade974ccde`), which also fill in the
+    history foreign keys specified by `foreign_tables`. In that case, no trigger is
+    required on the history table. Otherwise row-level triggers are used, and
+    `foreign_tables` is ignored.
+    """
     # Trigger: Enforce mod_time and mod_user values on primary table.
     op.execute(
         f"CREATE TRIGGER {prefix}primary_control_hx_cols "
@@ -198,66 +683,106 @@ def create_primary_table_triggers(collection_name: str, prefix: str = "t100_"):
         f"    EXECUTE FUNCTION {qualified_name('hxtk_primary_control_hx_cols')}()"
     )
 
-    # Trigger: Append history records to history table when primary updated.
-    op.execute(
-        f"CREATE TRIGGER {prefix}primary_ops_to_hx "
-        f"    AFTER INSERT OR DELETE OR UPDATE "
-        f"    ON {main_table_name(collection_name)} "
-        f"    FOR EACH ROW "
-        f"    EXECUTE FUNCTION {qualified_name('hxtk_primary_ops_to_hx')}()"
+    if not statement_level:
+        # Trigger: Append history records to history table when primary updated.
+        op.execute(
+            f"CREATE TRIGGER {prefix}primary_ops_to_hx "
+            f"    AFTER INSERT OR DELETE OR UPDATE "
+            f"    ON {main_table_name(collection_name)} "
+            f"    FOR EACH ROW "
+            f"    EXECUTE FUNCTION {qualified_name('hxtk_primary_ops_to_hx')}()"
+        )
+        return
+
+    # Triggers: Append history records to history table, once per statement.
+    # A trigger with a transition table can handle only one kind of event.
+    for event, transition_table in statement_trigger_events:
+        op.execute(
+            f"CREATE TRIGGER {prefix}primary_{event.lower()}_to_hx "
+            f"    AFTER {event} "
+            f"    ON {main_table_name(collection_name)} "
+            f"    REFERENCING {transition_table} "
+            f"    FOR EACH STATEMENT "
+            f"    EXECUTE FUNCTION {qualified_name('hxtk_primary_stmt_ops_to_hx')}"
+            f"({foreign_tables_trigger_arg(foreign_tables)})"
+        )
+
+
+def primary_table_trigger_names(prefix: str = "t100_", statement_level: bool = False):
+    ops_to_hx = (
+        tuple(
+            f"{prefix}primary_{event.lower()}_to_hx"
+            for event, _ in statement_trigger_events
+        )
+        if statement_level
+        else (f"{prefix}primary_ops_to_hx",)
     )
+    return (f"{prefix}primary_control_hx_cols",) + ops_to_hx
 
 
 def toggle_primary_table_triggers(
-    collection_name: str, enable: bool, prefix: str = "t100_"
+    collection_name: str,
+    enable: bool,
+    prefix: str = "t100_",
+    statement_level: bool = False,
 ):
     action = "ENABLE" if enable else "DISABLE"
-    op.execute(
-        f"ALTER TABLE {main_table_name(collection_name)} "
-        f"{action} TRIGGER {prefix}primary_control_hx_cols"
-    )
-    op.execute(
-        f"ALTER TABLE {main_table_name(collection_name)} "
-        f"{action} TRIGGER {prefix}primary_ops_to_hx"
+    for trigger_name in primary_table_trigger_names(prefix, statement_level):
+        op.execute(
+            f"ALTER TABLE {main_table_name(collection_name)} "
+            f"{action} TRIGGER {trigger_name}"
+        )
+
+
+def disable_primary_table_triggers(
+    collection_name: str, prefix: str = "t100_", statement_level: bool = False
+):
+    toggle_primary_table_triggers(
+        collection_name, enable=False, prefix=prefix, statement_level=statement_level
     )
 
 
-def disable_primary_table_triggers(collection_name: str, prefix: str = "t100_"):
-    toggle_primary_table_triggers(collection_name, enable=False, prefix=prefix)
+def enable_primary_table_triggers(
+    collection_name: str, prefix: str = "t100_", statement_level: bool = False
+):
+    toggle_primary_table_triggers(
+        collection_name, enable=True, prefix=prefix, statement_level=statement_level
+    )
 
 
-def enable_primary_table_triggers(collection_name: str, prefix: str = "t100_"):
-    toggle_primary_table_triggers(collection_name, enable=True, prefix=prefix)
+def foreign_tables_trigger_arg(foreign_tables: list) -> str:
+    return (
+        f"'{sql_array(sql_array(pair) for pair in foreign_tables)}'"
+        if foreign_tables
+        else ""
+    )
 
 
 def create_history_table_triggers(
     collection_name: str, foreign_tables: list, prefix: str = "t100_"
 ):
+    """
+    Create the history tracking trigger on the history table. This trigger is
+    required only with row-level primary table triggers.
+    """
     # Trigger: Add foreign key values to each record inserted into history table.
-    ft_args = (
-        f"'{sql_array(sql_array(pair) for pair in foreign_tables)}'"
-        if foreign_tables
-        else ""
-    )
     op.execute(
         f"CREATE TRIGGER {prefix}add_foreign_hx_keys "
         f"    BEFORE INSERT "
         f"    ON {hx_table_name(collection_name)} "
         f"    FOR EACH ROW "
-        f"    EXECUTE FUNCTION {qualified_name('hxtk_add_foreign_hx_keys')}({ft_args})"
+        f"    EXECUTE FUNCTION {qualified_name('hxtk_add_foreign_hx_keys')}"
+        f"({foreign_tables_trigger_arg(foreign_tables)})"
     )
 
 
-def drop_history_triggers(collection_name: str, prefix: str = "t100_"):
-    op.execute(
-        f"DROP TRIGGER {prefix}primary_control_hx_cols "
-        f"ON {main_table_name(collection_name)}"
-    )
-    op.execute(
-        f"DROP TRIGGER {prefix}primary_ops_to_hx "
-        f"ON {main_table_name(collection_name)}"
-    )
-    op.execute(
-        f"DROP TRIGGER {prefix}add_foreign_hx_keys "
-        f"ON {hx_table_name(collection_name)}"
-    )
+def drop_history_triggers(
+    collection_name: str, prefix: str = "t100_", statement_level: bool = False
+):
+    for trigger_name in primary_table_trigger_names(prefix, statement_level):
+        op.execute(f"DROP TRIGGER {trigger_name} ON {main_table_name(collection_name)}")
+    if not statement_level:
+        op.execute(
+            f"DROP TRIGGER {prefix}add_foreign_hx_keys "
+            f"ON {hx_table_name(collection_name)}"
+        )
@@ -107,10 +107,48 @@ class ReplaceableView(ReplaceableOrmClass):
             return snake_case(cls.__name__) + "_v"
 
 
+# Materialized views
+
+
+# Name of the table in which refreshes are recorded (see
+# `pycds.orm.tables.MatviewRefreshLog`).
+refresh_log_table_name = "matview_refresh_log"
+
+
+class RefreshLogging:
+    """
+    Options for recording refreshes of a materialized view in the refresh log.
+    Each refresh also records the modification time horizon of the matview's
+    sources, so that staleness can be determined later (see `pycds.refresh_log`).
+    The sources are the tables named in `refresh_source_table_names` (default
+    `obs_raw`), whose latest modification time is the latest `mod_time`, and the
+    matviews (classes) in `refresh_source_matviews` (default none), whose latest
+    modification time is the end of their latest logged refresh.
+    """
+
+    refresh_source_table_names = ("obs_raw",)
+    refresh_source_matviews = ()
+
+    @classmethod
+    def refresh_log_options(cls, log):
+        if not log:
+            return {}
+        prefix = "" if cls.metadata.schema is None else cls.metadata.schema + "."
+        return {
+            "log_table": prefix + refresh_log_table_name,
+            "source_tables": tuple(
+                prefix + name for name in cls.refresh_source_table_names
+            ),
+            "source_matviews": tuple(
+                matview.base_name() for matview in cls.refresh_source_matviews
+            ),
+        }
+
+
 # Native materialized views
 
 
-class ReplaceableNativeMatview(ReplaceableOrmClass):
+class ReplaceableNativeMatview(RefreshLogging, ReplaceableOrmClass):
     """
     Parent class for replaceable native materialized views. These are also ORM
     classes, and this class should be one of the parent classes of the ORM
@@ -129,8 +167,17 @@ class ReplaceableNativeMatview(ReplaceableOrmClass):
         return DropMaterializedView(cls.qualified_name(), cls.__selectable__)
 
     @classmethod
-    def refresh(cls):
-        return RefreshMaterializedView(cls.qualified_name(), cls.__selectable__)
+    def refresh(cls, concurrently=False, log=True, count_rows=False):
+        """Return a command that refreshes the matview, and, if `log`, records the
+        refresh in the refresh log. The number of rows in the matview is recorded
+        only if `count_rows`, since counting them requires a scan of the matview."""
+        return RefreshMaterializedView(
+            cls.qualified_name(),
+            cls.__selectable__,
+            concurrently=concurrently,
+            count_rows=count_rows,
+            **cls.refresh_log_options(log),
+        )
 
     @classmethod
     def base_name(cls):
@@ -143,7 +190,7 @@ class ReplaceableNativeMatview(ReplaceableOrmClass):
 # Manual materialized views
 
 
-class ReplaceableManualMatview(ReplaceableOrmClass):
+class ReplaceableManualMatview(RefreshLogging, ReplaceableOrmClass):
     """
     Parent class for replaceable Manual materialized views. These are also ORM
     classes, and this class should be one of the parent classes of the ORM
@@ -166,11 +213,49 @@ class ReplaceableManualMatview(ReplaceableOrmClass):
         )
 
     @classmethod
-    def refresh(cls):
+    def refresh(cls, log=True):
+        """Return a command that refreshes the matview, and, if `log`, records the
+        refresh in the refresh log."""
         return RefreshMaterializedView(
-            cls.qualified_name(), cls.__selectable__, type_="manual"
+            cls.qualified_name(),
+            cls.__selectable__,
+            type_="manual",
+            **cls.refresh_log_options(log),
+        )
+
+    @classmethod
+    def refresh_incremental(cls, scope, log=True):
+        """
+        Return a command that refreshes only the part of the matview identified by
+        `scope`. Because a manual matview is really a table, its contents can be
+        replaced piecemeal, which is much cheaper than a full refresh when only a
+        small part of the source data has changed.
+
+        `scope` is a selectable (typically a temporary table) whose rows identify
+        the parts of the matview to be recomputed. Its interpretation is up to the
+        subclass, which must define classmethods `scoped_selectable(scope)`,
+        returning the matview selectable restricted to `scope`, and
+        `scope_condition(scope)`, returning a boolean expression that selects the
+        existing matview rows within `scope`.
+
+        If `log`, the refresh is recorded in the refresh log as a partial refresh.
+        """
+        return RefreshMaterializedView(
+            cls.qualified_name(),
+            cls.scoped_selectable(scope),
+            type_="manual",
+            where=cls.scope_condition(scope),
+            **cls.refresh_log_options(log),
         )
 
+    @classmethod
+    def scoped_selectable(cls, scope):
+        raise NotImplementedError()
+
+    @classmethod
+    def scope_condition(cls, scope):
+        raise NotImplementedError()
+
     @classmethod
     def base_name(cls):
         try:
@@ -0,0 +1,512 @@
+"""
+Utilities for migrations that convert tables to and from partitioned tables.
+
+PostgreSQL cannot convert an existing table into a partitioned table (or vice versa)
+in place. Instead, the table is rebuilt: a new table with the same columns is
+created, the data copied into it, the old table dropped, and the new one renamed to
+take its place. The constraints, indexes, triggers, ownership, and privileges of the
+old table are read from the system catalog beforehand and re-applied to the new table
+afterwards, so that nothing need be declared twice.
+
+Views and materialized views that depend on a rebuilt table must be dropped before
+the table is, and re-created afterwards. `get_dependent_views`,
+`drop_dependent_views`, and `create_dependent_views` do this, again from the system
+catalog, so that migrations need not track which views are present at their revision.
+
+All definitions are read from the catalog with a `search_path` containing only
+`pg_catalog`, so that they contain fully qualified names and can be re-applied
+regardless of the `search_path` in effect.
+"""
+
+import logging
+from collections import namedtuple
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from pycds.context import get_schema_name
+from pycds.partitioning import (
+    default_partition_name,
+    partition_name,
+    partition_ranges,
+)
+
+
+logger = logging.getLogger("alembic")
+schema_name = get_schema_name()
+
+
+def _execute_all(conn, statements):
+    for statement in statements:
+        # Definitions read from the catalog may contain colons and percent signs,
+        # so they are passed to the driver as-is.
+        conn.exec_driver_sql(statement)
+
+
+@contextmanager
+def qualified_catalog_definitions(conn):
+    """Context manager within which definitions obtained from the system catalog
+    (e.g., by `pg_get_viewdef`) contain fully qualified names."""
+    search_path = conn.execute(text("SHOW search_path")).scalar()
+    conn.execute(text("SELECT set_config('search_path', 'pg_catalog', true)"))
+    try:
+        yield
+    finally:
+        conn.execute(
+            text("SELECT set_config('search_path', :search_path, true)"),
+            {"search_path": search_path},
+        )
+
+
+def _relation_oid(conn, name, schema=schema_name):
+    return conn.execute(
+        text("SELECT to_regclass(:name)::oid"), {"name": f"{schema}.{name}"}
+    ).scalar()
+
+
+relation_kinds = {
+    "r": "TABLE",
+    "p": "TABLE",
+    "v": "VIEW",
+    "m": "MATERIALIZED VIEW",
+    "S": "SEQUENCE",
+}
+
+
+def _owner(conn, oid):
+    return conn.execute(
+        text(
+            "SELECT quote_ident(pg_get_userbyid(relowner)) "
+            "FROM pg_class WHERE oid = :oid"
+        ),
+        {"oid": oid},
+    ).scalar()
+
+
+def privilege_statements(conn, oid, qualified_name, kind="TABLE", owner=True):
+    """Return statements that establish the ownership of, and privileges granted
+    on, a relation, as currently recorded in the catalog.
+
+    :param conn: database connection
+    :param oid: oid of the relation
+    :param qualified_name: name by which the statements refer to the relation
+    :param kind: kind of relation, as named in SQL (e.g., "TABLE", "SEQUENCE")
+    :param owner: include a statement establishing the owner
+    :return: list of SQL statements
+    """
+    grant_kind = "SEQUENCE" if kind == "SEQUENCE" else "TABLE"
+    grants = conn.execute(
+        text(
+            """
+            SELECT
+                CASE WHEN acl.grantee = 0 THEN 'PUBLIC'
+                    ELSE quote_ident(pg_get_userbyid(acl.grantee)) END,
+                acl.privilege_type,
+                acl.is_grantable
+            FROM pg_class, aclexplode(pg_class.relacl) acl
+            WHERE pg_class.oid = :oid
+            """
+        ),
+        {"oid": oid},
+    ).fetchall()
+    owner_statements = (
+        [f"ALTER {kind} {qualified_name} OWNER TO {_owner(conn, oid)}"] if owner else []
+    )
+    return owner_statements + [
+        f"GRANT {privilege} ON {grant_kind} {qualified_name} TO {grantee}"
+        + (" WITH GRANT OPTION" if grantable else "")
+        for grantee, privilege, grantable in grants
+    ]
+
+
+def _index_statements(conn, oid):
+    """Statements creating the indexes of a relation, excluding indexes that support
+    constraints and indexes inherited from a partitioned table."""
+    return [
+        # Definitions of indexes on partitioned tables read "ON ONLY <table>".
+        index_def.replace(" ON ONLY ", " ON ", 1)
+        for (index_def,) in conn.execute(
+            text(
+                """
+                SELECT pg_get_indexdef(pg_index.indexrelid)
+                FROM pg_index
+                    JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+                WHERE pg_index.indrelid = :oid
+                    AND NOT pg_class.relispartition
+                    AND NOT EXISTS (
+                        SELECT FROM pg_constraint
+                        WHERE pg_constraint.conindid = pg_index.indexrelid
+                            AND pg_constraint.conrelid = :oid
+                    )
+                ORDER BY pg_class.relname
+                """
+            ),
+            {"oid": oid},
+        )
+    ]
+
+
+def _comment_statements(conn, oid, qualified_name, kind):
+    comment = conn.execute(
+        text("SELECT quote_literal(obj_description(:oid, 'pg_class'))"), {"oid": oid}
+    ).scalar()
+    return [f"COMMENT ON {kind} {qualified_name} IS {comment}"] if comment else []
+
+
+DependentView = namedtuple(
+    "DependentView", "qualified_name kind definition populated statements"
+)
+DependentView.__doc__ = """A view or materialized view, as read from the catalog.
+`statements` re-create its indexes, ownership, privileges, and comment."""
+
+
+def get_dependent_views(conn, table_names, schema=schema_name):
+    """Return all views and materialized views that depend, directly or indirectly,
+    on any of the named tables, in an order in which they can be created.
+
+    :param conn: database connection
+    :param table_names: names of tables
+    :param schema: schema containing the tables
+    :return: list of DependentView
+    """
+    with qualified_catalog_definitions(conn):
+        rows = conn.execute(
+            text(
+                """
+                WITH RECURSIVE dependents(oid, depth) AS (
+                    SELECT pg_class.oid, 0
+                    FROM pg_class
+                        JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
+                    WHERE pg_namespace.nspname = :schema
+                        AND pg_class.relname = ANY(:table_names)
+                    UNION
+                    SELECT pg_rewrite.ev_class, dependents.depth + 1
+                    FROM dependents
+                        JOIN pg_depend
+                            ON pg_depend.refobjid = dependents.oid
+                            AND pg_depend.classid = 'pg_rewrite'::regclass
+                        JOIN pg_rewrite ON pg_rewrite.oid = pg_depend.objid
+                    WHERE pg_rewrite.ev_class <> dependents.oid
+                )
+                SELECT
+                    pg_class.oid,
+                    quote_ident(pg_namespace.nspname) || '.'
+                        || quote_ident(pg_class.relname),
+                    pg_class.relkind,
+                    pg_get_viewdef(pg_class.oid),
+                    pg_class.relkind <> 'm' OR pg_class.relispopulated
+                FROM (
+                    SELECT oid, max(depth) AS depth
+                    FROM dependents
+                    WHERE depth > 0
+                    GROUP BY oid
+                ) deepest
+                    JOIN pg_class ON pg_class.oid = deepest.oid
+                    JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
+                ORDER BY deepest.depth, pg_class.relname
+                """
+            ),
+            {"schema": schema, "table_names": list(table_names)},
+        ).fetchall()
+        views = []
+        for oid, qualified_name, relkind, definition, populated in rows:
+            kind = relation_kinds[relkind]
+            views.append(
+                DependentView(
+                    qualified_name=qualified_name,
+                    kind=kind,
+                    definition=definition.rstrip().rstrip(";"),
+                    populated=populated,
+                    statements=_index_statements(conn, oid)
+                    + privilege_statements(conn, oid, qualified_name, kind)
+                    + _comment_statements(conn, oid, qualified_name, kind),
+                )
+            )
+    return views
+
+
+def drop_dependent_views(conn, views):
+    """Drop views obtained from `get_dependent_views`."""
+    for view in reversed(views):
+        logger.debug(f"Dropping {view.kind.lower()} {view.qualified_name}")
+        conn.exec_driver_sql(f"DROP {view.kind} {view.qualified_name}")
+
+
+def create_dependent_views(conn, views):
+    """Re-create views obtained from `get_dependent_views`. Materialized views are
+    populated if they were populated before."""
+    for view in views:
+        logger.debug(f"Creating {view.kind.lower()} {view.qualified_name}")
+        with_data = ""
+        if view.kind == "MATERIALIZED VIEW":
+            with_data = " WITH DATA" if view.populated else " WITH NO DATA"
+        conn.exec_driver_sql(
+            f"CREATE {view.kind} {view.qualified_name} AS {view.definition}{with_data}"
+        )
+        _execute_all(conn, view.statements)
+
+
+def get_referencing_foreign_keys(conn, table_name, schema=schema_name):
+    """Return the foreign keys in other tables that reference a table, as a list of
+    `(qualified table name, constraint name, constraint definition)`."""
+    with qualified_catalog_definitions(conn):
+        return [
+            tuple(row)
+            for row in conn.execute(
+                text(
+                    """
+                    SELECT
+                        conrelid::regclass::text,
+                        quote_ident(conname),
+                        pg_get_constraintdef(oid)
+                    FROM pg_constraint
+                    WHERE confrelid = to_regclass(:name)
+                        AND conrelid <> confrelid
+                        AND contype = 'f'
+                        AND conparentid = 0
+                    ORDER BY 1, 2
+                    """
+                ),
+                {"name": f"{schema}.{table_name}"},
+            )
+        ]
+
+
+def _table_statements(conn, oid, qualified_name, primary_key):
+    """Statements re-creating the constraints (other than CHECK and NOT NULL
+    constraints, which are copied with the columns), indexes, and triggers of a table,
+    as currently recorded in the catalog. If `primary_key` is specified, it replaces
+    the columns of the primary key constraint."""
+    statements = []
+    for name, contype, definition in conn.execute(
+        text(
+            """
+            SELECT quote_ident(conname), contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = :oid
+                AND contype IN ('p', 'u', 'f', 'x')
+                AND conparentid = 0
+            ORDER BY
+                CASE contype WHEN 'p' THEN 0 WHEN 'u' THEN 1 WHEN 'x' THEN 2 ELSE 3 END,
+                conname
+            """
+        ),
+        {"oid": oid},
+    ):
+        if contype == "p" and primary_key is not None:
+            definition = f"PRIMARY KEY ({', '.join(primary_key)})"
+        statements.append(
+            f"ALTER TABLE {qualified_name} ADD CONSTRAINT {name} {definition}"
+        )
+    statements += _index_statements(conn, oid)
+    for name, definition, enabled in conn.execute(
+        text(
+            """
+            SELECT quote_ident(tgname), pg_get_triggerdef(oid), tgenabled
+            FROM pg_trigger
+            WHERE tgrelid = :oid AND NOT tgisinternal AND tgparentid = 0
+            ORDER BY tgname
+            """
+        ),
+        {"oid": oid},
+    ):
+        statements.append(definition)
+        if enabled == "D":
+            statements.append(f"ALTER TABLE {qualified_name} DISABLE TRIGGER {name}")
+    return statements
+
+
+def _owned_sequences(conn, oid):
+    """Return the sequences owned by columns of a table, as a list of
+    `(column name, qualified sequence name, sequence oid, is identity)`."""
+    return [
+        tuple(row)
+        for row in conn.execute(
+            text(
+                """
+                SELECT
+                    quote_ident(pg_attribute.attname),
+                    pg_depend.objid::regclass::text,
+                    pg_depend.objid,
+                    pg_depend.deptype = 'i'
+                FROM pg_depend
+                    JOIN pg_class ON pg_class.oid = pg_depend.objid
+                    JOIN pg_attribute
+                        ON pg_attribute.attrelid = pg_depend.refobjid
+                        AND pg_attribute.attnum = pg_depend.refobjsubid
+                WHERE pg_depend.refobjid = :oid
+                    AND pg_depend.classid = 'pg_class'::regclass
+                    AND pg_depend.deptype IN ('a', 'i')
+                    AND pg_class.relkind = 'S'
+                ORDER BY 1
+                """
+            ),
+            {"oid": oid},
+        )
+    ]
+
+
+def rebuild_table(
+    conn,
+    table_name,
+    partition_key=None,
+    primary_key=None,
+    identity_columns=(),
+    interval="year",
+    schema=schema_name,
+):
+    """
+    Rebuild a table as a partitioned or as an ordinary table, preserving its
+    contents, constraints, indexes, triggers, ownership, and privileges.
+
+    Views depending on the table, and foreign keys in other tables referencing it,
+    must be dropped by the caller beforehand; see `get_dependent_views` and
+    `get_referencing_foreign_keys`. Triggers are not fired by the rebuild.
+
+    :param conn: database connection
+    :param table_name: name of the table
+    :param partition_key: if specified, the table is rebuilt as a table partitioned by
+        range on this column, with a default partition and a partition for each
+        period (see `interval`) containing any existing rows. Otherwise the table is
+        rebuilt as an ordinary table.
+    :param primary_key: columns of the rebuilt primary key; default is the existing
+        primary key. A partitioned table's primary key must include the partition key.
+    :param identity_columns: columns to be made identity columns in the rebuilt table.
+        Identity columns of the existing table not named here become columns with a
+        default value from an owned sequence of the same name, as for `serial`.
+    :param interval: period covered by each partition, "year" or "month"
+    :param schema: schema containing the table
+    """
+    qualified_name = f"{schema}.{table_name}"
+    new_table_name = f"{table_name}_rebuild"
+    qualified_new_name = f"{schema}.{new_table_name}"
+
+    oid = _relation_oid(conn, table_name, schema)
+    with qualified_catalog_definitions(conn):
+        owner = _owner(conn, oid)
+        statements = _table_statements(
+            conn, oid, qualified_name, primary_key
+        ) + privilege_statements(conn, oid, qualified_name, owner=False)
+        sequences = _owned_sequences(conn, oid)
+        sequence_grants = {
+            column: privilege_statements(
+                conn, sequence_oid, sequence_name, "SEQUENCE", owner=False
+            )
+            for column, sequence_name, sequence_oid, _ in sequences
+        }
+
+    if partition_key is not None:
+        has_nulls = conn.execute(
+            text(
+                f"SELECT EXISTS "
+                f"(SELECT FROM {qualified_name} WHERE {partition_key} IS NULL)"
+            )
+        ).scalar()
+        if has_nulls:
+            raise ValueError(
+                f"Cannot partition {qualified_name} by {partition_key}: "
+                f"some rows have a null {partition_key}"
+            )
+
+    logger.info(
+        f"Rebuilding {qualified_name} as a "
+        + (f"table partitioned by {partition_key}" if partition_key else "table")
+    )
+    partition_by = f" PARTITION BY RANGE ({partition_key})" if partition_key else ""
+    conn.execute(
+        text(
+            f"CREATE TABLE {qualified_new_name} (LIKE {qualified_name} "
+            f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE "
+            f"INCLUDING COMMENTS){partition_by}"
+        )
+    )
+    conn.execute(text(f"ALTER TABLE {qualified_new_name} OWNER TO {owner}"))
+
+    if partition_key is not None:
+        # Partitions are named after the table they will belong to once it is renamed.
+        partitions = [(default_partition_name(table_name), "DEFAULT")]
+        start, end = conn.execute(
+            text(
+                f"SELECT min({partition_key}), max({partition_key}) "
+                f"FROM {qualified_name}"
+            )
+        ).one()
+        if start is not None:
+            partitions += [
+                (
+                    partition_name(table_name, lower, interval),
+                    f"FOR VALUES FROM ('{lower}') TO ('{upper}')",
+                )
+                for lower, upper in partition_ranges(start, end, interval)
+            ]
+        for name, bounds in partitions:
+            conn.execute(
+                text(
+                    f"CREATE TABLE {schema}.{name} "
+                    f"PARTITION OF {qualified_new_name} {bounds}"
+                )
+            )
+            conn.execute(text(f"ALTER TABLE {schema}.{name} OWNER TO {owner}"))
+
+    conn.execute(
+        text(f"INSERT INTO {qualified_new_name} SELECT * FROM {qualified_name}")
+    )
+
+    # Sequences owned by the old table would be dropped with it.
+    for _, sequence_name, _, is_identity in sequences:
+        if not is_identity:
+            conn.execute(text(f"ALTER SEQUENCE {sequence_name} OWNED BY NONE"))
+    conn.execute(text(f"DROP TABLE {qualified_name}"))
+    conn.execute(text(f"ALTER TABLE {qualified_new_name} RENAME TO {table_name}"))
+
+    for column, sequence_name, _, is_identity in sequences:
+        next_value = conn.execute(
+            text(f"SELECT coalesce(max({column}), 0) + 1 FROM {qualified_name}")
+        ).scalar()
+        if column in identity_columns:
+            if not is_identity:
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {qualified_name} ALTER COLUMN {column} "
+                        f"DROP DEFAULT"
+                    )
+                )
+                conn.execute(text(f"DROP SEQUENCE {sequence_name}"))
+            conn.execute(
+                text(
+                    f"ALTER TABLE {qualified_name} ALTER COLUMN {column} "
+                    f"ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {next_value})"
+                )
+            )
+        elif is_identity:
+            # The identity sequence was dropped with the old table. Replace it with
+            # an ordinary sequence of the same name, continuing from the largest value
+            # in use.
+            conn.execute(
+                text(f"CREATE SEQUENCE {sequence_name} START WITH {next_value}")
+            )
+            conn.execute(text(f"ALTER SEQUENCE {sequence_name} OWNER TO {owner}"))
+            conn.execute(
+                text(
+                    f"ALTER SEQUENCE {sequence_name} "
+                    f"OWNED BY {qualified_name}.{column}"
+                )
+            )
+            conn.execute(
+                text(
+                    f"ALTER TABLE {qualified_name} ALTER COLUMN {column} "
+                    f"SET DEFAULT nextval('{sequence_name}'::regclass)"
+                )
+            )
+        else:
+            conn.execute(
+                text(
+                    f"ALTER SEQUENCE {sequence_name} "
+                    f"OWNED BY {qualified_name}.{column}"
+                )
+            )
+            continue
+        # The column's sequence is new; restore the privileges granted on the old one.
+        _execute_all(conn, sequence_grants[column])
+
+    _execute_all(conn, statements)
@@ -33,6 +33,7 @@ def create_view_or_matview(obj, schema=None, grant_privs=True, create_indexes=Tr
                 columns=[col.name for col in index.columns],
                 unique=index.unique,
                 schema=schema,
+                **index.dialect_kwargs,
             )
 
 
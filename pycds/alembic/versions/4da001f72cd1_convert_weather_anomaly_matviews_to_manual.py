@@ -0,0 +1,86 @@
+"""Convert weather-anomaly matviews to manual matviews.
+
+Revision ID: 4da001f72cd1
+Revises: f6d5a4c2e901
+Create Date: 2026-10-17
+
+A native matview can only be refreshed in its entirety. The weather-anomaly
+matviews are replaced by manual matviews (tables) with the same names, columns,
+contents and unique indexes, so that they can be refreshed incrementally, month by
+month, for only the stations and variables whose observations have changed. See
+`pycds.manage_views.refresh_views_incrementally`.
+
+DiscardedObsRaw remains a native matview, and must still be refreshed before the
+weather-anomaly matviews.
+"""
+
+from alembic import op
+
+from pycds import get_schema_name, get_su_role_name
+from pycds.alembic.util import create_matview, drop_matview
+from pycds.orm.manual_matviews.version_4da001f72cd1 import (
+    DailyMaxTemperature,
+    DailyMinTemperature,
+    MonthlyTotalPrecipitation,
+    MonthlyAverageOfDailyMaxTemperature,
+    MonthlyAverageOfDailyMinTemperature,
+)
+from pycds.orm.native_matviews.version_f6d5a4c2e901 import (
+    DailyMaxTemperature as PreviousDailyMaxTemperature,
+    DailyMinTemperature as PreviousDailyMinTemperature,
+    MonthlyTotalPrecipitation as PreviousMonthlyTotalPrecipitation,
+    MonthlyAverageOfDailyMaxTemperature as PreviousMonthlyAverageOfDailyMaxTemperature,
+    MonthlyAverageOfDailyMinTemperature as PreviousMonthlyAverageOfDailyMinTemperature,
+)
+
+
+# revision identifiers, used by Alembic.
+revision = "4da001f72cd1"
+down_revision = "f6d5a4c2e901"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+# The monthly averages depend on the daily extrema, so this is the correct order
+# to create the matviews, but they need to be dropped in reverse order.
+previous_matviews = (
+    PreviousDailyMaxTemperature,
+    PreviousDailyMinTemperature,
+    PreviousMonthlyTotalPrecipitation,
+    PreviousMonthlyAverageOfDailyMaxTemperature,
+    PreviousMonthlyAverageOfDailyMinTemperature,
+)
+
+new_matviews = (
+    DailyMaxTemperature,
+    DailyMinTemperature,
+    MonthlyTotalPrecipitation,
+    MonthlyAverageOfDailyMaxTemperature,
+    MonthlyAverageOfDailyMinTemperature,
+)
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+
+    for matview in reversed(previous_matviews):
+        drop_matview(matview, schema=schema_name)
+
+    for matview in new_matviews:
+        create_matview(matview, schema=schema_name)
+
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+
+    for matview in reversed(new_matviews):
+        drop_matview(matview, schema=schema_name)
+
+    for matview in previous_matviews:
+        create_matview(matview, schema=schema_name)
+
+    op.reset_role()
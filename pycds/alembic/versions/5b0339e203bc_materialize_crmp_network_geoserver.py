@@ -0,0 +1,44 @@
+"""Materialize crmp_network_geoserver
+
+Revision ID: 5b0339e203bc
+Revises: 8578304b749d
+Create Date: 2026-10-17
+
+Replace the view `crmp_network_geoserver`, which GeoServer queried on every map
+request, with a native matview of the same name, columns and contents, with a
+unique index on `history_id` and a GiST index on `the_geom`. It is refreshed only
+when the station metadata or its upstream matviews have changed; see
+`pycds.manage_views.refresh_matviews`.
+"""
+
+from alembic import op
+
+from pycds import get_schema_name, get_su_role_name
+from pycds.alembic.util import create_matview, drop_matview, create_view, drop_view
+from pycds.orm.native_matviews.version_5b0339e203bc import CrmpNetworkGeoserver
+from pycds.orm.views.version_6cb393f711c3 import (
+    CrmpNetworkGeoserver as PreviousCrmpNetworkGeoserver,
+)
+
+# revision identifiers, used by Alembic.
+revision = "5b0339e203bc"
+down_revision = "8578304b749d"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    drop_view(PreviousCrmpNetworkGeoserver, schema=schema_name)
+    create_matview(CrmpNetworkGeoserver, schema=schema_name)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    drop_matview(CrmpNetworkGeoserver, schema=schema_name)
+    create_view(PreviousCrmpNetworkGeoserver, schema=schema_name)
+    op.reset_role()
@@ -0,0 +1,56 @@
+"""Add matview refresh log
+
+Revision ID: 6ae9c5de1470
+Revises: 87bf9f59b9b6
+Create Date: 2026-10-17
+
+Add table `matview_refresh_log`, in which the refresh commands of native and manual
+matviews record each refresh: its start and end times, duration, number of rows
+written, whether it was concurrent or partial, and the latest modification time of
+the source data when it began.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from pycds import get_schema_name
+from pycds.alembic.util import grant_standard_table_privileges
+
+# revision identifiers, used by Alembic.
+revision = "6ae9c5de1470"
+down_revision = "87bf9f59b9b6"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+table_name = "matview_refresh_log"
+
+
+def upgrade():
+    op.create_table(
+        table_name,
+        sa.Column("matview_refresh_log_id", sa.Integer(), nullable=False),
+        sa.Column("matview_name", sa.String(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("duration", sa.Interval(), nullable=False),
+        sa.Column("row_count", sa.BigInteger(), nullable=True),
+        sa.Column("source_mod_time", sa.DateTime(), nullable=True),
+        sa.Column("concurrently", sa.Boolean(), nullable=False),
+        sa.Column("partial", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("matview_refresh_log_id"),
+        schema=schema_name,
+    )
+    op.create_index(
+        "matview_refresh_log_matview_name_end_time_idx",
+        table_name,
+        ["matview_name", "end_time"],
+        schema=schema_name,
+    )
+    grant_standard_table_privileges(table_name, schema=schema_name)
+
+
+def downgrade():
+    op.drop_table(table_name, schema=schema_name)
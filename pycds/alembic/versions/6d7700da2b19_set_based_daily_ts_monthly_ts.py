@@ -0,0 +1,45 @@
+"""Set-based functions daily_ts and monthly_ts
+
+Revision ID: 6d7700da2b19
+Revises: aedcbc39fefa
+Create Date: 2026-10-17
+
+Replace the plpgsql implementations of `daily_ts` and `monthly_ts`, which filtered
+`obs_raw` on a nonexistent column `station_id`, with SQL functions that select the
+observations of the station's histories in a single grouped query. The signatures
+and returned rows are unchanged.
+"""
+
+from alembic import op
+
+from pycds.context import get_su_role_name
+from pycds.orm.functions.version_4a2f1879293a import (
+    daily_ts as old_daily_ts,
+    monthly_ts as old_monthly_ts,
+)
+from pycds.orm.functions.version_6d7700da2b19 import (
+    daily_ts as new_daily_ts,
+    monthly_ts as new_monthly_ts,
+)
+
+# revision identifiers, used by Alembic.
+revision = "6d7700da2b19"
+down_revision = "aedcbc39fefa"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    for old, new in ((old_daily_ts, new_daily_ts), (old_monthly_ts, new_monthly_ts)):
+        op.drop_replaceable_object(old)
+        op.create_replaceable_object(new)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    for old, new in ((old_daily_ts, new_daily_ts), (old_monthly_ts, new_monthly_ts)):
+        op.drop_replaceable_object(new)
+        op.create_replaceable_object(old)
+    op.reset_role()
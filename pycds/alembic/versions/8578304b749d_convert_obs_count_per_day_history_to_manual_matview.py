@@ -0,0 +1,44 @@
+"""Convert obs_count_per_day_history_v to manual matview
+
+Revision ID: 8578304b749d
+Revises: 8a817c2a4e7a
+Create Date: 2026-10-17
+
+Replace the view `obs_count_per_day_history_v`, which aggregated all of `obs_raw`
+on every query, with a manual matview (table) of the same name, columns and
+contents, with a unique index on `(history_id, date_trunc)`. It can be refreshed
+incrementally from observation modification times; see
+`pycds.manage_views.refresh_views_incrementally`.
+"""
+
+from alembic import op
+
+from pycds import get_schema_name, get_su_role_name
+from pycds.alembic.util import create_matview, drop_matview, create_view, drop_view
+from pycds.orm.manual_matviews.version_8578304b749d import ObsCountPerDayHistory
+from pycds.orm.views.version_84b7fc2596d5 import (
+    ObsCountPerDayHistory as PreviousObsCountPerDayHistory,
+)
+
+# revision identifiers, used by Alembic.
+revision = "8578304b749d"
+down_revision = "8a817c2a4e7a"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    drop_view(PreviousObsCountPerDayHistory, schema=schema_name)
+    create_matview(ObsCountPerDayHistory, schema=schema_name)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    drop_matview(ObsCountPerDayHistory, schema=schema_name)
+    create_view(PreviousObsCountPerDayHistory, schema=schema_name)
+    op.reset_role()
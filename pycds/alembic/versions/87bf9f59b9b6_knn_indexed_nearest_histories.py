@@ -0,0 +1,61 @@
+"""KNN-indexed nearest histories
+
+Revision ID: 87bf9f59b9b6
+Revises: 6d7700da2b19
+Create Date: 2026-10-17
+
+Add a GiST index on the geography of `meta_history.the_geom`, and function
+`nearest_histories`, which finds the histories nearest a point by a KNN (`<->`)
+scan of that index. Replace function `closest_stns_within_threshold`, which
+interpolated its arguments into dynamic SQL, with a parameterized SQL function that
+uses the same index.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from pycds.context import get_schema_name, get_su_role_name
+from pycds.orm.functions.version_4a2f1879293a import (
+    closest_stns_within_threshold as old_closest_stns_within_threshold,
+)
+from pycds.orm.functions.version_87bf9f59b9b6 import (
+    closest_stns_within_threshold as new_closest_stns_within_threshold,
+    nearest_histories,
+)
+
+# revision identifiers, used by Alembic.
+revision = "87bf9f59b9b6"
+down_revision = "6d7700da2b19"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+index_name = "meta_history_the_geog_idx"
+
+
+def upgrade():
+    op.create_index(
+        index_name,
+        "meta_history",
+        [sa.text("geography(the_geom)")],
+        schema=schema_name,
+        postgresql_using="gist",
+    )
+
+    op.set_role(get_su_role_name())
+    op.drop_replaceable_object(old_closest_stns_within_threshold)
+    op.create_replaceable_object(new_closest_stns_within_threshold)
+    op.create_replaceable_object(nearest_histories)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    op.drop_replaceable_object(nearest_histories)
+    op.drop_replaceable_object(new_closest_stns_within_threshold)
+    op.create_replaceable_object(old_closest_stns_within_threshold)
+    op.reset_role()
+
+    op.drop_index(index_name, table_name="meta_history", schema=schema_name)
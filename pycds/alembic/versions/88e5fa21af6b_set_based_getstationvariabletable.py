@@ -0,0 +1,41 @@
+"""Set-based function getstationvariabletable
+
+Revision ID: 88e5fa21af6b
+Revises: ae6f546b717d
+Create Date: 2026-10-17
+
+Replace the plpython3u implementation of `getstationvariabletable` with a SQL
+function. The query text it returns selects observations with array literals
+(`= ANY(...)`) instead of `OR` chains and `IN` lists, and pivots with aggregate
+`FILTER` clauses. The returned table is unchanged.
+"""
+
+from alembic import op
+
+from pycds.context import get_su_role_name
+from pycds.orm.functions.version_efde19ea4f52 import (
+    getstationvariabletable as old_getstationvariabletable,
+)
+from pycds.orm.functions.version_88e5fa21af6b import (
+    getstationvariabletable as new_getstationvariabletable,
+)
+
+# revision identifiers, used by Alembic.
+revision = "88e5fa21af6b"
+down_revision = "ae6f546b717d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    op.drop_replaceable_object(old_getstationvariabletable)
+    op.create_replaceable_object(new_getstationvariabletable)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    op.drop_replaceable_object(new_getstationvariabletable)
+    op.create_replaceable_object(old_getstationvariabletable)
+    op.reset_role()
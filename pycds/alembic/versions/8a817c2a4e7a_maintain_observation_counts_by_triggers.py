@@ -0,0 +1,106 @@
+"""Maintain observation counts by triggers
+
+Revision ID: 8a817c2a4e7a
+Revises: b2273a086ddb
+Create Date: 2026-10-17
+
+Add manual matview (table) `obs_count_per_month_mv` of observation counts per
+(history_id, vars_id, month), maintained by statement-level triggers on `obs_raw`.
+Replace the native matviews `obs_count_per_month_history_mv` and
+`climo_obs_count_mv`, which were full scans of `obs_raw`, with views of the same
+names and columns over it. They are always current and no longer need refreshing.
+
+Observations with a NULL `history_id` or `vars_id` are not counted. (`obs_time` is
+not nullable.) This changes the contents of the views: the native matviews had a row
+with NULL `history_id` counting the observations without a history, and
+`obs_count_per_month_history_mv` counted observations without a variable in the
+count of their history. Such observations cannot be selected by station and
+variable, which is what these counts are used to estimate.
+"""
+
+from alembic import op
+
+from pycds import get_schema_name, get_su_role_name
+from pycds.alembic.util import create_matview, drop_matview, create_view, drop_view
+from pycds.orm.manual_matviews.version_8a817c2a4e7a import ObsCountPerMonth
+from pycds.orm.native_matviews.version_bb2a222a1d4a import (
+    ObsCountPerMonthHistory as PreviousObsCountPerMonthHistory,
+)
+from pycds.orm.native_matviews.version_96729d6db8b3 import (
+    ClimoObsCount as PreviousClimoObsCount,
+)
+from pycds.orm.trigger_functions.version_8a817c2a4e7a import obs_count_per_month_ops
+from pycds.orm.views.version_8a817c2a4e7a import (
+    ObsCountPerMonthHistory,
+    ClimoObsCount,
+)
+
+# revision identifiers, used by Alembic.
+revision = "8a817c2a4e7a"
+down_revision = "b2273a086ddb"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+trigger_prefix = "t200_obs_count_per_month_"
+
+# A trigger with a transition table can handle only one kind of event.
+trigger_events = (
+    ("INSERT", "NEW TABLE AS new_rows"),
+    ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def create_triggers():
+    for event, transition_tables in trigger_events:
+        op.execute(
+            f"CREATE TRIGGER {trigger_prefix}{event.lower()} "
+            f"    AFTER {event} "
+            f"    ON {schema_name}.obs_raw "
+            f"    REFERENCING {transition_tables} "
+            f"    FOR EACH STATEMENT "
+            f"    EXECUTE FUNCTION {obs_count_per_month_ops.qualified_name()}()"
+        )
+
+
+def drop_triggers():
+    for event, _ in trigger_events:
+        op.execute(
+            f"DROP TRIGGER {trigger_prefix}{event.lower()} ON {schema_name}.obs_raw"
+        )
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+
+    # Block changes to obs_raw between counting its contents and creating the
+    # triggers that maintain the counts.
+    op.execute(f"LOCK TABLE {schema_name}.obs_raw IN SHARE ROW EXCLUSIVE MODE")
+    create_matview(ObsCountPerMonth, schema=schema_name)
+    op.create_replaceable_object(obs_count_per_month_ops)
+    create_triggers()
+
+    drop_matview(PreviousObsCountPerMonthHistory, schema=schema_name)
+    drop_matview(PreviousClimoObsCount, schema=schema_name)
+    create_view(ObsCountPerMonthHistory, schema=schema_name)
+    create_view(ClimoObsCount, schema=schema_name)
+
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+
+    drop_view(ClimoObsCount, schema=schema_name)
+    drop_view(ObsCountPerMonthHistory, schema=schema_name)
+    create_matview(PreviousClimoObsCount, schema=schema_name)
+    create_matview(PreviousObsCountPerMonthHistory, schema=schema_name)
+
+    drop_triggers()
+    op.drop_replaceable_object(obs_count_per_month_ops)
+    drop_matview(ObsCountPerMonth, schema=schema_name)
+
+    op.reset_role()
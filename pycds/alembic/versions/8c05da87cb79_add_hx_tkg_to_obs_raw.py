@@ -4,6 +4,19 @@ Revision ID: 8c05da87cb79
 Revises: a59d64cf16ca
 Create Date: 2025-01-07 13:04:10.515777
 
+Populating the history table for obs_raw can take hours. To populate it in chunks,
+each committed separately, run this migration with the command line arguments
+`-x hx_chunk_size=<n>` and optionally `-x hx_workers=<m>` (see
+`pycds.alembic.change_history_utils.populate_history_table_in_chunks`). If such a
+run fails, running it again resumes population where it stopped.
+
+`obs_raw` must not be written during chunked population, from the first run until
+population is complete: quiesce everything that writes to it beforehand. Each run
+blocks writes to `obs_raw` while it populates. A write between the start of the
+migration and the start of population, or between a failed run and its resumption,
+is recorded in the history table by the primary table triggers, which are created
+before population; population then fails rather than produce an inconsistent
+history table, and the migration must be downgraded and run again.
 """
 
 from alembic import op
@@ -13,7 +26,10 @@ from sqlalchemy import text
 from pycds import get_schema_name
 from pycds.alembic.change_history_utils import (
     add_history_cols_to_primary,
+    clear_population_progress,
     create_history_table,
+    get_population_progress,
+    history_population_options,
     populate_history_table,
     drop_history_triggers,
     drop_history_table,
@@ -48,34 +64,51 @@ def upgrade():
     # this here.
     op.get_bind().execute(text(f"SET search_path TO {schema_name}, public"))
 
-    # Primary table
-    ####
-
-    # Add missing history col
-    add_history_cols_to_primary(
-        table_name,
-        columns=(
-            'mod_user character varying(64) COLLATE pg_catalog."default" '
-            "   NOT NULL DEFAULT CURRENT_USER",
-        ),
-    )
-    # Existing trigger on obs_raw is superseded by the hx tracking trigger.
-    op.execute(
-        text(f"DROP TRIGGER IF EXISTS update_mod_time ON {main_table_name(table_name)}")
+    # Chunked population commits the steps preceding it. If a previous chunked run
+    # failed, those steps are done and population is resumed.
+    population_options = history_population_options()
+    resuming = (
+        population_options
+        and get_population_progress(op.get_bind(), table_name) is not None
     )
-    create_primary_table_triggers(table_name)
 
-    # History table
-    ####
+    if not resuming:
+        # Primary table
+        ####
+
+        # Add missing history col
+        add_history_cols_to_primary(
+            table_name,
+            columns=(
+                'mod_user character varying(64) COLLATE pg_catalog."default" '
+                "   NOT NULL DEFAULT CURRENT_USER",
+            ),
+        )
+        # Existing trigger on obs_raw is superseded by the hx tracking trigger.
+        op.execute(
+            text(
+                f"DROP TRIGGER IF EXISTS update_mod_time "
+                f"ON {main_table_name(table_name)}"
+            )
+        )
+        create_primary_table_triggers(table_name)
+
+        # History table
+        ####
 
-    # Create history table and give it the required privs
-    create_history_table(table_name, foreign_tables)
-    grant_standard_table_privileges(hx_table_name(table_name, schema=schema_name))
-    # Populate the history table. History FKs are included in the initial table
+        # Create history table and give it the required privs
+        create_history_table(table_name, foreign_tables)
+        grant_standard_table_privileges(hx_table_name(table_name, schema=schema_name))
+
+    # Populate the history table. The primary table triggers are already in place,
+    # so that any write to the primary table during chunked population leaves a
+    # history record, by which it is detected. History FKs are included in the initial table
     # population. It must be done this way: Doing it after population, in bulk, causes
     # memory overflows (UPDATEs use a lot of memory). Doing it piecemeal, via the
     # triggers, on 1e9 records is completely time infeasible.
-    populate_history_table(table_name, primary_key_name, foreign_tables)
+    populate_history_table(
+        table_name, primary_key_name, foreign_tables, **population_options
+    )
     # History table triggers must be created after the table is populated.
     create_history_table_triggers(table_name, foreign_tables)
     # Indexes are better created after table is populated than before.
@@ -83,6 +116,7 @@ def upgrade():
 
 
 def downgrade():
+    clear_population_progress(op.get_bind(), table_name)
     drop_history_triggers(table_name)
     drop_history_table(table_name)
     drop_history_cols_from_primary(table_name, columns=("mod_user",))
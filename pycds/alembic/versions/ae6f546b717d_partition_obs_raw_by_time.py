@@ -0,0 +1,161 @@
+"""Partition obs_raw and obs_raw_hx by time
+
+Revision ID: ae6f546b717d
+Revises: d7ade974ccde
+Create Date: 2026-10-17
+
+Convert `obs_raw` into a table partitioned by range on `obs_time`, and `obs_raw_hx`
+into a table partitioned by range on `mod_time`. Each table receives a default
+partition and a yearly partition for each year containing existing rows. Further
+partitions are managed with `pycds.partitioning`.
+
+PostgreSQL requires the primary key of a partitioned table to include the partition
+key, so the primary keys become (obs_raw_id, obs_time) and (obs_raw_hx_id, mod_time).
+For the same reason, foreign keys referencing `obs_raw.obs_raw_id` (from
+`obs_raw_native_flags`, `obs_raw_pcic_flags`, and `time_bounds`) cannot be retained,
+and are dropped. In their place, statement-level triggers on `obs_raw` raise a
+foreign key violation when a statement deletes (or changes the id of) an observation
+that is still referenced (see `pycds.orm.trigger_functions.version_ae6f546b717d`).
+Upgrade fails if any observation has a null `obs_time`.
+
+Both tables are rebuilt, which copies all their rows, and all views and materialized
+views depending on them are re-created, which refreshes the materialized views. This
+migration is therefore very long-running on a large database.
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+from pycds import get_schema_name, get_su_role_name
+from pycds.alembic.partition_utils import (
+    create_dependent_views,
+    drop_dependent_views,
+    get_dependent_views,
+    get_referencing_foreign_keys,
+    rebuild_table,
+)
+from pycds.orm.trigger_functions.version_ae6f546b717d import (
+    obs_raw_referenced_check,
+)
+
+# revision identifiers, used by Alembic.
+revision = "ae6f546b717d"
+down_revision = "d7ade974ccde"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+
+table_info = (
+    # table_name, partition_key, partitioned primary key, unpartitioned primary key,
+    # unpartitioned identity columns
+    ("obs_raw", "obs_time", ["obs_raw_id", "obs_time"], ["obs_raw_id"], ()),
+    (
+        "obs_raw_hx",
+        "mod_time",
+        ["obs_raw_hx_id", "mod_time"],
+        ["obs_raw_hx_id"],
+        ("obs_raw_hx_id",),
+    ),
+)
+
+# Foreign keys referencing obs_raw.obs_raw_id, restored on downgrade.
+obs_raw_referencing_foreign_keys = (
+    # table_name, constraint_name
+    ("obs_raw_native_flags", "obs_raw_native_flags_obs_raw_id_fkey"),
+    ("obs_raw_pcic_flags", "obs_raw_pcic_flags_obs_raw_id_fkey"),
+    ("time_bounds", "time_bounds_obs_raw_id_fkey"),
+)
+
+# Triggers replacing those foreign keys. The prefix makes them fire before the other
+# AFTER triggers on obs_raw. A trigger with a transition table can handle only one
+# kind of event.
+trigger_prefix = "t050_obs_raw_referenced_"
+trigger_events = (
+    ("DELETE", "OLD TABLE AS old_rows"),
+    ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+)
+
+
+def create_triggers():
+    for event, transition_tables in trigger_events:
+        op.execute(
+            f"CREATE TRIGGER {trigger_prefix}{event.lower()} "
+            f"    AFTER {event} "
+            f"    ON {schema_name}.obs_raw "
+            f"    REFERENCING {transition_tables} "
+            f"    FOR EACH STATEMENT "
+            f"    EXECUTE FUNCTION {obs_raw_referenced_check.qualified_name()}()"
+        )
+
+
+def drop_triggers():
+    for event, _ in trigger_events:
+        op.execute(
+            f"DROP TRIGGER {trigger_prefix}{event.lower()} ON {schema_name}.obs_raw"
+        )
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    conn = op.get_bind()
+    conn.execute(text(f"SET search_path TO {schema_name}, public"))
+
+    views = get_dependent_views(conn, [t for t, *_ in table_info], schema_name)
+    drop_dependent_views(conn, views)
+    for table_name, constraint_name, _ in get_referencing_foreign_keys(
+        conn, "obs_raw", schema_name
+    ):
+        conn.execute(
+            text(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint_name}")
+        )
+
+    for table_name, partition_key, primary_key, _, _ in table_info:
+        rebuild_table(
+            conn,
+            table_name,
+            partition_key=partition_key,
+            primary_key=primary_key,
+            schema=schema_name,
+        )
+    op.create_replaceable_object(obs_raw_referenced_check)
+    create_triggers()
+
+    create_dependent_views(conn, views)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    conn = op.get_bind()
+    conn.execute(text(f"SET search_path TO {schema_name}, public"))
+
+    views = get_dependent_views(conn, [t for t, *_ in table_info], schema_name)
+    drop_dependent_views(conn, views)
+    drop_triggers()
+    op.drop_replaceable_object(obs_raw_referenced_check)
+
+    for table_name, _, _, primary_key, identity_columns in table_info:
+        rebuild_table(
+            conn,
+            table_name,
+            primary_key=primary_key,
+            identity_columns=identity_columns,
+            schema=schema_name,
+        )
+
+    for table_name, constraint_name in obs_raw_referencing_foreign_keys:
+        op.create_foreign_key(
+            constraint_name,
+            table_name,
+            "obs_raw",
+            ["obs_raw_id"],
+            ["obs_raw_id"],
+            source_schema=schema_name,
+            referent_schema=schema_name,
+        )
+
+    create_dependent_views(conn, views)
+    op.reset_role()
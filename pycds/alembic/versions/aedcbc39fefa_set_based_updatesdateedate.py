@@ -0,0 +1,41 @@
+"""Set-based function updatesdateedate
+
+Revision ID: aedcbc39fefa
+Revises: fd52f31bc576
+Create Date: 2026-10-17
+
+Replace the station-by-station loop in `updatesdateedate` with a single grouped
+UPDATE ... FROM. New optional arguments restrict the update to stations whose
+observations changed since a given time, and take observation times from matview
+`station_obs_stats_mv` instead of `obs_raw`.
+"""
+
+from alembic import op
+
+from pycds.context import get_su_role_name
+from pycds.orm.functions.version_4a2f1879293a import (
+    updatesdateedate as old_updatesdateedate,
+)
+from pycds.orm.functions.version_aedcbc39fefa import (
+    updatesdateedate as new_updatesdateedate,
+)
+
+# revision identifiers, used by Alembic.
+revision = "aedcbc39fefa"
+down_revision = "fd52f31bc576"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    op.drop_replaceable_object(old_updatesdateedate)
+    op.create_replaceable_object(new_updatesdateedate)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    op.drop_replaceable_object(new_updatesdateedate)
+    op.create_replaceable_object(old_updatesdateedate)
+    op.reset_role()
@@ -0,0 +1,64 @@
+"""Immutable, parallel safe helper functions
+
+Revision ID: b2273a086ddb
+Revises: cc28bde2be1a
+Create Date: 2026-10-17
+
+Redefine the helper functions `daysinmonth`, `lastdateofmonth`, `season`, and
+`variable_tags` as IMMUTABLE PARALLEL SAFE SQL functions, so that queries calling
+them, including the defining queries of matviews `collapsed_vars_mv` and
+`climo_obs_count_mv`, can use parallel plans, and the planner can inline them.
+"""
+
+from alembic import op
+
+from pycds.context import get_su_role_name
+from pycds.orm.functions.version_4a2f1879293a import (
+    daysinmonth as previous_daysinmonth,
+    lastdateofmonth as previous_lastdateofmonth,
+    season as previous_season,
+)
+from pycds.orm.functions.version_83896ee79b06 import (
+    variable_tags as previous_variable_tags,
+)
+from pycds.orm.functions.version_b2273a086ddb import (
+    daysinmonth,
+    lastdateofmonth,
+    season,
+    variable_tags,
+)
+
+# revision identifiers, used by Alembic.
+revision = "b2273a086ddb"
+down_revision = "cc28bde2be1a"
+branch_labels = None
+depends_on = None
+
+
+new_functions = (daysinmonth, lastdateofmonth, season, variable_tags)
+
+previous_functions = (
+    previous_daysinmonth,
+    previous_lastdateofmonth,
+    previous_season,
+    previous_variable_tags,
+)
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+    # Views and matviews depend on variable_tags, so the functions are replaced,
+    # not dropped and created.
+    for function in new_functions:
+        op.create_replaceable_object(function)
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+    for function in previous_functions:
+        # Some previous functions have replace=False because they were originally
+        # used for first creation. Reuse their definitions but enable replacement.
+        function.replace = True
+        op.create_replaceable_object(function)
+    op.reset_role()
@@ -0,0 +1,81 @@
+"""Add latest history id tables
+
+Revision ID: cc28bde2be1a
+Revises: 6ae9c5de1470
+Create Date: 2026-10-17
+
+Add a latest history id table, `<table>_hx_latest`, for each history-tracked
+metadata table referred to by history foreign keys (`meta_network`, `meta_station`,
+`meta_history`, `meta_vars`). It maps each primary id to its latest history id. The
+statement-level history tracking trigger function maintains these tables, and uses
+them to resolve history foreign keys by primary key lookup instead of aggregating
+the foreign history table.
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+from pycds import get_schema_name
+from pycds.alembic.change_history_utils import (
+    create_hx_latest_table,
+    drop_hx_latest_table,
+    hx_latest_table_name,
+)
+from pycds.alembic.util import grant_standard_table_privileges
+from pycds.orm.trigger_functions.version_d7ade974ccde import (
+    hxtk_primary_stmt_ops_to_hx as previous_hxtk_primary_stmt_ops_to_hx,
+)
+from pycds.orm.trigger_functions.version_cc28bde2be1a import (
+    hxtk_primary_stmt_ops_to_hx,
+)
+
+# revision identifiers, used by Alembic.
+revision = "cc28bde2be1a"
+down_revision = "6ae9c5de1470"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+
+table_info = (
+    # table_name, primary key name
+    ("meta_network", "network_id"),
+    ("meta_station", "station_id"),
+    ("meta_history", "history_id"),
+    ("meta_vars", "vars_id"),
+)
+
+
+def lock_tables():
+    # Prevent changes to the main tables between populating the latest history id
+    # tables and replacing the trigger function that maintains them.
+    op.execute(
+        f"LOCK TABLE "
+        f"{', '.join(f'{schema_name}.{table_name}' for table_name, _ in table_info)} "
+        f"IN SHARE ROW EXCLUSIVE MODE"
+    )
+
+
+def upgrade():
+    op.get_bind().execute(text(f"SET search_path TO {schema_name}, public"))
+    lock_tables()
+    for table_name, pri_id_name in table_info:
+        create_hx_latest_table(table_name, pri_id_name)
+        grant_standard_table_privileges(
+            hx_latest_table_name(table_name, schema=None), schema=schema_name
+        )
+    # Triggers depend on the trigger function, so it is replaced, not dropped.
+    op.create_replaceable_object(hxtk_primary_stmt_ops_to_hx)
+
+
+def downgrade():
+    op.get_bind().execute(text(f"SET search_path TO {schema_name}, public"))
+    # previous_hxtk_primary_stmt_ops_to_hx has replace=False because it was
+    # originally used for first creation. Reuse its definition but enable
+    # replacement here.
+    previous_hxtk_primary_stmt_ops_to_hx.replace = True
+    op.create_replaceable_object(previous_hxtk_primary_stmt_ops_to_hx)
+    for table_name, _ in reversed(table_info):
+        drop_hx_latest_table(table_name)
@@ -0,0 +1,63 @@
+"""Use statement-level history tracking triggers
+
+Revision ID: d7ade974ccde
+Revises: 4da001f72cd1
+Create Date: 2026-10-17
+
+Replace the row-level history tracking triggers on all history-tracked tables with
+statement-level triggers using transition tables. The history records for each
+statement are appended with a single INSERT, and history foreign keys are resolved
+with one set-based join per foreign table, rather than by a query per row in a
+trigger on the history table.
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+from pycds import get_schema_name
+from pycds.alembic.change_history_utils import (
+    create_history_table_triggers,
+    create_primary_table_triggers,
+    drop_history_triggers,
+)
+from pycds.orm.trigger_functions.version_d7ade974ccde import (
+    hxtk_primary_stmt_ops_to_hx,
+)
+
+# revision identifiers, used by Alembic.
+revision = "d7ade974ccde"
+down_revision = "4da001f72cd1"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+
+table_info = (
+    # table_name, foreign_keys
+    ("meta_network", None),
+    ("meta_station", [("meta_network", "network_id")]),
+    ("meta_history", [("meta_station", "station_id")]),
+    ("meta_vars", [("meta_network", "network_id")]),
+    ("obs_raw", [("meta_history", "history_id"), ("meta_vars", "vars_id")]),
+)
+
+
+def upgrade():
+    op.get_bind().execute(text(f"SET search_path TO {schema_name}, public"))
+    op.create_replaceable_object(hxtk_primary_stmt_ops_to_hx)
+    for table_name, foreign_tables in table_info:
+        drop_history_triggers(table_name)
+        create_primary_table_triggers(
+            table_name, statement_level=True, foreign_tables=foreign_tables
+        )
+
+
+def downgrade():
+    op.get_bind().execute(text(f"SET search_path TO {schema_name}, public"))
+    for table_name, foreign_tables in reversed(table_info):
+        drop_history_triggers(table_name, statement_level=True)
+        create_primary_table_triggers(table_name)
+        create_history_table_triggers(table_name, foreign_tables)
+    op.drop_replaceable_object(hxtk_primary_stmt_ops_to_hx)
@@ -0,0 +1,112 @@
+"""Maintain discarded_obs_raw_mv by triggers
+
+Revision ID: fd52f31bc576
+Revises: 88e5fa21af6b
+Create Date: 2026-10-17
+
+Replace the native matview `discarded_obs_raw_mv` with a manual matview (table) of
+the same name, column, contents and unique index, maintained incrementally by
+statement-level triggers on the flag association tables (`obs_raw_native_flags`,
+`obs_raw_pcic_flags`) and the flag tables (`meta_native_flag`, `meta_pcic_flag`).
+It no longer needs to be refreshed before the weather-anomaly matviews.
+"""
+
+from alembic import op
+
+from pycds import get_schema_name, get_su_role_name
+from pycds.alembic.util import create_matview, drop_matview
+from pycds.orm.manual_matviews.version_fd52f31bc576 import DiscardedObsRaw
+from pycds.orm.native_matviews.version_f6d5a4c2e901 import (
+    DiscardedObsRaw as PreviousDiscardedObsRaw,
+)
+from pycds.orm.trigger_functions.version_fd52f31bc576 import (
+    discarded_obs_raw_assoc_ops,
+    discarded_obs_raw_flag_ops,
+)
+
+# revision identifiers, used by Alembic.
+revision = "fd52f31bc576"
+down_revision = "88e5fa21af6b"
+branch_labels = None
+depends_on = None
+
+
+schema_name = get_schema_name()
+
+trigger_prefix = "t200_discarded_obs_raw_"
+
+# flag association table name, flag table name, flag id name
+flag_tables = (
+    ("obs_raw_native_flags", "meta_native_flag", "native_flag_id"),
+    ("obs_raw_pcic_flags", "meta_pcic_flag", "pcic_flag_id"),
+)
+
+# A trigger with a transition table can handle only one kind of event.
+assoc_trigger_events = (
+    ("INSERT", "NEW TABLE AS new_rows"),
+    ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def create_triggers():
+    for assoc_table_name, flag_table_name, flag_id_name in flag_tables:
+        for event, transition_tables in assoc_trigger_events:
+            op.execute(
+                f"CREATE TRIGGER {trigger_prefix}{event.lower()} "
+                f"    AFTER {event} "
+                f"    ON {schema_name}.{assoc_table_name} "
+                f"    REFERENCING {transition_tables} "
+                f"    FOR EACH STATEMENT "
+                f"    EXECUTE FUNCTION "
+                f"{discarded_obs_raw_assoc_ops.qualified_name()}"
+                f"('{flag_table_name}', '{flag_id_name}')"
+            )
+        op.execute(
+            f"CREATE TRIGGER {trigger_prefix}update "
+            f"    AFTER UPDATE "
+            f"    ON {schema_name}.{flag_table_name} "
+            f"    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+            f"    FOR EACH STATEMENT "
+            f"    EXECUTE FUNCTION "
+            f"{discarded_obs_raw_flag_ops.qualified_name()}"
+            f"('{assoc_table_name}', '{flag_id_name}')"
+        )
+
+
+def drop_triggers():
+    for assoc_table_name, flag_table_name, _ in flag_tables:
+        for event, _ in assoc_trigger_events:
+            op.execute(
+                f"DROP TRIGGER {trigger_prefix}{event.lower()} "
+                f"ON {schema_name}.{assoc_table_name}"
+            )
+        op.execute(
+            f"DROP TRIGGER {trigger_prefix}update ON {schema_name}.{flag_table_name}"
+        )
+
+
+def upgrade():
+    op.set_role(get_su_role_name())
+
+    drop_matview(PreviousDiscardedObsRaw, schema=schema_name)
+    create_matview(DiscardedObsRaw, schema=schema_name)
+
+    op.create_replaceable_object(discarded_obs_raw_assoc_ops)
+    op.create_replaceable_object(discarded_obs_raw_flag_ops)
+    create_triggers()
+
+    op.reset_role()
+
+
+def downgrade():
+    op.set_role(get_su_role_name())
+
+    drop_triggers()
+    op.drop_replaceable_object(discarded_obs_raw_flag_ops)
+    op.drop_replaceable_object(discarded_obs_raw_assoc_ops)
+
+    drop_matview(DiscardedObsRaw, schema=schema_name)
+    create_matview(PreviousDiscardedObsRaw, schema=schema_name)
+
+    op.reset_role()
@@ -4,6 +4,10 @@ import logging
 import struct
 import datetime
 from calendar import monthrange
+
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
 from pycds import Network, Station, History, Variable, DerivedValue
 
 pcic_climate_variable_network_name = "PCIC Climate Variables"
@@ -138,12 +142,37 @@ field_widths = [8, 1, 12, 5, 1, 12, 12, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6]
 field_format = " ".join(["{}s".format(fw) for fw in field_widths])
 
 
+def get_latest_history_ids(session, native_ids):
+    """Return the id of the latest history (by `sdate`) of the station with each of
+    the specified native ids, in a single query.
+
+    Args:
+        session (...): SQLAlchemy session for accessing the database
+
+        native_ids (iterable): station native ids
+
+    Returns:
+        dict mapping native id to history id; native ids for which no history
+        exists are omitted
+    """
+    q = (
+        select(Station.native_id, History.id)
+        .select_from(Station)
+        .join(History, History.station_id == Station.id)
+        .where(Station.native_id == any_(bindparam("native_ids", type_=ARRAY(String))))
+        .order_by(Station.native_id, History.sdate.desc())
+        .distinct(Station.native_id)
+    )
+    return dict(session.execute(q, {"native_ids": list(native_ids)}).all())
+
+
 def load_pcic_climate_baseline_values(
     session,
     var_name,
     lines,
     exclude=[],
     network_name=pcic_climate_variable_network_name,
+    bulk=False,
 ):
     """Load baseline values into the database.
     Create the necessary variables and synthetic network if they do not
@@ -166,6 +195,14 @@ def load_pcic_climate_baseline_values(
         network_name (str): name of the network to which the climate variable
             (identified by `var_name`) must be associated
 
+        bulk (bool): if true, read all lines first, look up the latest history of
+            every station in a single query, and insert all values in bulk.
+            Values that already exist in the database (for the same time,
+            history, and variable) are replaced; otherwise they cause an
+            integrity error. Within `lines`, a later station line replaces an
+            earlier one with the same native id, and its values are counted once
+            in `n_values_added`.
+
     Returns: tuple:
         n_lines_added,      # count of lines loaded (stations processed) into
                               database
@@ -232,43 +269,77 @@ def load_pcic_climate_baseline_values(
     n_lines_excluded = 0
     n_lines_skipped = 0
 
-    for line in lines:
+    def parsed_lines():
+        """Yield (line, data) for each line; data is None if the line errored."""
+        for line in lines:
+            try:
+                yield line, parse_line(line)
+            except struct.error as e:
+                logger.info("Error processing input line:")
+                logger.info(line)
+                logger.info("Error: {}".format(repr(e)))
+                yield line, None
+
+    parsed = parsed_lines()
+    if bulk:
+        parsed = list(parsed)
+        latest_history_ids = get_latest_history_ids(
+            session,
+            {
+                data["native_id"].strip()
+                for _, data in parsed
+                if data is not None and data["native_id"].strip() not in exclude
+            },
+        )
+        # Values to insert, keyed by the columns of the unique constraint (less
+        # variable, which is the same for all).
+        values = {}
+
+    for line, data in parsed:
         n_lines_total += 1
-        try:
-            data = parse_line(line)
-        except struct.error as e:
-            logger.info("Error processing input line:")
-            logger.info(line)
-            logger.info("Error: {}".format(repr(e)))
+        if data is None:
             n_lines_errored += 1
             continue
         station_native_id = data["native_id"].strip()
         if station_native_id not in exclude:
-            latest_history = (
-                session.query(History)
-                .filter(History.station.has(native_id=station_native_id))
-                .order_by(History.sdate.desc())
-                .first()
-            )
-            if latest_history:
+            if bulk:
+                latest_history_id = latest_history_ids.get(station_native_id)
+            else:
+                latest_history = (
+                    session.query(History)
+                    .filter(History.station.has(native_id=station_native_id))
+                    .order_by(History.sdate.desc())
+                    .first()
+                )
+                latest_history_id = latest_history and latest_history.id
+            if latest_history_id is not None:
                 logger.info('Adding station "{}"'.format(station_native_id))
                 for month in range(1, 13):
                     datum = data[str(month)]
                     if datum.strip() != "-9999":
-                        session.add(
-                            DerivedValue(
-                                time=datetime.datetime(
-                                    baseline_year,
-                                    month,
-                                    baseline_day(month),
-                                    baseline_hour,
-                                ),
-                                datum=convert(datum),
-                                variable=variable,
-                                history=latest_history,
-                            )
+                        time = datetime.datetime(
+                            baseline_year,
+                            month,
+                            baseline_day(month),
+                            baseline_hour,
                         )
-                        n_values_added += 1
+                        if bulk:
+                            values[(time, latest_history_id)] = {
+                                "value_time": time,
+                                "datum": convert(datum),
+                                "vars_id": variable.id,
+                                "history_id": latest_history_id,
+                            }
+                        else:
+                            session.add(
+                                DerivedValue(
+                                    time=time,
+                                    datum=convert(datum),
+                                    variable=variable,
+                                    history=latest_history,
+                                )
+                            )
+                            n_values_added += 1
                 n_lines_added += 1
             else:
                 logger.info("Skipping input line:")
@@ -285,6 +356,21 @@ def load_pcic_climate_baseline_values(
             )
             n_lines_excluded += 1
 
+    if bulk and values:
+        stmt = insert(DerivedValue.__table__)
+        stmt = stmt.on_conflict_do_update(
+            constraint="obs_derived_value_time_place_variable_unique",
+            set_={"datum": stmt.excluded.datum, "mod_time": stmt.excluded.mod_time},
+        )
+        # Count the rows actually inserted or replaced, not the values read:
+        # duplicates within `lines` are written only once.
+        n_values_added = len(
+            session.execute(
+                stmt.returning(DerivedValue.__table__.c.obs_derived_value_id),
+                list(values.values()),
+            ).all()
+        )
+
     session.flush()
 
     assert (
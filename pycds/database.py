@@ -1,31 +1,39 @@
 import re
+import threading
+import weakref
 
 from alembic import op
 from sqlalchemy import text
-from sqlalchemy.engine import Connection
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.exc import ProgrammingError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from pycds.context import get_schema_name
 
 
 def check_migration_version(
-    executor, schema_name=get_schema_name(), version="f6d5a4c2e901"
+    executor, schema_name=get_schema_name(), version="5b0339e203bc", cached=False
 ):
     """Check that the migration version of the database schema is compatible
     with the current version of this package.
 
     This implementation is quick and easy, relying on manual updating of the
     correct version number.
+
+    If `cached`, the version is read from the cached schema catalog (see
+    `get_schema_catalog`).
     """
-    current = executor.execute(
-        text(
-            f"""
-        SELECT version_num 
-        FROM {schema_name}.alembic_version
-    """
-        )
-    ).scalar()
+    if cached:
+        current = get_schema_catalog(executor, schema_name, cached=True).version
+    else:
+        current = executor.execute(
+            text(
+                f"""
+            SELECT version_num 
+            FROM {schema_name}.alembic_version
+        """
+            )
+        ).scalar()
     if current != version:
         raise ValueError(
             f"Schema {schema_name} must be at Alembic version {version}; "
@@ -53,18 +61,31 @@ def get_postgresql_version(engine):
         return tuple(map(int, match.groups()))
 
 
-def db_supports_statement(engine, statement):
+def db_supports_statement(engine, statement, cached=False):
     """
     Return a boolean indicating whether this database instance can execute the
     statement. The statement is executed in a transaction and rolled back
     afterwards, so the effect on the database is null (so long as the statement
     itself can be executed in a transaction).
 
+    If `cached`, the result is cached for the engine, and later calls with `cached`
+    return it without executing the statement, until it is invalidated by
+    `invalidate_schema_catalog`.
+
     Note: We must create a session to do this test. Creating a transaction
     directly from the Alembic connection failed: the entire pre-existing Alembic
     operation transaction was rolled back, not just the one supposedly enclosing
     this test execution.
     """
+    if cached:
+        key = get_engine(engine)
+        with _cache_lock:
+            supported = _statement_support_cache.get(key, {}).get(statement)
+        if supported is None:
+            supported = db_supports_statement(engine, statement)
+            with _cache_lock:
+                _statement_support_cache.setdefault(key, {})[statement] = supported
+        return supported
 
     Session = sessionmaker(bind=engine)
     session = Session()
@@ -79,93 +100,285 @@ def db_supports_statement(engine, statement):
         session.close()
 
 
-def db_supports_matviews(engine):
-    return db_supports_statement(engine, "CREATE MATERIALIZED VIEW test AS SELECT 1")
+def db_supports_matviews(engine, cached=False):
+    return db_supports_statement(
+        engine, "CREATE MATERIALIZED VIEW test AS SELECT 1", cached=cached
+    )
 
 
-# TODO: Break this up into separate functions for each item type.
-# TODO: Use `inspect()` to get information.
-# Note: Prefer `Inspector` methods to this function wherever possible.
-# It's easy: e.g., `inspect(engine).get_table_names(schema=...)`
-def get_schema_item_names(
-    executor: Connection,
-    item_type,
-    table_name=None,
-    constraint_type=None,
-    schema_name=get_schema_name(),
-):
-    if item_type == "routines":
-        r = executor.execute(
-            text(
-                f"""
-            SELECT routine_name 
+def _contype(constraint_type):
+    """Return the `pg_constraint` type code of a constraint type (e.g., "check",
+    "foreign key"); only the first letter is significant."""
+    contype = constraint_type[0]
+    return "x" if contype == "e" else contype
+
+
+class SchemaCatalog:
+    """
+    The names of the items (routines, tables, views, matviews, indexes, and
+    constraints) in a database schema, and its Alembic migration version, loaded
+    together.
+
+    Items are loaded in a single query, and the migration version (if the schema
+    has an `alembic_version` table) in one more. A catalog is a snapshot: it does
+    not reflect changes to the schema made after it was loaded.
+
+    Catalogs are usually obtained from `get_schema_catalog`, which can cache them.
+    """
+
+    # Item types, excluding constraints, and the catalog query for each. Each query
+    # returns the item name and, for item types that belong to a table, the table
+    # name.
+    item_queries = {
+        "routines": """
+            SELECT routine_name, NULL 
             FROM information_schema.routines 
-            WHERE specific_schema = '{schema_name}'
-        """
-            )
-        )
-    elif item_type == "tables":
-        r = executor.execute(
-            text(
-                f"""
-            SELECT table_name 
+            WHERE specific_schema = :schema_name
+        """,
+        "tables": """
+            SELECT table_name, NULL
             FROM information_schema.tables 
-            WHERE table_schema = '{schema_name}';
-        """
-            )
-        )
-    elif item_type == "views":
-        r = executor.execute(
-            text(
-                f"""
-            SELECT table_name 
+            WHERE table_schema = :schema_name
+        """,
+        "views": """
+            SELECT table_name, NULL
             FROM information_schema.views 
-            WHERE table_schema = '{schema_name}';
-        """
-            )
-        )
-    elif item_type == "matviews":
-        r = executor.execute(
-            text(
-                f"""
-            SELECT matviewname 
+            WHERE table_schema = :schema_name
+        """,
+        "matviews": """
+            SELECT matviewname, NULL
             FROM pg_matviews
-            WHERE schemaname = '{schema_name}';
+            WHERE schemaname = :schema_name
+        """,
+        "indexes": """
+            SELECT indexname, tablename
+            FROM pg_indexes
+            WHERE schemaname = :schema_name
+        """,
+    }
+
+    constraints_query = """
+        SELECT conname, rel.relname, con.contype
+        FROM pg_catalog.pg_constraint con
+        INNER JOIN pg_catalog.pg_class rel ON rel.oid = con.conrelid
+        INNER JOIN pg_catalog.pg_namespace nsp ON nsp.oid = connamespace            
+        WHERE nsp.nspname = :schema_name
+    """
+
+    def __init__(self, schema_name, items, version=None):
         """
-            )
+        :param schema_name: (str) schema name
+        :param items: iterable of `(item_type, name, table_name)` tuples. For
+            constraints, `item_type` is `"constraints:<contype>"`, where `contype` is
+            the constraint type code used by `pg_constraint`.
+        :param version: (str) Alembic migration version of the schema
+        """
+        self.schema_name = schema_name
+        self.version = version
+        self._items = {}
+        for item_type, name, table_name in items:
+            self._items.setdefault((item_type, table_name), set()).add(name)
+
+    @classmethod
+    def load(cls, executor, schema_name=get_schema_name()):
+        """
+        Load the catalog for a schema.
+
+        :param executor: SQLAlchemy engine, connection, or session
+        :param schema_name: (str) schema name
+        :return: (SchemaCatalog)
+        """
+        if isinstance(executor, Engine):
+            with executor.connect() as conn:
+                return cls.load(conn, schema_name)
+
+        query = " UNION ALL ".join(
+            [
+                f"SELECT '{item_type}'::text, q.name::text, q.table_name::text "
+                f"FROM ({query}) AS q(name, table_name)"
+                for item_type, query in cls.item_queries.items()
+            ]
+            + [
+                f"SELECT 'constraints:' || q.contype, q.name::text, q.table_name::text "
+                f"FROM ({cls.constraints_query}) AS q(name, table_name, contype)"
+            ]
         )
-    elif item_type == "indexes":
-        r = executor.execute(
-            text(
-                f"""
-            SELECT indexname 
-            FROM pg_indexes
-            WHERE schemaname = '{schema_name}'
-            AND tablename = '{table_name}';
+        items = [
+            tuple(row)
+            for row in executor.execute(text(query), {"schema_name": schema_name})
+        ]
+        version = None
+        if ("tables", "alembic_version", None) in items:
+            version = executor.execute(
+                text(f"SELECT version_num FROM {schema_name}.alembic_version")
+            ).scalar()
+        return cls(schema_name, items, version=version)
+
+    @classmethod
+    def load_names(
+        cls,
+        executor,
+        item_type,
+        table_name=None,
+        constraint_type=None,
+        schema_name=get_schema_name(),
+    ):
+        """
+        Load the names of the items of a given type in a schema, without loading
+        the rest of the catalog: a single query, of the catalog of that item type
+        only. Arguments are as for `names`.
+
+        :param executor: SQLAlchemy engine, connection, or session
+        :return: (set) of names
         """
+        if isinstance(executor, Engine):
+            with executor.connect() as conn:
+                return cls.load_names(
+                    conn, item_type, table_name, constraint_type, schema_name
+                )
+
+        params = {"schema_name": schema_name}
+        if item_type in ("indexes", "constraints"):
+            params["table_name"] = table_name
+        if item_type == "constraints":
+            query = (
+                f"SELECT q.name FROM ({cls.constraints_query}) "
+                f"AS q(name, table_name, contype) "
+                f"WHERE q.table_name = :table_name AND q.contype = :contype"
             )
-        )
-    elif item_type == "constraints":
-        contype = constraint_type[0]
-        if contype == "e":
-            contype = "x"
-        sql = f"""
-            SELECT conname  
-            FROM pg_catalog.pg_constraint con
-            INNER JOIN pg_catalog.pg_class rel ON rel.oid = con.conrelid
-            INNER JOIN pg_catalog.pg_namespace nsp ON nsp.oid = connamespace            
-            WHERE nsp.nspname = '{schema_name}'
-            AND rel.relname = '{table_name}'
-            AND con.contype = '{contype}';
+            params["contype"] = _contype(constraint_type)
+        elif item_type == "indexes":
+            query = (
+                f"SELECT q.name FROM ({cls.item_queries[item_type]}) "
+                f"AS q(name, table_name) "
+                f"WHERE q.table_name = :table_name"
+            )
+        elif item_type in cls.item_queries:
+            query = cls.item_queries[item_type]
+        else:
+            raise ValueError("invalid item type")
+        return {row[0] for row in executor.execute(text(query), params)}
+
+    def names(self, item_type, table_name=None, constraint_type=None):
         """
-        r = executor.execute(text(sql))
-    else:
-        raise ValueError("invalid item type")
-    return {x[0] for x in r.fetchall()}
+        Return the names of the items of a given type in the schema.
+
+        :param item_type: (str) one of "routines", "tables", "views", "matviews",
+            "indexes", "constraints"
+        :param table_name: (str) for indexes and constraints, the name of the table
+            they belong to
+        :param constraint_type: (str) for constraints, the constraint type (e.g.,
+            "check", "foreign key", "primary key", "unique", "exclusion"); only the
+            first letter is significant
+        :return: (set) of names
+        """
+        if item_type == "constraints":
+            contype = _contype(constraint_type)
+            return set(self._items.get((f"constraints:{contype}", table_name), ()))
+        if item_type not in self.item_queries:
+            raise ValueError("invalid item type")
+        if item_type != "indexes":
+            table_name = None
+        return set(self._items.get((item_type, table_name), ()))
+
+
+# Cached schema catalogs and statement support, per engine. Entries are removed
+# with `invalidate_schema_catalog`, or when the engine is garbage collected.
+_catalog_cache = weakref.WeakKeyDictionary()
+_statement_support_cache = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+
+
+def get_engine(executor):
+    """Return the engine underlying a SQLAlchemy engine, connection, or session."""
+    if isinstance(executor, Session):
+        executor = executor.get_bind()
+    return executor.engine
+
+
+def get_schema_catalog(executor, schema_name=get_schema_name(), cached=False):
+    """
+    Return the catalog of a schema.
+
+    If `cached`, the catalog is cached for the engine underlying `executor`, and
+    later calls with `cached` return it without querying the database, until it
+    is invalidated by `invalidate_schema_catalog`. This suits services that check
+    the schema repeatedly but do not change it. Code that changes the schema (e.g.,
+    migrations) should not use cached catalogs, or must invalidate them.
+
+    :param executor: SQLAlchemy engine, connection, or session
+    :param schema_name: (str) schema name
+    :param cached: (bool) use and populate the per-engine cache
+    :return: (SchemaCatalog)
+    """
+    if not cached:
+        return SchemaCatalog.load(executor, schema_name)
+    engine = get_engine(executor)
+    with _cache_lock:
+        catalog = _catalog_cache.get(engine, {}).get(schema_name)
+    if catalog is None:
+        catalog = SchemaCatalog.load(executor, schema_name)
+        with _cache_lock:
+            _catalog_cache.setdefault(engine, {})[schema_name] = catalog
+    return catalog
+
+
+def invalidate_schema_catalog(executor=None, schema_name=None):
+    """
+    Discard cached schema catalogs, and cached results of `db_supports_statement`.
+
+    :param executor: SQLAlchemy engine, connection, or session whose underlying
+        engine's cache is discarded; if None, the caches of all engines are
+        discarded
+    :param schema_name: (str) schema whose catalog is discarded; if None, the
+        catalogs of all schemas are discarded
+    """
+    with _cache_lock:
+        engines = (
+            list(_catalog_cache.keys()) + list(_statement_support_cache.keys())
+            if executor is None
+            else [get_engine(executor)]
+        )
+        for engine in engines:
+            if schema_name is None:
+                _catalog_cache.pop(engine, None)
+                _statement_support_cache.pop(engine, None)
+            else:
+                _catalog_cache.get(engine, {}).pop(schema_name, None)
+
+
+def get_schema_item_names(
+    executor: Connection,
+    item_type,
+    table_name=None,
+    constraint_type=None,
+    schema_name=get_schema_name(),
+    cached=False,
+):
+    """
+    Return the names of the items of a given type in a schema. See
+    `SchemaCatalog.names` for the item types.
+
+    If `cached`, the names are taken from the cached catalog of the schema (see
+    `get_schema_catalog`), which is loaded in full on first use. Otherwise only
+    the items of the given type are queried.
+
+    Note: `Inspector` methods (e.g., `inspect(engine).get_table_names(schema=...)`)
+    are an alternative for some item types.
+    """
+    if not cached:
+        return SchemaCatalog.load_names(
+            executor, item_type, table_name, constraint_type, schema_name
+        )
+    return get_schema_catalog(executor, schema_name, cached=True).names(
+        item_type, table_name=table_name, constraint_type=constraint_type
+    )
 
 
-def matview_exists(engine, name, schema=None):
+def matview_exists(engine, name, schema=None, cached=False):
     # TODO: Use this when we move to SQLA 2.x
     # matview_names = inspect(engine).get_materialized_view_names(schema=schema)
-    matview_names = get_schema_item_names(engine, "matviews", schema_name=schema)
+    matview_names = get_schema_item_names(
+        engine, "matviews", schema_name=schema or get_schema_name(), cached=cached
+    )
     return name in matview_names
@@ -0,0 +1,265 @@
+"""
+Streaming export of observations.
+
+This module exports observations, joined to their histories and variables (the
+shape of view `ObsWithFlags`, plus `history_id`), selected by station, network,
+variable, and time. Rows are read through a server-side cursor in batches of fixed
+size, and each batch is converted and handed on before the next is read, so that
+memory use does not depend on the size of the result. No ORM objects are
+constructed.
+
+Batches can be obtained as
+
+- `pyarrow.RecordBatch` (`record_batches`), or
+- NumPy structured arrays (`numpy_batches`),
+
+and written incrementally to Parquet (`write_parquet`) or CSV (`write_csv`).
+
+PyArrow and NumPy are optional dependencies, installed by the `export` extra
+(`pip install pycds[export]`). They are imported only by the functions that need
+them; `write_csv` needs neither.
+
+Results must be consumed within the transaction of the session that produced them.
+
+Typical usage:
+
+    for batch in record_batches(sesh, station_ids=[1, 2], start_time=t0):
+        process(batch)
+
+    write_parquet(sesh, "obs.parquet", network_ids=[3], columns=["obs_time", ...])
+"""
+
+import csv
+import logging
+
+from sqlalchemy import select
+
+from pycds.orm.tables import History, Obs, Variable
+
+logger = logging.getLogger(__name__)
+
+
+default_batch_size = 10000
+
+# Value of NULL integers in NumPy structured arrays, which cannot represent NULL.
+numpy_int_fill = -1
+
+# Exportable columns: name, column expression, Arrow type alias, NumPy dtype.
+export_columns = (
+    ("obs_raw_id", Obs.id, "int64", "i8"),
+    ("obs_time", Obs.time, "timestamp[us]", "datetime64[us]"),
+    ("mod_time", Obs.mod_time, "timestamp[us]", "datetime64[us]"),
+    ("datum", Obs.datum, "float64", "f8"),
+    ("history_id", Obs.history_id, "int32", "i4"),
+    ("station_id", History.station_id, "int32", "i4"),
+    ("network_id", Variable.network_id, "int32", "i4"),
+    ("vars_id", Obs.vars_id, "int32", "i4"),
+    ("net_var_name", Variable.name, "string", "O"),
+    ("standard_name", Variable.standard_name, "string", "O"),
+    ("cell_method", Variable.cell_method, "string", "O"),
+    ("unit", Variable.unit, "string", "O"),
+)
+
+column_names = tuple(name for name, *_ in export_columns)
+_column_info = {name: info for name, *info in export_columns}
+
+
+def _check_columns(columns):
+    if columns is None:
+        return column_names
+    unknown = set(columns) - set(column_names)
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(sorted(unknown))}")
+    return tuple(columns)
+
+
+def export_query(
+    columns=None,
+    station_ids=None,
+    network_ids=None,
+    vars_ids=None,
+    net_var_names=None,
+    start_time=None,
+    end_time=None,
+    ordered=True,
+):
+    """Return a query for observations.
+
+    Each filter is optional; filters given are combined with AND.
+
+    :param columns: (list) names of the columns to select (see `column_names`);
+        default all
+    :param station_ids: (list) select observations of these stations
+    :param network_ids: (list) select observations of variables of these networks
+    :param vars_ids: (list) select observations of these variables
+    :param net_var_names: (list) select observations of variables with these names
+    :param start_time: (datetime.datetime) select observations at or after this time
+    :param end_time: (datetime.datetime) select observations before this time
+    :param ordered: (bool) order by observation time, variable, and history. The
+        order matches index `obs_raw_comp_idx`, so that the server need not sort
+        the result.
+    :return: (sqlalchemy.sql.Select)
+    """
+    columns = _check_columns(columns)
+    q = (
+        select(*(_column_info[name][0].label(name) for name in columns))
+        .select_from(Obs)
+        .join(Variable, Obs.vars_id == Variable.id)
+        .join(History, Obs.history_id == History.id)
+    )
+    if station_ids is not None:
+        q = q.where(History.station_id.in_(station_ids))
+    if network_ids is not None:
+        q = q.where(Variable.network_id.in_(network_ids))
+    if vars_ids is not None:
+        q = q.where(Obs.vars_id.in_(vars_ids))
+    if net_var_names is not None:
+        q = q.where(Variable.name.in_(net_var_names))
+    if start_time is not None:
+        q = q.where(Obs.time >= start_time)
+    if end_time is not None:
+        q = q.where(Obs.time < end_time)
+    if ordered:
+        q = q.order_by(Obs.time, Obs.vars_id, Obs.history_id)
+    return q
+
+
+def row_batches(sesh, batch_size=default_batch_size, columns=None, **filters):
+    """Yield the rows of the observations selected by `filters` (see
+    `export_query`), in lists of at most `batch_size` rows, read through a
+    server-side cursor.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param batch_size: (int) number of rows per batch
+    :param columns: (list) names of the columns to select; default all
+    :return: (generator) of lists of rows
+    """
+    result = sesh.execute(
+        export_query(columns=columns, **filters),
+        execution_options={"stream_results": True, "yield_per": batch_size},
+    )
+    try:
+        yield from result.partitions(batch_size)
+    finally:
+        result.close()
+
+
+def arrow_schema(columns=None):
+    """Return the Arrow schema of exported record batches.
+
+    :param columns: (list) names of the columns; default all
+    :return: (pyarrow.Schema)
+    """
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            (name, pa.type_for_alias(_column_info[name][1]))
+            for name in _check_columns(columns)
+        ]
+    )
+
+
+def record_batches(sesh, batch_size=default_batch_size, columns=None, **filters):
+    """Yield the observations selected by `filters` (see `export_query`) as Arrow
+    record batches of at most `batch_size` rows. Requires PyArrow.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param batch_size: (int) number of rows per batch
+    :param columns: (list) names of the columns to select; default all
+    :return: (generator) of pyarrow.RecordBatch
+    """
+    import pyarrow as pa
+
+    schema = arrow_schema(columns)
+    for rows in row_batches(sesh, batch_size=batch_size, columns=columns, **filters):
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*rows), schema)
+            ],
+            schema=schema,
+        )
+
+
+def numpy_dtype(columns=None):
+    """Return the NumPy dtype of exported structured arrays. String columns have
+    object dtype.
+
+    :param columns: (list) names of the columns; default all
+    :return: (numpy.dtype)
+    """
+    import numpy as np
+
+    return np.dtype([(name, _column_info[name][2]) for name in _check_columns(columns)])
+
+
+def numpy_batches(sesh, batch_size=default_batch_size, columns=None, **filters):
+    """Yield the observations selected by `filters` (see `export_query`) as NumPy
+    structured arrays of at most `batch_size` rows. Requires NumPy.
+
+    NULL values are represented by NaN (floats), NaT (times), None (strings), or
+    `numpy_int_fill` (integers).
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param batch_size: (int) number of rows per batch
+    :param columns: (list) names of the columns to select; default all
+    :return: (generator) of numpy.ndarray
+    """
+    import numpy as np
+
+    dtype = numpy_dtype(columns)
+    for rows in row_batches(sesh, batch_size=batch_size, columns=columns, **filters):
+        batch = np.empty(len(rows), dtype=dtype)
+        for name, values in zip(dtype.names, zip(*rows)):
+            if dtype[name].kind == "i":
+                values = [numpy_int_fill if v is None else v for v in values]
+            batch[name] = values
+        yield batch
+
+
+def write_parquet(sesh, path, batch_size=default_batch_size, columns=None, **filters):
+    """Write the observations selected by `filters` (see `export_query`) to a
+    Parquet file, one row group per batch. Requires PyArrow.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param path: (str or file-like) destination
+    :param batch_size: (int) number of rows per batch (row group)
+    :param columns: (list) names of the columns to select; default all
+    :return: (int) number of rows written
+    """
+    import pyarrow.parquet as pq
+
+    count = 0
+    with pq.ParquetWriter(path, arrow_schema(columns)) as writer:
+        for batch in record_batches(
+            sesh, batch_size=batch_size, columns=columns, **filters
+        ):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    logger.info(f"Wrote {count} rows to {path}")
+    return count
+
+
+def write_csv(sesh, file, batch_size=default_batch_size, columns=None, **filters):
+    """Write the observations selected by `filters` (see `export_query`) to a CSV
+    file with a header row. NULL values are written as empty fields.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param file: (str or file-like) destination path, or text file open for writing
+    :param batch_size: (int) number of rows per batch
+    :param columns: (list) names of the columns to select; default all
+    :return: (int) number of rows written
+    """
+    if isinstance(file, str):
+        with open(file, "w", newline="") as f:
+            return write_csv(sesh, f, batch_size=batch_size, columns=columns, **filters)
+
+    writer = csv.writer(file)
+    writer.writerow(_check_columns(columns))
+    count = 0
+    for rows in row_batches(sesh, batch_size=batch_size, columns=columns, **filters):
+        writer.writerows(rows)
+        count += len(rows)
+    logger.info(f"Wrote {count} rows")
+    return count
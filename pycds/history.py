@@ -0,0 +1,304 @@
+"""
+Point-in-time ("as of") queries over the history tables.
+
+Each history table (`*_hx`; ORM classes `NetworkHistory`, `StationHistory`,
+`HistoryHistory`, `VariableHistory`, `ObsHistory`) holds a record of every state of
+each item of its main table, stamped with the modification time of that state. A
+deletion is recorded as a final state with `deleted` true.
+
+The state of an item as of a time `t` is its latest state with `mod_time <= t`. It
+is selected with `DISTINCT ON` the item id, ordered by modification time and then
+by history id, which breaks ties between states recorded in the same transaction.
+History tables are indexed on the item id and on `mod_time` (see
+`pycds.alembic.change_history_utils.create_history_table_indexes`), and
+`obs_raw_hx` is partitioned on `mod_time`, so that the condition on `mod_time`
+also prunes partitions. Items whose state as of `t` is deleted are omitted, as are
+items not yet created.
+
+Context manager `bulk_load` loads many records into history-tracked tables,
+deferring their history tracking.
+
+Typical usage:
+
+    stations = as_of(sesh, StationHistory, datetime.datetime(2020, 1, 1))
+
+    q = as_of_query(ObsHistory, t, ids=obs_ids)
+    for obs in sesh.scalars(q): ...
+"""
+
+import logging
+from contextlib import contextmanager
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import aliased
+
+from pycds.context import get_schema_name
+from pycds.alembic.change_history_utils import (
+    history_column_names,
+    history_rows_query,
+    hx_id_name,
+    hx_latest_table_name,
+    hx_table_name,
+    main_table_name,
+)
+
+logger = logging.getLogger(__name__)
+
+# Name of the item id column of each history table.
+item_id_names = {
+    "meta_network_hx": "network_id",
+    "meta_station_hx": "station_id",
+    "meta_history_hx": "history_id",
+    "meta_vars_hx": "vars_id",
+    "obs_raw_hx": "obs_raw_id",
+}
+
+
+def _column(model, name):
+    """Return the ORM attribute of `model` mapped to column `name`."""
+    return getattr(
+        model, model.__mapper__.get_property_by_column(model.__table__.c[name]).key
+    )
+
+
+def item_id(model):
+    """Return the item id attribute (e.g., `StationHistory.station_id`) of a
+    history table ORM class."""
+    try:
+        name = item_id_names[model.__table__.name]
+    except KeyError:
+        raise ValueError(f"Not a history table: {model.__table__.name}")
+    return _column(model, name)
+
+
+def hx_id(model):
+    """Return the history id (primary key) attribute (e.g.,
+    `StationHistory.meta_station_hx_id`) of a history table ORM class."""
+    return _column(model, f"{model.__table__.name}_id")
+
+
+def as_of_query(model, timestamp, ids=None, include_deleted=False):
+    """Return a query selecting the state of each item of a history table as of a
+    given time.
+
+    :param model: history table ORM class, e.g., `StationHistory`
+    :param timestamp: (datetime.datetime) time
+    :param ids: (list) select only the items with these ids; default all
+    :param include_deleted: (bool) include items whose state is deleted
+    :return: (sqlalchemy.sql.Select) of `model` entities (aliased to a subquery)
+    """
+    id_ = item_id(model)
+    latest = (
+        select(model)
+        .where(model.mod_time <= timestamp)
+        .distinct(id_)
+        .order_by(id_, model.mod_time.desc(), hx_id(model).desc())
+    )
+    if ids is not None:
+        latest = latest.where(id_.in_(ids))
+    state = aliased(model, latest.subquery(f"{model.__table__.name}_as_of"))
+    q = select(state)
+    if not include_deleted:
+        q = q.where(state.deleted.is_not(True))
+    return q
+
+
+def as_of(sesh, model, timestamp, ids=None, include_deleted=False):
+    """Return the state of each item of a history table as of a given time.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param model: history table ORM class, e.g., `StationHistory`
+    :param timestamp: (datetime.datetime) time
+    :param ids: (list) return only the items with these ids; default all
+    :param include_deleted: (bool) include items whose state is deleted
+    :return: (list) of `model` instances
+    """
+    return sesh.scalars(
+        as_of_query(model, timestamp, ids=ids, include_deleted=include_deleted)
+    ).all()
+
+
+# History-tracked main tables, in dependency order: table name, primary key name,
+# foreign tables (foreign table name, foreign key name), as given to the history
+# tracking triggers.
+tracked_tables = (
+    ("meta_network", "network_id", None),
+    ("meta_station", "station_id", [("meta_network", "network_id")]),
+    ("meta_history", "history_id", [("meta_station", "station_id")]),
+    ("meta_vars", "vars_id", [("meta_network", "network_id")]),
+    (
+        "obs_raw",
+        "obs_raw_id",
+        [("meta_history", "history_id"), ("meta_vars", "vars_id")],
+    ),
+)
+
+# Tables referred to by history foreign keys, which have latest history id tables
+# (see `pycds.alembic.change_history_utils.create_hx_latest_table`).
+hx_latest_tables = {
+    ft_table_name
+    for _, _, foreign_tables in tracked_tables
+    for ft_table_name, _ in foreign_tables or ()
+}
+
+# Statement-level trigger that appends history records for inserted records.
+insert_trigger_name = "t100_primary_insert_to_hx"
+
+
+def _toggle_insert_trigger(conn, table_name, enable, schema):
+    action = "ENABLE" if enable else "DISABLE"
+    conn.execute(
+        text(
+            f"ALTER TABLE {main_table_name(table_name, schema=schema)} "
+            f"{action} TRIGGER {insert_trigger_name}"
+        )
+    )
+
+
+def _max(conn, column, table):
+    return conn.execute(text(f"SELECT max({column}) FROM {table}")).scalar()
+
+
+@contextmanager
+def bulk_load(sesh, tables, schema=None):
+    """Context manager for loading many records into history-tracked tables,
+    deferring their history tracking.
+
+    On entry, the history tracking trigger for inserts on each table is disabled,
+    and the greatest primary key of the table, and of its history table, recorded.
+    Records inserted in the block must have greater primary keys, as assigned by
+    the primary key sequence; records inserted with explicit lesser primary keys
+    get no history records. On exit, the history records of the records with
+    greater primary keys are appended with a single set-based INSERT ... SELECT
+    per table, resolving the history foreign keys from the latest history id
+    tables, and the triggers are enabled again. Tables are processed in dependency
+    order, so that records inserted into several tables, e.g., histories and their
+    observations, refer to each other's history records. Only the range of primary
+    keys loaded is read, by index, so the cost is proportional to the number of
+    records loaded, not to the size of the table.
+
+    Every history-tracked table that refers to one of the tables (e.g., `obs_raw`
+    for `meta_history`) must be loaded too, since its history records would
+    otherwise refer to history records that are replaced on exit.
+
+    The block runs in a savepoint of the session's transaction. If it fails,
+    the savepoint is rolled back, undoing the load and the disabling of the
+    triggers, so that the history tables are never inconsistent with the main
+    tables. The caller commits the transaction.
+
+    Disabling a trigger locks the table against concurrent writes until the end of
+    the transaction, so that no other records are inserted untracked.
+
+    Updates and deletions in the block are tracked as usual, except that records
+    inserted in the block are recorded only in their final state: history records
+    written for them in the block are replaced.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param tables: (list) main tables, as ORM classes (e.g., `Obs`) or names (e.g.,
+        "obs_raw")
+    :param schema: (str) schema name; default as configured
+    """
+    schema = schema or get_schema_name()
+    table_names = {getattr(table, "__tablename__", table) for table in tables}
+    unknown = table_names - {table_name for table_name, *_ in tracked_tables}
+    if unknown:
+        raise ValueError(f"Not history-tracked tables: {', '.join(sorted(unknown))}")
+    referring = {
+        table_name
+        for table_name, _, foreign_tables in tracked_tables
+        if any(
+            ft_table_name in table_names for ft_table_name, _ in foreign_tables or ()
+        )
+    }
+    if referring - table_names:
+        raise ValueError(
+            f"History-tracked tables referring to loaded tables must be loaded too: "
+            f"{', '.join(sorted(referring - table_names))}"
+        )
+    loaded = [info for info in tracked_tables if info[0] in table_names]
+
+    with sesh.begin_nested():
+        conn = sesh.connection()
+        start_ids = {}
+        for table_name, pri_id_name, _ in loaded:
+            _toggle_insert_trigger(conn, table_name, enable=False, schema=schema)
+            start_ids[table_name] = (
+                _max(conn, pri_id_name, main_table_name(table_name, schema=schema))
+                or 0,
+                _max(
+                    conn,
+                    hx_id_name(table_name),
+                    hx_table_name(table_name, schema=schema),
+                )
+                or 0,
+            )
+
+        yield sesh
+
+        sesh.flush()
+        # History records written in the block for loaded records are deleted in
+        # reverse dependency order, since they may refer to each other.
+        for table_name, pri_id_name, _ in reversed(loaded):
+            start_id, start_hx_id = start_ids[table_name]
+            delete_loaded_history(
+                conn, table_name, pri_id_name, start_id, start_hx_id, schema=schema
+            )
+        for table_name, pri_id_name, foreign_tables in loaded:
+            append_history(
+                conn,
+                table_name,
+                pri_id_name,
+                foreign_tables,
+                start_ids[table_name][0],
+                schema=schema,
+            )
+            _toggle_insert_trigger(conn, table_name, enable=True, schema=schema)
+
+
+def delete_loaded_history(conn, table_name, pri_id_name, start_id, start_hx_id, schema):
+    """Delete the history records with history id greater than `start_hx_id` of
+    the records of a main table with primary key greater than `start_id`, and
+    their entries in the latest history id table."""
+    tables = [hx_table_name(table_name, schema=schema)]
+    if table_name in hx_latest_tables:
+        tables.insert(0, hx_latest_table_name(table_name, schema=schema))
+    for table in tables:
+        conn.execute(
+            text(
+                f"DELETE FROM {table} "
+                f"WHERE {pri_id_name} > :start_id "
+                f"AND {hx_id_name(table_name)} > :start_hx_id"
+            ),
+            {"start_id": start_id, "start_hx_id": start_hx_id},
+        )
+
+
+def append_history(conn, table_name, pri_id_name, foreign_tables, start_id, schema):
+    """Append the history records of the records of a main table with primary key
+    greater than `start_id`, in order of primary key, and update its latest history
+    id table. Return the number of records appended."""
+    # The range of primary keys loaded, both found by the primary key index.
+    hi = _max(conn, pri_id_name, main_table_name(table_name, schema=schema))
+    if hi is None or hi <= start_id:
+        return 0
+    hx_table = hx_table_name(table_name, schema=schema)
+    columns = ", ".join(history_column_names(conn, table_name, schema=schema))
+    rows_query = history_rows_query(
+        table_name, pri_id_name, foreign_tables, schema=schema, latest=True
+    )
+    insert = (
+        f"INSERT INTO {hx_table} ({columns}) "
+        f"SELECT * FROM ({rows_query}) loaded ORDER BY {pri_id_name}"
+    )
+    if table_name in hx_latest_tables:
+        # Each loaded record has exactly one history record.
+        hx_id = hx_id_name(table_name)
+        insert = (
+            f"WITH inserted AS ({insert} RETURNING {pri_id_name}, {hx_id}) "
+            f"INSERT INTO {hx_latest_table_name(table_name, schema=schema)} "
+            f"SELECT {pri_id_name}, {hx_id} FROM inserted "
+            f"ON CONFLICT ({pri_id_name}) DO UPDATE SET {hx_id} = excluded.{hx_id}"
+        )
+    count = conn.execute(text(insert), {"lo": start_id + 1, "hi": hi + 1}).rowcount
+    logger.info(f"Appended {count} history records to {hx_table}")
+    return count
@@ -0,0 +1,282 @@
+"""
+Fast bulk loading of observations (`Obs`, table `obs_raw`).
+
+Adding observations through the ORM (`session.add`) issues one INSERT per
+observation, and fires the history tracking triggers once per observation. This
+module instead streams observations into a temporary staging table with
+`COPY ... FROM STDIN`, then merges the staging table into `obs_raw` with a single
+`INSERT ... SELECT ... ON CONFLICT` statement.
+
+Observations are keyed by (obs_time, history_id, vars_id), the columns of index
+`obs_raw_comp_idx`, which are constrained unique by `time_place_variable_unique`.
+Conflicts with existing observations are handled as specified by `on_conflict`:
+
+- `"nothing"`: keep the existing observation; the incoming one is discarded.
+- `"update"`: replace the datum of the existing observation.
+- `"error"`: raise an integrity error (and roll back the transaction).
+
+When `on_conflict` is `"nothing"` or `"update"`, duplicate keys within the
+incoming data are resolved in favour of the last occurrence.
+
+Observations can be supplied as an iterable of `(time, datum, vars_id, history_id)`
+tuples, or as a batch in column form: a mapping of column name to sequence, a NumPy
+structured array, or a PyArrow `Table` or `RecordBatch`. Batches must have columns
+named `time`, `datum`, `vars_id`, and `history_id`. NumPy and PyArrow are not
+dependencies of PyCDS; batches of these types are handled without importing them.
+
+All operations take place in the transaction of the session supplied; it is the
+caller's responsibility to commit.
+"""
+
+import csv
+import io
+import logging
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+from itertools import islice
+
+from pycds.context import get_schema_name
+
+logger = logging.getLogger(__name__)
+
+
+staging_table_name = "obs_raw_ingest"
+
+# Names of batch columns, in the order of the row tuples.
+batch_columns = ("time", "datum", "vars_id", "history_id")
+
+# Corresponding obs_raw columns.
+obs_columns = ("obs_time", "datum", "vars_id", "history_id")
+
+conflict_actions = {
+    "nothing": "ON CONFLICT (obs_time, history_id, vars_id) DO NOTHING",
+    "update": (
+        "ON CONFLICT (obs_time, history_id, vars_id) DO UPDATE "
+        "SET datum = excluded.datum "
+        "WHERE obs_raw.datum IS DISTINCT FROM excluded.datum"
+    ),
+    "error": "",
+}
+
+
+IngestResult = namedtuple(
+    "IngestResult",
+    "rows_copied rows_inserted rows_updated seconds rows_per_second",
+)
+IngestResult.__doc__ = """Summary of an ingestion. `rows_copied` counts the rows
+received; the remainder were discarded as conflicts or duplicates."""
+
+
+def get_conflict_action(on_conflict):
+    """Return the ON CONFLICT clause for the specified conflict handling."""
+    try:
+        return conflict_actions[on_conflict]
+    except KeyError:
+        raise ValueError(
+            f"Invalid value for on_conflict: '{on_conflict}'. "
+            f"Must be one of {', '.join(conflict_actions)}"
+        )
+
+
+def batch_rows(batch):
+    """Return an iterable of `(time, datum, vars_id, history_id)` tuples from a batch
+    of observations in any of the supported forms (see module docstring).
+
+    :param batch: observations
+    :return: iterable of tuples
+    """
+    # PyArrow Table or RecordBatch
+    if hasattr(batch, "column_names") and hasattr(batch, "column"):
+        return zip(*(batch.column(name).to_pylist() for name in batch_columns))
+
+    # NumPy structured array
+    dtype = getattr(batch, "dtype", None)
+    if dtype is not None and dtype.names:
+
+        def to_list(column):
+            # tolist() converts datetime64 values of less than microsecond resolution
+            # to datetime objects; finer resolutions become integers.
+            if column.dtype.kind == "M":
+                column = column.astype("datetime64[us]")
+            return column.tolist()
+
+        return zip(*(to_list(batch[name]) for name in batch_columns))
+
+    # Mapping of column names to sequences
+    if isinstance(batch, Mapping):
+        return zip(*(batch[name] for name in batch_columns))
+
+    # Already an iterable of rows
+    return batch
+
+
+class CsvRowStream(io.TextIOBase):
+    """A readable text stream presenting an iterable of rows as CSV, for use with
+    `cursor.copy_expert`. Rows are formatted lazily, `chunk_size` at a time, so that
+    arbitrarily large iterables can be streamed with bounded memory."""
+
+    def __init__(self, rows, chunk_size=10000):
+        self.rows = iter(rows)
+        self.chunk_size = chunk_size
+        self.buffer = ""
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        chunk = list(islice(self.rows, self.chunk_size))
+        if not chunk:
+            return False
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerows(chunk)
+        self.buffer += out.getvalue()
+        return True
+
+    def read(self, size=-1):
+        while (size is None or size < 0 or len(self.buffer) < size) and self._fill():
+            pass
+        if size is None or size < 0:
+            size = len(self.buffer)
+        result, self.buffer = self.buffer[:size], self.buffer[size:]
+        return result
+
+
+def _cursor(session):
+    """Return a DBAPI (psycopg2) cursor on the session's connection."""
+    return session.connection().connection.cursor()
+
+
+def create_staging_table(session):
+    """Create (or re-create) the temporary staging table. It is dropped at the end
+    of the transaction.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    """
+    with _cursor(session) as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging_table_name}")
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {staging_table_name} (
+                obs_time timestamp,
+                datum double precision,
+                vars_id integer,
+                history_id integer,
+                ordinal bigint GENERATED ALWAYS AS IDENTITY
+            ) ON COMMIT DROP
+            """
+        )
+
+
+def copy_to_staging_table(session, rows, chunk_size=10000):
+    """Stream rows into the staging table with `COPY ... FROM STDIN`.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    :param rows: iterable of `(time, datum, vars_id, history_id)` tuples
+    :param chunk_size: (int) number of rows formatted at a time
+    :return: (int) number of rows copied
+    """
+    with _cursor(session) as cursor:
+        cursor.copy_expert(
+            f"COPY {staging_table_name} ({', '.join(obs_columns)}) "
+            f"FROM STDIN WITH (FORMAT csv)",
+            CsvRowStream(rows, chunk_size=chunk_size),
+        )
+        return cursor.rowcount
+
+
+def merge_staging_table(session, on_conflict="nothing"):
+    """Merge the contents of the staging table into `obs_raw`, and empty it.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    :param on_conflict: (str) conflict handling; see module docstring
+    :return: (tuple) number of rows inserted, number of rows updated
+    """
+    conflict_action = get_conflict_action(on_conflict)
+
+    columns = ", ".join(obs_columns)
+    if on_conflict == "error":
+        source = f"SELECT {columns} FROM {staging_table_name} ORDER BY ordinal"
+    else:
+        # A single INSERT cannot affect the same row twice, so duplicates are
+        # removed, keeping the last one received.
+        source = (
+            f"SELECT DISTINCT ON (obs_time, history_id, vars_id) {columns} "
+            f"FROM {staging_table_name} "
+            f"ORDER BY obs_time, history_id, vars_id, ordinal DESC"
+        )
+
+    with _cursor(session) as cursor:
+        cursor.execute(
+            f"""
+            WITH merged AS (
+                INSERT INTO {get_schema_name()}.obs_raw AS obs_raw ({columns})
+                {source}
+                {conflict_action}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM merged
+            """
+        )
+        rows_inserted, rows_updated = cursor.fetchone()
+        cursor.execute(f"TRUNCATE {staging_table_name}")
+    return rows_inserted, rows_updated
+
+
+def ingest_obs_batches(session, batches, on_conflict="nothing", chunk_size=10000):
+    """Load a stream of batches of observations into `obs_raw`. Each batch is copied
+    into the staging table and then merged, so that memory and temporary storage
+    use are bounded by the batch size.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    :param batches: iterable of batches of observations, each in any of the
+        supported forms (see module docstring)
+    :param on_conflict: (str) conflict handling; see module docstring
+    :param chunk_size: (int) number of rows formatted at a time during copying
+    :return: (IngestResult)
+    """
+    get_conflict_action(on_conflict)  # Validate before doing any work
+
+    start = time.perf_counter()
+    rows_copied = rows_inserted = rows_updated = 0
+    create_staging_table(session)
+    for batch in batches:
+        rows_copied += copy_to_staging_table(
+            session, batch_rows(batch), chunk_size=chunk_size
+        )
+        inserted, updated = merge_staging_table(session, on_conflict=on_conflict)
+        rows_inserted += inserted
+        rows_updated += updated
+    seconds = time.perf_counter() - start
+
+    result = IngestResult(
+        rows_copied=rows_copied,
+        rows_inserted=rows_inserted,
+        rows_updated=rows_updated,
+        seconds=seconds,
+        rows_per_second=rows_copied / seconds if seconds > 0 else float("inf"),
+    )
+    logger.info(
+        f"Ingested {result.rows_copied} observations "
+        f"({result.rows_inserted} inserted, {result.rows_updated} updated) "
+        f"in {result.seconds:.2f} s ({result.rows_per_second:.0f} rows/s)"
+    )
+    return result
+
+
+def ingest_obs(session, obs, on_conflict="nothing", chunk_size=10000):
+    """Load observations into `obs_raw`.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    :param obs: observations, either an iterable of `(time, datum, vars_id,
+        history_id)` tuples or a single batch (see module docstring)
+    :param on_conflict: (str) conflict handling; see module docstring
+    :param chunk_size: (int) number of rows formatted at a time during copying
+    :return: (IngestResult)
+    """
+    return ingest_obs_batches(
+        session, [obs], on_conflict=on_conflict, chunk_size=chunk_size
+    )
@@ -0,0 +1,55 @@
+"""
+Lazy loading of module attributes (PEP 562).
+
+A package that re-exports many names from its submodules can defer importing each
+submodule until one of its names is first used, by defining module-level
+`__getattr__` and `__dir__` functions made by `lazy_attributes`:
+
+    __getattr__, __dir__ = lazy_attributes(
+        __name__,
+        {
+            "Obs": ".orm.tables",  # pycds.Obs is pycds.orm.tables.Obs
+            "database": None,  # pycds.database is the submodule pycds.database
+        },
+    )
+
+A loaded attribute is stored in the module's namespace, so `__getattr__` is called
+at most once for each name.
+
+This module must not import anything outside the standard library, since its
+purpose is to keep imports cheap.
+"""
+
+import importlib
+import sys
+
+
+def lazy_attributes(module_name, attributes):
+    """Return the functions `__getattr__` and `__dir__` for a module whose
+    attributes are loaded lazily.
+
+    :param module_name: (str) name of the module (its `__name__`)
+    :param attributes: (dict) maps each lazy attribute name to the name of the
+        module it is imported from, relative to `module_name` if it begins with
+        ".", or to None if the attribute is a submodule of the same name
+    :return: (tuple) `(__getattr__, __dir__)`
+    """
+
+    def __getattr__(name):
+        try:
+            source = attributes[name]
+        except KeyError:
+            raise AttributeError(
+                f"module {module_name!r} has no attribute {name!r}"
+            ) from None
+        if source is None:
+            value = importlib.import_module(f"{module_name}.{name}")
+        else:
+            value = getattr(importlib.import_module(source, module_name), name)
+        setattr(sys.modules[module_name], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[module_name])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -1,39 +1,295 @@
-# This script is deprecated, as there are no longer an managed matviews
+# This module manages refreshing of matviews: the manual matviews (weather-anomaly and
+# observation counts), in full or incrementally, and all matviews in dependency order.
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from pycds.alembic.extensions.replaceable_objects import ReplaceableOrmClass
+from sqlalchemy import text, Table
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+from pycds.context import get_schema_name
+from pycds.alembic.extensions.replaceable_objects import (
+    ReplaceableOrmClass,
+    ReplaceableNativeMatview,
+)
 from pycds.orm.native_matviews import (
+    VarsPerHistory,
+    StationObservationStats,
+    CollapsedVariables,
+    CrmpNetworkGeoserver,
+)
+from pycds.orm.manual_matviews import (
+    DiscardedObsRaw,
+    ObsCountPerMonth,
     DailyMaxTemperature,
     DailyMinTemperature,
     MonthlyAverageOfDailyMaxTemperature,
     MonthlyAverageOfDailyMinTemperature,
+    MonthlyTotalPrecipitation,
+    ObsCountPerDayHistory,
+    refresh_scope,
 )
+from pycds.refresh_log import stale_matviews
 
 daily_views = [DailyMaxTemperature, DailyMinTemperature]
 monthly_views = [
     MonthlyAverageOfDailyMaxTemperature,
     MonthlyAverageOfDailyMinTemperature,
 ]
+precipitation_views = [MonthlyTotalPrecipitation]
+obs_count_views = [ObsCountPerDayHistory]
+
+# All matviews, native and manual, in no particular order, that require refreshing.
+# Refresh order is determined by `matview_dependencies`.
+all_matviews = (
+    [
+        VarsPerHistory,
+        StationObservationStats,
+        CollapsedVariables,
+        CrmpNetworkGeoserver,
+    ]
+    + daily_views
+    + monthly_views
+    + precipitation_views
+    + obs_count_views
+)
+
+# Matviews maintained by triggers. They are up to date without refreshing, and are
+# refreshed only to resynchronize them, e.g., after changes made with their
+# triggers disabled.
+maintained_matviews = [DiscardedObsRaw, ObsCountPerMonth]
 
 logger = logging.getLogger(__name__)
 
 
+def _views(which_set):
+    return {
+        "daily": daily_views,
+        "monthly-only": monthly_views,
+        "precipitation": precipitation_views,
+        "obs-counts": obs_count_views,
+        # Order of view updating matters
+        "all": daily_views + monthly_views + precipitation_views + obs_count_views,
+    }[which_set]
+
+
 def manage_views(session, operation, which_set):
     """Apply specified view management operation to specified set of views.
 
     :param session: (sqlalchemy.orm.session.Session) database session
     :param operation: (str) operation to apply, one of 'create', 'refresh' (actually the name of any valid method
         of a materialized view can be supplied here, but the invoking script limits it to above list).
-    :param which_set: (str) which set of views to apply the operation to, one of 'daily', 'monthly-only', 'all'
+    :param which_set: (str) which set of views to apply the operation to, one of 'daily', 'monthly-only',
+        'precipitation', 'obs-counts', 'all'
     """
 
-    views = {
-        "daily": daily_views,
-        "monthly-only": monthly_views,
-        "all": daily_views + monthly_views,  # Order of view updating matters
-    }[which_set]
-
-    for view in views:
+    for view in _views(which_set):
         if issubclass(view, ReplaceableOrmClass):
             logger.info(f"{operation.capitalize()} '{view.qualified_name()}'")
             session.execute(getattr(view, operation)())
+
+
+def create_refresh_scope(session, since):
+    """Create and populate the temporary table `refresh_scope` with the
+    (history_id, vars_id, obs_month) keys affected by observations modified at or
+    after `since`.
+
+    Keys are taken both from `obs_raw` (via index `mod_time_idx`) and from
+    `obs_raw_hx`. The latter supplies the keys of deleted observations and the
+    previous keys of updated observations. Each observation contributes the month
+    it falls in and, because of the effective day of 12-hourly maximum
+    temperatures, the month in which the following day falls.
+
+    The table is dropped at the end of the transaction.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    :param since: (datetime.datetime) modification time threshold
+    """
+    schema_name = get_schema_name()
+    scope_name = refresh_scope.name
+    session.execute(text(f"DROP TABLE IF EXISTS {scope_name}"))
+    session.execute(
+        text(
+            f"""
+            CREATE TEMPORARY TABLE {scope_name} ON COMMIT DROP AS
+            WITH changed AS (
+                SELECT history_id, vars_id, obs_time
+                FROM {schema_name}.obs_raw
+                WHERE mod_time >= :since
+                UNION ALL
+                SELECT hx.history_id, hx.vars_id, hx.obs_time
+                FROM {schema_name}.obs_raw_hx AS hx
+                WHERE hx.obs_raw_id IN (
+                    SELECT obs_raw_id
+                    FROM {schema_name}.obs_raw_hx
+                    WHERE mod_time >= :since
+                )
+            )
+            SELECT DISTINCT
+                history_id,
+                vars_id,
+                date_trunc('month', obs_time + lead) AS obs_month
+            FROM changed
+            CROSS JOIN (VALUES (interval '0'), (interval '1 day')) AS leads(lead)
+            """
+        ),
+        {"since": since},
+    )
+    session.execute(text(f"ANALYZE {scope_name}"))
+
+
+def refresh_views_incrementally(session, since, which_set="all"):
+    """Refresh the specified set of views, recomputing only the rows affected by
+    observations modified at or after `since`. The result is the same as a full
+    refresh, provided that the views were up-to-date as of `since`.
+
+    Discard flags are read from `discarded_obs_raw_mv`, which is maintained by
+    triggers. However, a change in the flags of an observation does not change its
+    modification time, nor does a change to a flag definition; these require a full
+    refresh.
+
+    :param session: (sqlalchemy.orm.session.Session) database session
+    :param since: (datetime.datetime) modification time threshold
+    :param which_set: (str) which set of views to refresh; see `manage_views`.
+    """
+    create_refresh_scope(session, since)
+    for view in _views(which_set):
+        logger.info(f"Incrementally refresh '{view.qualified_name()}'")
+        session.execute(view.refresh_incremental(refresh_scope))
+
+
+def matview_dependencies(matviews=all_matviews):
+    """Return the dependency graph of a collection of matviews.
+
+    Dependencies are derived from the tables referenced by each matview's
+    `__selectable__`. Only dependencies among the given matviews are included.
+
+    :param matviews: (iterable) matview classes
+    :return: (dict) mapping each matview to the set of matviews it selects from
+    """
+    by_name = {matview.qualified_name(): matview for matview in matviews}
+    return {
+        matview: {
+            by_name[table.fullname]
+            for table in find_tables(matview.__selectable__)
+            if isinstance(table, Table)
+            and table.fullname in by_name
+            and by_name[table.fullname] is not matview
+        }
+        for matview in by_name.values()
+    }
+
+
+def topological_order(dependencies):
+    """Return the matviews in `dependencies` (as returned by `matview_dependencies`)
+    in an order in which they can be refreshed serially. Matviews that are part of a
+    dependency cycle are omitted."""
+    remaining = {matview: set(prereqs) for matview, prereqs in dependencies.items()}
+    order = []
+    ready = [matview for matview, prereqs in remaining.items() if not prereqs]
+    while ready:
+        matview = ready.pop(0)
+        order.append(matview)
+        for dependent, prereqs in remaining.items():
+            if matview in prereqs:
+                prereqs.remove(matview)
+                if not prereqs:
+                    ready.append(dependent)
+    return order
+
+
+def with_dependents(selected, matviews=all_matviews):
+    """Return the matviews in `selected`, together with those of `matviews` that
+    depend on them, directly or indirectly, in the order of `matviews`.
+
+    A matview that depends on a stale matview will be stale once that matview is
+    refreshed, so both must be refreshed together."""
+    dependencies = matview_dependencies(matviews)
+    result = set(selected)
+    added = True
+    while added:
+        added = False
+        for matview, prerequisites in dependencies.items():
+            if matview not in result and prerequisites & result:
+                result.add(matview)
+                added = True
+    return [matview for matview in matviews if matview in result]
+
+
+def can_refresh_concurrently(matview):
+    """Return True if `matview` can be refreshed concurrently, i.e., if it is a
+    native matview with at least one unique index."""
+    return issubclass(matview, ReplaceableNativeMatview) and any(
+        index.unique for index in matview.__table__.indexes
+    )
+
+
+def refresh_matviews(
+    engine, matviews=all_matviews, max_workers=4, concurrently=True, only_stale=False
+):
+    """Refresh matviews in dependency order, refreshing independent matviews in
+    parallel.
+
+    Each matview is refreshed in its own transaction on a connection from the
+    engine's pool, as soon as all the matviews it depends on have been refreshed.
+    Wall-clock time is therefore bounded by the longest dependency path rather than
+    the sum of all refresh times. The engine's pool should allow at least
+    `max_workers` connections.
+
+    If a refresh fails, no further refreshes are started, refreshes already in
+    progress are allowed to finish, and the first exception is raised.
+
+    :param engine: (sqlalchemy.engine.Engine) database engine
+    :param matviews: (iterable) matview classes to refresh
+    :param max_workers: (int) maximum number of simultaneous refreshes
+    :param concurrently: (bool) refresh native matviews having a unique index
+        with `REFRESH MATERIALIZED VIEW CONCURRENTLY`, which does not block readers
+    :param only_stale: (bool) refresh only the matviews that are stale according
+        to the refresh log (see `pycds.refresh_log`), and the matviews that depend
+        on them
+    """
+    if only_stale:
+        with Session(engine) as sesh:
+            matviews = with_dependents(stale_matviews(sesh, matviews), matviews)
+        logger.info(
+            f"Stale matviews: {', '.join(m.base_name() for m in matviews) or 'none'}"
+        )
+    dependencies = matview_dependencies(matviews)
+    dependents = {matview: set() for matview in dependencies}
+    for matview, prerequisites in dependencies.items():
+        for prerequisite in prerequisites:
+            dependents[prerequisite].add(matview)
+    remaining = {matview: len(prereqs) for matview, prereqs in dependencies.items()}
+    if len(topological_order(dependencies)) < len(dependencies):
+        raise ValueError("Matview dependencies contain a cycle")
+
+    def refresh(matview):
+        is_concurrent = concurrently and can_refresh_concurrently(matview)
+        logger.info(
+            f"Refresh '{matview.qualified_name()}'"
+            f"{' concurrently' if is_concurrent else ''}"
+        )
+        command = (
+            matview.refresh(concurrently=True) if is_concurrent else matview.refresh()
+        )
+        with engine.begin() as conn:
+            conn.execute(command)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {
+            executor.submit(refresh, matview): matview
+            for matview, count in remaining.items()
+            if count == 0
+        }
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                matview = running.pop(future)
+                exception = future.exception()
+                if exception is not None:
+                    wait(running)
+                    raise exception
+                for dependent in dependents[matview]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        running[executor.submit(refresh, dependent)] = dependent
@@ -0,0 +1,106 @@
+from pycds.context import get_schema_name
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+
+
+schema_name = get_schema_name()
+
+
+# Returns the daily means of the observations of one variable at one station, for
+# the days on which the fraction of hourly observations available,
+# `percent_obs_available` (number of observations / 24), is at least `percent_obs`.
+#
+# The previous version (in version_4a2f1879293a) filtered `obs_raw` on a nonexistent
+# column `station_id`, by query text built by concatenation, and filtered the result
+# row by row in a loop. This version selects the observations of the station's
+# histories in a single parameterized, grouped query.
+#
+# The same series can be obtained directly in application code with
+# `pycds.timeseries.daily`.
+daily_ts = ReplaceableFunction(
+    """
+    daily_ts(
+        IN station_id integer,
+        IN vars_id integer,
+        IN percent_obs real,
+        OUT daily_time timestamp without time zone,
+        OUT daily_mean real,
+        OUT percent_obs_available real,
+        OUT daily_count integer)
+    """,
+    f"""
+    RETURNS SETOF record
+    LANGUAGE 'sql'
+    STABLE
+    COST 100
+    ROWS 1000
+    AS $BODY$
+        SELECT
+            date_trunc('day', obs_time),
+            CAST(avg(datum) AS real),
+            CAST(count(datum) / 24.0 AS real),
+            CAST(count(datum) AS integer)
+        FROM {schema_name}.obs_raw
+        WHERE history_id IN (
+                SELECT history_id FROM {schema_name}.meta_history
+                WHERE meta_history.station_id = $1
+            )
+            AND obs_raw.vars_id = $2
+        GROUP BY date_trunc('day', obs_time)
+        HAVING CAST(count(datum) / 24.0 AS real) >= $3
+        ORDER BY date_trunc('day', obs_time)
+    $BODY$;
+    """,
+    schema=schema_name,
+)
+
+
+# Number of days in the month of `obs_time`.
+days_in_month = (
+    "EXTRACT(DAY FROM date_trunc('month', obs_time) "
+    "+ interval '1 month' - interval '1 day')"
+)
+
+
+# Returns the monthly means of the observations of one variable at one station, for
+# the months in which the fraction of daily observations available,
+# `percent_obs_available` (number of observations / number of days in the month),
+# is at least `percent_obs`.
+#
+# See `daily_ts` for the changes from the previous version. The same series can be
+# obtained directly in application code with `pycds.timeseries.monthly`.
+monthly_ts = ReplaceableFunction(
+    """
+    monthly_ts(
+        IN station_id integer,
+        IN vars_id integer,
+        IN percent_obs real,
+        OUT monthly_time timestamp without time zone,
+        OUT monthly_mean real,
+        OUT percent_obs_available real,
+        OUT monthly_count integer)
+    """,
+    f"""
+    RETURNS SETOF record
+    LANGUAGE 'sql'
+    STABLE
+    COST 100
+    ROWS 1000
+    AS $BODY$
+        SELECT
+            date_trunc('month', obs_time),
+            CAST(avg(datum) AS real),
+            CAST(count(datum) / {days_in_month} AS real),
+            CAST(count(datum) AS integer)
+        FROM {schema_name}.obs_raw
+        WHERE history_id IN (
+                SELECT history_id FROM {schema_name}.meta_history
+                WHERE meta_history.station_id = $1
+            )
+            AND obs_raw.vars_id = $2
+        GROUP BY date_trunc('month', obs_time)
+        HAVING CAST(count(datum) / {days_in_month} AS real) >= $3
+        ORDER BY date_trunc('month', obs_time)
+    $BODY$;
+    """,
+    schema=schema_name,
+)
@@ -0,0 +1,106 @@
+from pycds.context import get_schema_name
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+
+
+schema_name = get_schema_name()
+
+
+# The geography of `meta_history.the_geom`. Queries must use exactly this expression
+# to use the index `meta_history_the_geog_idx`.
+history_geog = "geography(meta_history.the_geom)"
+
+# The geography of the point (lon, lat) = ($1, $2).
+point_geog = "geography(ST_SetSRID(ST_MakePoint($1, $2), 4326))"
+
+
+# Returns the histories within `thres` metres of the point (`x`, `y`) (longitude,
+# latitude), and their distances from it, ordered by distance.
+#
+# The previous version (in version_4a2f1879293a) built its query by interpolating the
+# arguments into the query text, and selected candidates by the bounding box of a
+# buffer around the point, which cannot use an index on geometry `the_geom`. This
+# version is a parameterized query whose condition, `ST_DWithin`, uses the geography
+# index `meta_history_the_geog_idx`. Histories are selected by distance, not by
+# bounding box.
+closest_stns_within_threshold = ReplaceableFunction(
+    """
+    closest_stns_within_threshold(
+        IN x numeric,
+        IN y numeric,
+        IN thres integer
+    )""",
+    f"""
+    RETURNS TABLE(
+        history_id integer,
+        lat numeric,
+        lon numeric,
+        dist double precision
+    )
+    LANGUAGE 'sql'
+    STABLE
+    SECURITY DEFINER
+    COST 100
+    ROWS 1000
+    AS $BODY$
+        SELECT
+            meta_history.history_id,
+            meta_history.lat,
+            meta_history.lon,
+            ST_Distance({history_geog}, point.geog) AS dist
+        FROM {schema_name}.meta_history,
+            (SELECT {point_geog} AS geog) AS point
+        WHERE ST_DWithin({history_geog}, point.geog, $3)
+        ORDER BY dist
+    $BODY$;
+    """,
+    schema=schema_name,
+)
+
+
+# Returns the `k` histories nearest the point (`lon`, `lat`), and their distances from
+# it in metres, ordered by distance. If `max_dist` is not null, only histories within
+# `max_dist` metres of the point are returned.
+#
+# Histories are found by a nearest-neighbour (KNN) scan of the geography index
+# `meta_history_the_geog_idx`, ordered by `<->`, which visits only about `k` index
+# entries.
+#
+# The same histories can be obtained directly in application code with
+# `pycds.spatial.nearest_histories`.
+nearest_histories = ReplaceableFunction(
+    """
+    nearest_histories(
+        IN lon double precision,
+        IN lat double precision,
+        IN k integer,
+        IN max_dist double precision DEFAULT NULL
+    )""",
+    f"""
+    RETURNS TABLE(
+        history_id integer,
+        station_id integer,
+        lat numeric,
+        lon numeric,
+        dist double precision
+    )
+    LANGUAGE 'sql'
+    STABLE
+    COST 100
+    ROWS 10
+    AS $BODY$
+        SELECT
+            meta_history.history_id,
+            meta_history.station_id,
+            meta_history.lat,
+            meta_history.lon,
+            ST_Distance({history_geog}, point.geog)
+        FROM {schema_name}.meta_history,
+            (SELECT {point_geog} AS geog) AS point
+        WHERE meta_history.the_geom IS NOT NULL
+            AND ($4 IS NULL OR ST_DWithin({history_geog}, point.geog, $4))
+        ORDER BY {history_geog} <-> point.geog
+        LIMIT $3
+    $BODY$;
+    """,
+    schema=schema_name,
+)
@@ -0,0 +1,71 @@
+from pycds.context import get_schema_name
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+
+
+schema_name = get_schema_name()
+
+
+# Returns the text of a SELECT statement for a table containing the values
+# of all the variables reported by the specified station, filtered by whether
+# the variables are climatological or non-climatological. The rows of the
+# resulting table contain the following columns:
+#
+#   `obs_time`
+#       for each variable reported by the station:
+#       `   datum` of observation for this variable at `obs_time`
+#           (`NULL` if no observation for this variable at `obs_time`)
+#               AS `net_var_name`
+#
+# The returned statement restricts `obs_raw` with array literals
+# (`history_id = ANY('{...}')`, `vars_id = ANY('{...}')`) rather than chains of
+# `OR` or `IN` lists, so its planning time does not grow with the number of
+# histories, and pivots with aggregate `FILTER` clauses in a single ordered scan.
+# Column names are folded to lower case, as they were when this function returned
+# the names unquoted.
+#
+# The same table can be obtained directly in application code with
+# `pycds.station_table`.
+#
+# NOTE: Production code: This function is called by functions
+# `query_one_station` and `query_one_station_climo` .
+getstationvariabletable = ReplaceableFunction(
+    """
+    getstationvariabletable(
+        station_id integer,
+        climo boolean)
+    """,
+    f"""
+    RETURNS text
+    LANGUAGE 'sql'
+    COST 100
+    STABLE PARALLEL SAFE
+    AS $BODY$
+        SELECT format(
+            'SELECT obs_time%s FROM {schema_name}.obs_raw '
+            'WHERE history_id = ANY(%L::integer[]) AND vars_id = ANY(%L::integer[]) '
+            'GROUP BY obs_time ORDER BY obs_time',
+            string_agg(
+                format(
+                    ', max(datum) FILTER (WHERE vars_id = %s) AS %I',
+                    meta_vars.vars_id,
+                    lower(meta_vars.net_var_name)
+                ),
+                '' ORDER BY meta_vars.net_var_name
+            ),
+            (
+                SELECT coalesce(array_agg(history_id ORDER BY history_id), '{{}}')
+                FROM {schema_name}.meta_history
+                WHERE meta_history.station_id = $1
+            ),
+            coalesce(array_agg(meta_vars.vars_id ORDER BY meta_vars.net_var_name), '{{}}')
+        )
+        FROM {schema_name}.meta_vars
+            JOIN {schema_name}.meta_station
+                ON meta_vars.network_id = meta_station.network_id
+        WHERE ARRAY[CASE WHEN $2 THEN 'climatology' ELSE 'observation' END]
+                <@ {schema_name}.variable_tags(meta_vars.*)
+            AND meta_station.station_id = $1
+    $BODY$;
+    """,
+    schema=schema_name,
+)
@@ -0,0 +1,86 @@
+from pycds.context import get_schema_name
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+
+
+schema_name = get_schema_name()
+
+
+# Updates `meta_station.min_obs_time` and `max_obs_time` from the observations of
+# each station's histories, with a single grouped UPDATE ... FROM.
+#
+#   `since`
+#       If NULL, all stations with histories are updated. Otherwise, only stations
+#       with an observation inserted, updated, or deleted at or after `since`
+#       (according to `obs_raw.mod_time` and `obs_raw_hx.mod_time`) are updated.
+#   `from_matview`
+#       If true, observation times are taken from matview `station_obs_stats_mv`
+#       instead of `obs_raw`. This is much faster, but the matview must have been
+#       refreshed after the observations changed.
+#
+# Stations whose observation times are unchanged are not updated, so that no
+# history records are added for them.
+#
+# The previous version (in version_4a2f1879293a) looped over stations, querying and
+# updating each one separately. Called without arguments, this version has the same
+# effect.
+updatesdateedate = ReplaceableFunction(
+    """
+    updatesdateedate(
+        since timestamp without time zone DEFAULT NULL,
+        from_matview boolean DEFAULT false)
+    """,
+    f"""
+    RETURNS void
+    LANGUAGE 'sql'
+    VOLATILE
+    COST 100
+    AS $BODY$
+        WITH touched_stations AS (
+            SELECT DISTINCT station_id
+            FROM {schema_name}.meta_history
+            WHERE history_id IN (
+                SELECT history_id FROM {schema_name}.obs_raw
+                WHERE mod_time >= $1
+                UNION
+                SELECT history_id FROM {schema_name}.obs_raw_hx
+                WHERE mod_time >= $1
+            )
+        ),
+        histories AS (
+            SELECT history_id, station_id
+            FROM {schema_name}.meta_history
+            WHERE $1 IS NULL
+                OR station_id IN (SELECT station_id FROM touched_stations)
+        ),
+        history_stats AS (
+            SELECT history_id, min_obs_time, max_obs_time
+            FROM {schema_name}.station_obs_stats_mv
+            WHERE $2 AND history_id IN (SELECT history_id FROM histories)
+            UNION ALL
+            SELECT history_id, min(obs_time), max(obs_time)
+            FROM {schema_name}.obs_raw
+            WHERE NOT $2 AND history_id IN (SELECT history_id FROM histories)
+            GROUP BY history_id
+        ),
+        station_stats AS (
+            SELECT
+                histories.station_id,
+                min(history_stats.min_obs_time) AS min_obs_time,
+                max(history_stats.max_obs_time) AS max_obs_time
+            FROM histories
+                LEFT JOIN history_stats
+                    ON history_stats.history_id = histories.history_id
+            GROUP BY histories.station_id
+        )
+        UPDATE {schema_name}.meta_station
+        SET (min_obs_time, max_obs_time) =
+            (station_stats.min_obs_time, station_stats.max_obs_time)
+        FROM station_stats
+        WHERE meta_station.station_id = station_stats.station_id
+            AND (meta_station.min_obs_time, meta_station.max_obs_time)
+                IS DISTINCT FROM
+                (station_stats.min_obs_time, station_stats.max_obs_time)
+    $BODY$;
+    """,
+    schema=schema_name,
+)
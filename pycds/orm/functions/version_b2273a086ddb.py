@@ -0,0 +1,120 @@
+"""
+Function definitions introduced by migration b2273a086ddb.
+
+The helper functions `daysinmonth`, `lastdateofmonth`, `season`, and
+`variable_tags` were declared VOLATILE (and `variable_tags` PARALLEL UNSAFE), which
+prevents PostgreSQL from using parallel plans for queries that call them, such as
+the defining queries of `collapsed_vars_mv` and `climo_obs_count_mv`, and from
+evaluating them once for constant arguments. They depend only on their arguments,
+so they are declared IMMUTABLE PARALLEL SAFE here, as in version f6d5a4c2e901 for
+`effective_day`.
+
+All are single-expression SQL functions, which the planner can inline into the
+calling query, avoiding a function call per row:
+
+- `season` is rewritten from plpgsql. For a null argument it now returns null
+  rather than raising an error; otherwise its results are unchanged. (December
+  still maps to January 15 of the same year.)
+- `lastdateofmonth` truncates its argument as a timestamp without time zone. The
+  date argument was previously converted to a timestamp with time zone, which
+  depends on the session time zone, so the function could not be immutable.
+
+Results of the other functions are unchanged. These definitions replace the
+previous ones in place (CREATE OR REPLACE), since views and matviews depend on
+`variable_tags`.
+"""
+
+from pycds.context import get_schema_name
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+
+
+schema_name = get_schema_name()
+
+
+daysinmonth = ReplaceableFunction(
+    """
+    daysinmonth(d timestamp)
+    """,
+    """
+    RETURNS double precision AS
+    $BODY$
+    SELECT EXTRACT(DAY FROM CAST(date_trunc('month', d) + interval '1 month'
+    - interval '1 day' as timestamp));
+    $BODY$
+      LANGUAGE sql
+      IMMUTABLE
+      PARALLEL SAFE
+      COST 100;
+    """,
+    schema=schema_name,
+    replace=True,
+)
+
+
+lastdateofmonth = ReplaceableFunction(
+    """
+    lastdateofmonth(date)
+    """,
+    """
+    RETURNS date AS
+    $BODY$
+    SELECT CAST(
+        date_trunc('month', CAST($1 AS timestamp)) + interval '1 month'
+        - interval '1 day'
+        as date);
+    $BODY$
+      LANGUAGE sql
+      IMMUTABLE
+      PARALLEL SAFE
+      COST 100;
+    """,
+    schema=schema_name,
+    replace=True,
+)
+
+
+season = ReplaceableFunction(
+    """
+    season(d timestamp without time zone)
+    """,
+    """
+    RETURNS date AS
+    $BODY$
+    SELECT make_date(
+        CAST(date_part('year', d) AS integer),
+        CASE CAST(date_part('month', d) AS integer)
+            WHEN 12 THEN 1 WHEN 1 THEN 1 WHEN 2 THEN 1
+            WHEN 3 THEN 4 WHEN 4 THEN 4 WHEN 5 THEN 4
+            WHEN 6 THEN 7 WHEN 7 THEN 7 WHEN 8 THEN 7
+            ELSE 10
+        END,
+        15
+    );
+    $BODY$
+      LANGUAGE sql
+      IMMUTABLE
+      PARALLEL SAFE
+      COST 100;
+    """,
+    schema=schema_name,
+    replace=True,
+)
+
+
+variable_tags = ReplaceableFunction(
+    f"variable_tags(var {schema_name}.meta_vars)",
+    f"""
+    RETURNS text[]
+    LANGUAGE 'sql'
+    COST 100
+    IMMUTABLE PARALLEL SAFE
+    AS $BODY$
+     SELECT CASE
+         WHEN var.net_var_name ~ 'Climatology' THEN array['climatology']
+         ELSE array['observation']
+        END;
+    $BODY$
+    """,
+    replace=True,
+    schema=schema_name,
+)
@@ -20,8 +20,34 @@ export the latest version. When a PyCDS release is created, it will "freeze"
 this set of views. Following any PyCDS release, further migrations and further
 releases will "freeze" later sets of views.
 
-At present all manual matviews have been updated to native matviews, and this
-file is present only in case of future downgrades.
+The weather-anomaly matviews are manual matviews so that they can be refreshed
+incrementally (see `ReplaceableManualMatview.refresh_incremental`). The matview of
+discarded observation ids, `DiscardedObsRaw`, is a manual matview so that it can be
+maintained by triggers as flags change. Likewise, the observation counts
+`ObsCountPerMonth` are maintained by triggers as observations change. The daily
+observation counts `ObsCountPerDayHistory` are a manual matview so that they can
+be indexed and refreshed incrementally.
 """
 
-from .version_8fd8f556c548 import Base
+from .version_4da001f72cd1 import Base
+from .version_4da001f72cd1 import MonthlyTotalPrecipitation
+from .version_4da001f72cd1 import DailyMaxTemperature
+from .version_4da001f72cd1 import DailyMinTemperature
+from .version_4da001f72cd1 import MonthlyAverageOfDailyMaxTemperature
+from .version_4da001f72cd1 import MonthlyAverageOfDailyMinTemperature
+from .version_4da001f72cd1 import refresh_scope
+from .version_fd52f31bc576 import DiscardedObsRaw
+from .version_8a817c2a4e7a import ObsCountPerMonth
+from .version_8578304b749d import ObsCountPerDayHistory
+
+# only used for tests
+from .version_4da001f72cd1 import daily_temperature_extremum
+from .version_4da001f72cd1 import (
+    monthly_average_of_daily_temperature_extremum_with_avg_coverage,
+)
+from .version_4da001f72cd1 import (
+    monthly_average_of_daily_temperature_extremum_with_total_coverage,
+)
+from .version_4da001f72cd1 import monthly_total_precipitation_with_avg_coverage
+from .version_4da001f72cd1 import monthly_total_precipitation_with_total_coverage
+from .version_4da001f72cd1 import good_obs
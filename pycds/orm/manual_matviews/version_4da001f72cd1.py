@@ -0,0 +1,450 @@
+"""
+Manual materialized views for weather-anomaly application, supporting incremental
+(month-scoped) refresh.
+
+These matviews have the same names, columns, contents and indexes as the native
+matviews defined in `pycds.orm.native_matviews.version_f6d5a4c2e901`. They are
+re-implemented as manual matviews (i.e., tables) because a native matview can only
+be refreshed in its entirety, which requires a scan of all of `obs_raw` even when
+only a few weeks of observations have changed.
+
+A manual matview can be refreshed in part. Each matview here is keyed by
+`(history_id, vars_id, <period>)`, where `<period>` is `obs_day` or `obs_month`.
+A *refresh scope* is a set of rows `(history_id, vars_id, obs_month)`; refreshing a
+matview within a scope deletes and recomputes only the matview rows whose
+`(history_id, vars_id)` and month of `<period>` appear in the scope. The scope is
+typically computed from observations modified since the last refresh; see
+`pycds.manage_views.refresh_views_incrementally`.
+
+Semantics are otherwise unchanged from version f6d5a4c2e901; see that module.
+
+Notes:
+  - Observations are selected for a scoped refresh with a window extending one day
+    before the start of each month in scope. This is required because the effective
+    day of an afternoon 12-hourly maximum temperature observation is the following
+    day (see database function `effective_day`), so that the last day of a month
+    can contribute to the first day of the next month.
+  - Discard flags are taken from `discarded_obs_raw_mv`, which must be refreshed
+    before these matviews.
+"""
+
+from sqlalchemy import (
+    func,
+    and_,
+    not_,
+    case,
+    cast,
+    select,
+    tuple_,
+    literal_column,
+    Column,
+    Integer,
+    String,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Interval,
+)
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import table, column
+
+from pycds.context import get_schema_name
+from pycds.orm.tables import History, Obs, Variable
+from pycds.orm.native_matviews.version_f6d5a4c2e901 import DiscardedObsRaw
+from pycds.alembic.extensions.replaceable_objects import ReplaceableManualMatview
+from pycds.orm.view_base import make_declarative_base
+
+
+Base = make_declarative_base()
+
+
+one_day = literal_column("interval '1 day'", Interval)
+one_month = literal_column("interval '1 month'", Interval)
+
+
+# Refresh scope for incremental refreshes. This is a temporary table, and so it has
+# no schema. It is created and populated by the code that drives the refresh.
+refresh_scope = table(
+    "weather_anomaly_refresh_scope",
+    column("history_id", Integer),
+    column("vars_id", Integer),
+    column("obs_month", DateTime),
+)
+
+
+# Shared source for daily temperature extrema and monthly total precipitation.
+# Keep observations absent from the discarded-ID materialized view.
+good_obs = (
+    Query(
+        [
+            Obs.id.label("id"),
+            Obs.time.label("time"),
+            Obs.mod_time.label("mod_time"),
+            Obs.datum.label("datum"),
+            Obs.vars_id.label("vars_id"),
+            Obs.history_id.label("history_id"),
+        ]
+    )
+    .select_from(Obs)
+    .outerjoin(DiscardedObsRaw, Obs.id == DiscardedObsRaw.id)
+    .filter(DiscardedObsRaw.id.is_(None))
+).subquery("good_obs")
+
+
+def scoped_good_obs(scope, lead=None):
+    """
+    Return the subset of `good_obs` that can contribute to the matview rows within
+    `scope`, i.e., observations for a `(history_id, vars_id)` in scope, with
+    observation time within the month in scope, or within `lead` before it.
+
+    The result has an additional column `scope_month`, the month in scope that the
+    observation was selected for. Scoped observation windows can overlap when `lead`
+    is given, in which case an observation can be selected more than once, once for
+    each month. Queries using this subquery must therefore group by `scope_month`.
+    """
+    window_start = scope.c.obs_month if lead is None else scope.c.obs_month - lead
+    return (
+        Query(
+            [
+                Obs.id.label("id"),
+                Obs.time.label("time"),
+                Obs.mod_time.label("mod_time"),
+                Obs.datum.label("datum"),
+                Obs.vars_id.label("vars_id"),
+                Obs.history_id.label("history_id"),
+                scope.c.obs_month.label("scope_month"),
+            ]
+        )
+        .select_from(Obs)
+        .join(
+            scope,
+            and_(
+                scope.c.history_id == Obs.history_id,
+                scope.c.vars_id == Obs.vars_id,
+                Obs.time >= window_start,
+                Obs.time < scope.c.obs_month + one_month,
+            ),
+        )
+        .outerjoin(DiscardedObsRaw, Obs.id == DiscardedObsRaw.id)
+        .filter(DiscardedObsRaw.id.is_(None))
+    ).subquery("good_obs")
+
+
+class MonthScopedRefresh:
+    """
+    Mixin implementing the scope condition required by
+    `ReplaceableManualMatview.refresh_incremental` for the matviews in this module.
+    The name of the period column (`obs_day`, `obs_month`) is given by class
+    attribute `__scope_period__`.
+    """
+
+    @classmethod
+    def scope_condition(cls, scope):
+        period = getattr(cls, cls.__scope_period__)
+        return tuple_(
+            cls.history_id, cls.vars_id, func.date_trunc("month", period)
+        ).in_(select(scope.c.history_id, scope.c.vars_id, scope.c.obs_month))
+
+
+def monthly_total_precipitation_with_total_coverage(scope=None):
+    source = good_obs if scope is None else scoped_good_obs(scope)
+    return (
+        Query(
+            [
+                History.id.label("history_id"),
+                source.c.vars_id.label("vars_id"),
+                func.date_trunc("month", source.c.time).label("obs_month"),
+                func.sum(source.c.datum).label("statistic"),
+                func.sum(
+                    case(
+                        {
+                            "daily": 1.0,
+                            "12-hourly": 0.5,
+                            "1-hourly": 1 / 24,
+                        },
+                        value=History.freq,
+                    )
+                ).label("total_data_coverage"),
+            ]
+        )
+        .select_from(source)
+        .join(History)
+        .join(Variable)
+        .filter(
+            Variable.standard_name.in_(
+                (
+                    "lwe_thickness_of_precipitation_amount",
+                    "thickness_of_rainfall_amount",
+                    "thickness_of_snowfall_amount",
+                )
+            )
+        )
+        .filter(Variable.cell_method == "time: sum")
+        .filter(not_(Variable.name == "cum_pcpn_amt"))
+        .filter(History.freq.in_(("1-hourly", "daily")))
+        .group_by(History.id, source.c.vars_id, "obs_month")
+    )
+
+
+def monthly_total_precipitation_with_avg_coverage(scope=None):
+    monthly_total_precip = monthly_total_precipitation_with_total_coverage(
+        scope
+    ).subquery("monthly_total_precip")
+    func_schema = getattr(func, get_schema_name())
+
+    return Query(
+        [
+            monthly_total_precip.c.history_id.label("history_id"),
+            monthly_total_precip.c.vars_id.label("vars_id"),
+            monthly_total_precip.c.obs_month.label("obs_month"),
+            monthly_total_precip.c.statistic.label("statistic"),
+            (
+                monthly_total_precip.c.total_data_coverage
+                / func_schema.DaysInMonth(cast(monthly_total_precip.c.obs_month, Date))
+            ).label("data_coverage"),
+        ]
+    ).select_from(monthly_total_precip)
+
+
+class MonthlyTotalPrecipitation(Base, MonthScopedRefresh, ReplaceableManualMatview):
+    __tablename__ = "monthly_total_precipitation_mv"
+    __scope_period__ = "obs_month"
+
+    history_id = Column(Integer, primary_key=True)
+    vars_id = Column(Integer, primary_key=True)
+    obs_month = Column(DateTime, primary_key=True)
+    statistic = Column(Float)
+    data_coverage = Column(Float)
+
+    __selectable__ = monthly_total_precipitation_with_avg_coverage().selectable
+
+    @classmethod
+    def scoped_selectable(cls, scope):
+        return monthly_total_precipitation_with_avg_coverage(scope).selectable
+
+
+def daily_temperature_extremum(extremum, scope=None):
+    extremum_func = getattr(func, extremum)
+    func_schema = getattr(func, get_schema_name())
+    source = good_obs if scope is None else scoped_good_obs(scope, lead=one_day)
+    obs_day = func_schema.effective_day(
+        source.c.time,
+        cast(extremum, String),
+        cast(History.freq, String),
+    )
+
+    query = (
+        Query(
+            [
+                History.id.label("history_id"),
+                source.c.vars_id.label("vars_id"),
+                obs_day.label("obs_day"),
+                extremum_func(source.c.datum).label("statistic"),
+                func.sum(
+                    case(
+                        {
+                            "daily": 1.0,
+                            "12-hourly": 0.5,
+                            "1-hourly": 1 / 24,
+                        },
+                        value=History.freq,
+                    )
+                ).label("data_coverage"),
+            ]
+        )
+        .select_from(source)
+        .join(Variable)
+        .join(History)
+        .filter(Variable.standard_name == "air_temperature")
+        .filter(
+            Variable.cell_method.in_(
+                (
+                    f"time: {extremum}imum",
+                    "time: point",
+                    "time: mean",
+                )
+            )
+        )
+        .filter(History.freq.in_(("1-hourly", "12-hourly", "daily")))
+        .group_by(History.id, source.c.vars_id, "obs_day")
+    )
+    if scope is None:
+        return query
+
+    # Keep only the days that fall in the month each observation was selected for.
+    # This discards the partial days formed by observations in the lead window.
+    return query.group_by(source.c.scope_month).having(
+        func.date_trunc("month", obs_day) == source.c.scope_month
+    )
+
+
+class DailyMaxTemperature(Base, MonthScopedRefresh, ReplaceableManualMatview):
+    __tablename__ = "daily_max_temperature_mv"
+    __scope_period__ = "obs_day"
+
+    history_id = Column(Integer, primary_key=True)
+    vars_id = Column(Integer, primary_key=True)
+    obs_day = Column(DateTime, primary_key=True)
+    statistic = Column(Float)
+    data_coverage = Column(Float)
+
+    __selectable__ = daily_temperature_extremum("max").selectable
+
+    @classmethod
+    def scoped_selectable(cls, scope):
+        return daily_temperature_extremum("max", scope).selectable
+
+
+class DailyMinTemperature(Base, MonthScopedRefresh, ReplaceableManualMatview):
+    __tablename__ = "daily_min_temperature_mv"
+    __scope_period__ = "obs_day"
+
+    history_id = Column(Integer, primary_key=True)
+    vars_id = Column(Integer, primary_key=True)
+    obs_day = Column(DateTime, primary_key=True)
+    statistic = Column(Float)
+    data_coverage = Column(Float)
+
+    __selectable__ = daily_temperature_extremum("min").selectable
+
+    @classmethod
+    def scoped_selectable(cls, scope):
+        return daily_temperature_extremum("min", scope).selectable
+
+
+def monthly_average_of_daily_temperature_extremum_with_total_coverage(
+    extremum, scope=None
+):
+    daily_extreme = DailyMaxTemperature if extremum == "max" else DailyMinTemperature
+    obs_month = func.date_trunc("month", daily_extreme.obs_day)
+
+    query = Query(
+        [
+            daily_extreme.history_id.label("history_id"),
+            daily_extreme.vars_id.label("vars_id"),
+            obs_month.label("obs_month"),
+            func.avg(daily_extreme.statistic).label("statistic"),
+            func.sum(daily_extreme.data_coverage).label("total_data_coverage"),
+        ]
+    ).select_from(daily_extreme)
+    if scope is not None:
+        query = query.join(
+            scope,
+            and_(
+                scope.c.history_id == daily_extreme.history_id,
+                scope.c.vars_id == daily_extreme.vars_id,
+                daily_extreme.obs_day >= scope.c.obs_month,
+                daily_extreme.obs_day < scope.c.obs_month + one_month,
+            ),
+        )
+    return query.group_by(daily_extreme.history_id, daily_extreme.vars_id, "obs_month")
+
+
+def monthly_average_of_daily_temperature_extremum_with_avg_coverage(
+    extremum, scope=None
+):
+    avg_daily_extreme_temperature = (
+        monthly_average_of_daily_temperature_extremum_with_total_coverage(
+            extremum, scope
+        ).subquery("avg_daily_extreme_temperature")
+    )
+    func_schema = getattr(func, get_schema_name())
+
+    return Query(
+        [
+            avg_daily_extreme_temperature.c.history_id.label("history_id"),
+            avg_daily_extreme_temperature.c.vars_id.label("vars_id"),
+            avg_daily_extreme_temperature.c.obs_month.label("obs_month"),
+            avg_daily_extreme_temperature.c.statistic.label("statistic"),
+            (
+                avg_daily_extreme_temperature.c.total_data_coverage
+                / func_schema.DaysInMonth(
+                    cast(avg_daily_extreme_temperature.c.obs_month, Date)
+                )
+            ).label("data_coverage"),
+        ]
+    ).select_from(avg_daily_extreme_temperature)
+
+
+class MonthlyAverageOfDailyMaxTemperature(
+    Base, MonthScopedRefresh, ReplaceableManualMatview
+):
+    __tablename__ = "monthly_average_of_daily_max_temperature_mv"
+    __scope_period__ = "obs_month"
+
+    history_id = Column(Integer, primary_key=True)
+    vars_id = Column(Integer, primary_key=True)
+    obs_month = Column(DateTime, primary_key=True)
+    statistic = Column(Float)
+    data_coverage = Column(Float)
+
+    __selectable__ = monthly_average_of_daily_temperature_extremum_with_avg_coverage(
+        "max"
+    ).selectable
+
+    @classmethod
+    def scoped_selectable(cls, scope):
+        return monthly_average_of_daily_temperature_extremum_with_avg_coverage(
+            "max", scope
+        ).selectable
+
+
+class MonthlyAverageOfDailyMinTemperature(
+    Base, MonthScopedRefresh, ReplaceableManualMatview
+):
+    __tablename__ = "monthly_average_of_daily_min_temperature_mv"
+    __scope_period__ = "obs_month"
+
+    history_id = Column(Integer, primary_key=True)
+    vars_id = Column(Integer, primary_key=True)
+    obs_month = Column(DateTime, primary_key=True)
+    statistic = Column(Float)
+    data_coverage = Column(Float)
+
+    __selectable__ = monthly_average_of_daily_temperature_extremum_with_avg_coverage(
+        "min"
+    ).selectable
+
+    @classmethod
+    def scoped_selectable(cls, scope):
+        return monthly_average_of_daily_temperature_extremum_with_avg_coverage(
+            "min", scope
+        ).selectable
+
+
+Index(
+    "monthly_total_precipitation_mv_idx",
+    MonthlyTotalPrecipitation.history_id,
+    MonthlyTotalPrecipitation.vars_id,
+    MonthlyTotalPrecipitation.obs_month,
+    unique=True,
+)
+Index(
+    "daily_max_temperature_mv_idx",
+    DailyMaxTemperature.history_id,
+    DailyMaxTemperature.vars_id,
+    DailyMaxTemperature.obs_day,
+    unique=True,
+)
+Index(
+    "daily_min_temperature_mv_idx",
+    DailyMinTemperature.history_id,
+    DailyMinTemperature.vars_id,
+    DailyMinTemperature.obs_day,
+    unique=True,
+)
+Index(
+    "monthly_average_of_daily_max_temperature_mv_idx",
+    MonthlyAverageOfDailyMaxTemperature.history_id,
+    MonthlyAverageOfDailyMaxTemperature.vars_id,
+    MonthlyAverageOfDailyMaxTemperature.obs_month,
+    unique=True,
+)
+Index(
+    "monthly_average_of_daily_min_temperature_mv_idx",
+    MonthlyAverageOfDailyMinTemperature.history_id,
+    MonthlyAverageOfDailyMinTemperature.vars_id,
+    MonthlyAverageOfDailyMinTemperature.obs_month,
+    unique=True,
+)
@@ -0,0 +1,94 @@
+"""
+Manual materialized view of observation counts per day and history.
+
+`ObsCountPerDayHistory` was a plain view (see
+`pycds.orm.views.version_84b7fc2596d5`), so that every query on it aggregated all of
+`obs_raw`. It is now a manual matview (a table) with the same name and columns, and
+a unique index on `(history_id, date_trunc)`, so that lookups by history and day
+are index scans.
+
+Like the weather-anomaly matviews (see `pycds.orm.manual_matviews.version_4da001f72cd1`),
+it can be refreshed incrementally, in batches of observations modified since a given
+time (see `pycds.manage_views.refresh_views_incrementally`). A refresh scope is a set
+of rows `(history_id, vars_id, obs_month)`; an incremental refresh recomputes the
+counts of each history for each day in the months in scope, regardless of variable.
+
+This matview is declared on the same declarative base as the other current manual
+matviews, so that `pycds.orm.manual_matviews.Base` describes all of them.
+"""
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    BigInteger,
+    DateTime,
+    Index,
+    and_,
+    func,
+    select,
+    tuple_,
+)
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableManualMatview
+from pycds.orm.manual_matviews.version_4da001f72cd1 import Base, one_month
+from pycds.orm.tables import Obs
+
+
+def obs_count_per_day_history(scope=None):
+    """
+    Return the selectable counting observations by day and history. If `scope` is
+    given, count only the observations of the histories and months in scope.
+    """
+    day = func.date_trunc("day", Obs.time)
+    query = select(
+        func.count().label("count"),
+        day.label("date_trunc"),
+        Obs.history_id.label("history_id"),
+    ).select_from(Obs)
+    if scope is not None:
+        scope_months = (
+            select(scope.c.history_id, scope.c.obs_month)
+            .distinct()
+            .subquery("scope_months")
+        )
+        query = query.join(
+            scope_months,
+            and_(
+                scope_months.c.history_id == Obs.history_id,
+                Obs.time >= scope_months.c.obs_month,
+                Obs.time < scope_months.c.obs_month + one_month,
+            ),
+        )
+    return query.group_by(day, Obs.history_id)
+
+
+class ObsCountPerDayHistory(Base, ReplaceableManualMatview):
+    """
+    Counts of observations grouped by day (date) and history_id.
+    """
+
+    __tablename__ = "obs_count_per_day_history_v"  # Legacy name
+
+    count = Column(BigInteger)
+    date_trunc = Column(DateTime, primary_key=True)
+    history_id = Column(Integer, primary_key=True)
+
+    __selectable__ = obs_count_per_day_history()
+
+    @classmethod
+    def scoped_selectable(cls, scope):
+        return obs_count_per_day_history(scope)
+
+    @classmethod
+    def scope_condition(cls, scope):
+        return tuple_(cls.history_id, func.date_trunc("month", cls.date_trunc)).in_(
+            select(scope.c.history_id, scope.c.obs_month)
+        )
+
+
+Index(
+    "obs_count_per_day_history_idx",
+    ObsCountPerDayHistory.history_id,
+    ObsCountPerDayHistory.date_trunc,
+    unique=True,
+)
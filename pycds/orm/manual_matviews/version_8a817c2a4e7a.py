@@ -0,0 +1,70 @@
+"""
+Manual materialized view of observation counts per history, variable and month,
+maintained by triggers.
+
+`ObsCountPerMonth` holds one row per `(history_id, vars_id, obs_month)` present in
+`obs_raw`, with the number of observations having that key. Statement-level triggers
+on `obs_raw` add and subtract the counts of the rows inserted, deleted and updated by
+each statement (see `pycds.orm.trigger_functions.version_8a817c2a4e7a`), so it never
+needs to be refreshed in normal operation. A full refresh recomputes it from scratch,
+which is only necessary if the triggers were disabled while observations changed.
+
+The observation count views `ObsCountPerMonthHistory` and `ClimoObsCount` (formerly
+native matviews, each a full `GROUP BY` scan of `obs_raw`) are now views over this
+matview; see `pycds.orm.views.version_8a817c2a4e7a`.
+
+Observations with a NULL `history_id`, `vars_id` or `obs_time` are not counted: they
+cannot be located by the station and time selections these counts serve, and NULL
+keys cannot be matched by the upserts that maintain the counts.
+
+This matview is declared on the same declarative base as the other current manual
+matviews, so that `pycds.orm.manual_matviews.Base` describes all of them.
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, DateTime, Index, func, select
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableManualMatview
+from pycds.orm.manual_matviews.version_4da001f72cd1 import Base
+from pycds.orm.tables import Obs
+
+
+class ObsCountPerMonth(Base, ReplaceableManualMatview):
+    __tablename__ = "obs_count_per_month_mv"
+
+    history_id = Column(Integer, primary_key=True)
+    vars_id = Column(Integer, primary_key=True)
+    obs_month = Column(DateTime, primary_key=True)
+    count = Column(BigInteger)
+
+    __selectable__ = (
+        select(
+            Obs.history_id.label("history_id"),
+            Obs.vars_id.label("vars_id"),
+            func.date_trunc("month", Obs.time).label("obs_month"),
+            func.count().label("count"),
+        )
+        .select_from(Obs)
+        .where(
+            Obs.history_id.is_not(None),
+            Obs.vars_id.is_not(None),
+            Obs.time.is_not(None),
+        )
+        .group_by(Obs.history_id, Obs.vars_id, func.date_trunc("month", Obs.time))
+    )
+
+
+# The maintaining triggers upsert on this index.
+Index(
+    "obs_count_per_month_mv_pkey",
+    ObsCountPerMonth.history_id,
+    ObsCountPerMonth.vars_id,
+    ObsCountPerMonth.obs_month,
+    unique=True,
+)
+
+# Supports selection by time range, as in `ObsCountPerMonthHistory`.
+Index(
+    "obs_count_per_month_mv_month_idx",
+    ObsCountPerMonth.obs_month,
+    ObsCountPerMonth.history_id,
+)
@@ -0,0 +1,39 @@
+"""
+Manual materialized view of discarded observation ids, maintained by triggers.
+
+`DiscardedObsRaw` has the same name, column, contents and unique index as the
+native matview defined in `pycds.orm.native_matviews.version_f6d5a4c2e901`, which it
+replaces, so it can be used in its place in queries (e.g., the anti-joins in
+`good_obs`). Because it is a table, it can be maintained incrementally: triggers on
+the flag association tables and on the `discard` column of the flag tables add and
+remove observation ids as flags change (see
+`pycds.orm.trigger_functions.version_fd52f31bc576`). It therefore never needs to be
+refreshed in normal operation. A full refresh recomputes it from scratch, which is
+only necessary if the triggers were disabled while flags were changed.
+
+This matview is declared on the same declarative base as the other current manual
+matviews, so that `pycds.orm.manual_matviews.Base` describes all of them.
+"""
+
+from sqlalchemy import Column, BigInteger, Index
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableManualMatview
+from pycds.orm.manual_matviews.version_4da001f72cd1 import Base
+from pycds.orm.native_matviews.version_f6d5a4c2e901 import discarded_obs_raw
+
+
+class DiscardedObsRaw(Base, ReplaceableManualMatview):
+    __tablename__ = "discarded_obs_raw_mv"
+
+    # The Python attribute is ``id``; the physical column remains ``obs_raw_id``
+    # to match the source identifier.
+    id = Column("obs_raw_id", BigInteger, primary_key=True)
+
+    __selectable__ = discarded_obs_raw.selectable
+
+
+Index(
+    "discarded_obs_raw_mv_pkey",
+    DiscardedObsRaw.id,
+    unique=True,
+)
@@ -19,28 +19,19 @@ As migrations that modify views are added, this file should be updated to
 export the latest version. When a PyCDS release is created, it will "freeze"
 this set of views. Following any PyCDS release, further migrations and further
 releases will "freeze" later sets of views.
+
+Each view is imported from its version module on first use (see `pycds.lazy`), so
+that using one view does not construct the definitions of all the others.
 """
 
-from .version_3505750d3416 import VarsPerHistory
-from .version_96729d6db8b3 import ClimoObsCount
-from .version_bf366199f463 import StationObservationStats
-from .version_fecff1a73d7e import CollapsedVariables
-from .version_bb2a222a1d4a import ObsCountPerMonthHistory
-from .version_f6d5a4c2e901 import MonthlyTotalPrecipitation
-from .version_f6d5a4c2e901 import DailyMaxTemperature
-from .version_f6d5a4c2e901 import DailyMinTemperature
-from .version_f6d5a4c2e901 import MonthlyAverageOfDailyMaxTemperature
-from .version_f6d5a4c2e901 import MonthlyAverageOfDailyMinTemperature
-from .version_f6d5a4c2e901 import DiscardedObsRaw
+from pycds.lazy import lazy_attributes
 
-# only used for tests
-from .version_f6d5a4c2e901 import daily_temperature_extremum
-from .version_f6d5a4c2e901 import (
-    monthly_average_of_daily_temperature_extremum_with_avg_coverage,
-)
-from .version_f6d5a4c2e901 import (
-    monthly_average_of_daily_temperature_extremum_with_total_coverage,
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "VarsPerHistory": ".version_3505750d3416",
+        "StationObservationStats": ".version_bf366199f463",
+        "CollapsedVariables": ".version_fecff1a73d7e",
+        "CrmpNetworkGeoserver": ".version_5b0339e203bc",
+    },
 )
-from .version_f6d5a4c2e901 import monthly_total_precipitation_with_avg_coverage
-from .version_f6d5a4c2e901 import monthly_total_precipitation_with_total_coverage
-from .version_f6d5a4c2e901 import good_obs
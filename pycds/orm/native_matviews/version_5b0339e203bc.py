@@ -0,0 +1,101 @@
+"""
+Native matview of the CRMP GeoServer station layer.
+
+`CrmpNetworkGeoserver` was a view (see `pycds.orm.views.version_6cb393f711c3`), so
+that every WMS/WFS request from GeoServer re-ran its join of `meta_history`,
+`meta_station`, `meta_network`, `collapsed_vars_mv` and `station_obs_stats_mv`. It
+is now a native matview with the same name, columns and contents, with a unique
+index on `history_id` (so that it can be refreshed concurrently, without blocking
+GeoServer) and a GiST index on `the_geom` (for spatial filtering of map requests).
+
+Its contents change only when a history, station or network changes, or when
+`collapsed_vars_mv` or `station_obs_stats_mv` is refreshed. Its refresh log sources
+(see `pycds.refresh_log`) are accordingly the history tables of the metadata tables
+(which, unlike the metadata tables, record deletions as well as insertions and
+updates) and those two matviews. `pycds.manage_views.refresh_matviews` with
+`only_stale=True` refreshes it only when one of them has changed since its latest
+refresh. A refresh of either matview that is in progress while it is refreshed
+(and so may not be seen) makes it stale once committed, since that refresh began
+before the horizon of its refresh.
+"""
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Numeric,
+    Float,
+    DateTime,
+    Interval,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TEXT
+from geoalchemy2 import Geometry
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableNativeMatview
+from pycds.orm.native_matviews import StationObservationStats, CollapsedVariables
+from pycds.orm.views.version_6cb393f711c3 import (
+    CrmpNetworkGeoserver as CrmpNetworkGeoserverView,
+)
+from pycds.orm.view_base import make_declarative_base
+
+
+Base = make_declarative_base()
+
+
+class CrmpNetworkGeoserver(Base, ReplaceableNativeMatview):
+    """
+    This matview is used by the PDP Geoserver backend for generating station
+    map layers. To prevent unnecessary code repetition, its selectable is copied
+    from the view that it replaces. Columns cannot be copied so.
+    """
+
+    __tablename__ = "crmp_network_geoserver"
+
+    network_name = Column(String)
+    native_id = Column(String)
+    station_name = Column(String)
+    lon = Column(Numeric)
+    lat = Column(Numeric)
+    elev = Column(Float)
+    min_obs_time = Column(DateTime)
+    max_obs_time = Column(DateTime)
+    freq = Column(String)
+    tz_offset = Column(Interval)
+    province = Column(String)
+    station_id = Column(Integer)
+    history_id = Column(Integer, primary_key=True)
+    country = Column(String)
+    comments = Column(String(255))
+    # The spatial index is declared explicitly below.
+    the_geom = Column(Geometry("GEOMETRY", 4326, spatial_index=False))
+    sensor_id = Column(Integer)
+    description = Column(String)
+    network_id = Column(Integer)
+    col_hex = Column(String)
+    vars = Column(String)
+    display_names = Column(String)
+    vars_ids = Column(ARRAY(Integer))
+    unique_variable_tags = Column(ARRAY(TEXT))
+
+    __selectable__ = CrmpNetworkGeoserverView.__selectable__
+
+    refresh_source_table_names = (
+        "meta_history_hx",
+        "meta_station_hx",
+        "meta_network_hx",
+    )
+    refresh_source_matviews = (CollapsedVariables, StationObservationStats)
+
+
+Index(
+    "crmp_network_geoserver_history_id_idx",
+    CrmpNetworkGeoserver.history_id,
+    unique=True,
+)
+
+Index(
+    "crmp_network_geoserver_the_geom_idx",
+    CrmpNetworkGeoserver.the_geom,
+    postgresql_using="gist",
+)
@@ -15,11 +15,19 @@ TODO: This behaviour is different in 2.0 and should be reviewed during that upgr
 ensures that each class explicitly names all its relationship attributes.
 (Using `backref` requires one to scan the all other classes to
 find all the relationship attributes that a given class may have.)
+
+3. Tables `obs_raw` and `obs_raw_hx` are partitioned by time range (see
+`pycds.partitioning`). PostgreSQL requires the primary key and unique constraints of
+a partitioned table to include the partition key, and so does not allow foreign keys
+referencing `obs_raw.obs_raw_id` alone. Foreign keys referencing it are declared
+for the ORM (relationships and join inference) but are not created in the database;
+see `orm_only_foreign_keys`. The ORM identity of these tables remains their id
+column.
 """
 
 import datetime
 
-from sqlalchemy import MetaData, func, literal_column
+from sqlalchemy import DDL, MetaData, event, func, literal_column
 from sqlalchemy import (
     Table,
     Column,
@@ -40,6 +48,7 @@ from sqlalchemy.dialects.postgresql import CITEXT as CIText
 
 from pycds.alembic.change_history_utils import hx_table_name
 from pycds.context import get_schema_name
+from pycds.partitioning import default_partition_name
 
 
 Base = declarative_base(metadata=MetaData(schema=get_schema_name()))
@@ -55,6 +64,31 @@ def no_newline_ck_check(column):
     return f"{column} !~ '[\r\n]'"
 
 
+def add_default_partition(table):
+    """Create a default partition for a partitioned table whenever the table is
+    created from the ORM (e.g., by `metadata.create_all`). Without a partition, a
+    partitioned table cannot receive any rows. Migrations create partitions
+    explicitly."""
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"CREATE TABLE %(schema)s.{default_partition_name(table.name)} "
+            f"PARTITION OF %(fullname)s DEFAULT"
+        ),
+    )
+
+
+def orm_only_foreign_keys(column):
+    """Exclude the foreign keys of a column from DDL (e.g., `metadata.create_all`),
+    keeping them in the model for relationships and join inference. For foreign keys
+    referencing a partitioned table's column that is not unique by itself; the
+    database enforces the reference with triggers instead (see migration
+    ae6f546b717d)."""
+    for foreign_key in column.foreign_keys:
+        foreign_key.constraint.ddl_if(callable_=lambda *args, **kwargs: False)
+
+
 class Contact(Base):
     """This class maps to the table which represents contact people and
     representatives for the networks of the Climate Related Monitoring
@@ -215,6 +249,13 @@ class History(Base):
 
 Index("fki_meta_history_station_id_fk", History.station_id)
 Index("meta_history_freq_idx", History.freq)
+# Supports nearest neighbour (KNN) and distance searches by geography; see
+# `pycds.spatial` and function `nearest_histories`.
+Index(
+    "meta_history_the_geog_idx",
+    func.geography(History.the_geom),
+    postgresql_using="gist",
+)
 
 
 class HistoryHistory(Base):
@@ -266,6 +307,7 @@ ObsRawNativeFlags = Table(
     # Indexes
     Index("flag_index", "obs_raw_id"),
 )
+orm_only_foreign_keys(ObsRawNativeFlags.c.obs_raw_id)
 
 
 # Association table for Obs *--* PCICFLag
@@ -284,6 +326,7 @@ ObsRawPCICFlags = Table(
     # Indexes
     Index("pcic_flag_index", "obs_raw_id"),
 )
+orm_only_foreign_keys(ObsRawPCICFlags.c.obs_raw_id)
 
 
 class MetaSensor(Base):
@@ -300,8 +343,8 @@ class Obs(Base):
     """
 
     __tablename__ = "obs_raw"
-    id = Column("obs_raw_id", BigInteger, primary_key=True)
-    time = Column("obs_time", DateTime)
+    id = Column("obs_raw_id", BigInteger, primary_key=True, autoincrement=True)
+    time = Column("obs_time", DateTime, primary_key=True)
     mod_time = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
     datum = Column(Float)
     vars_id = Column(Integer, ForeignKey("meta_vars.vars_id"))
@@ -336,9 +379,12 @@ class Obs(Base):
             "vars_id",
             name="time_place_variable_unique",
         ),
+        {"postgresql_partition_by": "RANGE (obs_time)"},
     )
+    __mapper_args__ = {"primary_key": [id]}
 
 
+add_default_partition(Obs.__table__)
 Index("mod_time_idx", Obs.mod_time)
 Index("obs_raw_comp_idx", Obs.time, Obs.vars_id, Obs.history_id)
 Index("obs_raw_history_id_idx", Obs.history_id)
@@ -352,7 +398,12 @@ class ObsHistory(Base):
 
     obs_raw_id = Column(BigInteger)
     time = Column("obs_time", DateTime)
-    mod_time = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    mod_time = Column(
+        DateTime,
+        primary_key=True,
+        nullable=False,
+        default=datetime.datetime.utcnow,
+    )
     datum = Column(Float)
     vars_id = Column(Integer, ForeignKey("meta_vars.vars_id"))
     history_id = Column(Integer, ForeignKey("meta_history.history_id"))
@@ -360,12 +411,18 @@ class ObsHistory(Base):
         String(64), nullable=False, server_default=literal_column("current_user")
     )
     deleted = Column(Boolean, default=False)
-    obs_raw_hx_id = Column(BigInteger, primary_key=True)
+    obs_raw_hx_id = Column(BigInteger, primary_key=True, autoincrement=True)
     meta_history_hx_id = Column(
         Integer, ForeignKey("meta_history_hx.meta_history_hx_id")
     )
     meta_vars_hx_id = Column(Integer, ForeignKey("meta_vars_hx.meta_vars_hx_id"))
 
+    __table_args__ = ({"postgresql_partition_by": "RANGE (mod_time)"},)
+    __mapper_args__ = {"primary_key": [obs_raw_hx_id]}
+
+
+add_default_partition(ObsHistory.__table__)
+
 
 class TimeBound(Base):
     """This class maps to a table which records the start and end times
@@ -382,6 +439,9 @@ class TimeBound(Base):
     end = Column(DateTime)
 
 
+orm_only_foreign_keys(TimeBound.__table__.c.obs_raw_id)
+
+
 class Variable(Base):
     """This class maps to the table which records the details of the
     physical quantities which are recorded by the weather stations.
@@ -554,3 +614,75 @@ class DerivedValue(Base):
             name="obs_derived_value_time_place_variable_unique",
         ),
     )
+
+
+class NetworkHistoryLatest(Base):
+    """This class maps to the table of the latest history id of each Network. It is
+    maintained by the history tracking triggers."""
+
+    __tablename__ = f"{hx_table_name('meta_network', schema=None)}_latest"
+
+    network_id = Column(Integer, primary_key=True, autoincrement=False)
+    meta_network_hx_id = Column(Integer, nullable=False)
+
+
+class StationHistoryLatest(Base):
+    """This class maps to the table of the latest history id of each Station. It is
+    maintained by the history tracking triggers."""
+
+    __tablename__ = f"{hx_table_name(Station.__tablename__, schema=None)}_latest"
+
+    station_id = Column(Integer, primary_key=True, autoincrement=False)
+    meta_station_hx_id = Column(Integer, nullable=False)
+
+
+class HistoryHistoryLatest(Base):
+    """This class maps to the table of the latest history id of each History. It is
+    maintained by the history tracking triggers."""
+
+    __tablename__ = f"{hx_table_name(History.__tablename__, schema=None)}_latest"
+
+    history_id = Column(Integer, primary_key=True, autoincrement=False)
+    meta_history_hx_id = Column(Integer, nullable=False)
+
+
+class VariableHistoryLatest(Base):
+    """This class maps to the table of the latest history id of each Variable. It
+    is maintained by the history tracking triggers."""
+
+    __tablename__ = f"{hx_table_name(Variable.__tablename__, schema=None)}_latest"
+
+    vars_id = Column(Integer, primary_key=True, autoincrement=False)
+    meta_vars_hx_id = Column(Integer, nullable=False)
+
+
+class MatviewRefreshLog(Base):
+    """This class maps to the table that records each refresh of a materialized
+    view (native or manual) made with the refresh commands of the matview classes
+    (see `pycds.alembic.extensions.replaceable_objects`). The latest refresh of
+    each matview, and whether it is stale, can be obtained with
+    `pycds.refresh_log`.
+    """
+
+    __tablename__ = "matview_refresh_log"
+
+    id = Column("matview_refresh_log_id", Integer, primary_key=True)
+    matview_name = Column(String, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    duration = Column(Interval, nullable=False)
+    # Number of rows written by the refresh; for a full refresh, the number of
+    # rows in the matview. Recorded for native matviews only on request.
+    row_count = Column(BigInteger)
+    # Modification time horizon of the sources when the refresh began: every
+    # modification of the sources that the refresh did not see is at or after it.
+    source_mod_time = Column(DateTime)
+    concurrently = Column(Boolean, nullable=False)
+    partial = Column(Boolean, nullable=False)
+
+
+Index(
+    "matview_refresh_log_matview_name_end_time_idx",
+    MatviewRefreshLog.matview_name,
+    MatviewRefreshLog.end_time,
+)
@@ -41,6 +41,11 @@ from .base import (
     NativeFlag,
     PCICFlag,
     DerivedValue,
+    MatviewRefreshLog,
+    NetworkHistoryLatest,
+    StationHistoryLatest,
+    HistoryHistoryLatest,
+    VariableHistoryLatest,
 )
 
 
@@ -0,0 +1,121 @@
+"""
+Define the statement-level trigger function that maintains the observation counts
+`obs_count_per_month_mv`.
+
+`obs_count_per_month_mv` (a manual matview, see
+`pycds.orm.manual_matviews.version_8a817c2a4e7a`) holds the number of observations
+in `obs_raw` for each `(history_id, vars_id, obs_month)`. It is kept current by
+``obs_count_per_month_ops``, called by AFTER ... FOR EACH STATEMENT triggers on
+``obs_raw``:
+
+* For an INSERT, the inserted rows are counted by key, and the counts are added to
+  the matview, creating rows for new keys.
+* For a DELETE, the deleted rows are counted by key, and the counts are subtracted
+  from the matview. Rows whose count falls to zero are removed.
+* For an UPDATE, only the net change per key is applied, so that updates that do not
+  change the history, variable or month of an observation (e.g., corrections to
+  `datum`) leave the matview untouched.
+
+Work is proportional to the number of rows affected by the statement.
+
+Notes:
+
+* As for the history tracking triggers, PostgreSQL does not allow a trigger with
+  transition tables to be fired by more than one kind of event; there is one trigger
+  each for INSERT, UPDATE, and DELETE.
+* Concurrent statements affecting the same key are serialized by the row lock taken
+  by ``INSERT ... ON CONFLICT DO UPDATE``.
+"""
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+from pycds.context import get_schema_name
+
+
+schema_name = get_schema_name()
+
+
+# SQL query: the counts of the observations in transition table `rows` by key,
+# multiplied by `sign`.
+def counts(rows, sign):
+    return f"""
+        SELECT
+            history_id,
+            vars_id,
+            date_trunc('month', obs_time) AS obs_month,
+            {sign} * count(*) AS count
+        FROM {rows}
+        WHERE history_id IS NOT NULL
+            AND vars_id IS NOT NULL
+            AND obs_time IS NOT NULL
+        GROUP BY 1, 2, 3
+    """
+
+
+# SQL query: the net change in counts by key made by an UPDATE. Keys whose count is
+# unchanged are omitted.
+net_counts = f"""
+    SELECT history_id, vars_id, obs_month, sum(count) AS count
+    FROM (
+        {counts("old_rows", -1)}
+        UNION ALL
+        {counts("new_rows", 1)}
+    ) AS changes
+    GROUP BY 1, 2, 3
+    HAVING sum(count) <> 0
+"""
+
+
+# SQL statement: add `changes` (a query with columns history_id, vars_id, obs_month
+# and count) to the counts in the matview, adding rows for new keys.
+def add_counts(changes):
+    return f"""
+        INSERT INTO {schema_name}.obs_count_per_month_mv AS m
+            (history_id, vars_id, obs_month, count)
+        {changes}
+        ON CONFLICT (history_id, vars_id, obs_month)
+            DO UPDATE SET count = m.count + excluded.count
+    """
+
+
+# SQL statement: remove the rows of the matview whose counts were reduced to zero by
+# `changes`.
+def remove_empty(changes):
+    return f"""
+        DELETE FROM {schema_name}.obs_count_per_month_mv AS m
+        USING ({changes}) AS c
+        WHERE c.count < 0
+            AND (m.history_id, m.vars_id, m.obs_month)
+                = (c.history_id, c.vars_id, c.obs_month)
+            AND m.count <= 0
+    """
+
+
+obs_count_per_month_ops = ReplaceableFunction(
+    """
+obs_count_per_month_ops()
+    """,
+    f"""
+    RETURNS trigger
+    LANGUAGE plpgsql
+    PARALLEL UNSAFE
+AS
+$BODY$
+    -- Maintains obs_count_per_month_mv for changes to obs_raw. Must be called by an
+    -- AFTER ... FOR EACH STATEMENT trigger that declares the transition table
+    -- new_rows (INSERT, UPDATE) and/or old_rows (DELETE, UPDATE).
+BEGIN
+    IF tg_op = 'INSERT' THEN
+        {add_counts(counts("new_rows", 1))};
+    ELSIF tg_op = 'DELETE' THEN
+        {add_counts(counts("old_rows", -1))};
+        {remove_empty(counts("old_rows", -1))};
+    ELSIF tg_op = 'UPDATE' THEN
+        {add_counts(net_counts)};
+        {remove_empty(net_counts)};
+    END IF;
+    RETURN NULL;
+END;
+$BODY$;
+    """,
+    schema=schema_name,
+)
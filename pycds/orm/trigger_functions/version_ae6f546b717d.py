@@ -0,0 +1,89 @@
+"""
+Define the statement-level trigger function that prevents observations that are
+still referenced from being deleted.
+
+Until version ae6f546b717d, the flag association tables ``obs_raw_native_flags`` and
+``obs_raw_pcic_flags``, and ``time_bounds``, had foreign keys referencing
+``obs_raw.obs_raw_id``, so that an observation could not be deleted (or its id
+changed) while any of their rows referred to it. A partitioned table cannot be
+referenced by a foreign key that does not include its partition key, so when
+``obs_raw`` was partitioned these foreign keys were dropped. In their place,
+``obs_raw_referenced_check`` is called by AFTER DELETE and AFTER UPDATE ... FOR EACH
+STATEMENT triggers on ``obs_raw``. It raises a foreign key violation, as the foreign
+keys did, if any observation deleted, or whose id was changed, by the statement is
+still referenced.
+
+Work is proportional to the number of rows affected by the statement: each is looked
+up in the indexes on ``obs_raw_id`` of the referencing tables.
+
+Notes:
+
+* As for the history tracking triggers, PostgreSQL does not allow a trigger with
+  transition tables to be fired by more than one kind of event; there is one trigger
+  each for DELETE and UPDATE.
+* Inserting a row referencing a nonexistent observation into one of the referencing
+  tables is not checked. (The foreign keys prevented it.)
+"""
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+from pycds.context import get_schema_name
+
+
+schema_name = get_schema_name()
+
+# Tables referencing obs_raw.obs_raw_id.
+referencing_tables = ("obs_raw_native_flags", "obs_raw_pcic_flags", "time_bounds")
+
+
+# SQL condition: the observation with id `obs_raw_id` is referenced.
+def is_referenced(obs_raw_id):
+    return " OR ".join(
+        f"EXISTS (SELECT 1 FROM {schema_name}.{table} AS r "
+        f"WHERE r.obs_raw_id = {obs_raw_id})"
+        for table in referencing_tables
+    )
+
+
+obs_raw_referenced_check = ReplaceableFunction(
+    """
+obs_raw_referenced_check()
+    """,
+    f"""
+    RETURNS trigger
+    LANGUAGE plpgsql
+    PARALLEL UNSAFE
+AS
+$BODY$
+    -- Raises an exception if an observation removed from obs_raw by the statement
+    -- is still referenced. Must be called by an AFTER ... FOR EACH STATEMENT trigger
+    -- that declares the transition table old_rows (DELETE, UPDATE) and new_rows
+    -- (UPDATE).
+DECLARE
+    v_obs_raw_id bigint;
+BEGIN
+    IF tg_op = 'DELETE' THEN
+        SELECT o.obs_raw_id INTO v_obs_raw_id
+        FROM old_rows AS o
+        WHERE {is_referenced("o.obs_raw_id")}
+        LIMIT 1;
+    ELSE
+        SELECT o.obs_raw_id INTO v_obs_raw_id
+        FROM old_rows AS o
+        WHERE NOT EXISTS (
+            SELECT 1 FROM new_rows AS n WHERE n.obs_raw_id = o.obs_raw_id
+        )
+        AND ({is_referenced("o.obs_raw_id")})
+        LIMIT 1;
+    END IF;
+    IF v_obs_raw_id IS NOT NULL THEN
+        RAISE EXCEPTION 'observation % is still referenced', v_obs_raw_id
+            USING
+                ERRCODE = 'foreign_key_violation',
+                DETAIL = 'Referenced by one of {", ".join(referencing_tables)}.';
+    END IF;
+    RETURN NULL;
+END;
+$BODY$;
+    """,
+    schema=schema_name,
+)
@@ -0,0 +1,190 @@
+"""
+Define the statement-level trigger function for change history tracking, using and
+maintaining the latest history id tables.
+
+The trigger function defined in version d7ade974ccde resolves each history foreign
+key by aggregating the foreign history table: for each foreign metadata id referred
+to in the statement, ``max(<foreign>_hx_id)`` over its history records. The latest
+history id table of a collection, ``<collection>_hx_latest``, maps each primary id
+of the collection to its latest history id, so that this becomes a primary key
+lookup.
+
+This version of the trigger function is the same as that of version d7ade974ccde,
+except:
+
+* If the collection whose history records are appended has a latest history id
+  table, the function upserts the latest history id of each item affected by the
+  statement into it, in the same statement that appends the history records. The
+  table is therefore always current.
+* Each history foreign key is resolved by a join to the latest history id table of
+  the foreign collection, if it has one, and otherwise, as before, by aggregating
+  the foreign history table.
+
+Notes:
+
+* The presence of a latest history id table is determined by name, when the trigger
+  function is called. No trigger arguments are added.
+* The name of the primary id of the collection is taken from the primary key of its
+  latest history id table.
+* Deletions are recorded in the history table, so the latest history id of a deleted
+  item is that of the history record of its deletion, as with ``max()``.
+"""
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+from pycds.context import get_schema_name
+
+
+schema_name = get_schema_name()
+
+
+hxtk_primary_stmt_ops_to_hx = ReplaceableFunction(
+    """
+hxtk_primary_stmt_ops_to_hx()
+    """,
+    f"""
+-- CREATE OR REPLACE FUNCTION hxtk_primary_stmt_ops_to_hx()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    PARALLEL UNSAFE
+AS
+$BODY$
+    -- This trigger function inserts new records into the corresponding history table
+    -- for all rows affected by an insert, update or delete statement on a primary
+    -- table, and updates the latest history id table of the primary table, if any.
+    -- It must be called by an AFTER ... FOR EACH STATEMENT trigger that declares the
+    -- transition table new_rows (INSERT, UPDATE) or old_rows (DELETE).
+DECLARE
+    -- Trigger function arguments
+    foreign_keys text[][] := tg_argv[0];
+
+    -- Values from special variables
+    this_schema_name text := tg_table_schema;
+    this_collection_name text := tg_table_name;
+
+    -- Other values
+    this_history_table_name text := hxtk_hx_table_name(this_collection_name);
+    this_history_id_name text := hxtk_hx_id_name(this_collection_name);
+    this_history_id_seq text := pg_get_serial_sequence(
+        format('%I.%I', this_schema_name, this_history_table_name),
+        this_history_id_name
+    );
+    this_latest_table regclass := to_regclass(
+        format('%I.%I', this_schema_name, this_history_table_name || '_latest')
+    );
+    this_id_name text;
+    transition_table_name text;
+    deleted boolean;
+    item_expr text;
+    insert_stmt text;
+
+    fk_item text[];
+    fk_metadata_collection_name text;
+    fk_metadata_id_name text;
+    fk_latest_table regclass;
+    fk_index integer := 0;
+    fk_values text := '';
+    fk_joins text := '';
+BEGIN
+    IF tg_op = 'DELETE' THEN
+        transition_table_name := 'old_rows';
+        deleted := TRUE;
+        -- Deletions are recorded with the time and user of the deletion.
+        item_expr := 'tt #= hstore(' ||
+            'ARRAY[''mod_time'', ''mod_user''], ' ||
+            'ARRAY[localtimestamp::text, current_user::text])';
+    ELSE
+        -- mod_time, mod_user maintained in hxtk_primary_control_hx_cols
+        transition_table_name := 'new_rows';
+        deleted := FALSE;
+        item_expr := 'tt';
+    END IF;
+
+    -- Build a join for each foreign key, selecting the most recent foreign metadata
+    -- history id for each foreign metadata id referred to in this statement.
+    IF foreign_keys IS NOT NULL THEN
+        FOREACH fk_item SLICE 1 IN ARRAY foreign_keys
+            LOOP
+                fk_index := fk_index + 1;
+                fk_metadata_collection_name := fk_item[1];
+                fk_metadata_id_name := fk_item[2];
+                fk_values := fk_values || format(', fk%s.hx_id', fk_index);
+                fk_latest_table := to_regclass(format(
+                    '%I.%I',
+                    this_schema_name,
+                    hxtk_hx_table_name(fk_metadata_collection_name) || '_latest'
+                ));
+                IF fk_latest_table IS NOT NULL THEN
+                    fk_joins := fk_joins || format(
+                        ' LEFT JOIN (' ||
+                            'SELECT %1$I, %2$I AS hx_id FROM %3$s' ||
+                        ') fk%4$s ON fk%4$s.%1$I = (items.item).%1$I',
+                        fk_metadata_id_name,
+                        hxtk_hx_id_name(fk_metadata_collection_name),
+                        fk_latest_table,
+                        fk_index
+                    );
+                ELSE
+                    fk_joins := fk_joins || format(
+                        ' LEFT JOIN (' ||
+                            'SELECT %1$I, max(%2$I) AS hx_id ' ||
+                            'FROM %3$I.%4$I ' ||
+                            'WHERE %1$I IN (SELECT %1$I FROM %5$I) ' ||
+                            'GROUP BY %1$I' ||
+                        ') fk%6$s ON fk%6$s.%1$I = (items.item).%1$I',
+                        fk_metadata_id_name,
+                        hxtk_hx_id_name(fk_metadata_collection_name),
+                        this_schema_name,
+                        hxtk_hx_table_name(fk_metadata_collection_name),
+                        transition_table_name,
+                        fk_index
+                    );
+                END IF;
+            END LOOP;
+    END IF;
+
+    insert_stmt := format(
+        'INSERT INTO %1$I.%2$I ' ||
+        'SELECT (items.item).*, $1, nextval(%3$L::regclass)%4$s ' ||
+        'FROM (' ||
+            'SELECT %5$s AS item, row_number() OVER () AS ordinal FROM %6$I tt' ||
+        ') items%7$s ' ||
+        'ORDER BY items.ordinal',
+        this_schema_name,
+        this_history_table_name,
+        this_history_id_seq,
+        fk_values,
+        item_expr,
+        transition_table_name,
+        fk_joins
+    );
+
+    IF this_latest_table IS NULL THEN
+        EXECUTE insert_stmt USING deleted;
+    ELSE
+        SELECT attname INTO this_id_name
+        FROM pg_index
+            JOIN pg_attribute
+                ON attrelid = indrelid AND attnum = ANY(indkey)
+        WHERE indrelid = this_latest_table
+            AND indisprimary
+            AND attname <> this_history_id_name;
+
+        EXECUTE format(
+            'WITH inserted AS (%1$s RETURNING %2$I, %3$I) ' ||
+            'INSERT INTO %4$s (%2$I, %3$I) ' ||
+            'SELECT %2$I, max(%3$I) FROM inserted GROUP BY %2$I ' ||
+            'ON CONFLICT (%2$I) DO UPDATE SET %3$I = excluded.%3$I',
+            insert_stmt,
+            this_id_name,
+            this_history_id_name,
+            this_latest_table
+        ) USING deleted;
+    END IF;
+
+    RETURN NULL;  -- Ignored in an AFTER trigger
+END;
+$BODY$
+    """,
+    schema=schema_name,
+    replace=True,
+)
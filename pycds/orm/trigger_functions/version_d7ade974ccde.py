@@ -0,0 +1,142 @@
+"""
+Define statement-level trigger function for change history tracking.
+
+The row-level trigger functions defined in version 7ab87f8fbcf4 append one history
+record per primary table row, using a dynamically constructed statement, and then
+resolve each history foreign key with a further query per row
+(``hxtk_add_foreign_hx_keys``). For bulk operations on large tables (notably
+``obs_raw``), this per-row work dominates the cost of the operation.
+
+The trigger function defined here does the same job once per statement. It is
+called by AFTER ... FOR EACH STATEMENT triggers that declare a transition table
+(``REFERENCING NEW TABLE AS new_rows`` for INSERT and UPDATE, ``REFERENCING OLD
+TABLE AS old_rows`` for DELETE). It appends all history records for the statement
+with a single INSERT ... SELECT, in which each history foreign key is resolved with
+one set-based join against the corresponding history table. The history table
+therefore needs no trigger of its own.
+
+Notes:
+
+* PostgreSQL does not allow a trigger with transition tables to be fired by more than
+  one kind of event. Three triggers, one each for INSERT, UPDATE, and DELETE, call
+  this function.
+* The row-level BEFORE trigger function ``hxtk_primary_control_hx_cols``, which sets
+  ``mod_time`` and ``mod_user``, is still required. It is cheap, and a statement-level
+  trigger cannot modify rows.
+* History records are appended in the order in which the statement processed the
+  primary table rows, as the row-level triggers do.
+* Trigger arguments: ``tg_argv[0]``, if present, specifies the foreign keys in the
+  same format as for ``hxtk_add_foreign_hx_keys``, namely an array (in order of FK
+  occurrence in the history table) of ``array[foreign_collection_name,
+  foreign_metadata_id]``.
+"""
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+from pycds.context import get_schema_name
+
+
+schema_name = get_schema_name()
+
+
+hxtk_primary_stmt_ops_to_hx = ReplaceableFunction(
+    """
+hxtk_primary_stmt_ops_to_hx()
+    """,
+    f"""
+-- CREATE OR REPLACE FUNCTION hxtk_primary_stmt_ops_to_hx()
+    RETURNS trigger
+    LANGUAGE plpgsql
+    PARALLEL UNSAFE
+AS
+$BODY$
+    -- This trigger function inserts new records into the corresponding history table
+    -- for all rows affected by an insert, update or delete statement on a primary
+    -- table. It must be called by an AFTER ... FOR EACH STATEMENT trigger that
+    -- declares the transition table new_rows (INSERT, UPDATE) or old_rows (DELETE).
+DECLARE
+    -- Trigger function arguments
+    foreign_keys text[][] := tg_argv[0];
+
+    -- Values from special variables
+    this_schema_name text := tg_table_schema;
+    this_collection_name text := tg_table_name;
+
+    -- Other values
+    this_history_table_name text := hxtk_hx_table_name(this_collection_name);
+    this_history_id_seq text := pg_get_serial_sequence(
+        format('%I.%I', this_schema_name, this_history_table_name),
+        hxtk_hx_id_name(this_collection_name)
+    );
+    transition_table_name text;
+    deleted boolean;
+    item_expr text;
+
+    fk_item text[];
+    fk_metadata_collection_name text;
+    fk_metadata_id_name text;
+    fk_index integer := 0;
+    fk_values text := '';
+    fk_joins text := '';
+BEGIN
+    IF tg_op = 'DELETE' THEN
+        transition_table_name := 'old_rows';
+        deleted := TRUE;
+        -- Deletions are recorded with the time and user of the deletion.
+        item_expr := 'tt #= hstore(' ||
+            'ARRAY[''mod_time'', ''mod_user''], ' ||
+            'ARRAY[localtimestamp::text, current_user::text])';
+    ELSE
+        -- mod_time, mod_user maintained in hxtk_primary_control_hx_cols
+        transition_table_name := 'new_rows';
+        deleted := FALSE;
+        item_expr := 'tt';
+    END IF;
+
+    -- Build a join for each foreign key, selecting the most recent foreign metadata
+    -- history id for each foreign metadata id referred to in this statement.
+    IF foreign_keys IS NOT NULL THEN
+        FOREACH fk_item SLICE 1 IN ARRAY foreign_keys
+            LOOP
+                fk_index := fk_index + 1;
+                fk_metadata_collection_name := fk_item[1];
+                fk_metadata_id_name := fk_item[2];
+                fk_values := fk_values || format(', fk%s.hx_id', fk_index);
+                fk_joins := fk_joins || format(
+                    ' LEFT JOIN (' ||
+                        'SELECT %1$I, max(%2$I) AS hx_id ' ||
+                        'FROM %3$I.%4$I ' ||
+                        'WHERE %1$I IN (SELECT %1$I FROM %5$I) ' ||
+                        'GROUP BY %1$I' ||
+                    ') fk%6$s ON fk%6$s.%1$I = (items.item).%1$I',
+                    fk_metadata_id_name,
+                    hxtk_hx_id_name(fk_metadata_collection_name),
+                    this_schema_name,
+                    hxtk_hx_table_name(fk_metadata_collection_name),
+                    transition_table_name,
+                    fk_index
+                );
+            END LOOP;
+    END IF;
+
+    EXECUTE format(
+        'INSERT INTO %1$I.%2$I ' ||
+        'SELECT (items.item).*, $1, nextval(%3$L::regclass)%4$s ' ||
+        'FROM (' ||
+            'SELECT %5$s AS item, row_number() OVER () AS ordinal FROM %6$I tt' ||
+        ') items%7$s ' ||
+        'ORDER BY items.ordinal',
+        this_schema_name,
+        this_history_table_name,
+        this_history_id_seq,
+        fk_values,
+        item_expr,
+        transition_table_name,
+        fk_joins
+    ) USING deleted;
+
+    RETURN NULL;  -- Ignored in an AFTER trigger
+END;
+$BODY$
+    """,
+    schema=schema_name,
+)
@@ -0,0 +1,161 @@
+"""
+Define statement-level trigger functions that maintain the table of discarded
+observations, `discarded_obs_raw_mv`.
+
+An observation is discarded if it has any native or PCIC flag whose `discard` is
+true. In version f6d5a4c2e901, the set of discarded observation ids was a native
+matview, which could only be brought up to date by a full refresh, grouping all of
+`obs_raw` against both flag association tables. It is now a table (a manual matview,
+see `pycds.orm.manual_matviews.version_fd52f31bc576`) with the same name and column,
+kept current by these trigger functions:
+
+* ``discarded_obs_raw_assoc_ops`` is called by AFTER ... FOR EACH STATEMENT triggers
+  on the flag association tables ``obs_raw_native_flags`` and ``obs_raw_pcic_flags``.
+  Observations that gain a discarding flag are added. Observations that lose one are
+  removed, unless they still have another discarding flag (native or PCIC).
+
+* ``discarded_obs_raw_flag_ops`` is called by an AFTER UPDATE ... FOR EACH STATEMENT
+  trigger on each flag table, ``meta_native_flag`` and ``meta_pcic_flag``. When the
+  ``discard`` value of a flag changes, the observations having that flag are added or
+  removed as above. (A flag cannot be deleted while observations refer to it, and a
+  new flag has no observations, so only updates matter.)
+
+Work is proportional to the number of association rows affected by the statement,
+except that changing the ``discard`` value of a flag scans the association table for
+that flag's observations.
+
+Notes:
+
+* As for the history tracking triggers, PostgreSQL does not allow a trigger with
+  transition tables to be fired by more than one kind of event; each association
+  table has one trigger each for INSERT, UPDATE, and DELETE.
+* Trigger arguments: ``tg_argv[0]`` is the name of the flag table, and ``tg_argv[1]``
+  the name of its id column, e.g., ``'meta_native_flag', 'native_flag_id'``. For the
+  trigger on a flag table, ``tg_argv[0]`` is the name of the association table.
+* Observations are not removed from ``discarded_obs_raw_mv`` when they are deleted
+  from ``obs_raw``. Their ids are never reused, so the only effect is that the table
+  may hold ids that no longer match any observation. A full refresh removes them.
+"""
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableFunction
+from pycds.context import get_schema_name
+
+
+schema_name = get_schema_name()
+
+
+# SQL condition: the observation with id `obs_raw_id` has a discarding flag.
+def is_discarded(obs_raw_id):
+    return f"""(
+        EXISTS (
+            SELECT 1
+            FROM {schema_name}.obs_raw_native_flags AS nf
+            JOIN {schema_name}.meta_native_flag AS f
+                ON f.native_flag_id = nf.native_flag_id
+            WHERE nf.obs_raw_id = {obs_raw_id} AND f.discard
+        )
+        OR EXISTS (
+            SELECT 1
+            FROM {schema_name}.obs_raw_pcic_flags AS pf
+            JOIN {schema_name}.meta_pcic_flag AS f
+                ON f.pcic_flag_id = pf.pcic_flag_id
+            WHERE pf.obs_raw_id = {obs_raw_id} AND f.discard
+        )
+    )"""
+
+
+# SQL statement: remove the observations selected by `candidates` (a subquery with
+# column `obs_raw_id`) from the discarded set, unless they are still discarded.
+def remove_undiscarded(candidates):
+    return f"""
+        DELETE FROM {schema_name}.discarded_obs_raw_mv AS d
+        USING ({candidates}) AS c
+        WHERE d.obs_raw_id = c.obs_raw_id AND NOT {is_discarded("d.obs_raw_id")}
+    """
+
+
+discarded_obs_raw_assoc_ops = ReplaceableFunction(
+    """
+discarded_obs_raw_assoc_ops()
+    """,
+    f"""
+    RETURNS trigger
+    LANGUAGE plpgsql
+    PARALLEL UNSAFE
+AS
+$BODY$
+    -- Maintains discarded_obs_raw_mv for changes to a flag association table. Must
+    -- be called by an AFTER ... FOR EACH STATEMENT trigger that declares the
+    -- transition table new_rows (INSERT, UPDATE) and/or old_rows (DELETE, UPDATE).
+DECLARE
+    -- Trigger function arguments
+    flag_table_name text := tg_argv[0];
+    flag_id_name text := tg_argv[1];
+BEGIN
+    IF tg_op IN ('DELETE', 'UPDATE') THEN
+        {remove_undiscarded("SELECT DISTINCT obs_raw_id FROM old_rows")};
+    END IF;
+    IF tg_op IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format(
+            'INSERT INTO {schema_name}.discarded_obs_raw_mv (obs_raw_id) '
+            'SELECT DISTINCT new_rows.obs_raw_id '
+            'FROM new_rows JOIN {schema_name}.%1$I AS f USING (%2$I) '
+            'WHERE f.discard '
+            'ON CONFLICT DO NOTHING',
+            flag_table_name,
+            flag_id_name
+        );
+    END IF;
+    RETURN NULL;
+END;
+$BODY$;
+    """,
+    schema=schema_name,
+)
+
+
+discarded_obs_raw_flag_ops = ReplaceableFunction(
+    """
+discarded_obs_raw_flag_ops()
+    """,
+    f"""
+    RETURNS trigger
+    LANGUAGE plpgsql
+    PARALLEL UNSAFE
+AS
+$BODY$
+    -- Maintains discarded_obs_raw_mv for changes to the discard value of flags.
+    -- Must be called by an AFTER UPDATE ... FOR EACH STATEMENT trigger on a flag
+    -- table that declares the transition tables old_rows and new_rows.
+DECLARE
+    -- Trigger function arguments
+    assoc_table_name text := tg_argv[0];
+    flag_id_name text := tg_argv[1];
+
+    -- Query selecting the observations having a flag whose discard value changed.
+    -- Its two %%L placeholders are the old and new discard values.
+    changed_obs text := format(
+        'SELECT DISTINCT a.obs_raw_id '
+        'FROM new_rows JOIN old_rows USING (%2$I) '
+        'JOIN {schema_name}.%1$I AS a USING (%2$I) '
+        'WHERE coalesce(old_rows.discard, false) = %%L '
+        'AND coalesce(new_rows.discard, false) = %%L',
+        assoc_table_name,
+        flag_id_name
+    );
+BEGIN
+    EXECUTE format(
+        'INSERT INTO {schema_name}.discarded_obs_raw_mv (obs_raw_id) %s '
+        'ON CONFLICT DO NOTHING',
+        format(changed_obs, false, true)
+    );
+    EXECUTE format(
+        $$ {remove_undiscarded("%s")} $$,
+        format(changed_obs, true, false)
+    );
+    RETURN NULL;
+END;
+$BODY$;
+    """,
+    schema=schema_name,
+)
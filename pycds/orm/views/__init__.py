@@ -19,11 +19,20 @@ As migrations that modify views are added, this file should be updated to
 export the latest version. When a PyCDS release is created, it will "freeze"
 this set of views. Following any PyCDS release, further migrations and further
 releases will "freeze" later sets of views.
+
+Each view is imported from its version module on first use (see `pycds.lazy`), so
+that using one view does not construct the definitions of all the others.
 """
 
-from .version_6cb393f711c3 import CrmpNetworkGeoserver
-from .version_84b7fc2596d5 import HistoryStationNetwork
-from .version_84b7fc2596d5 import ObsCountPerDayHistory
-from .version_84b7fc2596d5 import ObsWithFlags
-from .version_22819129a609 import CollapsedVariables
-from .version_bb2a222a1d4a import ObsCountPerMonthHistory
+from pycds.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "HistoryStationNetwork": ".version_84b7fc2596d5",
+        "ObsWithFlags": ".version_84b7fc2596d5",
+        "CollapsedVariables": ".version_22819129a609",
+        "ObsCountPerMonthHistory": ".version_8a817c2a4e7a",
+        "ClimoObsCount": ".version_8a817c2a4e7a",
+    },
+)
@@ -0,0 +1,83 @@
+"""
+Observation count views over the trigger-maintained counts `obs_count_per_month_mv`.
+
+`ObsCountPerMonthHistory` and `ClimoObsCount` were native matviews (see
+`pycds.orm.native_matviews.version_bb2a222a1d4a` and `version_96729d6db8b3`), each
+computed by a full `GROUP BY` scan of `obs_raw` and therefore only as current as
+their last (lengthy) refresh. They are now views with the same names and columns,
+which sum the per-variable monthly counts in manual matview `ObsCountPerMonth`.
+Those counts are maintained by triggers on `obs_raw`, so these views are always
+current and never need refreshing. Since `ObsCountPerMonth` is much smaller than
+`obs_raw`, they remain cheap to query.
+"""
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    cast,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import array
+
+from pycds.alembic.extensions.replaceable_objects import ReplaceableView
+from pycds.orm.manual_matviews.version_8a817c2a4e7a import ObsCountPerMonth
+from pycds.orm.tables import Variable
+from pycds.orm.view_base import make_declarative_base
+from pycds.util import variable_tags
+
+
+Base = make_declarative_base()
+
+
+class ObsCountPerMonthHistory(Base, ReplaceableView):
+    """
+    This view is required for web app performance. It is used for approximating the
+    number of observations which will be returned by station selection criteria.
+    """
+
+    __tablename__ = "obs_count_per_month_history_mv"
+
+    count = Column(BigInteger)
+    date_trunc = Column(DateTime, primary_key=True)
+    history_id = Column(
+        Integer, ForeignKey("meta_history.history_id"), primary_key=True
+    )
+
+    __selectable__ = (
+        select(
+            cast(func.sum(ObsCountPerMonth.count), BigInteger).label("count"),
+            ObsCountPerMonth.obs_month.label("date_trunc"),
+            ObsCountPerMonth.history_id.label("history_id"),
+        )
+        .select_from(ObsCountPerMonth)
+        .group_by(ObsCountPerMonth.obs_month, ObsCountPerMonth.history_id)
+    )
+
+
+class ClimoObsCount(Base, ReplaceableView):
+    """
+    This view is required for web app performance. It is used to approximate the
+    number of climatologies which will be returned by station selection criteria.
+    """
+
+    __tablename__ = "climo_obs_count_mv"
+
+    count = Column(BigInteger)
+    history_id = Column(
+        Integer, ForeignKey("meta_history.history_id"), primary_key=True
+    )
+
+    __selectable__ = (
+        select(
+            cast(func.sum(ObsCountPerMonth.count), BigInteger).label("count"),
+            ObsCountPerMonth.history_id.label("history_id"),
+        )
+        .select_from(ObsCountPerMonth)
+        .join(Variable, Variable.id == ObsCountPerMonth.vars_id)
+        .where(variable_tags(Variable).contains(array(["climatology"])))
+        .group_by(ObsCountPerMonth.history_id)
+    )
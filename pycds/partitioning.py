@@ -0,0 +1,287 @@
+"""
+Management of the time-range partitions of partitioned tables.
+
+Table `obs_raw` is partitioned by range on `obs_time`, and its history table
+`obs_raw_hx` is partitioned by range on `mod_time` (see `partition_keys`). Each
+partitioned table has a default partition, which receives any row not covered by
+another partition, and any number of range partitions, each covering a whole year or
+a whole month. Range partitions are named after the period they cover, e.g.,
+`obs_raw_y2020` (yearly) or `obs_raw_y2020m03` (monthly); the default partition is
+named, e.g., `obs_raw_default`.
+
+Queries and matview definitions that restrict the partition key to a time range scan
+only the partitions that overlap that range, and index maintenance on insert is
+confined to the partition receiving the row. To keep the default partition small,
+partitions should be created ahead of the data that will go into them; for example,
+a periodic job can run
+
+    create_partitions(sesh, "obs_raw", now, now + one_year, interval="month")
+
+Creating a partition for a range that already has rows in the default partition is
+supported: those rows are moved into the new partition, without firing any triggers.
+
+Functions in this module take an `executor`, which is a SQLAlchemy session or
+connection. All operations take place in the executor's current transaction; it is
+the caller's responsibility to commit.
+"""
+
+import datetime
+import logging
+
+from sqlalchemy import text
+
+from pycds.context import get_schema_name
+
+logger = logging.getLogger(__name__)
+
+
+# Partitioned tables and their partition keys.
+partition_keys = {
+    "obs_raw": "obs_time",
+    "obs_raw_hx": "mod_time",
+}
+
+intervals = ("year", "month")
+
+
+def _check_interval(interval):
+    if interval not in intervals:
+        raise ValueError(
+            f"Invalid partition interval: '{interval}'. "
+            f"Must be one of {', '.join(intervals)}"
+        )
+
+
+def period_start(t, interval="year"):
+    """Return the start of the period (year or month) containing `t`."""
+    _check_interval(interval)
+    if interval == "year":
+        return datetime.datetime(t.year, 1, 1)
+    return datetime.datetime(t.year, t.month, 1)
+
+
+def next_period_start(t, interval="year"):
+    """Return the start of the period (year or month) following the one containing
+    `t`."""
+    start = period_start(t, interval)
+    if interval == "year":
+        return start.replace(year=start.year + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_ranges(start, end, interval="year"):
+    """Return a list of the `(lower, upper)` bounds of the partitions, each covering a
+    single period, that together cover all times from `start` to `end` inclusive.
+    Lower bounds are inclusive and upper bounds exclusive, as for a range partition.
+    """
+    ranges = []
+    lower = period_start(start, interval)
+    while lower <= end:
+        upper = next_period_start(lower, interval)
+        ranges.append((lower, upper))
+        lower = upper
+    return ranges
+
+
+def partition_name(table_name, lower, interval="year"):
+    """Return the name of the partition of `table_name` covering the period
+    starting at `lower`."""
+    _check_interval(interval)
+    if interval == "year":
+        return f"{table_name}_y{lower.year:04d}"
+    return f"{table_name}_y{lower.year:04d}m{lower.month:02d}"
+
+
+def default_partition_name(table_name):
+    """Return the name of the default partition of `table_name`."""
+    return f"{table_name}_default"
+
+
+def _literal(t):
+    return f"'{t.isoformat(sep=' ')}'"
+
+
+def get_partitions(executor, table_name, schema_name=None):
+    """Return a list of the names and bounds of the partitions of a table, ordered
+    by name. Bounds are expressed as in SQL, e.g., `FOR VALUES FROM (...) TO (...)`
+    or `DEFAULT`.
+
+    :param executor: (sqlalchemy.orm.session.Session or
+        sqlalchemy.engine.Connection) database session or connection
+    :param table_name: (str) name of the partitioned table
+    :param schema_name: (str) schema name; default is the PyCDS schema name
+    :return: (list) of `(name, bound)` tuples
+    """
+    schema_name = schema_name or get_schema_name()
+    return [
+        tuple(row)
+        for row in executor.execute(
+            text(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+                WHERE ns.nspname = :schema_name AND parent.relname = :table_name
+                ORDER BY child.relname
+                """
+            ),
+            {"schema_name": schema_name, "table_name": table_name},
+        )
+    ]
+
+
+def create_default_partition(executor, table_name, schema_name=None):
+    """Create the default partition of a partitioned table, if it does not already
+    exist.
+
+    :param executor: (sqlalchemy.orm.session.Session or
+        sqlalchemy.engine.Connection) database session or connection
+    :param table_name: (str) name of the partitioned table
+    :param schema_name: (str) schema name; default is the PyCDS schema name
+    :return: (str) name of the default partition
+    """
+    schema_name = schema_name or get_schema_name()
+    name = default_partition_name(table_name)
+    executor.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {schema_name}.{name} "
+            f"PARTITION OF {schema_name}.{table_name} DEFAULT"
+        )
+    )
+    return name
+
+
+def create_partition(executor, table_name, lower, upper, name=None, schema_name=None):
+    """Create a partition of a partitioned table covering the time range from
+    `lower` (inclusive) to `upper` (exclusive).
+
+    If the default partition contains rows in that range, they are moved into the new
+    partition. To do this without firing the triggers on the partitioned table, the
+    default partition is briefly detached. This requires an exclusive lock on the
+    partitioned table for the duration of the transaction.
+
+    :param executor: (sqlalchemy.orm.session.Session or
+        sqlalchemy.engine.Connection) database session or connection
+    :param table_name: (str) name of the partitioned table
+    :param lower: (datetime.datetime) lower bound of the partition
+    :param upper: (datetime.datetime) upper bound of the partition
+    :param name: (str) name of the partition; default is the name of a yearly
+        partition starting at `lower`
+    :param schema_name: (str) schema name; default is the PyCDS schema name
+    :return: (str) name of the partition
+    """
+    schema_name = schema_name or get_schema_name()
+    name = name or partition_name(table_name, lower)
+    key = partition_keys[table_name]
+    table = f"{schema_name}.{table_name}"
+    partition = f"{schema_name}.{name}"
+    bounds = f"FOR VALUES FROM ({_literal(lower)}) TO ({_literal(upper)})"
+    in_range = f"{key} >= {_literal(lower)} AND {key} < {_literal(upper)}"
+
+    default_name = default_partition_name(table_name)
+    has_default = any(
+        p == default_name for p, _ in get_partitions(executor, table_name, schema_name)
+    )
+    if has_default:
+        default_partition = f"{schema_name}.{default_name}"
+        has_default_rows = executor.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default_partition} WHERE {in_range})")
+        ).scalar()
+    else:
+        has_default_rows = False
+
+    if not has_default_rows:
+        logger.debug(f"Creating partition {partition}")
+        executor.execute(
+            text(f"CREATE TABLE {partition} PARTITION OF {table} {bounds}")
+        )
+        return name
+
+    logger.info(f"Creating partition {partition} from rows of {default_partition}")
+    executor.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default_partition}"))
+    executor.execute(
+        text(
+            f"CREATE TABLE {partition} "
+            f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)"
+        )
+    )
+    executor.execute(
+        text(
+            f"WITH moved AS ("
+            f"  DELETE FROM {default_partition} WHERE {in_range} RETURNING *"
+            f") "
+            f"INSERT INTO {partition} SELECT * FROM moved"
+        )
+    )
+    executor.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {partition} {bounds}"))
+    executor.execute(
+        text(f"ALTER TABLE {table} ATTACH PARTITION {default_partition} DEFAULT")
+    )
+    return name
+
+
+def create_partitions(
+    executor, table_name, start, end, interval="year", schema_name=None
+):
+    """Create any missing partitions, each covering a single period, of a partitioned
+    table, so that all times from `start` to `end` inclusive are covered.
+
+    Periods for which a partition of the same name already exists are skipped. This
+    makes the function safe to run repeatedly, e.g., to create partitions ahead of
+    the data. Yearly and monthly partitions should not be mixed over the same periods;
+    PostgreSQL rejects overlapping partitions.
+
+    :param executor: (sqlalchemy.orm.session.Session or
+        sqlalchemy.engine.Connection) database session or connection
+    :param table_name: (str) name of the partitioned table
+    :param start: (datetime.datetime) start of time range to cover
+    :param end: (datetime.datetime) end of time range to cover
+    :param interval: (str) period covered by each partition, "year" or "month"
+    :param schema_name: (str) schema name; default is the PyCDS schema name
+    :return: (list) names of the partitions created
+    """
+    existing = {name for name, _ in get_partitions(executor, table_name, schema_name)}
+    created = []
+    for lower, upper in partition_ranges(start, end, interval):
+        name = partition_name(table_name, lower, interval)
+        if name in existing:
+            continue
+        create_partition(
+            executor, table_name, lower, upper, name=name, schema_name=schema_name
+        )
+        created.append(name)
+    return created
+
+
+def attach_partition(executor, table_name, name, lower, upper, schema_name=None):
+    """Attach an existing table as the partition of a partitioned table covering the
+    time range from `lower` (inclusive) to `upper` (exclusive).
+
+    This is useful for loading large amounts of data: a table can be created like the
+    partitioned table, loaded and indexed independently of it, and then attached.
+    Attaching scans the table to verify that all its rows are in range, unless it has
+    a CHECK constraint proving so. The default partition is also scanned, and must not
+    contain rows in the range.
+
+    :param executor: (sqlalchemy.orm.session.Session or
+        sqlalchemy.engine.Connection) database session or connection
+    :param table_name: (str) name of the partitioned table
+    :param name: (str) name of the table to attach
+    :param lower: (datetime.datetime) lower bound of the partition
+    :param upper: (datetime.datetime) upper bound of the partition
+    :param schema_name: (str) schema name; default is the PyCDS schema name
+    :return: (str) name of the partition
+    """
+    schema_name = schema_name or get_schema_name()
+    executor.execute(
+        text(
+            f"ALTER TABLE {schema_name}.{table_name} "
+            f"ATTACH PARTITION {schema_name}.{name} "
+            f"FOR VALUES FROM ({_literal(lower)}) TO ({_literal(upper)})"
+        )
+    )
+    return name
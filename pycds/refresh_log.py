@@ -0,0 +1,148 @@
+"""
+Refresh log of materialized views: when each matview was last refreshed, and
+whether it is stale.
+
+The refresh commands of native and manual matviews (`refresh`,
+`refresh_incremental`) record each refresh in table `matview_refresh_log` (ORM class
+`MatviewRefreshLog`). By default the only source of a matview is table `obs_raw`,
+whose latest modification time is its latest `mod_time`. A matview class can specify
+other source tables, and source matviews, whose latest modification time is the end
+of their latest logged refresh (see `RefreshLogging`).
+
+Modification times are the start times of the modifying transactions, and so are
+not in commit order: a transaction that began before a refresh but committed after
+it can have an earlier modification time than those the refresh saw. Each refresh
+therefore records, as `source_mod_time`, a horizon rather than the latest
+modification time it saw: the start of the oldest transaction in progress when it
+began, or its own start if that is earlier. Every source modification the refresh
+did not see has a modification time at or after the horizon (see
+`pycds.sqlalchemy.ddl_extensions.materialized_view.source_horizon_query`).
+
+A matview is stale if it has never been refreshed, or if the current latest
+modification time of its sources is at or after the horizon of its latest refresh.
+This is conservative: a matview can be reported stale when it is not, if
+transactions were in progress while it was refreshed (including the refreshes of
+other matviews, and sessions left idle in a transaction), but not the reverse.
+The horizon requires the refreshing role to see the activity of all sessions (as a
+superuser or a member of `pg_read_all_stats`); if it cannot, the matview is always
+reported stale. Schedulers can use staleness to skip refreshes that would change
+nothing, and applications can use the logged times to show how fresh the data is.
+
+Deletions do not change the latest modification time of a table, so a matview is
+not regarded as stale when observations have only been deleted. (A history table,
+e.g. `meta_history_hx`, records deletions, and so avoids this.)
+
+Typical usage:
+
+    for status in matview_status(sesh, all_matviews):
+        print(status.matview_name, status.stale, status.last_refresh.end_time)
+
+    refresh_matviews(engine, stale_matviews(sesh, all_matviews))
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import select, text
+
+from pycds.orm.tables import MatviewRefreshLog
+from pycds.sqlalchemy.ddl_extensions.materialized_view import source_mod_time_query
+
+
+MatviewStatus = namedtuple(
+    "MatviewStatus",
+    "matview matview_name last_refresh current_source_mod_time stale",
+)
+MatviewStatus.__doc__ = """Refresh status of a matview.
+
+- `matview`: the matview class
+- `matview_name`: its name, as recorded in the refresh log
+- `last_refresh`: its latest refresh (`MatviewRefreshLog`), or None if never
+  refreshed
+- `current_source_mod_time`: current latest modification time of its sources
+- `stale`: whether it is stale
+"""
+
+
+def latest_refreshes(sesh, matview_names=None):
+    """Return the latest refresh of each matview in the refresh log.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param matview_names: (list) names of the matviews; default all
+    :return: (dict) `MatviewRefreshLog` by matview name
+    """
+    q = (
+        select(MatviewRefreshLog)
+        .distinct(MatviewRefreshLog.matview_name)
+        .order_by(MatviewRefreshLog.matview_name, MatviewRefreshLog.end_time.desc())
+    )
+    if matview_names is not None:
+        q = q.where(MatviewRefreshLog.matview_name.in_(matview_names))
+    return {refresh.matview_name: refresh for refresh in sesh.scalars(q)}
+
+
+def _source_mod_time_query(matview):
+    options = matview.refresh_log_options(True)
+    return source_mod_time_query(
+        options["source_tables"], options["source_matviews"], options["log_table"]
+    )
+
+
+def source_mod_time(sesh, matview):
+    """Return the current latest modification time of the sources of a matview.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param matview: matview class
+    :return: (datetime.datetime) or None if the sources have no modification times
+    """
+    return sesh.execute(text(_source_mod_time_query(matview))).scalar()
+
+
+def is_stale(last_refresh, current_source_mod_time):
+    """Return whether a matview is stale, given its latest refresh (or None) and
+    the current latest modification time of its sources."""
+    if last_refresh is None:
+        return True
+    if current_source_mod_time is None:
+        return False
+    return (
+        last_refresh.source_mod_time is None
+        or current_source_mod_time >= last_refresh.source_mod_time
+    )
+
+
+def matview_status(sesh, matviews):
+    """Return the refresh status of each of a list of matviews.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param matviews: (iterable) matview classes
+    :return: (list) of `MatviewStatus`, in the order of `matviews`
+    """
+    matviews = list(matviews)
+    refreshes = latest_refreshes(sesh, [matview.base_name() for matview in matviews])
+    mod_times = {}
+    statuses = []
+    for matview in matviews:
+        query = _source_mod_time_query(matview)
+        if query not in mod_times:
+            mod_times[query] = source_mod_time(sesh, matview)
+        last_refresh = refreshes.get(matview.base_name())
+        statuses.append(
+            MatviewStatus(
+                matview=matview,
+                matview_name=matview.base_name(),
+                last_refresh=last_refresh,
+                current_source_mod_time=mod_times[query],
+                stale=is_stale(last_refresh, mod_times[query]),
+            )
+        )
+    return statuses
+
+
+def stale_matviews(sesh, matviews):
+    """Return those of a list of matviews that are stale.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param matviews: (iterable) matview classes
+    :return: (list) of matview classes, in the order of `matviews`
+    """
+    return [status.matview for status in matview_status(sesh, matviews) if status.stale]
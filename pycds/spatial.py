@@ -0,0 +1,79 @@
+"""
+Spatial queries on station histories.
+
+Histories are located by the geography of `meta_history.the_geom`, which is indexed
+by the GiST expression index `meta_history_the_geog_idx`. Distances are in metres.
+
+`nearest_histories` finds the histories nearest a point by a nearest-neighbour
+(KNN) scan of that index: the query is ordered by the index distance operator `<->`
+and limited to `k` rows, so that the server visits only about `k` index entries,
+however many histories there are. It returns the same rows as database function
+`nearest_histories`. Coordinates are passed as query parameters.
+
+Typical usage:
+
+    for row in nearest_histories(sesh, -123.4, 48.4, k=5, max_dist=10000):
+        print(row.history_id, row.station_id, row.dist)
+"""
+
+from sqlalchemy import Float, func, select
+
+from pycds.orm.tables import History
+
+
+def history_geog():
+    """Return the geography of `History.the_geom`. This is the expression indexed by
+    `meta_history_the_geog_idx`, and must be used unchanged for the index to be
+    used."""
+    return func.geography(History.the_geom)
+
+
+def point_geog(lon, lat):
+    """Return the geography of the point (`lon`, `lat`), in WGS 84."""
+    return func.geography(func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326))
+
+
+def nearest_histories_query(lon, lat, k, max_dist=None):
+    """Return a query for the `k` histories nearest a point.
+
+    :param lon: (float) longitude of the point
+    :param lat: (float) latitude of the point
+    :param k: (int) maximum number of histories
+    :param max_dist: (float) if not None, select only histories within this
+        distance (m) of the point
+    :return: (sqlalchemy.sql.Select) rows with columns `history_id`, `station_id`,
+        `lat`, `lon`, `dist` (m), ordered by distance
+    """
+    geog = history_geog()
+    point = point_geog(lon, lat)
+    q = (
+        select(
+            History.id.label("history_id"),
+            History.station_id,
+            History.lat,
+            History.lon,
+            func.ST_Distance(geog, point, type_=Float).label("dist"),
+        )
+        .where(History.the_geom.is_not(None))
+        .order_by(geog.op("<->", return_type=Float)(point))
+        .limit(k)
+    )
+    if max_dist is not None:
+        q = q.where(func.ST_DWithin(geog, point, max_dist))
+    return q
+
+
+def nearest_histories(sesh, lon, lat, k=1, max_dist=None):
+    """Return the `k` histories nearest a point, optionally within a maximum
+    distance.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param lon: (float) longitude of the point
+    :param lat: (float) latitude of the point
+    :param k: (int) maximum number of histories
+    :param max_dist: (float) if not None, return only histories within this
+        distance (m) of the point
+    :return: (list) of rows with columns `history_id`, `station_id`, `lat`, `lon`,
+        `dist` (m), ordered by distance
+    """
+    return sesh.execute(nearest_histories_query(lon, lat, k, max_dist)).all()
@@ -64,14 +64,102 @@ def compiles(element, compiler, **kw):
 
 
 class RefreshMaterializedView(MaterializedViewDDL):
-    def __init__(self, name, selectable=None, type_="native", concurrently=False):
+    """
+    Refresh a materialized view.
+
+    A manual matview may also be refreshed partially, by supplying `where`, a
+    boolean SQL expression identifying the rows of the matview to be replaced.
+    In that case `selectable` must yield exactly the replacement rows. Native
+    matviews cannot be refreshed partially.
+
+    If `log_table` (a qualified table name) is given, the refresh is recorded in
+    that table (see `pycds.orm.tables.MatviewRefreshLog`): its start and end times,
+    the number of rows written, and, if `source_tables` or `source_matviews` are
+    given, the modification time horizon of its sources (see
+    `source_horizon_query`). The refresh and the recording of it are wrapped in an
+    anonymous code block. Nothing is recorded if the log table does not exist,
+    and no horizon if a source table does not exist, so that a logged refresh can be
+    used at any revision.
+
+    The rows written by a manual matview refresh are counted at no cost. Counting
+    the rows of a native matview requires a scan of the whole matview, and is done
+    only if `count_rows`; otherwise no row count is recorded.
+    """
+
+    def __init__(
+        self,
+        name,
+        selectable=None,
+        type_="native",
+        concurrently=False,
+        where=None,
+        log_table=None,
+        source_tables=(),
+        source_matviews=(),
+        count_rows=False,
+    ):
         super().__init__(name, selectable=selectable, type_=type_)
         self.concurrently = concurrently
-
-
-@compiler.compiles(RefreshMaterializedView)
-def compiles(element, compiler, **kw):
+        self.where = where
+        self.log_table = log_table
+        self.source_tables = tuple(source_tables)
+        self.source_matviews = tuple(source_matviews)
+        self.count_rows = count_rows
+
+
+def source_mod_time_query(source_tables=(), source_matviews=(), log_table=None):
+    """
+    Return a query (SQL string) selecting the latest modification time of the
+    sources of a matview: the latest of the `mod_time` values of the (qualified)
+    tables `source_tables`, and the end times of the refreshes of the matviews named
+    `source_matviews` recorded in `log_table`. The result is NULL if there are no
+    such values.
+    """
+    terms = [f"(SELECT max(mod_time) FROM {table})" for table in source_tables]
+    if source_matviews:
+        names = ", ".join(f"'{name}'" for name in source_matviews)
+        terms.append(
+            f"(SELECT max(end_time) FROM {log_table} "
+            f"WHERE matview_name IN ({names}))"
+        )
+    return f"SELECT greatest({', '.join(terms)})"
+
+
+def source_horizon_query():
+    """
+    Return a query (SQL string) selecting the modification time horizon for a
+    refresh about to begin in the current transaction: a time such that every
+    modification of the matview's sources that the refresh does not see has a
+    modification time (as selected by `source_mod_time_query`) at or after it.
+
+    Modification times are transaction start times (`now()`), and are not ordered
+    by commit, so the latest modification time seen by the refresh is not such a
+    time: a transaction that started before another, but committed after the
+    refresh began, has an earlier modification time than the one seen. Any
+    transaction whose modifications the refresh does not see was either in progress
+    when this query was executed, or started later. The horizon is therefore the
+    earlier of the start of the current transaction and the start of the oldest
+    transaction in progress in another client session.
+
+    If the current role cannot see the activity of some other session (it must be a
+    superuser, or a member of `pg_read_all_stats`, or the role of that session), or
+    activity is not tracked, the horizon is unknown, and is `-infinity`.
+    """
+    return (
+        "SELECT least(now(), min(CASE "
+        "WHEN state IS NULL OR state = 'disabled' THEN '-infinity' "
+        "ELSE xact_start END))::timestamp "
+        "FROM pg_stat_activity "
+        "WHERE pid <> pg_backend_pid() "
+        "AND (backend_type = 'client backend' OR backend_type IS NULL)"
+    )
+
+
+def refresh_statements(element, compiler):
+    """Return the SQL statements that refresh a materialized view."""
     if element.type_ == "native":
+        if element.where is not None:
+            raise ValueError("A native materialized view cannot be partially refreshed")
         return compact_join(
             "REFRESH MATERIALIZED VIEW",
             element.concurrently and "CONCURRENTLY",
@@ -79,5 +167,65 @@ def compiles(element, compiler, **kw):
         )
     if element.type_ == "manual":
         body = compiler.sql_compiler.process(element.selectable, literal_binds=True)
-        return f"TRUNCATE TABLE {element.name}; INSERT INTO {element.name} {body}"
+        if element.where is None:
+            return f"TRUNCATE TABLE {element.name}; INSERT INTO {element.name} {body}"
+        where = compiler.sql_compiler.process(element.where, literal_binds=True)
+        return (
+            f"DELETE FROM {element.name} WHERE {where}; "
+            f"INSERT INTO {element.name} {body}"
+        )
     raise ValueError(f"Invalid materialized view type '{element.type_}'")
+
+
+def logged_refresh_block(element, statements):
+    """Return an anonymous code block that executes the refresh `statements` and
+    records the refresh in `element.log_table`."""
+    lines = []
+    if element.source_tables or element.source_matviews:
+        tables = element.source_tables + (
+            (element.log_table,) if element.source_matviews else ()
+        )
+        exist = " AND ".join(f"to_regclass('{table}') IS NOT NULL" for table in tables)
+        lines.append(
+            f"IF {exist} THEN {source_horizon_query()} INTO v_source_mod_time; "
+            f"END IF;"
+        )
+    lines.append(f"{statements};")
+    # A manual matview is refreshed by INSERT, whose row count is available; a
+    # native matview must be counted, if at all.
+    if element.type_ == "native":
+        if element.count_rows:
+            lines.append(f"SELECT count(*) INTO v_row_count FROM {element.name};")
+    else:
+        lines.append("GET DIAGNOSTICS v_row_count = ROW_COUNT;")
+    body = "\n    ".join(lines)
+    return f"""DO $refresh$
+DECLARE
+    v_start_time timestamp := clock_timestamp();
+    v_end_time timestamp;
+    v_source_mod_time timestamp;
+    v_row_count bigint;
+BEGIN
+    {body}
+    v_end_time := clock_timestamp();
+    IF to_regclass('{element.log_table}') IS NOT NULL THEN
+        INSERT INTO {element.log_table} (
+            matview_name, start_time, end_time, duration, row_count,
+            source_mod_time, concurrently, partial
+        ) VALUES (
+            '{element.name.split(".")[-1]}', v_start_time, v_end_time,
+            v_end_time - v_start_time, v_row_count, v_source_mod_time,
+            {str(bool(element.concurrently)).lower()},
+            {str(element.where is not None).lower()}
+        );
+    END IF;
+END
+$refresh$"""
+
+
+@compiler.compiles(RefreshMaterializedView)
+def compiles(element, compiler, **kw):
+    statements = refresh_statements(element, compiler)
+    if element.log_table is None:
+        return statements
+    return logged_refresh_block(element, statements)
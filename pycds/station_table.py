@@ -0,0 +1,122 @@
+"""
+Station variable tables: the observations of a single station, one row per
+observation time and one column per variable.
+
+This module produces the same table as the query text returned by database function
+`getstationvariabletable` (and executed by `query_one_station` and
+`query_one_station_climo`), but directly, as a parameterized SQLAlchemy query. The
+histories and variables of the station are passed as array parameters
+(`history_id = ANY(:history_ids)`, `vars_id = ANY(:vars_ids)`), so that the query
+text, and therefore its planning cost, does not depend on how many histories the
+station has. The table is pivoted with aggregate `FILTER` clauses in a single scan
+of `obs_raw` ordered by `obs_time`.
+
+Rows are streamed through a server-side cursor, so that the table for a station
+with a very long record can be consumed without holding it in memory. The result
+must be consumed within the transaction of the session that produced it.
+
+Typical usage:
+
+    for row in station_table(sesh, station_id):
+        write(row.obs_time, row.max_temp, ...)
+"""
+
+from sqlalchemy import Integer, and_, any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, array
+
+from pycds.orm.tables import History, Obs, Station, Variable
+from pycds.util import variable_tags
+
+
+def variable_tag(climo):
+    """Return the variable tag selecting climatological or non-climatological
+    variables."""
+    return "climatology" if climo else "observation"
+
+
+def station_variables(sesh, station_id, climo=False):
+    """Return the variables of a station's network that are climatological or
+    non-climatological, as specified, ordered by name. Each is a `(vars_id, name)`
+    tuple, where `name` is the variable's `net_var_name` folded to lower case, which
+    is the name of its column in the station variable table.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param station_id: (int) station id
+    :param climo: (bool) if true, select climatological variables, otherwise
+        non-climatological variables
+    :return: (list) of `(vars_id, name)` tuples
+    """
+    q = (
+        select(Variable.id, func.lower(Variable.name))
+        .select_from(Variable)
+        .join(Station, Station.network_id == Variable.network_id)
+        .where(Station.id == station_id)
+        .where(variable_tags(Variable).contains(array([variable_tag(climo)])))
+        .order_by(Variable.name)
+    )
+    return [tuple(row) for row in sesh.execute(q)]
+
+
+def station_history_ids(sesh, station_id):
+    """Return the ids of the histories of a station.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param station_id: (int) station id
+    :return: (list) of int
+    """
+    q = select(History.id).where(History.station_id == station_id).order_by(History.id)
+    return list(sesh.execute(q).scalars())
+
+
+def station_table_query(variables):
+    """Return a query for a station variable table with the specified columns.
+
+    The query has two array parameters, `history_ids` and `vars_ids`, which are the
+    ids of the histories and variables whose observations are selected. Normally
+    `vars_ids` is the ids of `variables`, but it may be narrowed to omit columns
+    (which then contain only nulls).
+
+    :param variables: (list) of `(vars_id, name)` tuples (see `station_variables`),
+        specifying the variable columns of the table
+    :return: (sqlalchemy.sql.Select)
+    """
+    return (
+        select(
+            Obs.time.label("obs_time"),
+            *(
+                func.max(Obs.datum).filter(Obs.vars_id == vars_id).label(name)
+                for vars_id, name in variables
+            ),
+        )
+        .where(
+            and_(
+                Obs.history_id == any_(bindparam("history_ids", type_=ARRAY(Integer))),
+                Obs.vars_id == any_(bindparam("vars_ids", type_=ARRAY(Integer))),
+            )
+        )
+        .group_by(Obs.time)
+        .order_by(Obs.time)
+    )
+
+
+def station_table(sesh, station_id, climo=False, yield_per=10000):
+    """Return the station variable table for a station, streamed through a
+    server-side cursor.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param station_id: (int) station id
+    :param climo: (bool) if true, the table contains climatological variables,
+        otherwise non-climatological variables
+    :param yield_per: (int) number of rows fetched from the server at a time
+    :return: (sqlalchemy.engine.Result) rows with columns `obs_time` and one column
+        per variable, named as in `station_variables`
+    """
+    variables = station_variables(sesh, station_id, climo=climo)
+    return sesh.execute(
+        station_table_query(variables),
+        {
+            "history_ids": station_history_ids(sesh, station_id),
+            "vars_ids": [vars_id for vars_id, _ in variables],
+        },
+        execution_options={"stream_results": True, "yield_per": yield_per},
+    )
@@ -0,0 +1,142 @@
+"""
+Time series of daily and monthly means of the observations of one variable at one
+station.
+
+This module computes the same series as database functions `daily_ts` and
+`monthly_ts`, but directly, as a parameterized SQLAlchemy query, and returns them as
+NumPy structured arrays. The observations of all the station's histories are
+aggregated in a single grouped query; periods with too few observations are removed
+by the query, not in Python.
+
+Each series has the fields
+
+- `time`: start of the day or month (`datetime64[us]`)
+- `mean`: mean of the observations in the period (`f8`)
+- `percent_obs_available`: fraction of the expected observations present in the
+  period (`f8`); see `daily` and `monthly`
+- `count`: number of observations in the period (`i8`)
+
+NumPy is an optional dependency, installed by the `timeseries` extra
+(`pip install pycds[timeseries]`). It is imported only by the functions that need
+it.
+
+Typical usage:
+
+    series = daily(sesh, station_id, vars_id, percent_obs=0.8)
+    plot(series["time"], series["mean"])
+"""
+
+from sqlalchemy import Float, cast, extract, func, literal, literal_column, select
+
+from pycds.orm.tables import History, Obs
+
+
+def _obs_per_day(day):
+    return literal(24.0)
+
+
+def _obs_per_month(month):
+    return extract(
+        "day",
+        month
+        + literal_column("interval '1 month'")
+        - literal_column("interval '1 day'"),
+    )
+
+
+# Expected number of observations in a period, by period: hourly observations in a
+# day, daily observations in a month.
+obs_per_period = {
+    "day": _obs_per_day,
+    "month": _obs_per_month,
+}
+
+dtype_spec = [
+    ("time", "datetime64[us]"),
+    ("mean", "f8"),
+    ("percent_obs_available", "f8"),
+    ("count", "i8"),
+]
+
+
+def timeseries_query(period, station_id, vars_id, percent_obs=0.0):
+    """Return a query for the means of the observations of a variable at a station,
+    per period, for the periods in which the fraction of expected observations
+    available is at least `percent_obs`.
+
+    :param period: (str) `"day"` or `"month"`
+    :param station_id: (int) station id
+    :param vars_id: (int) variable id
+    :param percent_obs: (float) minimum fraction of expected observations available
+    :return: (sqlalchemy.sql.Select) rows with columns `time`, `mean`,
+        `percent_obs_available`, `count`, ordered by `time`
+    """
+    if period not in obs_per_period:
+        raise ValueError(f"Unknown period: {period}")
+    # A literal, so that the grouping expression is identical to the selected one.
+    period_time = func.date_trunc(literal_column(f"'{period}'"), Obs.time)
+    count = func.count(Obs.datum)
+    percent_obs_available = cast(count, Float) / obs_per_period[period](period_time)
+    return (
+        select(
+            period_time.label("time"),
+            func.avg(Obs.datum).label("mean"),
+            percent_obs_available.label("percent_obs_available"),
+            count.label("count"),
+        )
+        .where(
+            Obs.history_id.in_(
+                select(History.id).where(History.station_id == station_id)
+            )
+        )
+        .where(Obs.vars_id == vars_id)
+        .group_by(period_time)
+        .having(percent_obs_available >= percent_obs)
+        .order_by(period_time)
+    )
+
+
+def timeseries(sesh, period, station_id, vars_id, percent_obs=0.0):
+    """Return the means of the observations of a variable at a station, per period
+    (see `timeseries_query`), as a NumPy structured array. Requires NumPy.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param period: (str) `"day"` or `"month"`
+    :param station_id: (int) station id
+    :param vars_id: (int) variable id
+    :param percent_obs: (float) minimum fraction of expected observations available
+    :return: (numpy.ndarray) with fields as described in the module docstring
+    """
+    import numpy as np
+
+    rows = sesh.execute(timeseries_query(period, station_id, vars_id, percent_obs))
+    return np.array([tuple(row) for row in rows], dtype=np.dtype(dtype_spec))
+
+
+def daily(sesh, station_id, vars_id, percent_obs=0.0):
+    """Return the daily means of the observations of a variable at a station, for
+    the days on which the fraction of hourly observations available (number of
+    observations / 24) is at least `percent_obs`. Requires NumPy.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param station_id: (int) station id
+    :param vars_id: (int) variable id
+    :param percent_obs: (float) minimum fraction of hourly observations available
+    :return: (numpy.ndarray) with fields as described in the module docstring
+    """
+    return timeseries(sesh, "day", station_id, vars_id, percent_obs)
+
+
+def monthly(sesh, station_id, vars_id, percent_obs=0.0):
+    """Return the monthly means of the observations of a variable at a station, for
+    the months in which the fraction of daily observations available (number of
+    observations / number of days in the month) is at least `percent_obs`. Requires
+    NumPy.
+
+    :param sesh: (sqlalchemy.orm.session.Session) database session
+    :param station_id: (int) station id
+    :param vars_id: (int) variable id
+    :param percent_obs: (float) minimum fraction of daily observations available
+    :return: (numpy.ndarray) with fields as described in the module docstring
+    """
+    return timeseries(sesh, "month", station_id, vars_id, percent_obs)
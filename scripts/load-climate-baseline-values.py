@@ -34,6 +34,12 @@ Examples:
         "--exclude",
         help="Path of file containing native ids of stations to be excluded from loading, one per line",
     )
+    parser.add_argument(
+        "-b",
+        "--bulk",
+        action="store_true",
+        help="Load values in bulk, replacing any existing values",
+    )
     log_level_choices = "NOTSET DEBUG INFO WARNING ERROR CRITICAL".split()
     parser.add_argument(
         "-s",
@@ -105,7 +111,9 @@ Examples:
     exclude = [x.strip() for x in exclude]
 
     try:
-        load_pcic_climate_baseline_values(session, args.variable, f, exclude=exclude)
+        load_pcic_climate_baseline_values(
+            session, args.variable, f, exclude=exclude, bulk=args.bulk
+        )
         session.commit()
     finally:
         session.close()
@@ -1,8 +1,15 @@
 import pytest
+from sqlalchemy import text
+
 from pycds.database import (
     get_postgresql_version,
     db_supports_statement,
     db_supports_matviews,
+    check_migration_version,
+    get_schema_catalog,
+    get_schema_item_names,
+    invalidate_schema_catalog,
+    matview_exists,
 )
 
 
@@ -30,3 +37,71 @@ def test_db_supports_statement(alembic_engine, statement, expected):
 @pytest.mark.update20
 def test_db_supports_matviews(alembic_engine):
     assert db_supports_matviews(alembic_engine) is True
+
+
+@pytest.mark.update20
+def test_schema_catalog(alembic_engine, alembic_runner, schema_name):
+    alembic_runner.migrate_up_to("head")
+    with alembic_engine.begin() as conn:
+        catalog = get_schema_catalog(conn, schema_name)
+        for item_type in ("routines", "tables", "views", "matviews"):
+            assert catalog.names(item_type) == get_schema_item_names(
+                conn, item_type, schema_name=schema_name
+            )
+        # Uncached names are queried for the item type only, and agree.
+        assert catalog.names("indexes", table_name="obs_raw") == (
+            get_schema_item_names(
+                conn, "indexes", table_name="obs_raw", schema_name=schema_name
+            )
+        )
+        for constraint_type in ("primary key", "foreign key", "unique", "check"):
+            assert catalog.names(
+                "constraints", table_name="obs_raw", constraint_type=constraint_type
+            ) == get_schema_item_names(
+                conn,
+                "constraints",
+                table_name="obs_raw",
+                constraint_type=constraint_type,
+                schema_name=schema_name,
+            )
+        assert "obs_raw" in catalog.names("tables")
+        assert "getstationvariabletable" in catalog.names("routines")
+        assert "obs_raw_comp_idx" in catalog.names("indexes", table_name="obs_raw")
+        assert "time_place_variable_unique" in catalog.names(
+            "constraints", table_name="obs_raw", constraint_type="unique"
+        )
+        check_migration_version(conn, schema_name=schema_name, cached=True)
+        assert catalog.version == alembic_runner.current
+
+
+def test_get_schema_item_names_invalid_type():
+    with pytest.raises(ValueError, match="invalid item type"):
+        get_schema_item_names(None, "spoo")
+
+
+@pytest.mark.update20
+def test_schema_catalog_cache(alembic_engine, alembic_runner, schema_name):
+    alembic_runner.migrate_up_to("head")
+    catalog = get_schema_catalog(alembic_engine, schema_name, cached=True)
+    assert get_schema_catalog(alembic_engine, schema_name, cached=True) is catalog
+    assert not matview_exists(alembic_engine, "spoo", schema_name, cached=True)
+
+    with alembic_engine.begin() as conn:
+        conn.execute(text(f"CREATE MATERIALIZED VIEW {schema_name}.spoo AS SELECT 1"))
+        # An uncached catalog reflects the change; the cached one does not.
+        assert "spoo" in get_schema_item_names(
+            conn, "matviews", schema_name=schema_name
+        )
+        assert not matview_exists(conn, "spoo", schema_name, cached=True)
+
+    invalidate_schema_catalog(alembic_engine)
+    assert get_schema_catalog(alembic_engine, schema_name, cached=True) is not catalog
+    assert matview_exists(alembic_engine, "spoo", schema_name, cached=True)
+
+
+@pytest.mark.update20
+def test_db_supports_statement_cached(alembic_engine):
+    statement = "CREATE TABLE test (foo char(5))"
+    assert db_supports_statement(alembic_engine, statement, cached=True) is True
+    assert db_supports_statement(alembic_engine, statement, cached=True) is True
+    assert db_supports_matviews(alembic_engine, cached=True) is True
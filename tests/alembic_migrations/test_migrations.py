@@ -13,6 +13,7 @@ from tests.db_helpers.postgres_factory import db_setup
 from .sqlalchemydiff_util import prepare_schema_from_models
 
 from pycds import Base
+from pycds.orm import manual_matviews
 
 
 logger = logging.getLogger("tests")
@@ -70,6 +71,15 @@ def test_model_and_migration_schemas_are_the_same(
     alembic_runner.migrate_up_to("head")
     prepare_schema_from_models(uri_right, Base, db_setup=db_setup)
 
-    result = compare(alembic_engine.url, uri_right)
+    # Manual matviews are tables in the database, but they are not defined in the
+    # table models. Expression indexes are created by migrations but not declared
+    # in the table models, because migration 0d99ba90c229 creates every index
+    # declared on History from its columns.
+    result = compare(
+        alembic_engine.url,
+        uri_right,
+        ignores=[t.name for t in manual_matviews.Base.metadata.tables.values()]
+        + ["meta_history.idx.meta_history_the_geog_idx"],
+    )
 
     assert result.is_match
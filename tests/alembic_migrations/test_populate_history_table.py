@@ -0,0 +1,192 @@
+import pytest
+from sqlalchemy import text
+
+from pycds.alembic.change_history_utils import (
+    get_population_progress,
+    populate_history_table_in_chunks,
+)
+
+
+@pytest.fixture
+def engine_with_test_tables(alembic_engine, schema_name):
+    """Main tables `a` and `b`, where `b` references `a`, and their history tables,
+    as created by `create_history_table`. Table `a_hx` is already populated; `b_hx`
+    is empty. Primary keys of `b` are sparse, and inserted out of order."""
+    with alembic_engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                CREATE SCHEMA IF NOT EXISTS {schema_name};
+                SET search_path TO {schema_name}, public;
+                CREATE TABLE a (a_id int PRIMARY KEY, x int);
+                CREATE TABLE a_hx (
+                    LIKE a, 
+                    deleted boolean DEFAULT false,
+                    a_hx_id int PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY
+                );
+                CREATE TABLE b (b_id int PRIMARY KEY, a_id int REFERENCES a, y int);
+                CREATE TABLE b_hx (
+                    LIKE b, 
+                    deleted boolean DEFAULT false,
+                    b_hx_id int PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+                    a_hx_id int REFERENCES a_hx (a_hx_id)
+                );
+                INSERT INTO a VALUES (1, 10), (2, 20);
+                INSERT INTO a_hx (a_id, x) VALUES (1, 10), (2, 20), (1, 11);
+                INSERT INTO b 
+                    SELECT b_id, 1 + b_id % 2, b_id * 10 
+                    FROM generate_series(40, 1, -3) AS b_id;
+                """
+            )
+        )
+    yield alembic_engine
+
+
+def get_history(conn, schema_name):
+    return [
+        tuple(row)
+        for row in conn.execute(
+            text(f"SELECT b_hx_id, b_id, a_id, y, a_hx_id FROM {schema_name}.b_hx")
+        )
+    ]
+
+
+def expected_history(conn, schema_name):
+    return [
+        (i + 1, b_id, a_id, y, {1: 3, 2: 2}[a_id])
+        for i, (b_id, a_id, y) in enumerate(
+            conn.execute(
+                text(f"SELECT b_id, a_id, y FROM {schema_name}.b ORDER BY b_id")
+            )
+        )
+    ]
+
+
+@pytest.mark.update20
+@pytest.mark.parametrize("chunk_size", [1, 5, 100])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_populate_in_chunks(engine_with_test_tables, schema_name, chunk_size, workers):
+    engine = engine_with_test_tables
+    populate_history_table_in_chunks(
+        engine, "b", "b_id", [("a", "a_id")], chunk_size, workers=workers
+    )
+
+    with engine.begin() as conn:
+        assert get_history(conn, schema_name) == expected_history(conn, schema_name)
+        progress = get_population_progress(conn, "b")
+        assert progress.completed is not None
+        assert progress.rows_inserted == 14
+        # No prepared chunks are left behind
+        assert (
+            conn.execute(
+                text(
+                    "SELECT count(*) FROM pg_class WHERE relname LIKE 'b\\_hx\\_chunk%'"
+                )
+            ).scalar()
+            == 0
+        )
+
+
+@pytest.mark.update20
+@pytest.mark.parametrize("workers", [1, 3])
+def test_resume(engine_with_test_tables, schema_name, workers):
+    """A failed population is resumed, and completed population is not repeated."""
+    engine = engine_with_test_tables
+    # Make population fail part way through.
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"ALTER TABLE {schema_name}.b_hx ADD CONSTRAINT c CHECK (b_id < 15)")
+        )
+    with pytest.raises(Exception):
+        populate_history_table_in_chunks(
+            engine, "b", "b_id", [("a", "a_id")], 5, workers=workers
+        )
+    with engine.begin() as conn:
+        progress = get_population_progress(conn, "b")
+        assert progress.completed is None
+        assert progress.next_id == 16
+        assert len(get_history(conn, schema_name)) == 5
+        conn.execute(text(f"ALTER TABLE {schema_name}.b_hx DROP CONSTRAINT c"))
+
+    for _ in range(2):
+        populate_history_table_in_chunks(
+            engine, "b", "b_id", [("a", "a_id")], 5, workers=workers
+        )
+        with engine.begin() as conn:
+            assert get_history(conn, schema_name) == expected_history(conn, schema_name)
+
+
+@pytest.mark.update20
+def test_reject_written_before_population(engine_with_test_tables, schema_name):
+    engine = engine_with_test_tables
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {schema_name}.b_hx (b_id) VALUES (1)"))
+    with pytest.raises(RuntimeError, match="not empty"):
+        populate_history_table_in_chunks(engine, "b", "b_id", [("a", "a_id")], 5)
+
+
+@pytest.mark.update20
+def test_reject_written_before_resumption(engine_with_test_tables, schema_name):
+    """Writes to the main table between a failed population and its resumption, as
+    recorded by history tracking triggers, are detected."""
+    engine = engine_with_test_tables
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"ALTER TABLE {schema_name}.b_hx ADD CONSTRAINT c CHECK (b_id < 15)")
+        )
+    with pytest.raises(Exception):
+        populate_history_table_in_chunks(engine, "b", "b_id", [("a", "a_id")], 5)
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {schema_name}.b_hx DROP CONSTRAINT c"))
+        conn.execute(text(f"UPDATE {schema_name}.b SET y = 0 WHERE b_id = 1"))
+        conn.execute(
+            text(f"INSERT INTO {schema_name}.b_hx (b_id, a_id, y) VALUES (1, 2, 0)")
+        )
+    with pytest.raises(RuntimeError, match="not inserted by population"):
+        populate_history_table_in_chunks(engine, "b", "b_id", [("a", "a_id")], 5)
+
+
+def share_locks(conn, schema_name):
+    return conn.execute(
+        text(
+            f"SELECT count(*) FROM pg_locks "
+            f"WHERE relation = '{schema_name}.b'::regclass "
+            f"  AND mode = 'ShareLock' AND granted"
+        )
+    ).scalar()
+
+
+@pytest.mark.update20
+@pytest.mark.parametrize("workers", [1, 3])
+def test_locks_main_table(engine_with_test_tables, schema_name, workers):
+    """The main table is locked against writes while each chunk is inserted, and
+    released afterwards."""
+    engine = engine_with_test_tables
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                SET search_path TO {schema_name}, public;
+                CREATE FUNCTION check_locked() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM pg_locks
+                        WHERE relation = '{schema_name}.b'::regclass
+                            AND mode = 'ShareLock' AND granted
+                    ) THEN
+                        RAISE EXCEPTION 'b is not locked';
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$;
+                CREATE TRIGGER check_locked BEFORE INSERT ON b_hx
+                    FOR EACH STATEMENT EXECUTE FUNCTION check_locked();
+                """
+            )
+        )
+    populate_history_table_in_chunks(
+        engine, "b", "b_id", [("a", "a_id")], 5, workers=workers
+    )
+    with engine.begin() as conn:
+        assert get_history(conn, schema_name) == expected_history(conn, schema_name)
+        assert share_locks(conn, schema_name) == 0
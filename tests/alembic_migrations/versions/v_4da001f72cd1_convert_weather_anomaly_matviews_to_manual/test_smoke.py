@@ -0,0 +1,66 @@
+"""Smoke tests:
+- Upgrade drops weather-anomaly native matviews and creates manual matviews (tables)
+- Downgrade drops manual matviews and creates native matviews
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+
+from pycds.database import get_schema_item_names
+from .. import check_matviews
+
+
+logger = logging.getLogger("tests")
+
+
+matview_defns = {
+    "daily_max_temperature_mv": {"indexes": {"daily_max_temperature_mv_idx"}},
+    "daily_min_temperature_mv": {"indexes": {"daily_min_temperature_mv_idx"}},
+    "monthly_total_precipitation_mv": {
+        "indexes": {"monthly_total_precipitation_mv_idx"}
+    },
+    "monthly_average_of_daily_max_temperature_mv": {
+        "indexes": {"monthly_average_of_daily_max_temperature_mv_idx"}
+    },
+    "monthly_average_of_daily_min_temperature_mv": {
+        "indexes": {"monthly_average_of_daily_min_temperature_mv_idx"}
+    },
+}
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from f6d5a4c2e901 to 4da001f72cd1."""
+
+    # Set up database at 4da001f72cd1 (this migration)
+    alembic_runner.migrate_up_to("4da001f72cd1")
+
+    with alembic_engine.begin() as conn:
+        # Tables should be present, matviews absent.
+        names = get_schema_item_names(conn, "matviews", schema_name=schema_name)
+        assert names & set(matview_defns) == set()
+        names = get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert names >= set(matview_defns)
+
+        # Indexes should be installed on the tables.
+        for table_name, contents in matview_defns.items():
+            names = get_schema_item_names(
+                conn, "indexes", table_name=table_name, schema_name=schema_name
+            )
+            assert names == contents["indexes"]
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 4da001f72cd1 to f6d5a4c2e901."""
+
+    # Set up database at 4da001f72cd1 (this migration)
+    alembic_runner.migrate_up_to("4da001f72cd1")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        # Matviews should be present, tables absent.
+        check_matviews(conn, matview_defns, schema_name, matviews_present=True)
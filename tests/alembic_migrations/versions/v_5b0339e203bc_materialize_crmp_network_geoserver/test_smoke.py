@@ -0,0 +1,54 @@
+"""Smoke tests:
+- Upgrade replaces view crmp_network_geoserver with a native matview with a unique
+  index and a GiST index
+- Downgrade restores the view
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+
+from pycds.database import get_schema_item_names
+
+
+logger = logging.getLogger("tests")
+
+
+name = "crmp_network_geoserver"
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 8578304b749d to 5b0339e203bc."""
+
+    # Set up database at 5b0339e203bc (this migration)
+    alembic_runner.migrate_up_to("5b0339e203bc")
+
+    with alembic_engine.begin() as conn:
+        # Matview should be present, view absent.
+        assert name not in get_schema_item_names(conn, "views", schema_name=schema_name)
+        assert name in get_schema_item_names(conn, "matviews", schema_name=schema_name)
+        assert get_schema_item_names(
+            conn, "indexes", table_name=name, schema_name=schema_name
+        ) == {
+            "crmp_network_geoserver_history_id_idx",
+            "crmp_network_geoserver_the_geom_idx",
+        }
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 5b0339e203bc to 8578304b749d."""
+
+    # Set up database at 5b0339e203bc (this migration)
+    alembic_runner.migrate_up_to("5b0339e203bc")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        # View should be present, matview absent.
+        assert name in get_schema_item_names(conn, "views", schema_name=schema_name)
+        assert name not in get_schema_item_names(
+            conn, "matviews", schema_name=schema_name
+        )
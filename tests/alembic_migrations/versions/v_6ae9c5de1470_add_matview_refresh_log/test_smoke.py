@@ -0,0 +1,70 @@
+"""Smoke tests:
+- Upgrade adds table matview_refresh_log and its index
+- Downgrade drops the table
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+from pycds.database import get_schema_item_names
+from pycds.orm.native_matviews.version_bb2a222a1d4a import ObsCountPerMonthHistory
+
+
+logger = logging.getLogger("tests")
+
+
+table_name = "matview_refresh_log"
+index_names = {
+    "matview_refresh_log_pkey",
+    "matview_refresh_log_matview_name_end_time_idx",
+}
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 87bf9f59b9b6 to 6ae9c5de1470."""
+
+    # Set up database to version 6ae9c5de1470
+    alembic_runner.migrate_up_to("6ae9c5de1470")
+
+    with alembic_engine.begin() as conn:
+        assert table_name in get_schema_item_names(
+            conn, "tables", schema_name=schema_name
+        )
+        assert (
+            get_schema_item_names(
+                conn, "indexes", table_name=table_name, schema_name=schema_name
+            )
+            == index_names
+        )
+
+        # A logged refresh is recorded.
+        conn.execute(ObsCountPerMonthHistory.refresh())
+        result = conn.execute(
+            text(
+                f"SELECT matview_name, row_count, partial "
+                f"FROM {schema_name}.{table_name}"
+            )
+        )
+        assert list(result) == [("obs_count_per_month_history_mv", 0, False)]
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 6ae9c5de1470 to 87bf9f59b9b6."""
+
+    # Set up database to version 6ae9c5de1470
+    alembic_runner.migrate_up_to("6ae9c5de1470")
+
+    # Run downgrade migration
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        assert table_name not in get_schema_item_names(
+            conn, "tables", schema_name=schema_name
+        )
+
+        # A logged refresh is harmless without the log table.
+        conn.execute(ObsCountPerMonthHistory.refresh())
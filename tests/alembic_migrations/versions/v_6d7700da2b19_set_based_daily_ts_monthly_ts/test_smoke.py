@@ -0,0 +1,60 @@
+"""Smoke tests:
+- Upgrade replaces functions daily_ts and monthly_ts with SQL functions
+- Downgrade restores the plpgsql functions
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+
+logger = logging.getLogger("tests")
+
+
+function_names = ("daily_ts", "monthly_ts")
+
+
+def get_function_language(conn, schema_name, function_name):
+    return conn.execute(
+        text(
+            "SELECT lanname FROM pg_proc "
+            "JOIN pg_language ON pg_language.oid = pg_proc.prolang "
+            "JOIN pg_namespace ON pg_namespace.oid = pg_proc.pronamespace "
+            "WHERE nspname = :schema_name AND proname = :function_name"
+        ),
+        {"schema_name": schema_name, "function_name": function_name},
+    ).scalar()
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from aedcbc39fefa to 6d7700da2b19."""
+
+    # Set up database to version 6d7700da2b19
+    alembic_runner.migrate_up_to("6d7700da2b19")
+
+    with alembic_engine.begin() as conn:
+        for function_name in function_names:
+            assert get_function_language(conn, schema_name, function_name) == "sql"
+            # The function must be executable, even for a station that does not
+            # exist.
+            result = conn.execute(
+                text(f"SELECT * FROM {schema_name}.{function_name}(999, 1, 0.5)")
+            )
+            assert list(result) == []
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 6d7700da2b19 to aedcbc39fefa."""
+
+    # Set up database to version 6d7700da2b19
+    alembic_runner.migrate_up_to("6d7700da2b19")
+
+    # Run downgrade migration
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        for function_name in function_names:
+            assert get_function_language(conn, schema_name, function_name) == "plpgsql"
@@ -0,0 +1,51 @@
+"""Smoke tests:
+- Upgrade replaces view obs_count_per_day_history_v with a manual matview (table)
+  with a unique index
+- Downgrade restores the view
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+
+from pycds.database import get_schema_item_names
+
+
+logger = logging.getLogger("tests")
+
+
+name = "obs_count_per_day_history_v"
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 8a817c2a4e7a to 8578304b749d."""
+
+    # Set up database at 8578304b749d (this migration)
+    alembic_runner.migrate_up_to("8578304b749d")
+
+    with alembic_engine.begin() as conn:
+        # Table should be present, view absent.
+        assert name not in get_schema_item_names(conn, "views", schema_name=schema_name)
+        assert name in get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert get_schema_item_names(
+            conn, "indexes", table_name=name, schema_name=schema_name
+        ) == {"obs_count_per_day_history_idx"}
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 8578304b749d to 8a817c2a4e7a."""
+
+    # Set up database at 8578304b749d (this migration)
+    alembic_runner.migrate_up_to("8578304b749d")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        # View should be present, table absent.
+        assert name in get_schema_item_names(conn, "views", schema_name=schema_name)
+        assert name not in get_schema_item_names(
+            conn, "tables", schema_name=schema_name
+        )
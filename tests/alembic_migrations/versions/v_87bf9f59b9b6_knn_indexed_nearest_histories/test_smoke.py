@@ -0,0 +1,77 @@
+"""Smoke tests:
+- Upgrade adds a GiST index on the geography of meta_history.the_geom, adds
+  function nearest_histories, and replaces function closest_stns_within_threshold
+  with a SQL function
+- Downgrade drops the index and function nearest_histories, and restores the
+  plpgsql function closest_stns_within_threshold
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+from pycds.database import get_schema_item_names
+
+
+logger = logging.getLogger("tests")
+
+
+index_name = "meta_history_the_geog_idx"
+
+
+def get_function_language(conn, schema_name, function_name):
+    return conn.execute(
+        text(
+            "SELECT lanname FROM pg_proc "
+            "JOIN pg_language ON pg_language.oid = pg_proc.prolang "
+            "JOIN pg_namespace ON pg_namespace.oid = pg_proc.pronamespace "
+            "WHERE nspname = :schema_name AND proname = :function_name"
+        ),
+        {"schema_name": schema_name, "function_name": function_name},
+    ).scalar()
+
+
+def get_index_names(conn, schema_name):
+    return get_schema_item_names(
+        conn, "indexes", table_name="meta_history", schema_name=schema_name
+    )
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 6d7700da2b19 to 87bf9f59b9b6."""
+
+    # Set up database to version 87bf9f59b9b6
+    alembic_runner.migrate_up_to("87bf9f59b9b6")
+
+    with alembic_engine.begin() as conn:
+        assert index_name in get_index_names(conn, schema_name)
+        assert get_function_language(conn, schema_name, "nearest_histories") == "sql"
+        assert (
+            get_function_language(conn, schema_name, "closest_stns_within_threshold")
+            == "sql"
+        )
+        result = conn.execute(
+            text(f"SELECT * FROM {schema_name}.nearest_histories(-123.4, 48.4, 5)")
+        )
+        assert list(result) == []
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 87bf9f59b9b6 to 6d7700da2b19."""
+
+    # Set up database to version 87bf9f59b9b6
+    alembic_runner.migrate_up_to("87bf9f59b9b6")
+
+    # Run downgrade migration
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        assert index_name not in get_index_names(conn, schema_name)
+        assert get_function_language(conn, schema_name, "nearest_histories") is None
+        assert (
+            get_function_language(conn, schema_name, "closest_stns_within_threshold")
+            == "plpgsql"
+        )
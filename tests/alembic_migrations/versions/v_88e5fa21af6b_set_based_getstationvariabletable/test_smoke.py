@@ -0,0 +1,54 @@
+"""Smoke tests:
+- Upgrade replaces function getstationvariabletable with a SQL function
+- Downgrade restores the plpython3u function
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+
+logger = logging.getLogger("tests")
+
+
+def get_function_language(conn, schema_name):
+    return conn.execute(
+        text(
+            "SELECT lanname FROM pg_proc "
+            "JOIN pg_language ON pg_language.oid = pg_proc.prolang "
+            "JOIN pg_namespace ON pg_namespace.oid = pg_proc.pronamespace "
+            "WHERE nspname = :schema_name AND proname = 'getstationvariabletable'"
+        ),
+        {"schema_name": schema_name},
+    ).scalar()
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from ae6f546b717d to 88e5fa21af6b."""
+
+    # Set up database to version 88e5fa21af6b
+    alembic_runner.migrate_up_to("88e5fa21af6b")
+
+    with alembic_engine.begin() as conn:
+        assert get_function_language(conn, schema_name) == "sql"
+        query = conn.execute(
+            text(f"SELECT {schema_name}.getstationvariabletable(999, false)")
+        ).scalar()
+        # The query must be valid, even for a station that does not exist.
+        assert list(conn.execute(text(query))) == []
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 88e5fa21af6b to ae6f546b717d."""
+
+    # Set up database to version 88e5fa21af6b
+    alembic_runner.migrate_up_to("88e5fa21af6b")
+
+    # Run downgrade migration
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        assert get_function_language(conn, schema_name) == "plpython3u"
@@ -0,0 +1,228 @@
+"""Smoke tests:
+- Upgrade adds table obs_count_per_month_mv, maintained by triggers on obs_raw, and
+  replaces native matviews obs_count_per_month_history_mv and climo_obs_count_mv
+  with views over it
+- Downgrade restores the native matviews and drops the table and triggers
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+from pycds.database import get_schema_item_names
+from pycds.orm.manual_matviews.version_8a817c2a4e7a import ObsCountPerMonth
+from .. import check_matviews
+
+
+logger = logging.getLogger("tests")
+
+
+matview_defns = {
+    "obs_count_per_month_history_mv": {"indexes": {"obs_count_per_month_history_idx"}},
+    "climo_obs_count_mv": {"indexes": {"climo_obs_count_idx"}},
+}
+
+table_name = "obs_count_per_month_mv"
+
+
+def get_trigger_names(conn, schema_name):
+    return {
+        row.tgname
+        for row in conn.execute(
+            text(
+                "SELECT tgname FROM pg_trigger "
+                "WHERE tgrelid = CAST(:table_name AS regclass) "
+                "AND tgname LIKE 't200_obs_count_per_month_%'"
+            ),
+            {"table_name": f"{schema_name}.obs_raw"},
+        )
+    }
+
+
+def counts(conn, schema_name):
+    return {
+        (row.history_id, row.vars_id, row.obs_month.month): row.count
+        for row in conn.execute(text(f"SELECT * FROM {schema_name}.{table_name}"))
+    }
+
+
+def insert_metadata(conn, schema_name):
+    conn.execute(
+        text(
+            f"""
+            SET search_path TO {schema_name}, public;
+            INSERT INTO meta_network (network_id, network_name)
+                VALUES (1, 'Network');
+            INSERT INTO meta_station (station_id, network_id, native_id)
+                VALUES (1, 1, 'S1');
+            INSERT INTO meta_history (history_id, station_id) VALUES (1, 1);
+            INSERT INTO meta_vars
+                (vars_id, network_id, net_var_name, standard_name, cell_method,
+                display_name)
+                VALUES (1, 1, 'T', 'air_temperature', 'time: point', 'T'),
+                    (2, 1, 'P', 'precipitation_amount', 'time: sum', 'P');
+            """
+        )
+    )
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from b2273a086ddb to 8a817c2a4e7a."""
+
+    # Set up database at 8a817c2a4e7a (this migration)
+    alembic_runner.migrate_up_to("8a817c2a4e7a")
+
+    with alembic_engine.begin() as conn:
+        # Matviews replaced by views
+        names = get_schema_item_names(conn, "matviews", schema_name=schema_name)
+        assert names & set(matview_defns) == set()
+        names = get_schema_item_names(conn, "views", schema_name=schema_name)
+        assert names >= set(matview_defns)
+
+        # Table and triggers present
+        names = get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert table_name in names
+        names = get_schema_item_names(
+            conn, "indexes", table_name=table_name, schema_name=schema_name
+        )
+        assert names == {
+            "obs_count_per_month_mv_pkey",
+            "obs_count_per_month_mv_month_idx",
+        }
+        assert get_trigger_names(conn, schema_name) == {
+            "t200_obs_count_per_month_insert",
+            "t200_obs_count_per_month_update",
+            "t200_obs_count_per_month_delete",
+        }
+
+
+@pytest.mark.update20
+def test_triggers(alembic_engine, alembic_runner, schema_name):
+    """Test that the triggers keep obs_count_per_month_mv current."""
+
+    alembic_runner.migrate_up_to("8a817c2a4e7a")
+
+    with alembic_engine.begin() as conn:
+        insert_metadata(conn, schema_name)
+
+        def execute(sql):
+            conn.execute(text(sql))
+            return counts(conn, schema_name)
+
+        assert counts(conn, schema_name) == {}
+
+        # Inserting: one observation per day, January and February for variable 1,
+        # January only for variable 2.
+        assert (
+            execute(
+                """
+            INSERT INTO obs_raw (obs_raw_id, obs_time, datum, vars_id, history_id)
+                SELECT id, '2000-01-01'::timestamp + (id - 1) * interval '1 day',
+                    1.0, 1, 1
+                FROM generate_series(1, 40) AS id
+                UNION ALL
+                SELECT 100 + id, '2000-01-01'::timestamp + id * interval '1 day',
+                    1.0, 2, 1
+                FROM generate_series(1, 10) AS id
+            """
+            )
+            == {(1, 1, 1): 31, (1, 1, 2): 9, (1, 2, 1): 10}
+        )
+
+        # Updating values only leaves the counts unchanged.
+        assert execute("UPDATE obs_raw SET datum = 2.0") == {
+            (1, 1, 1): 31,
+            (1, 1, 2): 9,
+            (1, 2, 1): 10,
+        }
+
+        # Updating times and variables moves counts between keys.
+        assert execute(
+            "UPDATE obs_raw SET obs_time = obs_time + interval '1 month' "
+            "WHERE vars_id = 2"
+        ) == {(1, 1, 1): 31, (1, 1, 2): 9, (1, 2, 2): 10}
+
+        # Deleting removes keys whose count falls to zero.
+        assert execute("DELETE FROM obs_raw WHERE obs_raw_id > 31") == {
+            (1, 1, 1): 31,
+        }
+
+        # A full refresh agrees with the maintained contents.
+        conn.execute(ObsCountPerMonth.refresh())
+        assert counts(conn, schema_name) == {(1, 1, 1): 31}
+
+        # The views summarize the counts.
+        row = conn.execute(text("SELECT * FROM obs_count_per_month_history_mv")).one()
+        assert (row.count, row.history_id) == (31, 1)
+
+
+@pytest.mark.update20
+def test_null_keys(alembic_engine, alembic_runner, schema_name):
+    """Test that observations with a NULL history or variable are not counted.
+    (Unlike the native matviews this migration replaces.)"""
+
+    alembic_runner.migrate_up_to("8a817c2a4e7a")
+
+    with alembic_engine.begin() as conn:
+        insert_metadata(conn, schema_name)
+
+        def execute(sql):
+            conn.execute(text(sql))
+            return counts(conn, schema_name)
+
+        assert (
+            execute(
+                """
+            INSERT INTO obs_raw (obs_raw_id, obs_time, datum, vars_id, history_id)
+                VALUES (1, '2000-01-01', 1.0, 1, 1),
+                    (2, '2000-01-02', 1.0, NULL, 1),
+                    (3, '2000-01-03', 1.0, 1, NULL),
+                    (4, '2000-01-04', 1.0, NULL, NULL)
+            """
+            )
+            == {(1, 1, 1): 1}
+        )
+
+        # Setting a key to NULL uncounts an observation; setting it from NULL
+        # counts it.
+        assert execute("UPDATE obs_raw SET vars_id = NULL WHERE obs_raw_id = 1") == {}
+        assert execute("UPDATE obs_raw SET vars_id = 1 WHERE obs_raw_id = 2") == {
+            (1, 1, 1): 1
+        }
+        assert execute("DELETE FROM obs_raw WHERE obs_raw_id IN (1, 3, 4)") == {
+            (1, 1, 1): 1
+        }
+
+        # A full refresh agrees with the maintained contents.
+        conn.execute(ObsCountPerMonth.refresh())
+        assert counts(conn, schema_name) == {(1, 1, 1): 1}
+
+        # The views have no rows for observations with NULL keys.
+        conn.execute(
+            text(
+                "INSERT INTO obs_raw (obs_raw_id, obs_time, datum, vars_id, history_id) "
+                "VALUES (5, '2000-01-05', 1.0, NULL, NULL)"
+            )
+        )
+        rows = conn.execute(text("SELECT * FROM obs_count_per_month_history_mv")).all()
+        assert [(row.count, row.history_id) for row in rows] == [(1, 1)]
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 8a817c2a4e7a to b2273a086ddb."""
+
+    # Set up database at 8a817c2a4e7a (this migration)
+    alembic_runner.migrate_up_to("8a817c2a4e7a")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        # Native matviews should be present, table and triggers absent.
+        check_matviews(conn, matview_defns, schema_name, matviews_present=True)
+        names = get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert table_name not in names
+        assert get_trigger_names(conn, schema_name) == set()
@@ -0,0 +1,201 @@
+"""Smoke tests:
+- Upgrade converts obs_raw and obs_raw_hx to tables partitioned by time, with a
+  default partition, and replaces foreign keys referencing obs_raw with triggers
+- Observations still referenced cannot be deleted
+- Downgrade restores ordinary tables and the foreign keys
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+
+logger = logging.getLogger("tests")
+
+
+table_info = (
+    # table_name, partition key, partitioned primary key, unpartitioned primary key
+    ("obs_raw", "obs_time", ["obs_raw_id", "obs_time"], ["obs_raw_id"]),
+    ("obs_raw_hx", "mod_time", ["obs_raw_hx_id", "mod_time"], ["obs_raw_hx_id"]),
+)
+
+referencing_tables = ("obs_raw_native_flags", "obs_raw_pcic_flags", "time_bounds")
+
+triggers = {"t050_obs_raw_referenced_delete", "t050_obs_raw_referenced_update"}
+
+
+def get_relkind(conn, schema_name, table_name):
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+        {"name": f"{schema_name}.{table_name}"},
+    ).scalar()
+
+
+def get_partition_names(conn, schema_name, table_name):
+    return {
+        row.relname
+        for row in conn.execute(
+            text(
+                "SELECT relname FROM pg_inherits "
+                "JOIN pg_class ON pg_class.oid = pg_inherits.inhrelid "
+                "WHERE inhparent = CAST(:name AS regclass)"
+            ),
+            {"name": f"{schema_name}.{table_name}"},
+        )
+    }
+
+
+def get_primary_key_columns(conn, schema_name, table_name):
+    return [
+        row.attname
+        for row in conn.execute(
+            text(
+                "SELECT attname "
+                "FROM pg_constraint, unnest(conkey) WITH ORDINALITY AS k(attnum, n) "
+                "JOIN pg_attribute ON attnum = k.attnum "
+                "WHERE pg_constraint.conrelid = CAST(:name AS regclass) "
+                "   AND contype = 'p' "
+                "   AND pg_attribute.attrelid = pg_constraint.conrelid "
+                "ORDER BY k.n"
+            ),
+            {"name": f"{schema_name}.{table_name}"},
+        )
+    ]
+
+
+def get_obs_raw_referencing_tables(conn, schema_name):
+    return {
+        row.relname
+        for row in conn.execute(
+            text(
+                "SELECT relname FROM pg_constraint "
+                "JOIN pg_class ON pg_class.oid = pg_constraint.conrelid "
+                "WHERE confrelid = CAST(:name AS regclass) AND contype = 'f'"
+            ),
+            {"name": f"{schema_name}.obs_raw"},
+        )
+    }
+
+
+def get_trigger_names(conn, schema_name, table_name):
+    return {
+        row.tgname
+        for row in conn.execute(
+            text(
+                "SELECT tgname FROM pg_trigger "
+                "WHERE tgrelid = CAST(:name AS regclass) AND NOT tgisinternal"
+            ),
+            {"name": f"{schema_name}.{table_name}"},
+        )
+    }
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from d7ade974ccde to ae6f546b717d."""
+
+    # Set up database at ae6f546b717d (this migration)
+    alembic_runner.migrate_up_to("ae6f546b717d")
+
+    with alembic_engine.begin() as conn:
+        for table_name, _, primary_key, _ in table_info:
+            assert get_relkind(conn, schema_name, table_name) == "p"
+            assert f"{table_name}_default" in get_partition_names(
+                conn, schema_name, table_name
+            )
+            assert get_primary_key_columns(conn, schema_name, table_name) == primary_key
+        assert get_obs_raw_referencing_tables(conn, schema_name) == set()
+        assert triggers <= get_trigger_names(conn, schema_name, "obs_raw")
+
+
+@pytest.mark.update20
+@pytest.mark.parametrize("referencing_table", referencing_tables)
+def test_referenced_obs(alembic_engine, alembic_runner, schema_name, referencing_table):
+    """Test that the triggers replacing the foreign keys prevent deleting, or changing
+    the id of, an observation that is still referenced."""
+
+    alembic_runner.migrate_up_to("ae6f546b717d")
+
+    reference = {
+        "obs_raw_native_flags": "(obs_raw_id, native_flag_id) VALUES (1, 1)",
+        "obs_raw_pcic_flags": "(obs_raw_id, pcic_flag_id) VALUES (1, 1)",
+        "time_bounds": '(obs_raw_id, start, "end") '
+        "VALUES (1, '2000-01-01', '2000-01-02')",
+    }[referencing_table]
+    with alembic_engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                SET search_path TO {schema_name}, public;
+                INSERT INTO meta_network (network_id, network_name)
+                    VALUES (1, 'Network');
+                INSERT INTO meta_station (station_id, network_id, native_id)
+                    VALUES (1, 1, 'S1');
+                INSERT INTO meta_history (history_id, station_id) VALUES (1, 1);
+                INSERT INTO meta_vars
+                    (vars_id, network_id, net_var_name, standard_name, cell_method,
+                    display_name)
+                    VALUES (1, 1, 'T', 'air_temperature', 'time: point', 'T');
+                INSERT INTO meta_native_flag (native_flag_id, network_id)
+                    VALUES (1, 1);
+                INSERT INTO meta_pcic_flag (pcic_flag_id) VALUES (1);
+                INSERT INTO obs_raw (obs_raw_id, obs_time, datum, history_id, vars_id)
+                    VALUES (1, '2000-01-01', 1.0, 1, 1),
+                        (2, '2000-01-02', 2.0, 1, 1),
+                        (3, '2000-01-03', 3.0, 1, 1);
+                INSERT INTO {referencing_table} {reference};
+                """
+            )
+        )
+
+    # Unreferenced observations can be deleted, or their ids changed.
+    with alembic_engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {schema_name}.obs_raw WHERE obs_raw_id = 2"))
+        conn.execute(
+            text(
+                f"UPDATE {schema_name}.obs_raw SET obs_raw_id = 4 WHERE obs_raw_id = 3"
+            )
+        )
+        # Other changes to a referenced observation are allowed.
+        conn.execute(
+            text(f"UPDATE {schema_name}.obs_raw SET datum = 0 WHERE obs_raw_id = 1")
+        )
+
+    for statement in (
+        f"DELETE FROM {schema_name}.obs_raw",
+        f"UPDATE {schema_name}.obs_raw SET obs_raw_id = 5 WHERE obs_raw_id = 1",
+    ):
+        with pytest.raises(IntegrityError, match="observation 1 is still referenced"):
+            with alembic_engine.begin() as conn:
+                conn.execute(text(statement))
+
+    with alembic_engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {schema_name}.{referencing_table}"))
+        conn.execute(text(f"DELETE FROM {schema_name}.obs_raw"))
+        assert (
+            conn.execute(text(f"SELECT count(*) FROM {schema_name}.obs_raw")).scalar()
+            == 0
+        )
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from ae6f546b717d to d7ade974ccde."""
+
+    # Set up database at ae6f546b717d (this migration)
+    alembic_runner.migrate_up_to("ae6f546b717d")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        for table_name, _, _, primary_key in table_info:
+            assert get_relkind(conn, schema_name, table_name) == "r"
+            assert get_partition_names(conn, schema_name, table_name) == set()
+            assert get_primary_key_columns(conn, schema_name, table_name) == primary_key
+        assert get_obs_raw_referencing_tables(conn, schema_name) == set(
+            referencing_tables
+        )
+        assert not triggers & get_trigger_names(conn, schema_name, "obs_raw")
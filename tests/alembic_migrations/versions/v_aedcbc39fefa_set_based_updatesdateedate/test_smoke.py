@@ -0,0 +1,59 @@
+"""Smoke tests:
+- Upgrade replaces function updatesdateedate with a set-based version taking
+  optional arguments `since` and `from_matview`
+- Downgrade restores the previous version, which takes no arguments
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+
+logger = logging.getLogger("tests")
+
+
+def get_function_info(conn, schema_name):
+    return conn.execute(
+        text(
+            "SELECT pg_get_function_arguments(p.oid) AS arguments, l.lanname "
+            "FROM pg_proc p "
+            "JOIN pg_namespace n ON n.oid = p.pronamespace "
+            "JOIN pg_language l ON l.oid = p.prolang "
+            "WHERE n.nspname = :schema_name AND p.proname = 'updatesdateedate'"
+        ),
+        {"schema_name": schema_name},
+    ).all()
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from fd52f31bc576 to aedcbc39fefa."""
+
+    # Set up database at aedcbc39fefa (this migration)
+    alembic_runner.migrate_up_to("aedcbc39fefa")
+
+    with alembic_engine.begin() as conn:
+        (info,) = get_function_info(conn, schema_name)
+        assert info.lanname == "sql"
+        assert "since timestamp without time zone" in info.arguments
+        assert "from_matview boolean" in info.arguments
+
+        conn.execute(text(f"SELECT {schema_name}.updatesdateedate()"))
+        conn.execute(text(f"SELECT {schema_name}.updatesdateedate('2000-01-01', true)"))
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from aedcbc39fefa to fd52f31bc576."""
+
+    # Set up database at aedcbc39fefa (this migration)
+    alembic_runner.migrate_up_to("aedcbc39fefa")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        (info,) = get_function_info(conn, schema_name)
+        assert info.lanname == "plpgsql"
+        assert info.arguments == ""
@@ -0,0 +1,62 @@
+"""Smoke tests:
+- Upgrade redefines the helper functions as immutable, parallel safe SQL functions
+- Downgrade restores the volatile functions
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+
+logger = logging.getLogger("tests")
+
+
+function_names = ("daysinmonth", "lastdateofmonth", "season", "variable_tags")
+
+
+def get_function_attributes(conn, schema_name):
+    return {
+        row.proname: (row.lanname, row.provolatile, row.proparallel)
+        for row in conn.execute(
+            text(
+                "SELECT proname, lanname, provolatile, proparallel FROM pg_proc "
+                "JOIN pg_language ON pg_language.oid = pg_proc.prolang "
+                "JOIN pg_namespace ON pg_namespace.oid = pg_proc.pronamespace "
+                "WHERE nspname = :schema_name AND proname = ANY(:function_names)"
+            ),
+            {"schema_name": schema_name, "function_names": list(function_names)},
+        )
+    }
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from cc28bde2be1a to b2273a086ddb."""
+
+    # Set up database to version b2273a086ddb
+    alembic_runner.migrate_up_to("b2273a086ddb")
+
+    with alembic_engine.begin() as conn:
+        assert get_function_attributes(conn, schema_name) == {
+            name: ("sql", "i", "s") for name in function_names
+        }
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from b2273a086ddb to cc28bde2be1a."""
+
+    # Set up database to version b2273a086ddb
+    alembic_runner.migrate_up_to("b2273a086ddb")
+
+    # Run downgrade migration
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        assert get_function_attributes(conn, schema_name) == {
+            "daysinmonth": ("sql", "v", "u"),
+            "lastdateofmonth": ("sql", "v", "u"),
+            "season": ("plpgsql", "v", "u"),
+            "variable_tags": ("sql", "v", "u"),
+        }
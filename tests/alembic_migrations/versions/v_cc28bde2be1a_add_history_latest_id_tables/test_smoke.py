@@ -0,0 +1,123 @@
+"""Smoke tests:
+- Upgrade adds and populates the latest history id tables, which the history
+  tracking triggers then maintain
+- Downgrade drops the tables and restores the previous trigger function
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+from pycds.database import get_schema_item_names
+
+
+logger = logging.getLogger("tests")
+
+
+table_info = (
+    ("meta_network", "network_id"),
+    ("meta_station", "station_id"),
+    ("meta_history", "history_id"),
+    ("meta_vars", "vars_id"),
+)
+
+latest_table_names = {f"{table_name}_hx_latest" for table_name, _ in table_info}
+
+
+def insert_metadata(conn, schema_name, id_):
+    conn.execute(
+        text(
+            f"""
+            SET search_path TO {schema_name}, public;
+            INSERT INTO meta_network (network_id, network_name)
+                VALUES ({id_}, 'Network {id_}');
+            INSERT INTO meta_station (station_id, network_id, native_id)
+                VALUES ({id_}, {id_}, 'S{id_}');
+            UPDATE meta_network SET network_name = 'Network {id_}a'
+                WHERE network_id = {id_};
+            INSERT INTO meta_history (history_id, station_id)
+                VALUES ({id_}, {id_});
+            """
+        )
+    )
+
+
+def check_latest(conn, schema_name):
+    """Check that the latest history id tables agree with the history tables."""
+    for table_name, pri_id_name in table_info:
+        expected = conn.execute(
+            text(
+                f"SELECT {pri_id_name}, max({table_name}_hx_id) "
+                f"FROM {schema_name}.{table_name}_hx GROUP BY {pri_id_name}"
+            )
+        ).all()
+        actual = conn.execute(
+            text(f"SELECT * FROM {schema_name}.{table_name}_hx_latest")
+        ).all()
+        assert set(actual) == set(expected)
+
+
+def station_network_hx_ids(conn, schema_name, station_id):
+    """Return the network history id of the latest history record of a station, and
+    the latest history id of its network."""
+    return conn.execute(
+        text(
+            f"SELECT s.meta_network_hx_id, "
+            f"  (SELECT max(meta_network_hx_id) FROM {schema_name}.meta_network_hx n "
+            f"   WHERE n.network_id = s.network_id) "
+            f"FROM {schema_name}.meta_station_hx s "
+            f"WHERE s.station_id = :station_id "
+            f"ORDER BY s.meta_station_hx_id DESC LIMIT 1"
+        ),
+        {"station_id": station_id},
+    ).first()
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 6ae9c5de1470 to cc28bde2be1a."""
+
+    # Set up database at the previous revision, with some history.
+    alembic_runner.migrate_up_to("6ae9c5de1470")
+    with alembic_engine.begin() as conn:
+        insert_metadata(conn, schema_name, 1)
+
+    alembic_runner.migrate_up_one()
+
+    with alembic_engine.begin() as conn:
+        names = get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert names >= latest_table_names
+        check_latest(conn, schema_name)
+
+        # The triggers maintain the tables, and resolve history foreign keys with
+        # them.
+        insert_metadata(conn, schema_name, 2)
+        conn.execute(
+            text(
+                f"UPDATE {schema_name}.meta_network SET network_name = 'Changed'; "
+                f"UPDATE {schema_name}.meta_station SET native_id = 'Changed'; "
+                f"DELETE FROM {schema_name}.meta_history WHERE history_id = 1; "
+            )
+        )
+        check_latest(conn, schema_name)
+        for station_id in (1, 2):
+            hx_id, latest_hx_id = station_network_hx_ids(conn, schema_name, station_id)
+            assert hx_id == latest_hx_id
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from cc28bde2be1a to 6ae9c5de1470."""
+
+    alembic_runner.migrate_up_to("cc28bde2be1a")
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        names = get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert names & latest_table_names == set()
+
+        # History tracking works without the tables.
+        insert_metadata(conn, schema_name, 1)
+        hx_id, latest_hx_id = station_network_hx_ids(conn, schema_name, 1)
+        assert hx_id is not None and hx_id < latest_hx_id
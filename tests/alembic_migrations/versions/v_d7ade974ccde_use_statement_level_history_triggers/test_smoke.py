@@ -0,0 +1,75 @@
+"""Smoke tests:
+- Upgrade replaces row-level history tracking triggers with statement-level triggers
+- Downgrade restores row-level triggers
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+
+logger = logging.getLogger("tests")
+
+
+table_names = ("meta_network", "meta_station", "meta_history", "meta_vars", "obs_raw")
+
+row_level_triggers = {
+    "t100_primary_control_hx_cols",
+    "t100_primary_ops_to_hx",
+}
+statement_level_triggers = {
+    "t100_primary_control_hx_cols",
+    "t100_primary_insert_to_hx",
+    "t100_primary_update_to_hx",
+    "t100_primary_delete_to_hx",
+}
+
+
+def get_trigger_names(conn, schema_name, table_name):
+    return {
+        row.tgname
+        for row in conn.execute(
+            text(
+                "SELECT tgname FROM pg_trigger "
+                "WHERE tgrelid = CAST(:table_name AS regclass) AND NOT tgisinternal"
+            ),
+            {"table_name": f"{schema_name}.{table_name}"},
+        )
+    }
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 4da001f72cd1 to d7ade974ccde."""
+
+    # Set up database at d7ade974ccde (this migration)
+    alembic_runner.migrate_up_to("d7ade974ccde")
+
+    with alembic_engine.begin() as conn:
+        for table_name in table_names:
+            assert (
+                get_trigger_names(conn, schema_name, table_name)
+                == statement_level_triggers
+            )
+            assert get_trigger_names(conn, schema_name, f"{table_name}_hx") == set()
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from d7ade974ccde to 4da001f72cd1."""
+
+    # Set up database at d7ade974ccde (this migration)
+    alembic_runner.migrate_up_to("d7ade974ccde")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        for table_name in table_names:
+            assert (
+                get_trigger_names(conn, schema_name, table_name) == row_level_triggers
+            )
+            assert get_trigger_names(conn, schema_name, f"{table_name}_hx") == {
+                "t100_add_foreign_hx_keys"
+            }
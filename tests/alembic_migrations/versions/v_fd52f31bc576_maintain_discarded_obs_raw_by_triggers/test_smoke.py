@@ -0,0 +1,166 @@
+"""Smoke tests:
+- Upgrade replaces native matview discarded_obs_raw_mv with a table maintained by
+  triggers on the flag and flag association tables
+- Downgrade restores the native matview and drops the triggers
+"""
+
+# -*- coding: utf-8 -*-
+import logging
+import pytest
+from sqlalchemy import text
+
+from pycds.database import get_schema_item_names
+from pycds.orm.manual_matviews.version_fd52f31bc576 import DiscardedObsRaw
+from .. import check_matviews
+
+
+logger = logging.getLogger("tests")
+
+
+matview_defns = {
+    "discarded_obs_raw_mv": {"indexes": {"discarded_obs_raw_mv_pkey"}},
+}
+
+triggered_tables = (
+    "obs_raw_native_flags",
+    "obs_raw_pcic_flags",
+    "meta_native_flag",
+    "meta_pcic_flag",
+)
+
+
+def get_trigger_names(conn, schema_name, table_name):
+    return {
+        row.tgname
+        for row in conn.execute(
+            text(
+                "SELECT tgname FROM pg_trigger "
+                "WHERE tgrelid = CAST(:table_name AS regclass) "
+                "AND tgname LIKE 't200_discarded_obs_raw_%'"
+            ),
+            {"table_name": f"{schema_name}.{table_name}"},
+        )
+    }
+
+
+def discarded_ids(conn, schema_name):
+    return set(
+        conn.execute(
+            text(f"SELECT obs_raw_id FROM {schema_name}.discarded_obs_raw_mv")
+        ).scalars()
+    )
+
+
+@pytest.mark.update20
+def test_upgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from 88e5fa21af6b to fd52f31bc576."""
+
+    # Set up database at fd52f31bc576 (this migration)
+    alembic_runner.migrate_up_to("fd52f31bc576")
+
+    with alembic_engine.begin() as conn:
+        # Table should be present, matview absent.
+        names = get_schema_item_names(conn, "matviews", schema_name=schema_name)
+        assert names & set(matview_defns) == set()
+        names = get_schema_item_names(conn, "tables", schema_name=schema_name)
+        assert names >= set(matview_defns)
+        for table_name, contents in matview_defns.items():
+            names = get_schema_item_names(
+                conn, "indexes", table_name=table_name, schema_name=schema_name
+            )
+            assert names == contents["indexes"]
+
+        for table_name in triggered_tables:
+            assert get_trigger_names(conn, schema_name, table_name)
+
+
+@pytest.mark.update20
+def test_triggers(alembic_engine, alembic_runner, schema_name):
+    """Test that the triggers keep discarded_obs_raw_mv current."""
+
+    alembic_runner.migrate_up_to("fd52f31bc576")
+
+    with alembic_engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                SET search_path TO {schema_name}, public;
+                INSERT INTO meta_network (network_id, network_name)
+                    VALUES (1, 'Network');
+                INSERT INTO meta_station (station_id, network_id, native_id)
+                    VALUES (1, 1, 'S1');
+                INSERT INTO meta_history (history_id, station_id) VALUES (1, 1);
+                INSERT INTO meta_vars
+                    (vars_id, network_id, net_var_name, standard_name, cell_method,
+                    display_name)
+                    VALUES (1, 1, 'T', 'air_temperature', 'time: point', 'T');
+                INSERT INTO obs_raw (obs_raw_id, obs_time, datum, vars_id, history_id)
+                    SELECT id, '2000-01-01'::timestamp + id * interval '1 hour',
+                        1.0, 1, 1
+                    FROM generate_series(1, 5) AS id;
+                INSERT INTO meta_native_flag
+                    (native_flag_id, flag_name, network_id, discard)
+                    VALUES (1, 'discard', 1, true), (2, 'keep', 1, false);
+                INSERT INTO meta_pcic_flag (pcic_flag_id, flag_name, discard)
+                    VALUES (1, 'discard', true), (2, 'keep', false);
+                """
+            )
+        )
+
+        def execute(sql):
+            conn.execute(text(sql))
+            return discarded_ids(conn, schema_name)
+
+        assert discarded_ids(conn, schema_name) == set()
+
+        # Adding flags
+        assert execute(
+            "INSERT INTO obs_raw_native_flags VALUES (1, 1), (2, 1), (2, 2), (3, 2)"
+        ) == {1, 2}
+        assert execute(
+            "INSERT INTO obs_raw_pcic_flags VALUES (2, 1), (4, 1), (5, 2)"
+        ) == {1, 2, 4}
+
+        # Removing a discarding flag; obs 2 still has a PCIC discarding flag.
+        assert execute("DELETE FROM obs_raw_native_flags WHERE native_flag_id = 1") == {
+            2,
+            4,
+        }
+
+        # Changing a flag association
+        assert execute(
+            "UPDATE obs_raw_pcic_flags SET obs_raw_id = 3 WHERE obs_raw_id = 4"
+        ) == {2, 3}
+
+        # Changing flag definitions
+        assert execute(
+            "UPDATE meta_native_flag SET discard = true WHERE native_flag_id = 2"
+        ) == {2, 3}
+        assert execute(
+            "UPDATE meta_pcic_flag SET discard = true WHERE pcic_flag_id = 2"
+        ) == {2, 3, 5}
+        assert execute("UPDATE meta_pcic_flag SET discard = false") == {2, 3}
+        assert execute("UPDATE meta_native_flag SET discard = false") == set()
+
+        # A full refresh agrees with the maintained contents.
+        assert execute("UPDATE meta_pcic_flag SET discard = true") == {2, 3, 5}
+        conn.execute(DiscardedObsRaw.refresh())
+        assert discarded_ids(conn, schema_name) == {2, 3, 5}
+
+
+@pytest.mark.update20
+def test_downgrade(alembic_engine, alembic_runner, schema_name):
+    """Test the schema migration from fd52f31bc576 to 88e5fa21af6b."""
+
+    # Set up database at fd52f31bc576 (this migration)
+    alembic_runner.migrate_up_to("fd52f31bc576")
+
+    # Run downgrade migration to prev revision
+    alembic_runner.migrate_down_one()
+
+    with alembic_engine.begin() as conn:
+        # Matview should be present, table absent.
+        check_matviews(conn, matview_defns, schema_name, matviews_present=True)
+
+        for table_name in triggered_tables:
+            assert get_trigger_names(conn, schema_name, table_name) == set()
@@ -7,11 +7,7 @@ import pytest
     "func, args",
     [
         ("closest_stns_within_threshold", (-120.0, 50.0, 1)),
-        pytest.param(
-            "daily_ts",
-            (1, 1, 50.0),
-            marks=pytest.mark.xfail(reason="Bug in function definition"),
-        ),
+        ("daily_ts", (1, 1, 50.0)),
         ("daysinmonth", (datetime(2000, 3, 4),)),
         pytest.param(
             "do_query_one_station",
@@ -21,15 +17,15 @@ import pytest
         ("effective_day", (datetime(2000, 1, 1, 7, 39), "max", "1-hourly")),
         ("getstationvariabletable", (999, False)),
         ("lastdateofmonth", (date(2000, 3, 4),)),
-        pytest.param(
-            "monthly_ts",
-            (1, 1, 50.0),
-            marks=pytest.mark.xfail(reason="Bug in function definition"),
-        ),
+        ("monthly_ts", (1, 1, 50.0)),
+        ("nearest_histories", (-120.0, 50.0, 5)),
+        ("nearest_histories", (-120.0, 50.0, 5, 1000.0)),
         ("query_one_station", (999,)),
         ("query_one_station_climo", (999,)),
         ("season", (datetime(2000, 3, 4),)),
         ("updatesdateedate", ()),
+        ("updatesdateedate", (datetime(2000, 1, 1),)),
+        ("updatesdateedate", (None, True)),
     ],
 )
 def test_executable(func, args, sesh_in_prepared_schema_left, schema_func):
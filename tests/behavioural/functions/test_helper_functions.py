@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from pycds import Variable, schema_func
+from pycds.util import variable_tags
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize(
+    "function_name, arg, expected",
+    [
+        ("daysinmonth", datetime(2000, 2, 4), 29),
+        ("daysinmonth", datetime(2001, 2, 4), 28),
+        ("daysinmonth", datetime(2001, 12, 31, 23), 31),
+        ("lastdateofmonth", date(2000, 2, 4), date(2000, 2, 29)),
+        ("lastdateofmonth", date(2000, 12, 1), date(2000, 12, 31)),
+        ("season", datetime(2000, 12, 31), date(2000, 1, 15)),
+        ("season", datetime(2000, 1, 1), date(2000, 1, 15)),
+        ("season", datetime(2000, 2, 29), date(2000, 1, 15)),
+        ("season", datetime(2000, 3, 1), date(2000, 4, 15)),
+        ("season", datetime(2000, 5, 31), date(2000, 4, 15)),
+        ("season", datetime(2000, 6, 1), date(2000, 7, 15)),
+        ("season", datetime(2000, 8, 31), date(2000, 7, 15)),
+        ("season", datetime(2000, 9, 1), date(2000, 10, 15)),
+        ("season", datetime(2000, 11, 30), date(2000, 10, 15)),
+    ],
+)
+def test_helper_function(sesh_in_prepared_schema_left, function_name, arg, expected):
+    result = sesh_in_prepared_schema_left.execute(
+        select(getattr(schema_func, function_name)(arg))
+    ).scalar()
+    assert result == expected
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize(
+    "net_var_name, expected",
+    [("Tx_Climatology", ["climatology"]), ("Tx", ["observation"])],
+)
+def test_variable_tags(sesh_in_prepared_schema_left, net_var_name, expected):
+    sesh = sesh_in_prepared_schema_left
+    variable = Variable(
+        name=net_var_name,
+        standard_name="air_temperature",
+        cell_method="time: maximum",
+        display_name=net_var_name,
+    )
+    sesh.add(variable)
+    sesh.flush()
+    result = sesh.execute(
+        select(variable_tags(Variable)).where(Variable.id == variable.id)
+    ).scalar()
+    assert result == expected
+    sesh.rollback()
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import Float, func, select
+
+from pycds import History, schema_func
+from pycds.spatial import history_geog, nearest_histories, point_geog
+
+# Points in and around the large data set.
+points = [(-123.4, 48.4), (-120.0, 50.0), (-126.5, 54.0)]
+
+
+def all_histories_by_distance(sesh, lon, lat):
+    """Return (history_id, dist) of all located histories, ordered by distance,
+    without using the index."""
+    dist = func.ST_Distance(history_geog(), point_geog(lon, lat), type_=Float)
+    q = (
+        select(History.id, dist)
+        .where(History.the_geom.is_not(None))
+        .order_by(dist, History.id)
+    )
+    return [tuple(row) for row in sesh.execute(q)]
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("lon, lat", points)
+@pytest.mark.parametrize("k", [1, 5])
+def test_nearest_histories(sesh_with_large_data_rw, lon, lat, k):
+    sesh = sesh_with_large_data_rw
+    expected = all_histories_by_distance(sesh, lon, lat)
+    assert len(expected) > k
+
+    result = nearest_histories(sesh, lon, lat, k=k)
+
+    assert len(result) == k
+    dists = [row.dist for row in result]
+    assert dists == sorted(dists)
+    # The KNN operator uses spherical distance, which may order histories at very
+    # nearly the same distance differently.
+    assert dists == pytest.approx([dist for _, dist in expected[:k]], rel=1e-2)
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("lon, lat", points)
+def test_max_dist(sesh_with_large_data_rw, lon, lat):
+    sesh = sesh_with_large_data_rw
+    expected = all_histories_by_distance(sesh, lon, lat)
+    max_dist = expected[2][1] + 1.0
+
+    result = nearest_histories(sesh, lon, lat, k=len(expected), max_dist=max_dist)
+
+    assert {row.history_id for row in result} == {
+        history_id for history_id, dist in expected if dist <= max_dist
+    }
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("lon, lat", points)
+@pytest.mark.parametrize("max_dist", [None, 50000.0])
+def test_database_function(sesh_with_large_data_rw, lon, lat, max_dist):
+    """Test that database function nearest_histories returns the same histories as
+    `pycds.spatial.nearest_histories`."""
+    sesh = sesh_with_large_data_rw
+    expected = nearest_histories(sesh, lon, lat, k=5, max_dist=max_dist)
+
+    result = sesh.execute(
+        select(
+            schema_func.nearest_histories(lon, lat, 5, max_dist)
+            .table_valued("history_id", "station_id", "lat", "lon", "dist")
+            .render_derived()
+        )
+    ).all()
+
+    assert [tuple(row) for row in result] == [tuple(row) for row in expected]
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("lon, lat", points)
+def test_closest_stns_within_threshold(sesh_with_large_data_rw, lon, lat):
+    sesh = sesh_with_large_data_rw
+    thres = 50000
+    expected = all_histories_by_distance(sesh, lon, lat)
+
+    result = sesh.execute(
+        select(
+            schema_func.closest_stns_within_threshold(lon, lat, thres)
+            .table_valued("history_id", "lat", "lon", "dist")
+            .render_derived()
+        )
+    ).all()
+
+    dists = [row.dist for row in result]
+    assert dists == sorted(dists)
+    assert {row.history_id for row in result} == {
+        history_id for history_id, dist in expected if dist <= thres
+    }
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import text
+from pycds import get_schema_name, schema_func
+from pycds.station_table import station_table, station_variables
+
+getstationvariabletable = schema_func.getstationvariabletable
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize(
+    "station_id",
+    # A random selection of stations.
+    [4137, 1213, 2313, 1313, 5136, 5634],
+)
+@pytest.mark.parametrize("climo", [False, True])
+def test_station_table(station_id, climo, sesh_with_large_data_rw):
+    """Test that `station_table` returns the same table as the query returned by
+    getstationvariabletable."""
+    sesh = sesh_with_large_data_rw
+    sesh.execute(text(f"SET search_path TO {get_schema_name()}, public"))
+
+    query = sesh.query(getstationvariabletable(station_id, climo)).scalar()
+    expected = sesh.execute(text(query))
+    expected_keys = list(expected.keys())
+    expected_rows = [tuple(row) for row in expected]
+
+    result = station_table(sesh, station_id, climo=climo, yield_per=10)
+    assert list(result.keys()) == expected_keys
+    assert [tuple(row) for row in result] == expected_rows
+
+    assert expected_keys == ["obs_time"] + [
+        name for _, name in station_variables(sesh, station_id, climo=climo)
+    ]
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_station_table_no_station(sesh_with_large_data_rw):
+    """A station that does not exist has an empty table."""
+    sesh = sesh_with_large_data_rw
+    result = station_table(sesh, 999999)
+    assert list(result.keys()) == ["obs_time"]
+    assert list(result) == []
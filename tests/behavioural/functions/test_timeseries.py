@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import func, select
+
+from pycds import History, Obs, schema_func
+from pycds.timeseries import daily, monthly, timeseries_query
+
+
+def station_variables(sesh, limit=5):
+    """Return a selection of (station_id, vars_id) pairs having observations."""
+    q = (
+        select(History.station_id, Obs.vars_id)
+        .select_from(Obs)
+        .join(History, Obs.history_id == History.id)
+        .group_by(History.station_id, Obs.vars_id)
+        .order_by(func.count().desc(), History.station_id, Obs.vars_id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in sesh.execute(q)]
+
+
+def test_timeseries_query_unknown_period():
+    with pytest.raises(ValueError, match="Unknown period: year"):
+        timeseries_query("year", 1, 1)
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize(
+    "period, db_func", [("day", "daily_ts"), ("month", "monthly_ts")]
+)
+@pytest.mark.parametrize("percent_obs", [0.0, 0.5])
+def test_timeseries_query(sesh_with_large_data_rw, period, db_func, percent_obs):
+    """Test that `timeseries_query` returns the same series as the database
+    function."""
+    sesh = sesh_with_large_data_rw
+    pairs = station_variables(sesh)
+    assert pairs
+    for station_id, vars_id in pairs:
+        expected = sesh.execute(
+            select(
+                getattr(schema_func, db_func)(station_id, vars_id, percent_obs)
+                .table_valued("time", "mean", "percent_obs_available", "count")
+                .render_derived()
+            )
+        ).all()
+        result = sesh.execute(
+            timeseries_query(period, station_id, vars_id, percent_obs)
+        ).all()
+        assert [row.time for row in result] == [row.time for row in expected]
+        assert [row.count for row in result] == [row.count for row in expected]
+        assert [row.mean for row in result] == pytest.approx(
+            [row.mean for row in expected], rel=1e-6
+        )
+        assert all(row.percent_obs_available >= percent_obs for row in result)
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("series_func", [daily, monthly])
+def test_numpy(sesh_with_large_data_rw, series_func):
+    np = pytest.importorskip("numpy")
+    sesh = sesh_with_large_data_rw
+    ((station_id, vars_id),) = station_variables(sesh, limit=1)
+
+    series = series_func(sesh, station_id, vars_id, percent_obs=0.1)
+
+    assert series.dtype.names == ("time", "mean", "percent_obs_available", "count")
+    assert len(series) > 0
+    assert np.all(np.diff(series["time"]) > np.timedelta64(0))
+    assert np.all(series["percent_obs_available"] >= 0.1)
+    assert np.all(series["count"] > 0)
@@ -0,0 +1,74 @@
+import datetime
+
+import pytest
+from sqlalchemy import func, select, text, update
+
+from pycds import History, Obs, Station
+from pycds.orm.native_matviews import StationObservationStats
+
+
+def expected_station_times(sesh):
+    q = (
+        select(History.station_id, func.min(Obs.time), func.max(Obs.time))
+        .select_from(History)
+        .outerjoin(Obs, Obs.history_id == History.id)
+        .group_by(History.station_id)
+    )
+    return {station_id: (min_, max_) for station_id, min_, max_ in sesh.execute(q)}
+
+
+def station_times(sesh):
+    q = select(Station.id, Station.min_obs_time, Station.max_obs_time)
+    return {station_id: (min_, max_) for station_id, min_, max_ in sesh.execute(q)}
+
+
+def clear_station_times(sesh):
+    sesh.execute(update(Station).values(min_obs_time=None, max_obs_time=None))
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("from_matview", [False, True])
+def test_all_stations(sesh_with_large_data_rw, schema_func, from_matview):
+    sesh = sesh_with_large_data_rw
+    clear_station_times(sesh)
+    if from_matview:
+        sesh.execute(StationObservationStats.refresh())
+
+    sesh.execute(select(schema_func.updatesdateedate(None, from_matview)))
+
+    expected = expected_station_times(sesh)
+    assert expected
+    times = station_times(sesh)
+    assert {station_id: times[station_id] for station_id in expected} == expected
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_since(sesh_with_large_data_rw, schema_func):
+    sesh = sesh_with_large_data_rw
+    clear_station_times(sesh)
+    since = sesh.execute(text("SELECT localtimestamp")).scalar()
+
+    # Add an observation to one station, later than any other.
+    history = sesh.execute(select(History).limit(1)).scalar_one()
+    obs_time = datetime.datetime(2100, 1, 1)
+    vars_id = sesh.execute(
+        select(Obs.vars_id).where(Obs.history_id == history.id).limit(1)
+    ).scalar_one()
+    sesh.add(Obs(history_id=history.id, vars_id=vars_id, time=obs_time, datum=1.0))
+    sesh.flush()
+
+    sesh.execute(select(schema_func.updatesdateedate(since)))
+
+    times = station_times(sesh)
+    expected = expected_station_times(sesh)[history.station_id]
+    assert expected[1] == obs_time
+    assert times[history.station_id] == expected
+    assert {
+        station_id: t
+        for station_id, t in times.items()
+        if station_id != history.station_id
+    } == {
+        station_id: (None, None)
+        for station_id in times
+        if station_id != history.station_id
+    }
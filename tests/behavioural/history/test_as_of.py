@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+from pycds import NetworkHistory, Station
+from pycds.history import as_of, as_of_query, hx_id, item_id
+
+
+def t(day):
+    return datetime.datetime(2000, 1, day)
+
+
+# History of networks: (network_id, network_name, mod_time, deleted). The last two
+# records have the same mod_time, as records made in the same transaction do.
+history = (
+    (1, "A1", t(1), False),
+    (1, "A2", t(3), False),
+    (1, "A3", t(5), True),
+    (2, "B1", t(2), False),
+    (2, "B2", t(4), False),
+    (2, "B3", t(4), False),
+)
+
+
+@pytest.fixture
+def sesh_with_history(sesh_in_prepared_schema_left, schema_name):
+    sesh = sesh_in_prepared_schema_left
+    for network_id, name, mod_time, deleted in history:
+        sesh.execute(
+            text(
+                f"INSERT INTO {schema_name}.meta_network_hx "
+                f"(network_id, network_name, mod_time, mod_user, deleted) "
+                f"VALUES (:network_id, :name, :mod_time, 'test', :deleted)"
+            ),
+            {
+                "network_id": network_id,
+                "name": name,
+                "mod_time": mod_time,
+                "deleted": deleted,
+            },
+        )
+    yield sesh
+    sesh.rollback()
+
+
+def test_item_id():
+    assert item_id(NetworkHistory) is NetworkHistory.network_id
+    assert hx_id(NetworkHistory) is NetworkHistory.meta_network_hx_id
+
+
+def test_not_history_table():
+    with pytest.raises(ValueError, match="Not a history table: meta_station"):
+        as_of_query(Station, t(1))
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize(
+    "timestamp, ids, include_deleted, expected",
+    [
+        (datetime.datetime(1999, 1, 1), None, False, {}),
+        (t(1), None, False, {1: "A1"}),
+        (t(2), None, False, {1: "A1", 2: "B1"}),
+        (t(3), None, False, {1: "A2", 2: "B1"}),
+        (t(4), None, False, {1: "A2", 2: "B3"}),
+        (t(5), None, False, {2: "B3"}),
+        (t(5), None, True, {1: "A3", 2: "B3"}),
+        (t(3), [1], False, {1: "A2"}),
+    ],
+)
+def test_as_of(sesh_with_history, timestamp, ids, include_deleted, expected):
+    result = as_of(
+        sesh_with_history,
+        NetworkHistory,
+        timestamp,
+        ids=ids,
+        include_deleted=include_deleted,
+    )
+    assert {network.network_id: network.name for network in result} == expected
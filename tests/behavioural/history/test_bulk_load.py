@@ -0,0 +1,218 @@
+import datetime
+
+import pytest
+from sqlalchemy import func, select, text
+
+from pycds import (
+    History,
+    HistoryHistory,
+    HistoryHistoryLatest,
+    Network,
+    Obs,
+    ObsHistory,
+    Station,
+    Variable,
+)
+from pycds.history import bulk_load
+
+
+def count(sesh, model):
+    return sesh.scalar(select(func.count()).select_from(model))
+
+
+def insert_trigger_enabled(sesh, schema_name, table_name):
+    return sesh.execute(
+        text(
+            "SELECT tgenabled <> 'D' FROM pg_trigger "
+            "WHERE tgrelid = CAST(:table_name AS regclass) "
+            "AND tgname = 't100_primary_insert_to_hx'"
+        ),
+        {"table_name": f"{schema_name}.{table_name}"},
+    ).scalar()
+
+
+@pytest.fixture
+def sesh_with_station(sesh_in_prepared_schema_left):
+    sesh = sesh_in_prepared_schema_left
+    network = Network(name="Network")
+    variable = Variable(
+        name="T",
+        standard_name="air_temperature",
+        cell_method="time: point",
+        display_name="T",
+        network=network,
+    )
+    station = Station(native_id="S1", network=network)
+    sesh.add_all([network, variable, station])
+    sesh.flush()
+    yield sesh
+    sesh.rollback()
+
+
+def load(sesh, station_id, vars_id, n):
+    history = History(station_id=station_id, station_name="Station")
+    sesh.add(history)
+    sesh.flush()
+    sesh.execute(
+        text(
+            f"INSERT INTO {Obs.__table__.fullname} "
+            "(obs_time, datum, vars_id, history_id) "
+            "SELECT '2000-01-01'::timestamp + i * interval '1 hour', i, :vars_id, "
+            "   :history_id "
+            "FROM generate_series(1, :n) AS i"
+        ),
+        {"vars_id": vars_id, "history_id": history.id, "n": n},
+    )
+    return history
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_bulk_load(sesh_with_station, schema_name):
+    sesh = sesh_with_station
+    station = sesh.scalars(select(Station)).one()
+    variable = sesh.scalars(select(Variable)).one()
+    obs_hx_count = count(sesh, ObsHistory)
+
+    with bulk_load(sesh, [History, Obs]):
+        assert not insert_trigger_enabled(sesh, schema_name, "obs_raw")
+        history = load(sesh, station.id, variable.id, 100)
+        # Updating a loaded record
+        sesh.execute(
+            text(f"UPDATE {Obs.__table__.fullname} SET datum = -1 WHERE datum = 1")
+        )
+        # No history records until the end of the block.
+        assert count(sesh, ObsHistory) == obs_hx_count + 1
+
+    assert insert_trigger_enabled(sesh, schema_name, "obs_raw")
+    assert insert_trigger_enabled(sesh, schema_name, "meta_history")
+
+    # One history record per loaded record, in its final state, with history
+    # foreign keys resolved.
+    history_hx = sesh.scalars(
+        select(HistoryHistory).where(HistoryHistory.history_id == history.id)
+    ).one()
+    obs_hx = sesh.scalars(
+        select(ObsHistory).where(ObsHistory.history_id == history.id)
+    ).all()
+    assert len(obs_hx) == 100
+    assert sorted(obs.datum for obs in obs_hx) == [-1] + list(range(2, 101))
+    assert all(
+        obs.meta_history_hx_id == history_hx.meta_history_hx_id for obs in obs_hx
+    )
+    assert all(obs.meta_vars_hx_id is not None for obs in obs_hx)
+    assert (
+        sesh.get(HistoryHistoryLatest, history.id).meta_history_hx_id
+        == history_hx.meta_history_hx_id
+    )
+    # History ids are in order of primary key.
+    by_hx_id = sorted(obs_hx, key=lambda obs: obs.obs_raw_hx_id)
+    assert [obs.obs_raw_id for obs in by_hx_id] == sorted(
+        obs.obs_raw_id for obs in obs_hx
+    )
+
+    # Records inserted afterwards are tracked by the triggers.
+    load(sesh, station.id, variable.id, 10)
+    assert count(sesh, ObsHistory) == obs_hx_count + 110
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_bulk_load_failure(sesh_with_station, schema_name):
+    sesh = sesh_with_station
+    station = sesh.scalars(select(Station)).one()
+    variable = sesh.scalars(select(Variable)).one()
+    obs_count = count(sesh, Obs)
+    obs_hx_count = count(sesh, ObsHistory)
+
+    with pytest.raises(RuntimeError):
+        with bulk_load(sesh, [History, Obs]):
+            load(sesh, station.id, variable.id, 100)
+            raise RuntimeError("Load failed")
+
+    assert insert_trigger_enabled(sesh, schema_name, "obs_raw")
+    assert count(sesh, Obs) == obs_count
+    assert count(sesh, ObsHistory) == obs_hx_count
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_bulk_load_reads_loaded_range(sesh_with_station, schema_name):
+    """Only records with primary keys greater than those of existing records are
+    read on exit; existing records are not rescanned."""
+    sesh = sesh_with_station
+    station = sesh.scalars(select(Station)).one()
+    variable = sesh.scalars(select(Variable)).one()
+    history = History(station_id=station.id, station_name="Station")
+    sesh.add(history)
+    sesh.flush()
+
+    def insert_obs(obs_raw_id):
+        sesh.execute(
+            text(
+                f"INSERT INTO {Obs.__table__.fullname} "
+                "(obs_raw_id, obs_time, datum, vars_id, history_id) "
+                "VALUES (:obs_raw_id, '2000-01-01', 1, :vars_id, :history_id)"
+            ),
+            {
+                "obs_raw_id": obs_raw_id,
+                "vars_id": variable.id,
+                "history_id": history.id,
+            },
+        )
+
+    def obs_hx_ids(obs_raw_id):
+        return sesh.scalars(
+            select(ObsHistory.obs_raw_hx_id).where(ObsHistory.obs_raw_id == obs_raw_id)
+        ).all()
+
+    # An existing record without history, which a scan of the whole table would
+    # find and give a history record.
+    sesh.execute(
+        text(
+            f"ALTER TABLE {Obs.__table__.fullname} "
+            "DISABLE TRIGGER t100_primary_insert_to_hx"
+        )
+    )
+    insert_obs(500)
+    sesh.execute(
+        text(
+            f"ALTER TABLE {Obs.__table__.fullname} "
+            "ENABLE TRIGGER t100_primary_insert_to_hx"
+        )
+    )
+    insert_obs(1000)
+    (existing_hx_id,) = obs_hx_ids(1000)
+
+    with bulk_load(sesh, [Obs]):
+        insert_obs(2000)
+        # Updating an existing record
+        sesh.execute(
+            text(
+                f"UPDATE {Obs.__table__.fullname} SET datum = 2 "
+                "WHERE obs_raw_id = 1000"
+            )
+        )
+
+    assert len(obs_hx_ids(2000)) == 1
+    assert obs_hx_ids(500) == []
+    # The history of existing records is kept.
+    hx_ids = obs_hx_ids(1000)
+    assert len(hx_ids) == 2
+    assert existing_hx_id in hx_ids
+
+
+@pytest.mark.parametrize(
+    "tables, missing",
+    [
+        (["meta_history"], "obs_raw"),
+        (["meta_network", "meta_station"], "meta_history, meta_vars"),
+    ],
+)
+def test_bulk_load_referring_tables(tables, missing):
+    with pytest.raises(ValueError, match=f"must be loaded too: {missing}"):
+        with bulk_load(None, tables):
+            pass
+
+
+def test_bulk_load_untracked_table():
+    with pytest.raises(ValueError, match="Not history-tracked tables: meta_sensor"):
+        with bulk_load(None, ["obs_raw", "meta_sensor"]):
+            pass
@@ -3,13 +3,19 @@ import pytest
 from sqlalchemy import func, text
 
 from pycds import VarsPerHistory
-from pycds.orm.native_matviews import StationObservationStats, CollapsedVariables
-from pycds.orm.views import CrmpNetworkGeoserver
+from pycds.orm.native_matviews import (
+    StationObservationStats,
+    CollapsedVariables,
+    CrmpNetworkGeoserver,
+)
 
 
 @pytest.mark.usefixtures("new_db_left")
 def test_basic_content(sesh_with_large_data_rw):
+    sesh_with_large_data_rw.execute(VarsPerHistory.refresh())
+    sesh_with_large_data_rw.execute(CollapsedVariables.refresh())
     sesh_with_large_data_rw.execute(StationObservationStats.refresh())
+    sesh_with_large_data_rw.execute(CrmpNetworkGeoserver.refresh())
     q = sesh_with_large_data_rw.query(CrmpNetworkGeoserver.network_name)
     rv = q.all()
 
@@ -45,6 +51,7 @@ def test_collapsed_vars_content(sesh_with_large_data_rw):
     sesh_with_large_data_rw.execute(VarsPerHistory.refresh())
     sesh_with_large_data_rw.execute(CollapsedVariables.refresh())
     sesh_with_large_data_rw.execute(StationObservationStats.refresh())
+    sesh_with_large_data_rw.execute(CrmpNetworkGeoserver.refresh())
 
     num_cng_rows = sesh_with_large_data_rw.query(CrmpNetworkGeoserver).count()
     assert num_cng_rows > 0
@@ -72,3 +79,53 @@ def test_collapsed_vars_content(sesh_with_large_data_rw):
             row.CrmpNetworkGeoserver.display_names
             == row.CollapsedVariables.display_names
         )
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_matches_view(sesh_with_large_data_rw):
+    """Test that the matview has the same contents as the view it replaces"""
+    sesh_with_large_data_rw.execute(VarsPerHistory.refresh())
+    sesh_with_large_data_rw.execute(CollapsedVariables.refresh())
+    sesh_with_large_data_rw.execute(StationObservationStats.refresh())
+    sesh_with_large_data_rw.execute(CrmpNetworkGeoserver.refresh())
+
+    columns = ("history_id", "network_name", "native_id", "vars", "max_obs_time")
+    expected = (
+        sesh_with_large_data_rw.execute(
+            CrmpNetworkGeoserver.__selectable__.with_only_columns(
+                *(
+                    CrmpNetworkGeoserver.__selectable__.selected_columns[c]
+                    for c in columns
+                )
+            )
+        )
+        .mappings()
+        .all()
+    )
+    result = sesh_with_large_data_rw.query(
+        *(getattr(CrmpNetworkGeoserver, c) for c in columns)
+    ).all()
+    assert len(expected) > 0
+    assert sorted(tuple(r.values()) for r in expected) == sorted(
+        tuple(r) for r in result
+    )
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_spatial_filter(sesh_with_large_data_rw):
+    """Test that the matview can be filtered spatially, as GeoServer does"""
+    sesh_with_large_data_rw.execute(VarsPerHistory.refresh())
+    sesh_with_large_data_rw.execute(CollapsedVariables.refresh())
+    sesh_with_large_data_rw.execute(StationObservationStats.refresh())
+    sesh_with_large_data_rw.execute(CrmpNetworkGeoserver.refresh())
+
+    q = sesh_with_large_data_rw.query(CrmpNetworkGeoserver).filter(
+        CrmpNetworkGeoserver.the_geom.isnot(None)
+    )
+    num_located = q.count()
+    assert num_located > 0
+    envelope = func.ST_MakeEnvelope(-180, -90, 180, 90, 4326)
+    assert (
+        q.filter(CrmpNetworkGeoserver.the_geom.op("&&")(envelope)).count()
+        == num_located
+    )
@@ -0,0 +1,279 @@
+import datetime
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from pycds import MatviewRefreshLog
+from pycds.manage_views import all_matviews, refresh_matviews
+from pycds.orm.native_matviews import (
+    VarsPerHistory,
+    CrmpNetworkGeoserver,
+    CollapsedVariables,
+    StationObservationStats,
+)
+from pycds.orm.manual_matviews import DailyMaxTemperature, refresh_scope
+from pycds.refresh_log import (
+    is_stale,
+    latest_refreshes,
+    matview_status,
+    stale_matviews,
+)
+from pycds.alembic.extensions.replaceable_objects import ReplaceableNativeMatview
+from pycds.sqlalchemy.ddl_extensions.materialized_view import (
+    source_horizon_query,
+    source_mod_time_query,
+)
+
+
+Refresh = namedtuple("Refresh", "source_mod_time")
+
+t0 = datetime.datetime(2000, 1, 1)
+t1 = datetime.datetime(2000, 1, 2)
+
+
+@pytest.mark.parametrize(
+    "last_refresh, current_source_mod_time, expected",
+    [
+        (None, None, True),
+        (None, t0, True),
+        (Refresh(None), None, False),
+        (Refresh(None), t0, True),
+        # Modifications at the horizon may not have been seen by the refresh.
+        (Refresh(t0), t0, True),
+        (Refresh(t0), t1, True),
+        (Refresh(t1), t0, False),
+    ],
+)
+def test_is_stale(last_refresh, current_source_mod_time, expected):
+    assert is_stale(last_refresh, current_source_mod_time) == expected
+
+
+@pytest.mark.parametrize(
+    "statement, partial",
+    [
+        (VarsPerHistory.refresh(), "false"),
+        (DailyMaxTemperature.refresh(), "false"),
+        (DailyMaxTemperature.refresh_incremental(refresh_scope), "true"),
+    ],
+)
+def test_logged_refresh(statement, partial):
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DO $refresh$")
+    assert "matview_refresh_log" in sql
+    assert sql.rstrip().endswith("$refresh$")
+    assert f"{partial}\n        );" in sql
+
+
+@pytest.mark.parametrize("count_rows", [False, True])
+def test_logged_native_refresh_row_count(count_rows):
+    sql = str(
+        VarsPerHistory.refresh(count_rows=count_rows).compile(
+            dialect=postgresql.dialect()
+        )
+    )
+    assert ("SELECT count(*) INTO v_row_count" in sql) == count_rows
+
+
+def test_logged_refresh_horizon():
+    sql = str(VarsPerHistory.refresh().compile(dialect=postgresql.dialect()))
+    assert f"{source_horizon_query()} INTO v_source_mod_time" in sql
+    # The sources are not read when the refresh is logged.
+    assert "max(mod_time)" not in sql
+
+
+def test_source_mod_time_query():
+    query = source_mod_time_query(
+        ("crmp.meta_history_hx", "crmp.meta_station_hx"),
+        ("collapsed_vars_mv",),
+        "crmp.matview_refresh_log",
+    )
+    assert query.startswith("SELECT greatest(")
+    assert "(SELECT max(mod_time) FROM crmp.meta_history_hx)" in query
+    assert "(SELECT max(mod_time) FROM crmp.meta_station_hx)" in query
+    assert (
+        "(SELECT max(end_time) FROM crmp.matview_refresh_log "
+        "WHERE matview_name IN ('collapsed_vars_mv'))"
+    ) in query
+
+
+def test_logged_refresh_sources():
+    sql = str(CrmpNetworkGeoserver.refresh().compile(dialect=postgresql.dialect()))
+    assert "obs_raw" not in sql
+    # The refresh records a horizon, rather than the modification times of its
+    # sources, if they exist.
+    assert "to_regclass('crmp.meta_history_hx') IS NOT NULL" in sql
+    assert source_horizon_query() in sql
+
+
+def test_unlogged_refresh():
+    sql = str(VarsPerHistory.refresh(log=False).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("REFRESH MATERIALIZED VIEW")
+    assert "matview_refresh_log" not in sql
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_refresh_log(prepared_schema_from_migrations_left, schema_name):
+    engine = prepared_schema_from_migrations_left
+
+    with Session(engine) as sesh:
+        # Never refreshed: all stale.
+        assert latest_refreshes(sesh) == {}
+        assert stale_matviews(sesh, all_matviews) == all_matviews
+
+    # Refresh serially: a refresh in progress while another is made makes the other
+    # (conservatively) stale.
+    refresh_matviews(engine, max_workers=1)
+
+    with Session(engine) as sesh:
+        refreshes = latest_refreshes(sesh)
+        assert set(refreshes) == {matview.base_name() for matview in all_matviews}
+        for matview in all_matviews:
+            refresh = refreshes[matview.base_name()]
+            assert refresh.start_time <= refresh.end_time
+            # Native matview rows are counted only on request.
+            assert refresh.row_count == (
+                None if issubclass(matview, ReplaceableNativeMatview) else 0
+            )
+            assert not refresh.partial
+        assert stale_matviews(sesh, all_matviews) == []
+        statuses = matview_status(sesh, [VarsPerHistory])
+        assert [status.matview_name for status in statuses] == ["vars_per_history_mv"]
+        count = sesh.scalar(select(func.count()).select_from(MatviewRefreshLog))
+
+    # Nothing is stale, so nothing is refreshed.
+    refresh_matviews(engine, max_workers=3, only_stale=True)
+
+    with Session(engine) as sesh:
+        assert sesh.scalar(select(func.count()).select_from(MatviewRefreshLog)) == count
+
+
+def add_history(engine, schema_name):
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                SET search_path TO {schema_name}, public;
+                INSERT INTO meta_network (network_id, network_name)
+                    VALUES (1, 'Network');
+                INSERT INTO meta_station (station_id, network_id, native_id)
+                    VALUES (1, 1, 'S1');
+                INSERT INTO meta_history (history_id, station_id) VALUES (1, 1);
+                INSERT INTO meta_vars
+                    (vars_id, network_id, net_var_name, standard_name, cell_method,
+                    display_name)
+                    VALUES (1, 1, 'T', 'air_temperature', 'time: point', 'T');
+                """
+            )
+        )
+
+
+def insert_obs(conn, schema_name, day):
+    conn.execute(
+        text(
+            f"INSERT INTO {schema_name}.obs_raw (obs_time, datum, history_id, vars_id) "
+            f"VALUES ('2000-01-{day:02d}', 1.0, 1, 1)"
+        )
+    )
+
+
+def is_stale_now(engine, matview):
+    with Session(engine) as sesh:
+        return stale_matviews(sesh, [matview]) == [matview]
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_stale_after_interleaved_transactions(
+    prepared_schema_from_migrations_left, schema_name
+):
+    """A modification made by a transaction that began before a refresh, but
+    committed after it, makes the matview stale, even when a later transaction
+    committed before the refresh."""
+    engine = prepared_schema_from_migrations_left
+    add_history(engine, schema_name)
+
+    with engine.connect() as early, engine.connect() as late:
+        # The early transaction begins, and modifies obs_raw, first ...
+        early_transaction = early.begin()
+        insert_obs(early, schema_name, 1)
+        # ... the late one begins later, and commits before the refresh ...
+        with late.begin():
+            insert_obs(late, schema_name, 2)
+        with engine.begin() as conn:
+            conn.execute(VarsPerHistory.refresh())
+        # ... and the early one commits after it. Its modification time precedes
+        # that of the late transaction, which the refresh saw.
+        early_transaction.commit()
+
+    assert is_stale_now(engine, VarsPerHistory)
+
+    # Once refreshed with no transaction in progress, the matview is not stale.
+    with engine.begin() as conn:
+        conn.execute(VarsPerHistory.refresh())
+    assert not is_stale_now(engine, VarsPerHistory)
+
+    # A transaction in progress during a refresh that makes no modification does
+    # not make the matview stale after it ends.
+    with engine.connect() as idle:
+        with idle.begin():
+            idle.execute(text("SELECT 1"))
+            with engine.begin() as conn:
+                conn.execute(VarsPerHistory.refresh())
+    assert not is_stale_now(engine, VarsPerHistory)
+
+
+def refresh(engine, matview):
+    with engine.begin() as conn:
+        conn.execute(matview.refresh())
+
+
+def wait_for_lock(engine, timeout=10):
+    """Wait until some session is waiting for a lock."""
+    deadline = time.monotonic() + timeout
+    with engine.connect() as conn:
+        while time.monotonic() < deadline:
+            waiting = conn.scalar(
+                text(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE wait_event_type = 'Lock'"
+                )
+            )
+            conn.rollback()
+            if waiting:
+                return
+            time.sleep(0.05)
+    raise TimeoutError("No session is waiting for a lock")
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_stale_after_interleaved_source_matview_refresh(
+    prepared_schema_from_migrations_left,
+):
+    """A matview is stale if one of its source matviews was being refreshed while it
+    was refreshed, even when another source matview was refreshed (and committed)
+    after that refresh began."""
+    engine = prepared_schema_from_migrations_left
+    for matview in (StationObservationStats, CollapsedVariables, CrmpNetworkGeoserver):
+        refresh(engine, matview)
+    assert not is_stale_now(engine, CrmpNetworkGeoserver)
+
+    with engine.connect() as upstream:
+        upstream_transaction = upstream.begin()
+        upstream.execute(StationObservationStats.refresh())
+        refresh(engine, CollapsedVariables)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # The refresh of CrmpNetworkGeoserver records its horizon, then waits for
+            # the refresh of StationObservationStats to commit.
+            future = executor.submit(refresh, engine, CrmpNetworkGeoserver)
+            wait_for_lock(engine)
+            upstream_transaction.commit()
+            future.result()
+
+    assert is_stale_now(engine, CrmpNetworkGeoserver)
+
+    refresh(engine, CrmpNetworkGeoserver)
+    assert not is_stale_now(engine, CrmpNetworkGeoserver)
@@ -0,0 +1,182 @@
+import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from pycds import Network, Station, History, Variable, Obs
+
+from pycds.manage_views import (
+    all_matviews,
+    matview_dependencies,
+    topological_order,
+    with_dependents,
+    can_refresh_concurrently,
+    refresh_matviews,
+)
+from pycds.orm.native_matviews import (
+    VarsPerHistory,
+    CollapsedVariables,
+    StationObservationStats,
+    CrmpNetworkGeoserver,
+)
+from pycds.orm.native_matviews.version_f6d5a4c2e901 import (
+    DiscardedObsRaw as NativeDiscardedObsRaw,
+)
+from pycds.refresh_log import latest_refreshes
+from pycds.orm.manual_matviews import (
+    DiscardedObsRaw,
+    DailyMaxTemperature,
+    MonthlyAverageOfDailyMaxTemperature,
+    MonthlyTotalPrecipitation,
+)
+
+
+@pytest.mark.parametrize(
+    "matview, expected",
+    [
+        (VarsPerHistory, set()),
+        (CollapsedVariables, {VarsPerHistory}),
+        (CrmpNetworkGeoserver, {CollapsedVariables, StationObservationStats}),
+        (DailyMaxTemperature, set()),
+        (MonthlyTotalPrecipitation, set()),
+        (MonthlyAverageOfDailyMaxTemperature, {DailyMaxTemperature}),
+    ],
+)
+def test_matview_dependencies(matview, expected):
+    assert matview_dependencies()[matview] == expected
+
+
+def test_matview_dependencies_subset():
+    # Dependencies outside the given matviews are omitted.
+    assert matview_dependencies([CollapsedVariables]) == {CollapsedVariables: set()}
+
+
+def test_matview_dependencies_maintained():
+    # Trigger-maintained matviews are not refreshed by default, but dependencies on
+    # them are found when they are included.
+    assert DiscardedObsRaw not in all_matviews
+    assert matview_dependencies([DiscardedObsRaw, DailyMaxTemperature]) == {
+        DiscardedObsRaw: set(),
+        DailyMaxTemperature: {DiscardedObsRaw},
+    }
+
+
+def test_topological_order():
+    dependencies = matview_dependencies()
+    order = topological_order(dependencies)
+    assert set(order) == set(all_matviews)
+    for matview, prerequisites in dependencies.items():
+        for prerequisite in prerequisites:
+            assert order.index(prerequisite) < order.index(matview)
+
+
+def test_topological_order_cycle():
+    dependencies = {
+        VarsPerHistory: {CollapsedVariables},
+        CollapsedVariables: {VarsPerHistory},
+    }
+    assert topological_order(dependencies) == []
+
+
+@pytest.mark.parametrize(
+    "selected, expected",
+    [
+        ([], []),
+        (
+            [VarsPerHistory],
+            [VarsPerHistory, CollapsedVariables, CrmpNetworkGeoserver],
+        ),
+        (
+            [StationObservationStats],
+            [StationObservationStats, CrmpNetworkGeoserver],
+        ),
+        ([CrmpNetworkGeoserver], [CrmpNetworkGeoserver]),
+        (
+            [DailyMaxTemperature],
+            [DailyMaxTemperature, MonthlyAverageOfDailyMaxTemperature],
+        ),
+    ],
+)
+def test_with_dependents(selected, expected):
+    assert with_dependents(selected) == expected
+
+
+def test_can_refresh_concurrently():
+    assert can_refresh_concurrently(NativeDiscardedObsRaw)
+    assert can_refresh_concurrently(CrmpNetworkGeoserver)
+    assert not can_refresh_concurrently(DiscardedObsRaw)
+    assert not can_refresh_concurrently(VarsPerHistory)
+    assert not can_refresh_concurrently(DailyMaxTemperature)
+
+
+def add_observations(engine):
+    """Commit a station with temperature and precipitation observations, so that
+    every matview has some content."""
+    with Session(engine) as sesh:
+        network = Network(name="Network 1")
+        history = History(
+            station=Station(network=network, native_id="1"),
+            station_name="Station 1",
+            freq="1-hourly",
+            lon=-123.5,
+            lat=48.5,
+        )
+        variables = [
+            Variable(
+                network=network,
+                name=name,
+                standard_name=standard_name,
+                cell_method=cell_method,
+                display_name=name,
+            )
+            for name, standard_name, cell_method in (
+                ("T", "air_temperature", "time: point"),
+                ("P", "lwe_thickness_of_precipitation_amount", "time: sum"),
+            )
+        ]
+        sesh.add_all(
+            Obs(
+                variable=variable,
+                history=history,
+                time=datetime.datetime(2000, 1, 1) + datetime.timedelta(hours=hour),
+                datum=float(hour),
+            )
+            for variable in variables
+            for hour in range(0, 24 * 40, 6)
+        )
+        sesh.commit()
+
+
+def contents(conn, matview):
+    rows = conn.execute(text(f"SELECT * FROM {matview.qualified_name()}"))
+    return sorted((tuple(row) for row in rows), key=repr)
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_refresh_matviews(prepared_schema_from_migrations_left, schema_name):
+    engine = prepared_schema_from_migrations_left
+    add_observations(engine)
+
+    refresh_matviews(engine, max_workers=3)
+
+    with engine.connect() as conn:
+        refreshed = {matview: contents(conn, matview) for matview in all_matviews}
+    assert all(refreshed[matview] for matview in all_matviews)
+
+    # The contents are the same as those of serial, non-concurrent refreshes.
+    with engine.connect() as conn:
+        for matview in topological_order(matview_dependencies()):
+            conn.execute(matview.refresh(log=False))
+            assert contents(conn, matview) == refreshed[matview]
+        conn.rollback()
+
+    # Each matview was refreshed after the matviews it depends on.
+    with Session(engine) as sesh:
+        refreshes = latest_refreshes(sesh)
+    for matview, prerequisites in matview_dependencies().items():
+        for prerequisite in prerequisites:
+            assert (
+                refreshes[prerequisite.base_name()].end_time
+                <= refreshes[matview.base_name()].start_time
+            )
@@ -1,7 +1,7 @@
 from pytest import fixture
 
-from pycds.orm.native_matviews import (
-    DiscardedObsRaw,
+from pycds.orm.manual_matviews import DiscardedObsRaw
+from pycds.orm.manual_matviews import (
     MonthlyTotalPrecipitation,
     DailyMaxTemperature,
     DailyMinTemperature,
@@ -1,13 +1,22 @@
 import datetime
 
-from pytest import mark
+from pytest import approx, fixture, mark
+from sqlalchemy import select, text, update
 
 from pycds import Obs
-from pycds.manage_views import daily_views, monthly_views, manage_views
+from pycds.orm.manual_matviews import refresh_scope
+from pycds.manage_views import (
+    daily_views,
+    monthly_views,
+    precipitation_views,
+    manage_views,
+    refresh_views_incrementally,
+)
 
 
 daily_view_names = [v.base_name() for v in daily_views]
 monthly_view_names = [v.base_name() for v in monthly_views]
+all_views = daily_views + monthly_views + precipitation_views
 
 
 @mark.parametrize(
@@ -61,3 +70,162 @@ def test_refresh(
     # Now each view should contain something
     for view in exp_views:
         assert prepared_sesh_left.query(view).count() > 0
+
+
+@fixture
+def refreshed_sesh(
+    prepared_sesh_left,
+    network1,
+    station1,
+    history_stn1_hourly,
+    var_temp_point,
+    var_precip_net1_1,
+):
+    """Yield a session containing January observations, with all views fully
+    refreshed."""
+    session = prepared_sesh_left
+    session.add_all([network1, station1, history_stn1_hourly, var_temp_point])
+    session.add_all(
+        [
+            Obs(
+                variable=variable,
+                history=history_stn1_hourly,
+                time=datetime.datetime(2000, 1, day, hour),
+                datum=float(hour),
+            )
+            for variable in [var_temp_point, var_precip_net1_1]
+            for day in (1, 15, 31)
+            for hour in (6, 18)
+        ]
+    )
+    session.flush()
+    manage_views(session, "refresh", "all")
+    session.flush()
+    yield session
+
+
+@fixture
+def february_obs(history_stn1_hourly, var_temp_point, var_precip_net1_1):
+    return [
+        Obs(
+            variable=variable,
+            history=history_stn1_hourly,
+            time=datetime.datetime(2000, 2, day, hour),
+            datum=float(day),
+        )
+        for variable in [var_temp_point, var_precip_net1_1]
+        for day in (1, 2)
+        for hour in (6, 18)
+    ]
+
+
+def view_contents(session, view):
+    return sorted(tuple(row) for row in session.execute(select(view.__table__)))
+
+
+def expected_contents(session, view):
+    return sorted(tuple(row) for row in session.execute(view.__selectable__))
+
+
+def test_refresh_incrementally(refreshed_sesh, february_obs):
+    session = refreshed_sesh
+    session.add_all(february_obs)
+    session.flush()
+
+    refresh_views_incrementally(session, datetime.datetime(1900, 1, 1), "all")
+    session.flush()
+
+    for view in all_views:
+        actual = view_contents(session, view)
+        expected = expected_contents(session, view)
+        assert [row[:3] for row in actual] == [row[:3] for row in expected]
+        for actual_row, expected_row in zip(actual, expected):
+            assert actual_row[3:] == approx(expected_row[3:])
+
+
+def test_refresh_incrementally_out_of_scope(refreshed_sesh, february_obs):
+    session = refreshed_sesh
+    before = {view: view_contents(session, view) for view in all_views}
+    session.add_all(february_obs)
+    session.flush()
+
+    # No observations were modified after this time, so nothing is refreshed.
+    refresh_views_incrementally(session, datetime.datetime(3000, 1, 1), "all")
+    session.flush()
+
+    for view in all_views:
+        assert view_contents(session, view) == before[view]
+
+
+def create_scope(session, keys):
+    """Create the temporary table `refresh_scope` containing `keys`, a list of
+    (history_id, vars_id, obs_month)."""
+    session.execute(text(f"DROP TABLE IF EXISTS {refresh_scope.name}"))
+    session.execute(
+        text(
+            f"CREATE TEMPORARY TABLE {refresh_scope.name} "
+            f"(history_id integer, vars_id integer, obs_month timestamp) "
+            f"ON COMMIT DROP"
+        )
+    )
+    session.execute(
+        refresh_scope.insert(),
+        [dict(zip(("history_id", "vars_id", "obs_month"), key)) for key in keys],
+    )
+
+
+def test_refresh_incrementally_partial_scope(
+    refreshed_sesh, february_obs, history_stn1_hourly
+):
+    session = refreshed_sesh
+    session.add_all(february_obs)
+    session.flush()
+    manage_views(session, "refresh", "all")
+    session.flush()
+
+    # Mark every row, so that rows that are recomputed can be distinguished from
+    # rows that are kept.
+    sentinel = -999.0
+    for view in all_views:
+        session.execute(update(view.__table__).values(statistic=sentinel))
+    before = {view: view_contents(session, view) for view in all_views}
+
+    # Change the February observations, then refresh February only.
+    for obs in february_obs:
+        obs.datum += 10
+    session.flush()
+    february = datetime.datetime(2000, 2, 1)
+
+    def in_scope(row):
+        # Period (day or month) is the third column of each view.
+        return row[2] >= february
+
+    create_scope(
+        session,
+        [(history_stn1_hourly.id, obs.variable.id, february) for obs in february_obs],
+    )
+    for view in all_views:
+        session.execute(view.refresh_incremental(refresh_scope))
+    session.flush()
+
+    for view in all_views:
+        actual = view_contents(session, view)
+        expected = expected_contents(session, view)
+        # Rows outside the scope, including those at the end of January, which
+        # adjoin it, are kept as they were.
+        kept = [row for row in actual if not in_scope(row)]
+        assert kept == [row for row in before[view] if not in_scope(row)]
+        assert len(kept) > 0
+        assert all(row[3] == sentinel for row in kept)
+        # Rows in the scope, from its first day, are replaced by their new values.
+        replaced = [row for row in actual if in_scope(row)]
+        assert [row[:3] for row in replaced] == [
+            row[:3] for row in expected if in_scope(row)
+        ]
+        assert len(replaced) > 0
+        for actual_row, expected_row in zip(
+            replaced, [row for row in expected if in_scope(row)]
+        ):
+            assert actual_row[3:] == approx(expected_row[3:])
+        if view in daily_views:
+            assert replaced[0][2] == february
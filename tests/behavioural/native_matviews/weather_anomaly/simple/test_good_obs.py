@@ -2,7 +2,7 @@
 
 import pytest
 from pycds import Obs
-from pycds.orm.native_matviews import good_obs
+from pycds.orm.manual_matviews import good_obs
 
 
 @pytest.mark.slow
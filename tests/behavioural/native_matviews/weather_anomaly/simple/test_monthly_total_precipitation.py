@@ -1,4 +1,4 @@
-from pycds.orm.native_matviews import (
+from pycds.orm.manual_matviews import (
     MonthlyTotalPrecipitation,
     monthly_total_precipitation_with_total_coverage,
     monthly_total_precipitation_with_avg_coverage,
@@ -9,12 +9,71 @@ def sesh_with_basics(schema_name, sesh_in_prepared_schema_left):
     yield sesh_in_prepared_schema_left
 
 
+def primary_table_triggers(table_name, trigger_level, foreign_keys=""):
+    """Return DDL for the history tracking triggers on primary table `table_name`,
+    at the specified trigger level ("row" or "statement")."""
+    control = f"""
+CREATE TRIGGER t100_primary_control_hx_cols
+    BEFORE INSERT OR DELETE OR UPDATE
+    ON {table_name}
+    FOR EACH ROW
+EXECUTE FUNCTION hxtk_primary_control_hx_cols();
+"""
+    if trigger_level == "row":
+        return (
+            control
+            + f"""
+CREATE TRIGGER t100_primary_ops_to_hx
+    AFTER INSERT OR DELETE OR UPDATE
+    ON {table_name}
+    FOR EACH ROW
+EXECUTE FUNCTION hxtk_primary_ops_to_hx();
+"""
+        )
+    return control + "".join(
+        f"""
+CREATE TRIGGER t100_primary_{event.lower()}_to_hx
+    AFTER {event}
+    ON {table_name}
+    REFERENCING {transition_table}
+    FOR EACH STATEMENT
+EXECUTE FUNCTION hxtk_primary_stmt_ops_to_hx({foreign_keys});
+"""
+        for event, transition_table in (
+            ("INSERT", "NEW TABLE AS new_rows"),
+            ("UPDATE", "NEW TABLE AS new_rows"),
+            ("DELETE", "OLD TABLE AS old_rows"),
+        )
+    )
+
+
+def history_table_triggers(table_name, trigger_level, foreign_keys):
+    """Return DDL for the history tracking triggers on history table `table_name`.
+    Statement-level primary table triggers require none."""
+    if trigger_level == "statement":
+        return ""
+    return f"""
+CREATE TRIGGER t100_add_foreign_hx_keys
+    BEFORE INSERT
+    ON {table_name}
+    FOR EACH ROW
+EXECUTE FUNCTION hxtk_add_foreign_hx_keys({foreign_keys});
+"""
+
+
+@pytest.fixture(params=["row", "statement"])
+def trigger_level(request):
+    return request.param
+
+
 @pytest.fixture()
-def sesh_with_test_tables(sesh_with_basics):
+def sesh_with_test_tables(sesh_with_basics, trigger_level):
     sesh = sesh_with_basics
+    b_foreign_keys = "'{{a, a_id}}'"
+    c_foreign_keys = "'{{a, a_id}, {b, b_id}}'"
     sesh.execute(
         text(
-            """
+            f"""
 CREATE TABLE a (
     -- Main attributes
     a_id SERIAL PRIMARY KEY,
@@ -23,19 +82,7 @@ CREATE TABLE a (
     mod_time timestamp WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
     mod_user character varying(64) COLLATE pg_catalog."default" NOT NULL DEFAULT CURRENT_USER
 ); 
-        
-CREATE TRIGGER t100_primary_control_hx_cols
-    BEFORE INSERT OR DELETE OR UPDATE
-    ON a
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_primary_control_hx_cols();
-
-CREATE TRIGGER t100_primary_ops_to_hx
-    AFTER INSERT OR DELETE OR UPDATE
-    ON a
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_primary_ops_to_hx();
-
+{primary_table_triggers("a", trigger_level)}
 CREATE TABLE b (
     -- Main attributes
     b_id SERIAL PRIMARY KEY,
@@ -45,19 +92,7 @@ CREATE TABLE b (
     mod_time timestamp WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
     mod_user character varying(64) COLLATE pg_catalog."default" NOT NULL DEFAULT CURRENT_USER
 );
-
-CREATE TRIGGER t100_primary_control_hx_cols
-    BEFORE INSERT OR DELETE OR UPDATE
-    ON b
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_primary_control_hx_cols();
-
-CREATE TRIGGER t100_primary_ops_to_hx
-    AFTER INSERT OR DELETE OR UPDATE
-    ON b
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_primary_ops_to_hx();
-
+{primary_table_triggers("b", trigger_level, b_foreign_keys)}
 CREATE TABLE c (
     -- Main attributes
     c_id SERIAL PRIMARY KEY,
@@ -68,19 +103,7 @@ CREATE TABLE c (
     mod_time timestamp WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
     mod_user character varying(64) COLLATE pg_catalog."default" NOT NULL DEFAULT CURRENT_USER
 );
-
-CREATE TRIGGER t100_primary_control_hx_cols
-    BEFORE INSERT OR DELETE OR UPDATE
-    ON c
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_primary_control_hx_cols();
-
-CREATE TRIGGER t100_primary_ops_to_hx
-    AFTER INSERT OR DELETE OR UPDATE
-    ON c
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_primary_ops_to_hx();
-
+{primary_table_triggers("c", trigger_level, c_foreign_keys)}
 -- History tables
 CREATE TABLE a_hx (
     a_id INTEGER,
@@ -106,13 +129,7 @@ CREATE TABLE b_hx (
     -- Foreign key columns. 
     a_hx_id INTEGER REFERENCES a_hx (a_hx_id) -- inserted by trigger fn
 );
-
-CREATE TRIGGER t100_add_foreign_hx_keys
-    BEFORE INSERT
-    ON b_hx
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_add_foreign_hx_keys('{{a, a_id}}');
-               
+{history_table_triggers("b_hx", trigger_level, b_foreign_keys)}
 CREATE TABLE c_hx (
     -- Must parallel primary table cols: $1.* (NEW.*/OLD.*)
     c_id INTEGER,
@@ -128,13 +145,7 @@ CREATE TABLE c_hx (
     a_hx_id INTEGER REFERENCES a_hx (a_hx_id), -- inserted by trigger fn
     b_hx_id INTEGER REFERENCES b_hx (b_hx_id) -- inserted by trigger fn
 );
-
-CREATE TRIGGER t100_add_foreign_hx_keys
-    BEFORE INSERT
-    ON c_hx
-    FOR EACH ROW
-EXECUTE FUNCTION hxtk_add_foreign_hx_keys('{{a, a_id}, {b, b_id}}');
-               
+{history_table_triggers("c_hx", trigger_level, c_foreign_keys)}
         """
         )
     )
@@ -0,0 +1,32 @@
+import pytest
+from pycds.orm.views import ClimoObsCount
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_view_content(sesh_with_large_data_rw):
+    """Test that ClimoObsCount definition is correct."""
+
+    # Content is present without any refresh.
+    q = sesh_with_large_data_rw.query(ClimoObsCount)
+    assert q.count() > 0
+
+    # This test sucks, relying as it does on hardcoded magic numbers taken from
+    # the large dataset. But it's what we've got just now.
+    expected_pairs = {
+        (48, 816),
+        (48, 1516),
+        (2, 2516),
+        (48, 1216),
+        (48, 1016),
+        (48, 1616),
+        (12, 516),
+        (36, 1816),
+        (48, 1716),
+        (48, 1316),
+        (21, 3516),
+        (5, 2016),
+    }
+    result_pairs = {(row.count, row.history_id) for row in q.all()}
+    assert expected_pairs <= result_pairs
+    for pair in expected_pairs:
+        assert pair in result_pairs
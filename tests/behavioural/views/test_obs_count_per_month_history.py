@@ -2,22 +2,19 @@ from datetime import datetime
 
 import pytest
 import sqlalchemy
-from pycds.orm.native_matviews import ObsCountPerMonthHistory
+from sqlalchemy import func, update, text
+
+from pycds import Obs
+from pycds.orm.manual_matviews import ObsCountPerMonth
+from pycds.orm.views import ObsCountPerMonthHistory
 
 
 @pytest.mark.usefixtures("new_db_left")
-def test_matview_content(sesh_with_large_data_rw):
+def test_view_content(sesh_with_large_data_rw):
     """Test that ObsCountPerMonthHistory definition is correct."""
 
+    # Content is present without any refresh.
     q = sesh_with_large_data_rw.query(ObsCountPerMonthHistory)
-
-    # No content before matview is refreshed
-    assert q.count() == 0
-
-    # Refresh
-    sesh_with_large_data_rw.execute(ObsCountPerMonthHistory.refresh())
-
-    # Et voila
     assert q.count() > 0
 
     # Test that some expected rows are present.
@@ -583,23 +580,56 @@ def test_matview_content(sesh_with_large_data_rw):
     assert expected_rows <= result_rows
 
 
+@pytest.mark.usefixtures("new_db_left")
+def test_view_matches_obs(sesh_with_large_data_rw):
+    """Test that ObsCountPerMonthHistory matches a count over obs_raw, and stays
+    current as observations change."""
+    sesh = sesh_with_large_data_rw
+    month = func.date_trunc("month", Obs.time)
+    obs_counts_q = sesh.query(func.count(Obs.id), month, Obs.history_id).group_by(
+        month, Obs.history_id
+    )
+
+    def view_rows():
+        return {
+            (row.count, row.date_trunc, row.history_id)
+            for row in sesh.query(ObsCountPerMonthHistory).all()
+        }
+
+    assert view_rows() == set(obs_counts_q.all())
+
+    # Move the observations of one history to other months.
+    history_id = sesh.query(Obs.history_id).limit(1).scalar()
+    sesh.execute(
+        update(Obs)
+        .where(Obs.history_id == history_id)
+        .values(time=Obs.time + text("interval '1000 years'"))
+    )
+    assert view_rows() == set(obs_counts_q.all())
+
+
 @pytest.mark.usefixtures("new_db_left")
 def test_index(schema_name, prepared_schema_from_migrations_left):
-    """Test that ObsCountPerMonthHistory has the expected index."""
+    """Test that ObsCountPerMonth, which ObsCountPerMonthHistory summarizes, has the
+    expected indexes."""
     engine = prepared_schema_from_migrations_left
     inspector = sqlalchemy.inspect(engine)
     indexes = inspector.get_indexes(
-        table_name=(ObsCountPerMonthHistory.base_name()), schema=schema_name
+        table_name=(ObsCountPerMonth.base_name()), schema=schema_name
     )
-    assert indexes == [
+    assert sorted(indexes, key=lambda index: index["name"]) == [
         {
-            "name": "obs_count_per_month_history_idx",
-            "column_names": [
-                "date_trunc",
-                "history_id",
-            ],
+            "name": "obs_count_per_month_mv_month_idx",
+            "column_names": ["obs_month", "history_id"],
             "unique": False,
             "include_columns": [],
             "dialect_options": {"postgresql_include": []},
-        }
+        },
+        {
+            "name": "obs_count_per_month_mv_pkey",
+            "column_names": ["history_id", "vars_id", "obs_month"],
+            "unique": True,
+            "include_columns": [],
+            "dialect_options": {"postgresql_include": []},
+        },
     ]
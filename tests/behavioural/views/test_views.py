@@ -1,8 +1,12 @@
+import datetime
+
 import pytest
-from sqlalchemy import func, text
+from sqlalchemy import func, text, select
 
 from pycds import Obs, History
-from pycds.orm.views import HistoryStationNetwork, ObsCountPerDayHistory, ObsWithFlags
+from pycds.manage_views import refresh_views_incrementally
+from pycds.orm.manual_matviews import ObsCountPerDayHistory
+from pycds.orm.views import HistoryStationNetwork, ObsWithFlags
 
 
 @pytest.mark.usefixtures("new_db_left")
@@ -22,6 +26,7 @@ def test_history_station_network(sesh_with_large_data_rw):
 
 @pytest.mark.usefixtures("new_db_left")
 def test_obs_count_per_day_history(sesh_with_large_data_rw):
+    sesh_with_large_data_rw.execute(ObsCountPerDayHistory.refresh())
     ocdh_count_over_hx_q = (
         sesh_with_large_data_rw.query(
             ObsCountPerDayHistory.history_id.label("history_id"),
@@ -51,6 +56,36 @@ def test_obs_count_per_day_history(sesh_with_large_data_rw):
         assert ocdh_count.count == obs_count.count
 
 
+@pytest.mark.usefixtures("new_db_left")
+def test_obs_count_per_day_history_incremental(sesh_with_large_data_rw):
+    sesh = sesh_with_large_data_rw
+    sesh.execute(ObsCountPerDayHistory.refresh())
+
+    def contents():
+        return sorted(tuple(row) for row in sesh.execute(select(ObsCountPerDayHistory)))
+
+    def expected_contents():
+        return sorted(
+            tuple(row) for row in sesh.execute(ObsCountPerDayHistory.__selectable__)
+        )
+
+    # Move the observations of one history to other days. Updating an observation
+    # updates its modification time.
+    since = sesh.execute(text("SELECT now()::timestamp")).scalar()
+    history_id = sesh.query(Obs.history_id).limit(1).scalar()
+    sesh.execute(
+        text(
+            "UPDATE obs_raw SET obs_time = obs_time + interval '1000 years' "
+            "WHERE history_id = :history_id"
+        ),
+        {"history_id": history_id},
+    )
+    assert contents() != expected_contents()
+
+    refresh_views_incrementally(sesh, since, "obs-counts")
+    assert contents() == expected_contents()
+
+
 @pytest.mark.usefixtures("new_db_left")
 def test_obs_with_flags(sesh_with_large_data_rw):
     obs_with_flags_q = sesh_with_large_data_rw.query(ObsWithFlags).order_by(
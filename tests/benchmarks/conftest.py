@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks import synthetic
+
+
+@pytest.fixture
+def head_engine(alembic_engine, alembic_runner):
+    """Engine for a database migrated to the head revision."""
+    alembic_runner.migrate_up_to("head")
+    yield alembic_engine
+
+
+@pytest.fixture
+def scale():
+    """Scale of a synthetic dataset small enough to generate in a test."""
+    return synthetic.Scale(
+        networks=1,
+        stations_per_network=2,
+        histories_per_station=2,
+        variables_per_network=3,
+        obs_per_history=30,
+        flag_density=0.5,
+    )
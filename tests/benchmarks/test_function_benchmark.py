@@ -0,0 +1,46 @@
+import pytest
+
+from benchmarks.common import plan_summary
+from benchmarks.functions import cases, run
+
+
+def test_plan_summary():
+    plan = {
+        "Plan": {
+            "Node Type": "Finalize Aggregate",
+            "Parallel Aware": False,
+            "Plans": [
+                {
+                    "Node Type": "Gather",
+                    "Parallel Aware": False,
+                    "Workers Planned": 2,
+                    "Workers Launched": 1,
+                    "Plans": [{"Node Type": "Seq Scan", "Parallel Aware": True}],
+                }
+            ],
+        }
+    }
+    assert plan_summary(plan) == {
+        "parallel": True,
+        "workers_planned": 2,
+        "workers_launched": 1,
+    }
+    assert plan_summary({"Plan": {"Node Type": "Seq Scan"}}) == {
+        "parallel": False,
+        "workers_planned": 0,
+        "workers_launched": 0,
+    }
+
+
+@pytest.mark.update20
+def test_function_benchmark(head_engine, scale):
+    results = run(head_engine, scale=scale, repeat=2, force_parallel=True)
+
+    assert set(results["cases"]) == set(cases())
+    for result in results["cases"].values():
+        assert len(result["time"]["seconds"]) == 2
+        assert "Plan" in result["plan"]
+    # At the head revision, the functions can be inlined, and plans parallel.
+    for name in ("daysinmonth", "lastdateofmonth", "season", "variable_tags"):
+        assert results["cases"][name]["inlined"]
+        assert results["cases"][name]["plan_summary"]["workers_planned"] > 0
@@ -0,0 +1,16 @@
+from benchmarks.import_time import cases, run, violations
+
+
+def test_lazy_loading():
+    """Test that no import statement loads modules it does not need."""
+    results = run(repeat=1)
+
+    assert set(results["imports"]) == {statement for statement, _ in cases}
+    assert violations(results) == []
+    assert results["imports"]["import pycds"]["modules"] == [
+        "pycds",
+        "pycds.context",
+        "pycds.lazy",
+    ]
+    for result in results["imports"].values():
+        assert result["median"] > 0
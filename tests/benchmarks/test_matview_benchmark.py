@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks.matviews import native_matviews, run
+
+
+@pytest.mark.update20
+def test_matview_benchmark(head_engine, scale):
+    results = run(head_engine, scale=scale, repeat=2)
+
+    assert results["scale"] == scale._asdict()
+    assert results["row_counts"]["meta_history"] == 4
+    assert results["row_counts"]["obs_raw"] == 4 * 30
+    assert results["row_counts"]["obs_raw_native_flags"] > 0
+    assert set(results["matviews"]) == {mv.base_name() for mv in native_matviews()}
+    for result in results["matviews"].values():
+        for operation in ("create", "refresh"):
+            assert len(result[operation]["seconds"]) == 2
+            assert result[operation]["median"] >= 0
+        assert result["rows"] >= 0
+        assert "Plan" in result["plan"]
+
+    # The benchmark leaves no trace beyond the generated dataset.
+    assert run(head_engine, repeat=1)["row_counts"] == results["row_counts"]
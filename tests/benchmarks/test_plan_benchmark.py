@@ -0,0 +1,214 @@
+import datetime
+import os
+
+import pytest
+
+from benchmarks.plans import (
+    client_queries,
+    compare,
+    format_comparisons,
+    parse_settings,
+    run,
+    summarize,
+)
+
+
+index_plan = {
+    "Plan": {
+        "Node Type": "Sort",
+        "Total Cost": 100.0,
+        "Sort Method": "quicksort",
+        "Sort Space Type": "Memory",
+        "Plans": [
+            {
+                "Node Type": "Index Scan",
+                "Relation Name": "obs_raw",
+                "Index Name": "obs_raw_history_id_idx",
+            }
+        ],
+    }
+}
+
+seq_plan = {
+    "Plan": {
+        "Node Type": "Sort",
+        "Total Cost": 150.0,
+        "Sort Method": "external merge",
+        "Sort Space Type": "Disk",
+        "Plans": [{"Node Type": "Seq Scan", "Relation Name": "obs_raw"}],
+    }
+}
+
+
+def results(**plans):
+    return {
+        "cases": {name: {"summary": summarize(plan)} for name, plan in plans.items()}
+    }
+
+
+def test_summarize():
+    assert summarize(index_plan) == {
+        "shape": ["Sort", "  Index Scan on obs_raw using obs_raw_history_id_idx"],
+        "cost": 100.0,
+        "seq_scans": [],
+        "index_scans": ["obs_raw"],
+        "sort_spills": 0,
+    }
+    assert summarize(seq_plan) == {
+        "shape": ["Sort", "  Seq Scan on obs_raw"],
+        "cost": 150.0,
+        "seq_scans": ["obs_raw"],
+        "index_scans": [],
+        "sort_spills": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "base, new, cost_tolerance, expected",
+    [
+        (
+            index_plan,
+            index_plan,
+            None,
+            {
+                "shape_changed": False,
+                "seq_scans": [],
+                "sort_spills": False,
+                "costlier": False,
+                "regressed": False,
+            },
+        ),
+        (
+            index_plan,
+            seq_plan,
+            None,
+            {
+                "shape_changed": True,
+                "seq_scans": ["obs_raw"],
+                "sort_spills": True,
+                "costlier": False,
+                "regressed": True,
+            },
+        ),
+        (
+            index_plan,
+            seq_plan,
+            0.2,
+            {
+                "shape_changed": True,
+                "seq_scans": ["obs_raw"],
+                "sort_spills": True,
+                "costlier": True,
+                "regressed": True,
+            },
+        ),
+        # Replacing sequential scans with index scans is not a regression.
+        (
+            seq_plan,
+            index_plan,
+            0.2,
+            {
+                "shape_changed": True,
+                "seq_scans": [],
+                "sort_spills": False,
+                "costlier": False,
+                "regressed": False,
+            },
+        ),
+    ],
+)
+def test_compare(base, new, cost_tolerance, expected):
+    (comparison,) = compare(
+        results(q=base), results(q=new), cost_tolerance=cost_tolerance
+    )
+    assert comparison["case"] == "q"
+    assert {key: comparison[key] for key in expected} == expected
+
+
+def test_compare_missing_cases():
+    assert compare(results(a=index_plan), results(b=index_plan)) == []
+
+
+def test_client_queries():
+    values = {
+        "history_id": 1,
+        "station_id": 2,
+        "network_id": 3,
+        "vars_id": 4,
+        "obs_time": datetime.datetime(2000, 1, 1),
+        "flagged_obs_raw_id": 5,
+        "mod_time": datetime.datetime(2000, 1, 2),
+    }
+    queries = client_queries(values, schema_name="crmp")
+    assert "WHERE history_id = 1 " in queries["obs_of_history"]
+    assert "obs_time >= '2000-01-01 00:00:00'" in queries["obs_in_time_range"]
+    for query in queries.values():
+        assert query.startswith("SELECT ")
+        assert " crmp." in query
+    # Values are NULL for an empty dataset.
+    queries = client_queries(dict.fromkeys(values), schema_name="crmp")
+    assert "WHERE history_id = NULL " in queries["obs_of_history"]
+
+
+def test_parse_settings():
+    assert parse_settings(None) == {}
+    assert parse_settings(["enable_seqscan=off", "work_mem=64kB"]) == {
+        "enable_seqscan": "off",
+        "work_mem": "64kB",
+    }
+
+
+@pytest.mark.update20
+def test_plan_benchmark(head_engine, scale):
+    # On so small a dataset the planner prefers sequential scans; discourage them
+    # in the baseline, and disable index scans in the new run.
+    base = run(head_engine, scale=scale, settings={"enable_seqscan": "off"})
+    new = run(
+        head_engine,
+        settings={
+            "enable_indexscan": "off",
+            "enable_indexonlyscan": "off",
+            "enable_bitmapscan": "off",
+        },
+    )
+
+    assert set(new["cases"]) == set(base["cases"])
+    kinds = {result["kind"] for result in base["cases"].values()}
+    assert kinds == {"view", "matview", "client"}
+    for result in base["cases"].values():
+        assert "Plan" in result["plan"]
+        assert result["summary"]["cost"] > 0
+    assert base["cases"]["obs_of_history"]["summary"]["index_scans"]
+
+    # A run compared with itself does not regress.
+    assert not any(c["regressed"] for c in compare(base, base))
+    # Index scans replaced by sequential scans are regressions.
+    regressed = {c["case"] for c in compare(base, new) if c["regressed"]}
+    assert "obs_of_history" in regressed
+    assert "histories_of_station" in regressed
+
+
+# Revision whose query plans `test_plan_regression` checks the head revision
+# against: the head revision of the latest release. Update it on release.
+base_revision = os.environ.get("PYCDS_PLAN_BASE_REVISION", "f6d5a4c2e901")
+
+
+@pytest.mark.update20
+@pytest.mark.plan_regression
+def test_plan_regression(alembic_engine, alembic_runner, scale):
+    """No query plan at the head revision regresses from the base revision, on the
+    same data: no query scans sequentially a relation it scanned by index, spills a
+    sort to disk, or costs more than the tolerance."""
+    # Sequential scans are discouraged, so that the plans show the indexes each
+    # query can use; on so small a dataset the planner would otherwise prefer
+    # sequential scans everywhere.
+    settings = {"enable_seqscan": "off"}
+    alembic_runner.migrate_up_to(base_revision)
+    base = run(alembic_engine, scale=scale, settings=settings)
+    alembic_runner.migrate_up_to("head")
+    new = run(alembic_engine, settings=settings)
+
+    comparisons = compare(base, new, cost_tolerance=0.2)
+    print(format_comparisons(base, new, comparisons))
+    assert comparisons
+    assert not any(c["regressed"] for c in comparisons)
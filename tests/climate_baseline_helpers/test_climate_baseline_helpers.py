@@ -250,6 +250,7 @@ def describe_load__pcic__climate__baseline__values():
                         (["100", "foo", "200"], 2),
                     ],
                 )
+                @mark.parametrize("bulk", [False, True])
                 def it_correctly_converts_and_loads_values_into_the_database(
                     sesh_with_station_and_history_records,
                     stations,
@@ -257,6 +258,7 @@ def describe_load__pcic__climate__baseline__values():
                     source,
                     exclude,
                     n_exclude_matching,
+                    bulk,
                 ):
                     sesh = sesh_with_station_and_history_records
 
@@ -267,7 +269,7 @@ def describe_load__pcic__climate__baseline__values():
                         n_lines_excluded,
                         n_lines_skipped,
                     ) = load_pcic_climate_baseline_values(
-                        sesh, var_name, source, exclude
+                        sesh, var_name, source, exclude, bulk=bulk
                     )
                     assert n_lines_added == len(stations) - n_exclude_matching
                     assert n_values_added == n_lines_added * 12
@@ -358,11 +360,13 @@ def describe_load__pcic__climate__baseline__values():
                     "var_name",
                     ["Tx_Climatology", "Tn_Climatology", "Precip_Climatology"],
                 )
+                @mark.parametrize("bulk", [False, True])
                 def it_loads_only_non_absent_values(
                     sesh_with_station_and_history_records,
                     stations,
                     var_name,
                     source,
+                    bulk,
                 ):
                     sesh = sesh_with_station_and_history_records
 
@@ -372,7 +376,9 @@ def describe_load__pcic__climate__baseline__values():
                         n_lines_errored,
                         n_lines_excluded,
                         n_lines_skipped,
-                    ) = load_pcic_climate_baseline_values(sesh, var_name, source)
+                    ) = load_pcic_climate_baseline_values(
+                        sesh, var_name, source, bulk=bulk
+                    )
                     assert n_lines_added == 1
                     assert n_values_added == 8
                     assert n_lines_errored == 0
@@ -400,6 +406,53 @@ def describe_load__pcic__climate__baseline__values():
                         12,
                     }
 
+                def it_counts_values_of_duplicate_lines_once_in_bulk_mode(
+                    sesh_with_station_and_history_records,
+                    source,
+                ):
+                    result = load_pcic_climate_baseline_values(
+                        sesh_with_station_and_history_records,
+                        "Precip_Climatology",
+                        source + source,
+                        bulk=True,
+                    )
+                    assert result == (2, 8, 0, 0, 0)
+
+                def it_replaces_existing_values_in_bulk_mode(
+                    sesh_with_station_and_history_records,
+                    stations,
+                    source,
+                ):
+                    sesh = sesh_with_station_and_history_records
+                    var_name = "Precip_Climatology"
+                    load_pcic_climate_baseline_values(sesh, var_name, source)
+                    reloaded = [line.replace(" 2     ", " 20    ") for line in source]
+
+                    result = load_pcic_climate_baseline_values(
+                        sesh, var_name, reloaded, bulk=True
+                    )
+                    assert result == (1, 8, 0, 0, 0)
+
+                    station_values = (
+                        sesh.query(DerivedValue)
+                        .join(DerivedValue.variable)
+                        .filter(Variable.name == var_name)
+                        .join(History)
+                        .join(Station)
+                        .filter(Station.id == stations[0].id)
+                        .order_by(DerivedValue.time)
+                    )
+                    assert [sv.datum for sv in station_values] == [
+                        20,
+                        3,
+                        4,
+                        5,
+                        7,
+                        8,
+                        11,
+                        12,
+                    ]
+
 
 def describe_verify__baseline__network__and__variables():
     def describe_without_baseline_network():
@@ -0,0 +1,100 @@
+import csv
+import datetime
+import io
+
+import pytest
+from sqlalchemy import func, select
+
+from pycds import History, Obs
+from pycds.export import (
+    column_names,
+    export_query,
+    numpy_batches,
+    record_batches,
+    row_batches,
+    write_csv,
+    write_parquet,
+)
+
+# A random selection of stations in the large data set.
+station_ids = [4137, 1213, 2313]
+
+
+def expected_count(sesh, start_time=None):
+    q = (
+        select(func.count())
+        .select_from(Obs)
+        .join(History, Obs.history_id == History.id)
+        .where(History.station_id.in_(station_ids))
+    )
+    if start_time is not None:
+        q = q.where(Obs.time >= start_time)
+    return sesh.execute(q).scalar()
+
+
+def test_export_query_unknown_column():
+    with pytest.raises(ValueError, match="Unknown export columns: bogus"):
+        export_query(columns=["obs_time", "bogus"])
+
+
+@pytest.mark.usefixtures("new_db_left")
+@pytest.mark.parametrize("start_time", [None, datetime.datetime(2000, 1, 1)])
+def test_row_batches(sesh_with_large_data_rw, start_time):
+    sesh = sesh_with_large_data_rw
+    batches = list(
+        row_batches(
+            sesh, batch_size=100, station_ids=station_ids, start_time=start_time
+        )
+    )
+    assert all(len(batch) <= 100 for batch in batches)
+    rows = [row for batch in batches for row in batch]
+    assert len(rows) == expected_count(sesh, start_time)
+    assert all(row.station_id in station_ids for row in rows)
+    if start_time is not None:
+        assert all(row.obs_time >= start_time for row in rows)
+    # Ordered by time, variable, history
+    keys = [(row.obs_time, row.vars_id, row.history_id) for row in rows]
+    assert keys == sorted(keys)
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_write_csv(sesh_with_large_data_rw):
+    sesh = sesh_with_large_data_rw
+    columns = ["obs_raw_id", "obs_time", "datum"]
+    f = io.StringIO()
+    count = write_csv(sesh, f, batch_size=50, columns=columns, station_ids=station_ids)
+    assert count == expected_count(sesh)
+    lines = list(csv.reader(io.StringIO(f.getvalue())))
+    assert lines[0] == columns
+    assert len(lines) == count + 1
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_record_batches(sesh_with_large_data_rw):
+    pytest.importorskip("pyarrow")
+    sesh = sesh_with_large_data_rw
+    batches = list(record_batches(sesh, batch_size=100, station_ids=station_ids))
+    assert all(batch.schema.names == list(column_names) for batch in batches)
+    assert sum(batch.num_rows for batch in batches) == expected_count(sesh)
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_write_parquet(sesh_with_large_data_rw, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    sesh = sesh_with_large_data_rw
+    path = str(tmp_path / "obs.parquet")
+    count = write_parquet(sesh, path, batch_size=100, station_ids=station_ids)
+    assert count == expected_count(sesh)
+    assert pq.read_table(path).num_rows == count
+
+
+@pytest.mark.usefixtures("new_db_left")
+def test_numpy_batches(sesh_with_large_data_rw):
+    pytest.importorskip("numpy")
+    sesh = sesh_with_large_data_rw
+    columns = ["obs_time", "station_id", "datum", "net_var_name"]
+    batches = list(
+        numpy_batches(sesh, batch_size=100, columns=columns, station_ids=station_ids)
+    )
+    assert all(batch.dtype.names == tuple(columns) for batch in batches)
+    assert sum(len(batch) for batch in batches) == expected_count(sesh)
@@ -0,0 +1,154 @@
+import datetime
+
+from pytest import fixture, mark, raises
+from psycopg2.errors import UniqueViolation
+
+from pycds import Network, Station, History, Variable, Obs
+from pycds.ingest import (
+    CsvRowStream,
+    batch_rows,
+    ingest_obs,
+    ingest_obs_batches,
+)
+
+
+@fixture
+def sesh_with_history_and_variable(pycds_sesh):
+    """Session containing one history and one variable. Contents are discarded
+    when the session is rolled back."""
+    network = Network(name="Test Network")
+    station = Station(native_id="100", network=network)
+    history = History(station=station, station_name="Test Station")
+    variable = Variable(
+        name="Tx",
+        standard_name="air_temperature",
+        cell_method="time: maximum",
+        display_name="Temperature (Max.)",
+        network=network,
+    )
+    pycds_sesh.add_all([network, station, history, variable])
+    pycds_sesh.flush()
+    yield pycds_sesh
+
+
+@fixture
+def ids(sesh_with_history_and_variable):
+    sesh = sesh_with_history_and_variable
+    return sesh.query(History.id).scalar(), sesh.query(Variable.id).scalar()
+
+
+def hours(n):
+    return [
+        datetime.datetime(2000, 1, 1) + datetime.timedelta(hours=h) for h in range(n)
+    ]
+
+
+def obs_data(sesh):
+    return [(o.time, o.datum) for o in sesh.query(Obs).order_by(Obs.time).all()]
+
+
+def test_csv_row_stream():
+    rows = [(datetime.datetime(2000, 1, 1, h), float(h), 1, None) for h in range(3)]
+    stream = CsvRowStream(rows, chunk_size=2)
+    assert stream.read() == (
+        "2000-01-01 00:00:00,0.0,1,\n"
+        "2000-01-01 01:00:00,1.0,1,\n"
+        "2000-01-01 02:00:00,2.0,1,\n"
+    )
+    assert stream.read() == ""
+
+
+def test_batch_rows_mapping():
+    batch = {"time": [1, 2], "datum": [3, 4], "vars_id": [5, 6], "history_id": [7, 8]}
+    assert list(batch_rows(batch)) == [(1, 3, 5, 7), (2, 4, 6, 8)]
+
+
+def test_ingest_obs(sesh_with_history_and_variable, ids):
+    sesh = sesh_with_history_and_variable
+    history_id, vars_id = ids
+    times = hours(100)
+
+    result = ingest_obs(
+        sesh, [(t, float(i), vars_id, history_id) for i, t in enumerate(times)]
+    )
+
+    assert result.rows_copied == 100
+    assert result.rows_inserted == 100
+    assert result.rows_updated == 0
+    assert result.rows_per_second > 0
+    assert obs_data(sesh) == [(t, float(i)) for i, t in enumerate(times)]
+
+
+@mark.parametrize(
+    "on_conflict, expected_inserted, expected_updated, expected_data",
+    [
+        ("nothing", 1, 0, [1.0, 2.0, 3.0]),
+        ("update", 1, 2, [10.0, 20.0, 3.0]),
+    ],
+)
+def test_ingest_obs_conflict(
+    sesh_with_history_and_variable,
+    ids,
+    on_conflict,
+    expected_inserted,
+    expected_updated,
+    expected_data,
+):
+    sesh = sesh_with_history_and_variable
+    history_id, vars_id = ids
+    times = hours(3)
+    ingest_obs(
+        sesh, [(t, 1.0 + i, vars_id, history_id) for i, t in enumerate(times[:2])]
+    )
+
+    # Includes a duplicate within the incoming data; the last one wins.
+    result = ingest_obs(
+        sesh,
+        [
+            (times[0], 0.0, vars_id, history_id),
+            (times[0], 10.0, vars_id, history_id),
+            (times[1], 20.0, vars_id, history_id),
+            (times[2], 3.0, vars_id, history_id),
+        ],
+        on_conflict=on_conflict,
+    )
+
+    assert result.rows_copied == 4
+    assert result.rows_inserted == expected_inserted
+    assert result.rows_updated == expected_updated
+    assert [datum for _, datum in obs_data(sesh)] == expected_data
+
+
+def test_ingest_obs_conflict_error(sesh_with_history_and_variable, ids):
+    sesh = sesh_with_history_and_variable
+    history_id, vars_id = ids
+    rows = [(datetime.datetime(2000, 1, 1), 1.0, vars_id, history_id)]
+    ingest_obs(sesh, rows)
+    with raises(UniqueViolation):
+        ingest_obs(sesh, rows, on_conflict="error")
+
+
+def test_ingest_obs_invalid_conflict(pycds_sesh):
+    with raises(ValueError):
+        ingest_obs(pycds_sesh, [], on_conflict="ignore")
+
+
+def test_ingest_obs_batches(sesh_with_history_and_variable, ids):
+    sesh = sesh_with_history_and_variable
+    history_id, vars_id = ids
+    times = hours(6)
+    batches = [
+        {
+            "time": times[i : i + 3],
+            "datum": [float(j) for j in range(i, i + 3)],
+            "vars_id": [vars_id] * 3,
+            "history_id": [history_id] * 3,
+        }
+        for i in (0, 3)
+    ]
+
+    result = ingest_obs_batches(sesh, batches)
+
+    assert result.rows_copied == 6
+    assert result.rows_inserted == 6
+    assert obs_data(sesh) == [(t, float(i)) for i, t in enumerate(times)]
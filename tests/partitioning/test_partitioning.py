@@ -0,0 +1,134 @@
+import datetime
+
+from pytest import mark, raises
+from sqlalchemy import text
+
+from pycds import Network, Station, History, Variable, Obs
+from pycds.partitioning import (
+    create_partition,
+    create_partitions,
+    get_partitions,
+    partition_name,
+    partition_ranges,
+)
+
+
+@mark.parametrize(
+    "start, end, interval, expected",
+    [
+        (
+            datetime.datetime(2000, 6, 1),
+            datetime.datetime(2001, 1, 1),
+            "year",
+            [
+                (datetime.datetime(2000, 1, 1), datetime.datetime(2001, 1, 1)),
+                (datetime.datetime(2001, 1, 1), datetime.datetime(2002, 1, 1)),
+            ],
+        ),
+        (
+            datetime.datetime(2000, 11, 15),
+            datetime.datetime(2001, 1, 31, 23, 59),
+            "month",
+            [
+                (datetime.datetime(2000, 11, 1), datetime.datetime(2000, 12, 1)),
+                (datetime.datetime(2000, 12, 1), datetime.datetime(2001, 1, 1)),
+                (datetime.datetime(2001, 1, 1), datetime.datetime(2001, 2, 1)),
+            ],
+        ),
+    ],
+)
+def test_partition_ranges(start, end, interval, expected):
+    assert partition_ranges(start, end, interval) == expected
+
+
+@mark.parametrize(
+    "interval, expected",
+    [("year", "obs_raw_y2000"), ("month", "obs_raw_y2000m03")],
+)
+def test_partition_name(interval, expected):
+    assert (
+        partition_name("obs_raw", datetime.datetime(2000, 3, 1), interval) == expected
+    )
+
+
+def test_invalid_interval():
+    with raises(ValueError):
+        partition_ranges(
+            datetime.datetime(2000, 1, 1), datetime.datetime(2000, 1, 1), "week"
+        )
+
+
+def partition_row_counts(sesh, schema_name):
+    return dict(
+        sesh.execute(
+            text(
+                f"SELECT pg_class.relname, count(*) "
+                f"FROM {schema_name}.obs_raw "
+                f"JOIN pg_class ON pg_class.oid = obs_raw.tableoid "
+                f"GROUP BY 1"
+            )
+        ).fetchall()
+    )
+
+
+def test_create_partitions(pycds_sesh, schema_name):
+    sesh = pycds_sesh
+    network = Network(name="Test Network")
+    history = History(station=Station(native_id="100", network=network))
+    variable = Variable(name="Tx", network=network)
+    sesh.add_all(
+        [network, history, variable]
+        + [
+            Obs(
+                time=datetime.datetime(year, 6, 1),
+                datum=1.0,
+                history=history,
+                variable=variable,
+            )
+            for year in (2000, 2001, 2002)
+        ]
+    )
+    sesh.flush()
+
+    created = create_partitions(
+        sesh,
+        "obs_raw",
+        datetime.datetime(2000, 1, 1),
+        datetime.datetime(2001, 12, 31),
+    )
+
+    assert created == ["obs_raw_y2000", "obs_raw_y2001"]
+    assert [name for name, _ in get_partitions(sesh, "obs_raw")] == [
+        "obs_raw_default",
+        "obs_raw_y2000",
+        "obs_raw_y2001",
+    ]
+    # Rows in the default partition were moved into the new partitions.
+    assert partition_row_counts(sesh, schema_name) == {
+        "obs_raw_default": 1,
+        "obs_raw_y2000": 1,
+        "obs_raw_y2001": 1,
+    }
+    # Existing partitions are skipped.
+    assert create_partitions(
+        sesh,
+        "obs_raw",
+        datetime.datetime(2001, 1, 1),
+        datetime.datetime(2002, 1, 1),
+    ) == ["obs_raw_y2002"]
+    assert sesh.query(Obs).count() == 3
+
+
+def test_create_partition_empty_range(pycds_sesh, schema_name):
+    name = create_partition(
+        pycds_sesh,
+        "obs_raw_hx",
+        datetime.datetime(2030, 1, 1),
+        datetime.datetime(2030, 2, 1),
+        name="obs_raw_hx_y2030m01",
+    )
+    assert name == "obs_raw_hx_y2030m01"
+    assert (
+        name,
+        "FOR VALUES FROM ('2030-01-01 00:00:00') TO ('2030-02-01 00:00:00')",
+    ) in get_partitions(pycds_sesh, "obs_raw_hx")